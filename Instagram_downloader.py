@@ -17,6 +17,8 @@ from typing import Optional, Dict, Any, List
 import requests
 from urllib.parse import urlparse
 
+from file_watcher import WatchSession, watch_directory
+
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -208,23 +210,17 @@ class InstagramPicDownloaderSimple:
     
     async def _download_with_gallery_dl_cmd(self, url: str, download_dir: str, progress_callback=None, post_id=None) -> Dict[str, Any]:
         """使用命令行方式调用 gallery-dl 下载"""
+        watcher = None
         try:
-            # 记录下载前的文件
-            before_files = set()
+            # 监视下载目录，只关心本次下载新出现的文件
             download_path = Path(download_dir)
-            if download_path.exists():
-                for file_path in download_path.rglob("*"):
-                    if file_path.is_file():
-                        relative_path = str(file_path.relative_to(download_path))
-                        before_files.add(relative_path)
-            
-            logger.info(f"📊 下载前文件数量: {len(before_files)}")
+            watcher = watch_directory(download_path)
             
             # 创建进度监控任务
             progress_task = None
             if progress_callback:
                 progress_task = asyncio.create_task(self._monitor_progress(
-                    download_path, before_files, progress_callback
+                    watcher, progress_callback
                 ))
             
             # 构建 gallery-dl 命令
@@ -264,14 +260,8 @@ class InstagramPicDownloaderSimple:
                     pass
             
             # 计算下载结果
-            current_files = set()
-            if download_path.exists():
-                for file_path in download_path.rglob("*"):
-                    if file_path.is_file():
-                        relative_path = str(file_path.relative_to(download_path))
-                        current_files.add(relative_path)
-            
-            new_files = current_files - before_files
+            watcher.stop()
+            new_files = [watcher.relative(path) for path in watcher.new_files()]
             files_count = len(new_files)
             
             if files_count == 0:
@@ -328,9 +318,12 @@ class InstagramPicDownloaderSimple:
                 "success": False,
                 "error": f"gallery-dl 命令执行失败: {str(e)}"
             }
+        finally:
+            if watcher:
+                watcher.stop()
     
-    async def _monitor_progress(self, download_path: Path, before_files: set, progress_callback):
-        """监控下载进度"""
+    async def _monitor_progress(self, watcher: WatchSession, progress_callback):
+        """监控下载进度（由目录监视器的文件事件驱动）"""
         try:
             last_count = 0
             last_update_time = time.time()
@@ -339,18 +332,11 @@ class InstagramPicDownloaderSimple:
             logger.info(f"📊 开始监控 Instagram 下载进度")
             
             while True:
-                await asyncio.sleep(1)  # 每1秒检查一次
-                
-                # 计算当前文件数量
-                current_files = set()
-                if download_path.exists():
-                    for file_path in download_path.rglob("*"):
-                        if file_path.is_file():
-                            relative_path = str(file_path.relative_to(download_path))
-                            current_files.add(relative_path)
+                # 有新文件时立即更新，最多等待1秒
+                await watcher.wait_for_change(timeout=1)
                 
                 # 计算新文件数量
-                new_files = current_files - before_files
+                new_files = watcher.new_files()
                 current_count = len(new_files)
                 
                 # 如果文件数量有变化或时间间隔到了，更新进度
@@ -361,8 +347,7 @@ class InstagramPicDownloaderSimple:
                     # 获取当前正在下载的文件路径
                     current_file_path = "准备中..."
                     if new_files:
-                        latest_file = sorted(new_files)[-1]
-                        current_file_path = latest_file
+                        current_file_path = watcher.relative(new_files[-1])
                     
                     progress_text = (
                         f"📱 **Instagram 图片下载中**\n"
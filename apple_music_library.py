@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+Apple Music 曲库索引
+记录 AM-DL downloads 目录中的 艺术家 → 专辑 → 曲目（含文件大小），保存在 SQLite 中并在内存里按
+专辑目录、专辑名和曲目名建立字典。下载过程中由目录监视器报告的新文件增量写入索引，
+完成消息需要的单曲目录、曲目大小和专辑汇总都直接从字典中查询，不再遍历整个曲库目录。
+读取专辑时比较专辑目录的修改时间，目录发生变化（曲目被删除或替换）时重新列出该专辑
+"""
+
+import os
+import re
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = "/app/db/apple_music_library.db"
+
+# 与完成消息统计的格式一致（AM-DL 之外的工具可能写入 FLAC / MP3）
+AUDIO_EXTENSIONS = ('.m4a', '.flac', '.aac', '.mp3', '.m4p')
+
+# 多碟专辑的分碟子目录（Disc 1、CD2 等）
+DISC_DIR_PATTERN = re.compile(r'^(disc|disk|cd)\s*\d+$', re.IGNORECASE)
+
+# 模糊匹配专辑名时只检查最近写入的专辑
+RECENT_ALBUMS_LIMIT = 64
+
+
+class AppleMusicLibraryIndex:
+    """AM-DL downloads 目录的持久化曲库索引"""
+
+    def __init__(self, root: str, db_path: Optional[str] = DEFAULT_DB_PATH):
+        """
+        初始化曲库索引（数据库中还没有该目录的记录时，遍历一次现有曲库作为初始内容）
+
+        Args:
+            root: AM-DL downloads 目录
+            db_path: SQLite 数据库文件路径，为 None 时只使用内存索引
+        """
+        self.root = os.path.abspath(str(root))
+        self.db_path = Path(db_path) if db_path else None
+        self._lock = threading.RLock()
+        self.enabled = self.db_path is not None
+
+        # 专辑目录 -> {曲目文件名: 大小}
+        self._albums: Dict[str, Dict[str, int]] = {}
+        # 专辑目录 -> 上次列出该目录时的修改时间（None 表示还没有列出过）
+        self._album_mtimes: Dict[str, Optional[int]] = {}
+        # 专辑目录名 -> 专辑目录（同名专辑以最近写入的为准）
+        self._album_names: Dict[str, str] = {}
+        # 曲目名（不含扩展名）-> 文件路径
+        self._tracks_by_stem: Dict[str, str] = {}
+        # 按写入时间排序的专辑目录（最后一个为最近写入）
+        self._recent_albums: "OrderedDict[str, float]" = OrderedDict()
+        self._latest_track: Optional[str] = None
+
+        if not self.enabled:
+            self._bootstrap()
+            return
+        try:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._init_database()
+            self._load()
+        except Exception as e:
+            # 数据库不可用时索引只保存在内存中
+            logger.warning(f"⚠️ Apple Music 曲库索引无法持久化，仅使用内存索引: {e}")
+            self.enabled = False
+            if not self._albums:
+                self._bootstrap()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """打开连接并在一个事务中使用，结束时提交（出错时回滚）并关闭连接"""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_database(self):
+        """初始化数据库表"""
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS library_tracks (
+                    path TEXT PRIMARY KEY,
+                    root TEXT NOT NULL,
+                    album_dir TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_library_tracks_root ON library_tracks (root, mtime)')
+            conn.commit()
+
+    def _load(self):
+        """从数据库载入索引，没有记录时遍历一次曲库"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT path, album_dir, size, mtime FROM library_tracks WHERE root = ? ORDER BY mtime",
+                (self.root,)
+            ).fetchall()
+        if not rows:
+            self._bootstrap()
+            return
+        for path, album_dir, size, mtime in rows:
+            self._add(path, album_dir, size, mtime)
+        logger.info(f"✅ Apple Music 曲库索引已载入: {len(self._albums)} 个专辑, {len(rows)} 首曲目")
+
+    def _bootstrap(self):
+        """首次使用时遍历现有曲库（之后只通过下载事件增量更新）"""
+        if not os.path.isdir(self.root):
+            return
+        started = time.time()
+        rows = []
+        for directory, _dirs, files in os.walk(self.root):
+            for file in files:
+                if not file.lower().endswith(AUDIO_EXTENSIONS):
+                    continue
+                path = os.path.join(directory, file)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                rows.append((path, self.root, directory, stat.st_size, stat.st_mtime))
+        rows.sort(key=lambda row: row[4])
+        with self._lock:
+            for path, _root, album_dir, size, mtime in rows:
+                self._add(path, album_dir, size, mtime)
+        self._write(rows)
+        logger.info(f"🗂️ Apple Music 曲库索引初始化: {len(self._albums)} 个专辑, {len(rows)} 首曲目，"
+                    f"耗时 {time.time() - started:.1f}s")
+
+    def _write(self, rows: List[Tuple[str, str, str, int, float]]):
+        if not self.enabled or not rows:
+            return
+        try:
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO library_tracks (path, root, album_dir, size, mtime) "
+                    "VALUES (?, ?, ?, ?, ?)", rows)
+        except Exception as e:
+            logger.debug(f"写入 Apple Music 曲库索引失败: {e}")
+
+    def _add(self, path: str, album_dir: str, size: int, mtime: float):
+        filename = os.path.basename(path)
+        self._albums.setdefault(album_dir, {})[filename] = size
+        self._album_mtimes.setdefault(album_dir, None)
+        self._album_names[os.path.basename(album_dir)] = album_dir
+        self._tracks_by_stem[os.path.splitext(filename)[0]] = path
+        self._recent_albums[album_dir] = mtime
+        self._recent_albums.move_to_end(album_dir)
+        self._latest_track = path
+
+    def _forget_album(self, album_dir: str):
+        """专辑目录已被删除或移走时从索引中移除"""
+        with self._lock:
+            tracks = self._albums.pop(album_dir, {})
+            self._album_mtimes.pop(album_dir, None)
+            self._recent_albums.pop(album_dir, None)
+            if self._album_names.get(os.path.basename(album_dir)) == album_dir:
+                del self._album_names[os.path.basename(album_dir)]
+            self._drop_tracks(album_dir, tracks)
+        if self.enabled:
+            try:
+                with self._connect() as conn:
+                    conn.execute("DELETE FROM library_tracks WHERE album_dir = ?", (album_dir,))
+            except Exception as e:
+                logger.debug(f"删除 Apple Music 曲库索引记录失败: {e}")
+
+    def _drop_tracks(self, album_dir: str, filenames: Iterable[str]):
+        """从曲目名字典中移除指定曲目（调用方持有锁）"""
+        for filename in filenames:
+            path = os.path.join(album_dir, filename)
+            stem = os.path.splitext(filename)[0]
+            if self._tracks_by_stem.get(stem) == path:
+                del self._tracks_by_stem[stem]
+            if self._latest_track == path:
+                self._latest_track = None
+
+    def _refresh_album(self, album_dir: str) -> bool:
+        """
+        读取前校验专辑：目录修改时间与上次列出时不同（曲目被删除、替换或新增）时重新列出该目录
+
+        Returns:
+            专辑目录是否仍然存在
+        """
+        try:
+            mtime = os.stat(album_dir).st_mtime_ns
+        except OSError:
+            self._forget_album(album_dir)
+            return False
+        with self._lock:
+            if album_dir in self._albums and self._album_mtimes.get(album_dir) == mtime:
+                return True
+        try:
+            names = os.listdir(album_dir)
+        except OSError:
+            return True
+        current: Dict[str, Tuple[int, float]] = {}
+        for name in names:
+            if not name.lower().endswith(AUDIO_EXTENSIONS):
+                continue
+            try:
+                stat = os.stat(os.path.join(album_dir, name))
+            except OSError:
+                continue
+            current[name] = (stat.st_size, stat.st_mtime)
+
+        rows = []
+        with self._lock:
+            known = self._albums.get(album_dir, {})
+            removed = [name for name in known if name not in current]
+            self._drop_tracks(album_dir, removed)
+            for name in removed:
+                del known[name]
+            # 按修改时间写入，保持最近写入的曲目在最后
+            for name, (size, file_mtime) in sorted(current.items(), key=lambda item: item[1][1]):
+                path = os.path.join(album_dir, name)
+                if known.get(name) != size:
+                    rows.append((path, self.root, album_dir, size, file_mtime))
+                self._albums.setdefault(album_dir, {})[name] = size
+                self._tracks_by_stem[os.path.splitext(name)[0]] = path
+            if album_dir in self._albums:
+                self._album_mtimes[album_dir] = mtime
+        self._write(rows)
+        if removed and self.enabled:
+            try:
+                with self._connect() as conn:
+                    conn.executemany("DELETE FROM library_tracks WHERE path = ?",
+                                     [(os.path.join(album_dir, name),) for name in removed])
+            except Exception as e:
+                logger.debug(f"删除 Apple Music 曲库索引记录失败: {e}")
+        if removed or rows:
+            logger.debug(f"🗂️ 专辑目录已变化，重新列出: {album_dir}（移除 {len(removed)}，更新 {len(rows)}）")
+        return True
+
+    # ------------------------------------------------------------------
+    # 更新
+    # ------------------------------------------------------------------
+
+    def record_files(self, paths: Iterable[Any]) -> int:
+        """
+        记录下载写入的音频文件（目录监视器报告的新文件）
+
+        Returns:
+            新增或大小发生变化的曲目数
+        """
+        rows = []
+        for path in paths:
+            path = os.path.abspath(str(path))
+            if not path.lower().endswith(AUDIO_EXTENSIONS):
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            album_dir = os.path.dirname(path)
+            with self._lock:
+                known = self._albums.get(album_dir, {}).get(os.path.basename(path))
+                self._add(path, album_dir, stat.st_size, stat.st_mtime)
+            if known != stat.st_size:
+                rows.append((path, self.root, album_dir, stat.st_size, stat.st_mtime))
+        self._write(rows)
+        return len(rows)
+
+    def scan_changes(self, since: float) -> int:
+        """
+        没有目录监视器时记录 since 之后写入的曲目：只对 since 之后修改过的目录逐个检查文件，
+        其余目录只列出子目录
+
+        Returns:
+            新增或大小发生变化的曲目数
+        """
+        candidates = []
+        try:
+            pending = [(self.root, os.stat(self.root).st_mtime >= since)]
+        except OSError:
+            return 0
+        while pending:
+            directory, changed = pending.pop()
+            try:
+                with os.scandir(directory) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append((entry.path, entry.stat().st_mtime >= since))
+                    elif changed and entry.name.lower().endswith(AUDIO_EXTENSIONS):
+                        mtime = entry.stat().st_mtime
+                        if mtime >= since:
+                            candidates.append((mtime, entry.path))
+                except OSError:
+                    continue
+        candidates.sort()
+        return self.record_files(path for _mtime, path in candidates)
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def find_album_dir(self, name: str) -> Optional[str]:
+        """按专辑目录名查找（支持 " - Single" 后缀，精确匹配失败时在最近写入的专辑中模糊匹配）"""
+        with self._lock:
+            for candidate in (name, f"{name} - Single"):
+                album_dir = self._album_names.get(candidate)
+                if album_dir:
+                    return self._existing_album(album_dir)
+            recent = list(self._recent_albums)[-RECENT_ALBUMS_LIMIT:]
+        for album_dir in reversed(recent):
+            if name in os.path.basename(album_dir):
+                return self._existing_album(album_dir)
+        return None
+
+    def find_track(self, stem: str) -> Optional[Tuple[str, int]]:
+        """按曲目名（不含扩展名）查找，返回 (路径, 大小)"""
+        with self._lock:
+            path = self._tracks_by_stem.get(stem)
+        if not path:
+            return None
+        self._refresh_album(os.path.dirname(path))
+        with self._lock:
+            return self._track(self._tracks_by_stem.get(stem))
+
+    def latest_track(self) -> Optional[Tuple[str, int]]:
+        """最近写入的曲目 (路径, 大小)"""
+        with self._lock:
+            path = self._latest_track
+        if not path:
+            return None
+        self._refresh_album(os.path.dirname(path))
+        with self._lock:
+            return self._track(self._latest_track)
+
+    def _track(self, path: Optional[str]) -> Optional[Tuple[str, int]]:
+        if not path:
+            return None
+        size = self._albums.get(os.path.dirname(path), {}).get(os.path.basename(path))
+        return (path, size) if size is not None else None
+
+    def latest_album_dir(self) -> Optional[str]:
+        """最近写入的专辑目录"""
+        with self._lock:
+            if not self._recent_albums:
+                return None
+            album_dir = next(reversed(self._recent_albums))
+        # 最近写入的是分碟子目录时返回专辑目录
+        if DISC_DIR_PATTERN.match(os.path.basename(album_dir)):
+            album_dir = os.path.dirname(album_dir)
+        return self._existing_album(album_dir)
+
+    def album_tracks(self, album_dir: str) -> List[Tuple[str, int]]:
+        """专辑中的曲目 [(路径, 大小)]，包括分碟等子目录中的曲目，按相对路径排序"""
+        album_dir = os.path.abspath(str(album_dir))
+        # 不在索引中的目录（例如其他工具写入的）同样列出一次后加入索引
+        if not self._refresh_album(album_dir):
+            return []
+        directories = [album_dir]
+        for directory, dirs, _files in os.walk(album_dir):
+            for name in dirs:
+                subdir = os.path.join(directory, name)
+                if self._refresh_album(subdir):
+                    directories.append(subdir)
+        tracks = []
+        with self._lock:
+            for directory in directories:
+                tracks.extend((os.path.join(directory, name), size)
+                              for name, size in self._albums.get(directory, {}).items())
+        return sorted(tracks, key=lambda track: os.path.relpath(track[0], album_dir))
+
+    def album_summary(self, album_dir: str) -> Dict[str, Any]:
+        """专辑汇总：艺术家、专辑名、曲目数、总大小（字节）和曲目列表"""
+        tracks = self.album_tracks(album_dir)
+        return {
+            'artist': os.path.basename(os.path.dirname(album_dir)),
+            'album': os.path.basename(album_dir),
+            'path': album_dir,
+            'files_count': len(tracks),
+            'total_size': sum(size for _path, size in tracks),
+            'track_list': [{
+                'name': os.path.splitext(os.path.basename(path))[0],
+                'size': size / (1024 * 1024),
+                'path': os.path.basename(path),
+            } for path, size in tracks],
+        }
+
+    def _existing_album(self, album_dir: str) -> Optional[str]:
+        return album_dir if self._refresh_album(album_dir) else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "root": self.root,
+                "albums": len(self._albums),
+                "tracks": sum(len(tracks) for tracks in self._albums.values()),
+                "persistent": self.enabled,
+            }
+
+
+_shared_indexes: Dict[str, AppleMusicLibraryIndex] = {}
+_shared_indexes_lock = threading.Lock()
+
+
+def get_library_index(root: str) -> AppleMusicLibraryIndex:
+    """获取 root 目录的进程内共享曲库索引（路径可通过 APPLE_MUSIC_LIBRARY_DB 环境变量修改）"""
+    root = os.path.abspath(str(root))
+    with _shared_indexes_lock:
+        index = _shared_indexes.get(root)
+        if index is None:
+            index = AppleMusicLibraryIndex(root, os.getenv("APPLE_MUSIC_LIBRARY_DB", DEFAULT_DB_PATH))
+            _shared_indexes[root] = index
+        return index
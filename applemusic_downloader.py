@@ -17,6 +17,8 @@ from typing import Optional, Dict, Any, List
 import re
 from urllib.parse import urlparse, parse_qs
 
+from file_watcher import WatchSession, watch_directory
+
 # 配置日志
 logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -258,6 +260,7 @@ class AppleMusicDownloader:
                 "error": "不是有效的 Apple Music 链接"
             }
 
+        watcher = None
         try:
             # 提取音乐信息
             music_info = self.extract_music_info_for_myself(url)
@@ -272,16 +275,8 @@ class AppleMusicDownloader:
                 )
                 await self._safe_callback(progress_callback, start_text)
 
-            # 记录下载前的文件
-            before_files = set()
-            if self.output_dir.exists():
-                for file_path in self.output_dir.rglob("*"):
-                    if file_path.is_file():
-                        relative_path = str(
-                            file_path.relative_to(self.output_dir))
-                        before_files.add(relative_path)
-
-            logger.info(f"📊 下载前文件数量: {len(before_files)}")
+            # 监视输出目录，只关心本次下载新出现的文件
+            watcher = watch_directory(self.output_dir)
 
             # 构建 gamdl 命令
             cmd = ['gamdl']
@@ -318,7 +313,7 @@ class AppleMusicDownloader:
             progress_task = None
             if progress_callback:
                 progress_task = asyncio.create_task(self._monitor_progress(
-                    self.output_dir, before_files, progress_callback, music_info
+                    watcher, progress_callback, music_info
                 ))
 
             try:
@@ -343,16 +338,7 @@ class AppleMusicDownloader:
                         await asyncio.sleep(3)
 
                         # 检查是否有新文件下载
-                        current_files = set()
-                        if self.output_dir.exists():
-                            for file_path in self.output_dir.rglob("*"):
-                                if file_path.is_file():
-                                    relative_path = str(
-                                        file_path.relative_to(self.output_dir))
-                                    current_files.add(relative_path)
-
-                        new_files = current_files - before_files
-                        if len(new_files) > 0:
+                        if watcher.new_files():
                             # 有文件下载，检查质量
                             if self._check_download_quality():
                                 logger.info(
@@ -421,15 +407,8 @@ class AppleMusicDownloader:
                     pass
 
             # 计算下载结果
-            current_files = set()
-            if self.output_dir.exists():
-                for file_path in self.output_dir.rglob("*"):
-                    if file_path.is_file():
-                        relative_path = str(
-                            file_path.relative_to(self.output_dir))
-                        current_files.add(relative_path)
-
-            new_files = current_files - before_files
+            watcher.stop()
+            new_files = [watcher.relative(path) for path in watcher.new_files()]
             files_count = len(new_files)
 
             if files_count == 0:
@@ -489,10 +468,13 @@ class AppleMusicDownloader:
                 "success": False,
                 "error": f"下载失败: {str(e)}"
             }
+        finally:
+            if watcher:
+                watcher.stop()
 
-    async def _monitor_progress(self, download_dir: Path, before_files: set,
+    async def _monitor_progress(self, watcher: WatchSession,
                                 progress_callback, music_info: Dict[str, Any]):
-        """监控下载进度"""
+        """监控下载进度（由目录监视器的文件事件驱动）"""
         try:
             last_count = 0
             last_update_time = time.time()
@@ -501,19 +483,10 @@ class AppleMusicDownloader:
             start_time = time.time()
 
             while True:
-                await asyncio.sleep(1)
-
-                # 计算当前文件数量
-                current_files = set()
-                if download_dir.exists():
-                    for file_path in download_dir.rglob("*"):
-                        if file_path.is_file():
-                            relative_path = str(
-                                file_path.relative_to(download_dir))
-                            current_files.add(relative_path)
+                await watcher.wait_for_change(timeout=1)
 
                 # 计算新文件数量
-                new_files = current_files - before_files
+                new_files = [watcher.relative(path) for path in watcher.new_files()]
                 current_count = len(new_files)
 
                 # 如果文件数量有变化或时间间隔到了，更新进度
@@ -523,7 +496,7 @@ class AppleMusicDownloader:
 
                     # 获取当前正在下载的文件信息
                     current_file_info = self._get_current_download_info(
-                        download_dir, new_files)
+                        watcher.root, new_files)
 
                     # 计算进度百分比
                     progress_percent = self._calculate_progress_percent(
@@ -588,7 +561,7 @@ class AppleMusicDownloader:
         """获取当前下载选项"""
         return self.default_options.copy()
 
-    def _get_current_download_info(self, download_dir: Path, new_files: set) -> Dict[str, Any]:
+    def _get_current_download_info(self, download_dir: Path, new_files: List[str]) -> Dict[str, Any]:
         """获取当前下载文件的信息"""
         if not new_files:
             return {
@@ -597,8 +570,8 @@ class AppleMusicDownloader:
                 'total_mb': 0.0
             }
 
-        # 获取最新的文件
-        latest_file = sorted(new_files)[-1]
+        # 获取最新的文件（目录监视器按出现顺序记录）
+        latest_file = new_files[-1]
         file_path = download_dir / latest_file
 
         # 计算当前文件大小
@@ -13,14 +13,30 @@ import os
 import re
 import subprocess
 import tempfile
+import threading
 import time
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Any
+from collections import OrderedDict
 from urllib.parse import urlparse, parse_qs
 import aiohttp
 import aiofiles
 from dataclasses import dataclass
 
+from file_watcher import WatchSession, watch_directory
+from apple_music_library import AUDIO_EXTENSIONS, AppleMusicLibraryIndex, get_library_index
+
+# 导入元数据缓存（按链接持久化 amd_getinfo.py 的解析结果）
+try:
+    from metadata_cache import DEFAULT_POLICIES, get_metadata_cache
+    MUSIC_INFO_POLICY = DEFAULT_POLICIES["apple_music"]
+except ImportError:
+    get_metadata_cache = None
+    MUSIC_INFO_POLICY = {"ttl": 7 * 86400, "negative_ttl": 3600}
+
+# 进程内记忆的音乐信息条数
+MUSIC_INFO_MEMO_ITEMS = 256
+
 # 尝试导入 yaml，如果失败则使用内置的 json
 try:
     import yaml
@@ -33,6 +49,24 @@ except ImportError:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 繁体到简体转换器（OpenCC 创建时要加载词典，进程内只创建一次；opencc 未安装时为 False）
+_t2s_converter = None
+_t2s_converter_lock = threading.Lock()
+
+
+def get_t2s_converter():
+    """获取进程内共享的 OpenCC 繁体到简体转换器（opencc 未安装时返回 None）"""
+    global _t2s_converter
+    with _t2s_converter_lock:
+        if _t2s_converter is None:
+            try:
+                import opencc
+                _t2s_converter = opencc.OpenCC('t2s')
+            except ImportError:
+                logger.warning("⚠️ opencc库未安装，无法进行繁简转换")
+                _t2s_converter = False
+        return _t2s_converter or None
+
 class DownloadBackend:
     """下载后端接口"""
     
@@ -56,18 +90,38 @@ class DownloadBackend:
 class AppleMusicDownloaderBackend(DownloadBackend):
     """apple-music-downloader 后端实现"""
     
-    def __init__(self, decrypt_port: str = None, get_m3u8_port: str = None):
+    def __init__(self, decrypt_port: str = None, get_m3u8_port: str = None, slot: int = 0):
+        """
+        Args:
+            slot: 批量下载的并发槽编号；0 为默认的 /app/amdp 工作目录，其他槽使用独立的工作目录和
+                  暂存下载目录，任务结束后再把文件移入 AM-DL downloads，互不看到对方的文件
+        """
         super().__init__("apple-music-downloader")
+        self.slot = slot
+        self.work_dir = "/app/amdp" if not slot else os.path.join("/app/amdp", "slots", str(slot))
         self.decrypt_port = decrypt_port or os.environ.get("AMD_WRAPER_DECRYPT", "192.168.2.134:10020")
         self.get_m3u8_port = get_m3u8_port or os.environ.get("AMD_WRAPER_GET", "192.168.2.134:20020")
         self.region = os.environ.get("AMD_REGION", "cn")
         self.amd_path = self._find_amd_executable()
         self.config_template = self._get_config_template()
         self._download_url = None  # 添加下载URL属性
+
+        # 当前任务的音乐信息：下载开始时在后台解析一次，进度解析只读取结果
+        self._music_info: Optional[Dict[str, Any]] = None
+        self._music_info_task: Optional[asyncio.Task] = None
         
         # 初始化解密大小信息
         self._last_decrypt_total = None
         self._last_decrypt_unit = None
+
+        # 当前下载任务的目录监视器（记录本次下载新写入的文件）
+        self._watcher: Optional[WatchSession] = None
+        # 本次下载中已写入曲库索引的文件
+        self._indexed_files: set = set()
+        # 本次下载开始的时间（目录监视器不可用时按修改时间查找新文件）
+        self._download_started: float = 0.0
+        # 并发槽的本次任务索引（只包含暂存目录中本次下载的文件）
+        self._job_index: Optional[AppleMusicLibraryIndex] = None
         
         # 在初始化时就创建配置文件和目录
         if self.amd_path:
@@ -76,8 +130,8 @@ class AppleMusicDownloaderBackend(DownloadBackend):
     def _initialize_amd_environment(self):
         """初始化 amd 环境"""
         try:
-            # 直接使用 /app/amdp 目录
-            amd_dir = "/app/amdp"
+            # 默认使用 /app/amdp 目录，并发槽使用 /app/amdp/slots/<槽号>
+            amd_dir = self.work_dir
             os.makedirs(amd_dir, exist_ok=True)
             logger.info(f"✅ 确认 amdp 目录: {amd_dir}")
             
@@ -168,6 +222,10 @@ storefront: "{self.region}"
         # 直接在 /app/amdp 目录中创建配置文件
         config_path = os.path.join(amd_dir, "config.yaml")
         
+        # 并发槽：复制默认配置（保留其中的令牌等设置），下载路径改为本槽的暂存目录
+        if self.slot:
+            return self._create_slot_config_file(config_path)
+        
         # 如果配置文件已存在，直接返回
         if os.path.exists(config_path):
             logger.info(f"✅ 配置文件已存在: {config_path}")
@@ -183,6 +241,27 @@ storefront: "{self.region}"
             logger.error(f"❌ 配置文件创建失败: {e}")
             return None
     
+    def _create_slot_config_file(self, config_path: str) -> Optional[str]:
+        """生成并发槽的配置文件（下载路径指向本槽的暂存目录）"""
+        try:
+            try:
+                with open("/app/amdp/config.yaml", 'r', encoding='utf-8') as f:
+                    content = f.read()
+            except OSError:
+                content = self.config_template
+            staging_root = self._staging_root()
+            for kind, folder in (("alac", "AM-DL downloads"), ("atmos", "AM-DL-Atmos downloads"),
+                                 ("aac", "AM-DL-AAC downloads")):
+                content = re.sub(rf'^{kind}-save-folder:.*$',
+                                 f'{kind}-save-folder: {os.path.join(staging_root, folder)}',
+                                 content, flags=re.MULTILINE)
+            with open(config_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            return config_path
+        except Exception as e:
+            logger.error(f"❌ 并发槽 {self.slot} 配置文件创建失败: {e}")
+            return None
+    
     def _ensure_amd_in_output_dir(self, amd_dir: str) -> str:
         """确保 amd 工具在指定的 amd 目录中"""
         # 检查多个可能的路径
@@ -233,6 +312,9 @@ storefront: "{self.region}"
         try:
             # 保存URL供后续解析使用
             self._download_url = url
+            self._start_music_info_resolution(url)
+            await self._prepare_library_index()
+            self._start_download_watcher()
             
             if not self.amd_path:
                 return {
@@ -242,7 +324,7 @@ storefront: "{self.region}"
                 }
             
             # 创建配置文件
-            config_path = self._create_config_file("/app/amdp")
+            config_path = self._create_config_file(self.work_dir)
             if not config_path:
                 return {
                     'success': False,
@@ -260,7 +342,7 @@ storefront: "{self.region}"
             logger.debug(f"命令: {' '.join(cmd)}")
             
             # 使用 /app/amdp 作为工作目录和配置目录
-            amd_working_dir = "/app/amdp"  # 使用 /app/amdp 作为工作目录
+            amd_working_dir = self.work_dir  # 使用 /app/amdp（或并发槽目录）作为工作目录
             
             # 环境变量设置
             env_vars = {
@@ -335,8 +417,8 @@ storefront: "{self.region}"
                 # 发送完成进度信息
                 if progress_callback:
                     try:
-                        # 使用 amd_getinfo.py 获取真实的音乐信息
-                        music_info = self._get_music_info_from_amd_getinfo_sync(self._download_url)
+                        # 使用下载开始时解析的音乐信息
+                        music_info = await self._job_music_info()
                         
                         # 如果没有获取到音乐信息，使用默认值
                         if not music_info:
@@ -373,7 +455,7 @@ storefront: "{self.region}"
                             'files_count': 1,
                             'total_size': real_file_size,  # real_file_size已经是MB
                             'total_size_mb': real_file_size,  # 直接提供MB值
-                            'download_path': str(output_dir),
+                            'download_path': self._job_download_path(str(output_dir)),
                             'track_list': [],
                             'download_url': self._download_url if hasattr(self, '_download_url') else ''
                         }
@@ -390,7 +472,8 @@ storefront: "{self.region}"
                     'music_type': 'song',
                     'message': 'amd 下载成功',
                     'music_info': music_info if 'music_info' in locals() else None,
-                    'total_size_mb': real_file_size
+                    'total_size_mb': real_file_size,
+                    'download_path': self._job_download_path(str(output_dir))
                 }
             else:
                 # 如果没有进度回调，stderr可能未定义，需要安全处理
@@ -416,6 +499,130 @@ storefront: "{self.region}"
                 'backend': self.name,
                 'error': str(e)
             }
+        finally:
+            self._stop_download_watcher()
+
+    def _output_root(self) -> str:
+        return getattr(self, 'output_dir', '/downloads/AppleMusic')
+
+    def _staging_root(self) -> Optional[str]:
+        """并发槽的暂存目录（默认槽直接写入曲库，返回 None）"""
+        if not self.slot:
+            return None
+        return os.path.join(self._output_root(), ".amd-slots", str(self.slot))
+
+    def _amd_downloads_dir(self) -> str:
+        """apple-music-downloader 的下载目录（并发槽为本槽的暂存目录）"""
+        return os.path.join(self._staging_root() or self._output_root(), "AM-DL downloads")
+
+    def _start_download_watcher(self):
+        """开始监视下载目录，完成后只在本次新写入的文件中查找结果"""
+        self._stop_download_watcher()
+        self._indexed_files = set()
+        self._download_started = time.time()
+        if self.slot:
+            self._job_index = AppleMusicLibraryIndex(self._amd_downloads_dir(), db_path=None)
+        try:
+            self._watcher = watch_directory(self._amd_downloads_dir())
+        except OSError as e:
+            logger.warning(f"⚠️ 无法监视下载目录，将按修改时间查找新文件: {e}")
+            self._watcher = None
+
+    def _stop_download_watcher(self):
+        """停止监视（已记录的新文件在下一次下载前仍可查询）"""
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._sync_library_index()
+        if self.slot:
+            self._publish_staged_files()
+
+    def _published_path(self, path: str) -> str:
+        """暂存目录中的路径在曲库中的对应位置（默认槽及暂存目录外的路径原样返回）"""
+        staging_root = self._staging_root()
+        if not staging_root or not path:
+            return path
+        relative = os.path.relpath(path, staging_root)
+        if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+            return path
+        return os.path.normpath(os.path.join(self._output_root(), relative))
+
+    def _publish_staged_files(self):
+        """把并发槽暂存目录中的文件移入曲库（保持相对路径），并记录到曲库索引；曲库中已有的文件保留不覆盖"""
+        staging_root = self._staging_root()
+        if not os.path.isdir(staging_root):
+            return
+        output_root = self._output_root()
+        library_root = os.path.join(output_root, "AM-DL downloads")
+        published = []
+        skipped = 0
+        for directory, _dirs, files in os.walk(staging_root, topdown=False):
+            for file in files:
+                source = os.path.join(directory, file)
+                target = self._published_path(source)
+                try:
+                    if os.path.exists(target):
+                        # 其他任务已把同一文件放入曲库，保留曲库中的文件，丢弃暂存的副本
+                        logger.warning(f"⚠️ 曲库中已存在，跳过: {target}")
+                        os.remove(source)
+                        skipped += 1
+                        continue
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    os.replace(source, target)
+                    published.append(target)
+                except OSError as e:
+                    logger.warning(f"⚠️ 移动暂存文件失败: {source} -> {target}: {e}")
+            # 保留暂存目录下的 AM-DL downloads 等顶层目录（共享监视器监视着它们）
+            if os.path.dirname(directory) not in (staging_root, os.path.dirname(staging_root)):
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    pass
+        audio = [path for path in published if path.startswith(library_root + os.sep)]
+        if audio:
+            get_library_index(library_root).record_files(audio)
+        if published or skipped:
+            logger.info(f"📦 并发槽 {self.slot} 已将 {len(published)} 个文件移入曲库（跳过已存在 {skipped} 个）")
+
+    def _job_download_path(self, default: str) -> str:
+        """本次下载的单曲所在目录在曲库中的位置（找不到时返回 default）"""
+        new_files = self._new_audio_files()
+        if new_files:
+            return self._published_path(os.path.dirname(new_files[-1]))
+        latest = self._library_index().latest_track()
+        if latest:
+            return self._published_path(os.path.dirname(latest[0]))
+        return default
+
+    def _new_audio_files(self) -> List[str]:
+        """本次下载新写入的音频文件（没有监视器时返回空列表）"""
+        if self._watcher is None:
+            return []
+        return [str(path) for path in self._watcher.new_files(AUDIO_EXTENSIONS)]
+
+    def _library_index(self) -> AppleMusicLibraryIndex:
+        """AM-DL downloads 目录的曲库索引（并发槽为只包含本次任务文件的索引）"""
+        if self.slot:
+            if self._job_index is None:
+                self._job_index = AppleMusicLibraryIndex(self._amd_downloads_dir(), db_path=None)
+            return self._job_index
+        return get_library_index(self._amd_downloads_dir())
+
+    async def _prepare_library_index(self):
+        """首次使用曲库索引时要遍历一次现有曲库，在线程中提前完成以免阻塞事件循环"""
+        library_root = os.path.join(self._output_root(), "AM-DL downloads")
+        await asyncio.get_running_loop().run_in_executor(None, get_library_index, library_root)
+
+    def _sync_library_index(self):
+        """把本次下载中已写完的新文件记录到曲库索引（每个文件只记录一次）"""
+        if self._watcher is None:
+            # 监视器不可用时只检查下载开始后修改过的目录（留 1 秒余量应对时间精度）
+            self._library_index().scan_changes(self._download_started - 1)
+            return
+        completed = [str(path) for path in self._watcher.completed_files(AUDIO_EXTENSIONS)]
+        new_files = [path for path in completed if path not in self._indexed_files]
+        if new_files:
+            self._library_index().record_files(new_files)
+            self._indexed_files.update(new_files)
 
     async def _monitor_amd_progress(self, process, progress_callback, monitored_output=None):
         """实时监控 amd 进程输出，解析进度信息"""
@@ -1040,8 +1247,8 @@ storefront: "{self.region}"
         """获取真实的文件名（通过 amd_getinfo.py）"""
         try:
             if hasattr(self, '_download_url') and self._download_url:
-                # 首先尝试通过 amd_getinfo.py 获取真实信息
-                music_info = self._get_music_info_from_amd_getinfo(self._download_url)
+                # 首先尝试通过 amd_getinfo.py 获取真实信息（按链接缓存）
+                music_info = await self._resolve_music_info(self._download_url)
                 if music_info:
                     content_type = music_info.get('type', 'unknown')
                     if content_type == 'song':
@@ -1321,6 +1528,9 @@ storefront: "{self.region}"
         try:
             # 保存URL供后续解析使用
             self._download_url = url
+            self._start_music_info_resolution(url)
+            await self._prepare_library_index()
+            self._start_download_watcher()
             
             if not self.amd_path:
                 return {
@@ -1330,7 +1540,7 @@ storefront: "{self.region}"
                 }
             
             # 创建配置文件
-            config_path = self._create_config_file("/app/amdp")
+            config_path = self._create_config_file(self.work_dir)
             if not config_path:
                 return {
                     'success': False,
@@ -1350,7 +1560,7 @@ storefront: "{self.region}"
             logger.debug(f"命令: {' '.join(cmd)}")
             
             # 使用 /app/amdp 作为工作目录和配置目录
-            amd_working_dir = "/app/amdp"  # 使用 /app/amdp 作为工作目录
+            amd_working_dir = self.work_dir  # 使用 /app/amdp（或并发槽目录）作为工作目录
             
             # 环境变量设置
             env_vars = {
@@ -1424,10 +1634,9 @@ storefront: "{self.region}"
                     logger.info("✅ apple-music-downloader 专辑真正下载完成")
                     logger.info(f"📊 下载输出: {output}")
                     
-                    # 使用 amd_getinfo.py 获取真实的音乐信息
-                    self._download_url = url
-                    music_info = self._get_music_info_from_amd_getinfo_sync(self._download_url)
-                    logger.info(f"✅ 通过 amd_getinfo.py 获取专辑音乐信息: {music_info}")
+                    # 使用下载开始时解析的音乐信息
+                    music_info = await self._job_music_info()
+                    logger.info(f"✅ 专辑音乐信息: {music_info}")
                     
                     # 如果没有获取到音乐信息，使用默认值
                     if not music_info:
@@ -1494,7 +1703,7 @@ storefront: "{self.region}"
                                 'files_count': real_files_count,  # 使用真实的文件数量
                                 'total_size': real_total_size / (1024 * 1024) if real_total_size > 0 else 0,  # 转换为MB
                                 'total_size_mb': real_total_size / (1024 * 1024) if real_total_size > 0 else 0,  # 计算MB值
-                                'download_path': str(output_dir),
+                                'download_path': real_album_info.get('path') or str(output_dir),
                                 'track_list': real_track_list,  # 使用真实的歌曲列表
                                 'download_url': self._download_url if hasattr(self, '_download_url') else ''
                             }
@@ -1520,7 +1729,8 @@ storefront: "{self.region}"
                         'total_size_mb': real_total_size / (1024 * 1024) if real_total_size > 0 else 0,
                         'files_count': real_files_count,
                         'track_list': real_track_list,
-                        'total_size': real_total_size / (1024 * 1024) if real_total_size > 0 else 0  # 转换为MB
+                        'total_size': real_total_size / (1024 * 1024) if real_total_size > 0 else 0,  # 转换为MB
+                        'download_path': real_album_info.get('path') or str(output_dir)
                     }
                 else:
                     logger.warning("⚠️ amd 工具退出但专辑下载可能未完成")
@@ -1559,6 +1769,8 @@ storefront: "{self.region}"
                 'backend': self.name,
                 'error': str(e)
             }
+        finally:
+            self._stop_download_watcher()
     
     # AMD输出解析功能已完全移除
     
@@ -1940,14 +2152,14 @@ storefront: "{self.region}"
             return None
     
     def _get_real_filename_sync(self) -> str:
-        """获取真实的文件名（同步版本，用于进度解析）"""
+        """获取真实的文件名（同步版本，用于进度解析，只做字符串处理）"""
         try:
             # 检查是否是专辑下载 - 专辑下载时优先使用专辑名称
             if hasattr(self, '_download_url') and self._download_url and '/album/' in self._download_url:
                 # 专辑下载：返回专辑名（没有扩展名）
                 if hasattr(self, '_album_info') and self._album_info:
                     album_name = self._album_info.get('album', '未知专辑')
-                    logger.info(f"📁 专辑下载使用专辑名称: {album_name}")
+                    logger.debug(f"📁 专辑下载使用专辑名称: {album_name}")
                     return self._sanitize_filename(album_name)
                 else:
                     # 从URL提取专辑名
@@ -1956,7 +2168,7 @@ storefront: "{self.region}"
                         name = url_parts[5]
                         from urllib.parse import unquote
                         name = unquote(name)
-                        logger.info(f"📁 从URL提取专辑名称: {name}")
+                        logger.debug(f"📁 从URL提取专辑名称: {name}")
                         return self._sanitize_filename(name)
             
             # 单曲下载时，才使用单曲名称
@@ -1964,7 +2176,7 @@ storefront: "{self.region}"
                 track_name = self._current_track_name
                 # 清理文件名中的特殊字符
                 track_name = self._sanitize_filename(track_name)
-                logger.info(f"📁 单曲下载使用单曲名称: {track_name}")
+                logger.debug(f"📁 单曲下载使用单曲名称: {track_name}")
                 return track_name
             
             # 如果后端没有单曲信息，尝试从父类获取
@@ -1972,12 +2184,12 @@ storefront: "{self.region}"
                 parent_track_name = self._parent_downloader._get_current_track_name()
                 if parent_track_name:
                     track_name = self._sanitize_filename(parent_track_name)
-                    logger.info(f"📁 从父类获取到单曲名称: {track_name}")
+                    logger.debug(f"📁 从父类获取到单曲名称: {track_name}")
                     return track_name
             
             if hasattr(self, '_download_url') and self._download_url:
-                # 尝试通过 amd_getinfo.py 获取真实信息
-                music_info = self._get_music_info_from_amd_getinfo_sync(self._download_url)
+                # 使用下载开始时解析的音乐信息（尚未解析完成时从URL中提取）
+                music_info = self._music_info
                 if music_info:
                     content_type = music_info.get('type', 'unknown')
                     if content_type == 'song':
@@ -2012,6 +2224,78 @@ storefront: "{self.region}"
             logger.debug(f"获取真实文件名失败: {e}")
             return "Apple Music 文件"
     
+    # 进程内按链接记忆的音乐信息 url -> (信息, 过期时间)，None 表示 amd_getinfo.py 未能解析；
+    # 按最近使用淘汰，解析失败的结果使用元数据缓存的负缓存有效期
+    _music_info_memo: "OrderedDict[str, Tuple[Optional[Dict[str, Any]], float]]" = OrderedDict()
+
+    @classmethod
+    def _memo_lookup(cls, url: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        entry = cls._music_info_memo.get(url)
+        if entry is None:
+            return False, None
+        info, expires_at = entry
+        if expires_at <= time.time():
+            del cls._music_info_memo[url]
+            return False, None
+        cls._music_info_memo.move_to_end(url)
+        return True, info
+
+    @classmethod
+    def _memo_store(cls, url: str, info: Optional[Dict[str, Any]]):
+        ttl = MUSIC_INFO_POLICY["ttl"] if info is not None else MUSIC_INFO_POLICY["negative_ttl"]
+        cls._music_info_memo[url] = (info, time.time() + ttl)
+        cls._music_info_memo.move_to_end(url)
+        while len(cls._music_info_memo) > MUSIC_INFO_MEMO_ITEMS:
+            cls._music_info_memo.popitem(last=False)
+
+    async def _resolve_music_info(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        解析链接的音乐信息：依次查询进程内记忆、持久化元数据缓存，都未命中时
+        在线程池中调用 amd_getinfo.py，结果（包括解析失败）写回两级缓存
+        """
+        hit, info = self._memo_lookup(url)
+        if hit:
+            return info
+
+        loop = asyncio.get_running_loop()
+        cache = get_metadata_cache() if get_metadata_cache else None
+        if cache is not None:
+            found, info = await loop.run_in_executor(None, cache.lookup, "apple_music", url)
+            if found:
+                logger.info(f"⚡ Apple Music 音乐信息缓存命中: {url}")
+                self._memo_store(url, info)
+                return info
+
+        info = await loop.run_in_executor(None, self._get_music_info_from_amd_getinfo_sync, url)
+        self._memo_store(url, info)
+        if cache is not None:
+            await loop.run_in_executor(None, cache.put, "apple_music", url, info)
+        return info
+
+    def _start_music_info_resolution(self, url: str):
+        """在后台开始解析本次下载的音乐信息，与 amd 进程的启动并行进行"""
+        self._music_info = self._memo_lookup(url)[1]
+        if self._music_info_task is not None and not self._music_info_task.done():
+            self._music_info_task.cancel()
+
+        async def resolve():
+            info = await self._resolve_music_info(url)
+            if self._download_url == url:
+                self._music_info = info
+            return info
+
+        self._music_info_task = asyncio.create_task(resolve())
+
+    async def _job_music_info(self) -> Optional[Dict[str, Any]]:
+        """等待本次下载的音乐信息解析完成，返回可修改的副本"""
+        info = self._music_info
+        if self._music_info_task is not None:
+            try:
+                info = await self._music_info_task
+            except Exception as e:
+                logger.warning(f"⚠️ 解析音乐信息失败: {e}")
+        return dict(info) if info else None
+
     def _get_music_info_from_amd_getinfo_sync(self, url: str) -> Optional[Dict[str, Any]]:
         """使用 amd_getinfo.py 获取音乐信息（同步版本）"""
         try:
@@ -2101,30 +2385,13 @@ storefront: "{self.region}"
         return filename.strip()
 
     def _get_file_actual_size(self, filename: str) -> tuple:
-        """获取文件的真实大小"""
+        """获取文件的真实大小（从曲库索引中查询，不列目录）"""
         try:
-            # 尝试从输出目录中查找文件
-            output_dir = getattr(self, 'output_dir', '/downloads/AppleMusic')
-            possible_extensions = ['.m4a', '.aac', '.m4p']
-            
-            for ext in possible_extensions:
-                file_path = os.path.join(output_dir, f"{filename}{ext}")
-                if os.path.exists(file_path):
-                    file_size = os.path.getsize(file_path)
-                    # 转换为MB
-                    size_mb = file_size / (1024 * 1024)
-                    return size_mb, "MB"
-            
-            # 如果找不到具体文件，尝试从目录中获取最新文件的大小
-            if os.path.exists(output_dir):
-                files = [f for f in os.listdir(output_dir) if f.endswith(tuple(possible_extensions))]
-                if files:
-                    # 获取最新的文件
-                    latest_file = max(files, key=lambda x: os.path.getctime(os.path.join(output_dir, x)))
-                    file_path = os.path.join(output_dir, latest_file)
-                    file_size = os.path.getsize(file_path)
-                    size_mb = file_size / (1024 * 1024)
-                    return size_mb, "MB"
+            self._sync_library_index()
+            index = self._library_index()
+            track = index.find_track(filename) or index.latest_track()
+            if track:
+                return track[1] / (1024 * 1024), "MB"
             
             logger.warning(f"⚠️ 无法找到文件 {filename} 或确定其大小")
             return None, None
@@ -2136,78 +2403,38 @@ storefront: "{self.region}"
     def _get_real_file_size_for_completion(self, filename=None) -> float:
         """获取下载完成时的真实文件大小"""
         try:
+            self._sync_library_index()
+            index = self._library_index()
+
             # 优先使用传入的文件名来查找单曲目录
             if filename:
                 song_dir = self._find_song_directory(filename)
                 if song_dir:
                     # 在单曲目录中查找音频文件
-                    audio_files = self._find_audio_files_in_directory(song_dir)
-                    if audio_files:
+                    tracks = index.album_tracks(song_dir)
+                    if tracks:
                         # 获取第一个音频文件的大小
-                        first_audio = audio_files[0]
-                        file_size = os.path.getsize(first_audio)
+                        first_audio, file_size = tracks[0]
                         size_mb = file_size / (1024 * 1024)
                         logger.info(f"✅ 在单曲目录中找到音频文件: {os.path.basename(first_audio)} ({size_mb:.2f}MB)")
                         return size_mb
             
-            # 尝试从输出目录中获取最新文件的大小（回退方案）
-            output_dir = getattr(self, 'output_dir', '/downloads/AppleMusic')
-            # 修复：Apple Music只使用.m4a格式
-            possible_extensions = ['.m4a', '.aac', '.m4p']
-            
-            if os.path.exists(output_dir):
-                files = [f for f in os.listdir(output_dir) if f.endswith(tuple(possible_extensions))]
-                if files:
-                    # 获取最新的文件
-                    latest_file = max(files, key=lambda x: os.path.getctime(os.path.join(output_dir, x)))
-                    file_path = os.path.join(output_dir, latest_file)
-                    file_size = os.path.getsize(file_path)
-                    size_mb = file_size / (1024 * 1024)
-                    logger.info(f"✅ 获取到真实文件大小: {size_mb:.2f}MB")
-                    return size_mb
-            
             # 如果无法获取真实大小，尝试使用之前保存的解密大小
             if hasattr(self, '_last_decrypt_total') and self._last_decrypt_total:
                 logger.info(f"✅ 使用保存的解密大小: {self._last_decrypt_total}MB")
                 return self._last_decrypt_total
             
-            # 新增：智能回退 - 尝试在AM-DL downloads目录中查找最新的音频文件
-            logger.info("🔍 尝试智能回退：在AM-DL downloads目录中查找最新音频文件")
-            try:
-                base_dir = getattr(self, 'output_dir', '/downloads/AppleMusic')
-                amd_downloads_dir = os.path.join(base_dir, "AM-DL downloads")
+            # 回退：曲库索引中最近写入的音频文件
+            latest = index.latest_track()
+            if latest:
+                file_path, file_size = latest
+                size_mb = file_size / (1024 * 1024)
                 
-                if os.path.exists(amd_downloads_dir):
-                    # 递归查找所有音频文件
-                    audio_files = []
-                    for root, dirs, files in os.walk(amd_downloads_dir):
-                        for file in files:
-                            # 修复：Apple Music只使用.m4a格式
-                            if file.lower().endswith(('.m4a', '.aac', '.m4p')):
-                                file_path = os.path.join(root, file)
-                                file_size = os.path.getsize(file_path)
-                                # 按修改时间排序，获取最新的文件
-                                mtime = os.path.getmtime(file_path)
-                                audio_files.append((file_path, file_size, mtime))
-                    
-                    if audio_files:
-                        # 按修改时间排序，获取最新的文件
-                        latest_audio = max(audio_files, key=lambda x: x[2])
-                        file_path, file_size, mtime = latest_audio
-                        size_mb = file_size / (1024 * 1024)
-                        
-                        # 检查文件大小是否合理（应该在10MB到100MB之间）
-                        if 10 <= size_mb <= 100:
-                            logger.info(f"✅ 智能回退找到音频文件: {os.path.basename(file_path)} ({size_mb:.2f}MB)")
-                            return size_mb
-                        else:
-                            logger.warning(f"⚠️ 智能回退找到的音频文件大小异常: {size_mb:.2f}MB，跳过")
-                    else:
-                        logger.warning("⚠️ 智能回退：在AM-DL downloads目录中没有找到音频文件")
-                else:
-                    logger.warning("⚠️ 智能回退：AM-DL downloads目录不存在")
-            except Exception as e:
-                logger.warning(f"⚠️ 智能回退失败: {e}")
+                # 检查文件大小是否合理（应该在10MB到100MB之间）
+                if 10 <= size_mb <= 100:
+                    logger.info(f"✅ 曲库索引中最近的音频文件: {os.path.basename(file_path)} ({size_mb:.2f}MB)")
+                    return size_mb
+                logger.warning(f"⚠️ 曲库索引中最近的音频文件大小异常: {size_mb:.2f}MB，跳过")
             
             # 完全禁止硬编码！如果无法获取真实大小，返回None
             logger.error("❌ 无法获取真实文件大小，禁止使用硬编码值")
@@ -2219,30 +2446,22 @@ storefront: "{self.region}"
             return None
 
     def _get_real_file_size_direct(self) -> float:
-        """直接遍历单曲目录获取正确的文件大小"""
+        """获取本次下载的单曲文件大小（本次新写入的文件，其次为曲库索引中最近写入的文件）"""
         try:
-            logger.info("🔍 直接遍历单曲目录获取文件大小")
-            
-            # 获取基础下载目录
-            base_dir = getattr(self, 'output_dir', '/downloads/AppleMusic')
-            amd_downloads_dir = os.path.join(base_dir, "AM-DL downloads")
-            
-            if not os.path.exists(amd_downloads_dir):
-                logger.warning(f"⚠️ AM-DL downloads目录不存在: {amd_downloads_dir}")
-                return None
+            self._sync_library_index()
             
-            # 直接遍历AM-DL downloads目录，查找最新的音频文件
+            # 优先使用目录监视器记录的本次新文件
             audio_files = []
-            for root, dirs, files in os.walk(amd_downloads_dir):
-                for file in files:
-                    if file.lower().endswith(('.m4a', '.aac', '.m4p')):
-                        file_path = os.path.join(root, file)
-                        file_size = os.path.getsize(file_path)
-                        size_mb = file_size / (1024 * 1024)
-                        
-                        # 按修改时间排序，获取最新的文件
-                        mtime = os.path.getmtime(file_path)
-                        audio_files.append((file_path, file_size, mtime, size_mb))
+            for file_path in self._new_audio_files():
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    continue
+                audio_files.append((file_path, stat.st_size, stat.st_mtime, stat.st_size / (1024 * 1024)))
+            if not audio_files:
+                latest = self._library_index().latest_track()
+                if latest:
+                    audio_files.append((latest[0], latest[1], 0, latest[1] / (1024 * 1024)))
             
             if audio_files:
                 # 按修改时间排序，获取最新的文件
@@ -2250,7 +2469,6 @@ storefront: "{self.region}"
                 file_path, file_size, mtime, size_mb = latest_audio
                 
                 logger.info(f"✅ 找到最新音频文件: {os.path.basename(file_path)} ({size_mb:.2f} MB)")
-                logger.info(f"   位置: {os.path.relpath(file_path, amd_downloads_dir)}")
                 
                 # 检查文件大小是否合理（应该在10MB到100MB之间）
                 if 10 <= size_mb <= 100:
@@ -2281,44 +2499,23 @@ storefront: "{self.region}"
     def _find_song_directory(self, song_name: str) -> str:
         """查找单曲目录，支持 - Single 后缀"""
         try:
-            # 获取基础下载目录
-            base_dir = getattr(self, 'output_dir', '/downloads/AppleMusic')
-            amd_downloads_dir = os.path.join(base_dir, "AM-DL downloads")
-            
-            if not os.path.exists(amd_downloads_dir):
-                logger.warning(f"⚠️ AM-DL downloads目录不存在: {amd_downloads_dir}")
-                return None
-            
             # 从文件名中提取歌曲名称（去掉扩展名）
             song_name_clean = os.path.splitext(song_name)[0]
             logger.info(f"🔍 查找单曲目录: {song_name_clean}")
             
-            # 遍历艺术家目录
-            for artist_dir in os.listdir(amd_downloads_dir):
-                artist_path = os.path.join(amd_downloads_dir, artist_dir)
-                if not os.path.isdir(artist_path):
-                    continue
-                
-                # 在艺术家目录中查找单曲目录
-                for item in os.listdir(artist_path):
-                    item_path = os.path.join(artist_path, item)
-                    if not os.path.isdir(item_path):
-                        continue
-                    
-                    # 方式1：直接匹配 song_name
-                    if item == song_name_clean:
-                        logger.info(f"✅ 找到单曲目录（直接匹配）: {item}")
-                        return item_path
-                    
-                    # 方式2：匹配 song_name - Single（Apple Music的命名规则）
-                    if item == f"{song_name_clean} - Single":
-                        logger.info(f"✅ 找到单曲目录（- Single后缀）: {item}")
-                        return item_path
-                    
-                    # 方式3：模糊匹配，查找包含 song_name 的目录
-                    if song_name_clean in item:
-                        logger.info(f"✅ 找到单曲目录（模糊匹配）: {item}")
-                        return item_path
+            # 先在本次下载新写入文件的目录中查找
+            for file_path in reversed(self._new_audio_files()):
+                item_path = os.path.dirname(file_path)
+                item = os.path.basename(item_path)
+                if item in (song_name_clean, f"{song_name_clean} - Single") or song_name_clean in item:
+                    logger.info(f"✅ 找到单曲目录（本次下载）: {item}")
+                    return item_path
+            
+            # 在曲库索引中按目录名查找（直接匹配、- Single 后缀、最近专辑中模糊匹配）
+            item_path = self._library_index().find_album_dir(song_name_clean)
+            if item_path:
+                logger.info(f"✅ 找到单曲目录（曲库索引）: {os.path.basename(item_path)}")
+                return item_path
             
             logger.warning(f"⚠️ 未找到单曲目录: {song_name_clean}")
             return None
@@ -2328,61 +2525,25 @@ storefront: "{self.region}"
             return None
 
     def _find_audio_files_in_directory(self, directory: str) -> list:
-        """在指定目录中查找音频文件"""
+        """在指定目录中查找音频文件（从曲库索引中查询）"""
         try:
-            audio_files = []
-            # 修复：Apple Music只使用.m4a格式
-            possible_extensions = ['.m4a', '.aac', '.m4p']
-            
-            if os.path.exists(directory):
-                for file in os.listdir(directory):
-                    if file.lower().endswith(tuple(possible_extensions)):
-                        file_path = os.path.join(directory, file)
-                        audio_files.append(file_path)
-                        logger.info(f"🎵 找到音频文件: {file}")
-            
-            return audio_files
+            return [path for path, _size in self._library_index().album_tracks(directory)]
             
         except Exception as e:
             logger.error(f"❌ 查找音频文件失败: {e}")
             return []
 
     def _get_real_album_size(self) -> float:
-        """获取专辑的真实总大小（MB）- 遍历所有音频文件"""
+        """获取最近下载专辑的真实总大小（MB）"""
         try:
-            import os
-            
-            # 获取专辑下载目录
-            amd_downloads_dir = os.path.join(self.output_dir, "AM-DL downloads")
-            if not os.path.exists(amd_downloads_dir):
-                logger.warning(f"⚠️ 专辑下载目录不存在: {amd_downloads_dir}")
+            self._sync_library_index()
+            index = self._library_index()
+            album_dir = index.latest_album_dir()
+            if not album_dir:
+                logger.warning("⚠️ 曲库索引中没有专辑")
                 return 0.0
             
-            # 遍历所有艺术家目录
-            total_size = 0.0
-            for artist_dir in os.listdir(amd_downloads_dir):
-                artist_path = os.path.join(amd_downloads_dir, artist_dir)
-                if not os.path.isdir(artist_path):
-                    continue
-                
-                # 遍历艺术家目录下的专辑目录
-                for album_dir in os.listdir(artist_path):
-                    album_path = os.path.join(artist_path, album_dir)
-                    if not os.path.isdir(album_path):
-                        continue
-                    
-                    # 遍历专辑目录中的所有音频文件
-                    for file in os.listdir(album_path):
-                        if file.lower().endswith(('.m4a', '.aac', '.m4p')):
-                            file_path = os.path.join(album_path, file)
-                            try:
-                                file_size = os.path.getsize(file_path)
-                                file_size_mb = file_size / (1024 * 1024)
-                                total_size += file_size_mb
-                                logger.debug(f"🔍 专辑文件: {file} - {file_size_mb:.2f} MB")
-                            except Exception as e:
-                                logger.warning(f"⚠️ 获取文件大小失败: {file} - {e}")
-            
+            total_size = sum(size for _path, size in index.album_tracks(album_dir)) / (1024 * 1024)
             logger.info(f"✅ 专辑总大小计算完成: {total_size:.2f} MB")
             return total_size
             
@@ -2394,118 +2555,58 @@ storefront: "{self.region}"
                 return self._last_decrypt_total
             return 0.0
     
+    
     def _convert_traditional_to_simplified(self, text: str) -> str:
         """将繁体中文转换为简体中文"""
         try:
-            # 使用 opencc 库进行繁简转换
-            import opencc
-            converter = opencc.OpenCC('t2s')  # 繁体到简体
+            # 使用共享的 opencc 转换器进行繁简转换
+            converter = get_t2s_converter()
+            if converter is None:
+                return text
             converted = converter.convert(text)
             if converted != text:
                 logger.info(f"🔍 opencc转换: '{text}' -> '{converted}'")
             return converted
             
-        except ImportError:
-            logger.warning("⚠️ opencc库未安装，无法进行繁简转换")
-            return text
         except Exception as e:
             logger.error(f"❌ 繁简转换失败: {e}")
             return text
 
     def _get_real_album_info(self, output_dir: str) -> Dict[str, Any]:
-        """获取专辑的真实信息 - 包括文件数量、总大小和歌曲列表"""
+        """获取专辑的真实信息 - 包括文件数量、总大小和歌曲列表（最近写入的专辑，来自曲库索引）"""
+        empty = {
+            'files_count': 0,
+            'total_size': 0,
+            'track_list': []
+        }
         try:
-            import os
-            
-            # 获取专辑下载目录
-            amd_downloads_dir = os.path.join(output_dir, "AM-DL downloads")
+            # 获取专辑下载目录（并发槽只查询本次任务的文件）
+            amd_downloads_dir = self._amd_downloads_dir() if self.slot else os.path.join(output_dir, "AM-DL downloads")
             if not os.path.exists(amd_downloads_dir):
                 logger.warning(f"⚠️ 专辑下载目录不存在: {amd_downloads_dir}")
-                return {
-                    'files_count': 0,
-                    'total_size': 0,
-                    'track_list': []
-                }
-            
-            # 遍历所有艺术家目录，找到最新的专辑
-            latest_album_info = None
-            latest_time = 0
+                return empty
             
-            for artist_dir in os.listdir(amd_downloads_dir):
-                artist_path = os.path.join(amd_downloads_dir, artist_dir)
-                if not os.path.isdir(artist_path):
-                    continue
-                
-                # 遍历艺术家目录下的专辑目录
-                for album_dir in os.listdir(artist_path):
-                    album_path = os.path.join(artist_path, album_dir)
-                    if not os.path.isdir(album_path):
-                        continue
-                    
-                    # 检查专辑目录的修改时间
-                    try:
-                        album_time = os.path.getmtime(album_path)
-                        if album_time > latest_time:
-                            latest_time = album_time
-                            latest_album_info = {
-                                'artist': artist_dir,
-                                'album': album_dir,
-                                'path': album_path
-                            }
-                    except Exception as e:
-                        logger.warning(f"⚠️ 获取专辑目录时间失败: {album_path} - {e}")
-            
-            if not latest_album_info:
+            self._sync_library_index()
+            index = self._library_index() if self.slot else get_library_index(amd_downloads_dir)
+            album_dir = index.latest_album_dir()
+            if not album_dir:
                 logger.warning("⚠️ 未找到任何专辑目录")
-                return {
-                    'files_count': 0,
-                    'total_size': 0,
-                    'track_list': []
-                }
-            
-            # 分析最新专辑目录
-            album_path = latest_album_info['path']
-            files_count = 0
-            total_size = 0
-            track_list = []
-            
-            for file in os.listdir(album_path):
-                if file.lower().endswith(('.m4a', '.aac', '.m4p')):
-                    files_count += 1
-                    file_path = os.path.join(album_path, file)
-                    try:
-                        file_size = os.path.getsize(file_path)
-                        total_size += file_size
-                        
-                        # 构建歌曲信息
-                        track_name = file.replace('.m4a', '').replace('.aac', '').replace('.m4p', '')
-                        track_info = {
-                            'name': track_name,
-                            'size': file_size / (1024 * 1024),  # 转换为MB
-                            'path': file
-                        }
-                        track_list.append(track_info)
-                        
-                        logger.debug(f"🔍 专辑文件: {track_name} - {file_size / (1024 * 1024):.2f} MB")
-                    except Exception as e:
-                        logger.warning(f"⚠️ 获取文件大小失败: {file} - {e}")
+                return empty
             
-            logger.info(f"✅ 专辑信息获取完成: {latest_album_info['artist']} - {latest_album_info['album']}")
-            logger.info(f"✅ 文件数量: {files_count}, 总大小: {total_size / (1024 * 1024):.2f} MB")
+            summary = index.album_summary(album_dir)
+            logger.info(f"✅ 专辑信息获取完成: {summary['artist']} - {summary['album']}")
+            logger.info(f"✅ 文件数量: {summary['files_count']}, 总大小: {summary['total_size'] / (1024 * 1024):.2f} MB")
             
             return {
-                'files_count': files_count,
-                'total_size': total_size,  # 返回字节数
-                'track_list': track_list
+                'files_count': summary['files_count'],
+                'total_size': summary['total_size'],  # 返回字节数
+                'track_list': summary['track_list'],
+                'path': self._published_path(summary['path'])  # 并发槽的文件在任务结束后移入曲库，这里给出移入后的位置
             }
             
         except Exception as e:
             logger.error(f"❌ 获取专辑信息失败: {e}")
-            return {
-                'files_count': 0,
-                'total_size': 0,
-                'track_list': []
-            }
+            return empty
 
 class GamdlBackend(DownloadBackend):
     """Gamdl 后端实现"""
@@ -3123,12 +3224,15 @@ class ProgressTracker:
         self.downloaded_files = 0
         self.start_time = None
         self.current_file = ""
+        # 后端名称 -> 完成数、失败数和下载字节数
+        self.backend_stats: Dict[str, Dict[str, int]] = {}
     
     def start(self):
         """开始跟踪"""
         self.start_time = time.time()
         self.downloaded_size = 0
         self.downloaded_files = 0
+        self.backend_stats = {}
     
     def update(self, bytes_downloaded: int, filename: str = ""):
         """更新进度"""
@@ -3137,6 +3241,16 @@ class ProgressTracker:
             self.downloaded_files += 1
             self.current_file = filename
     
+    def complete(self, bytes_downloaded: int, filename: str = "", backend: str = "", success: bool = True):
+        """记录一个完成的下载（并发下载时使用，按后端分别统计吞吐）"""
+        self.downloaded_size += bytes_downloaded
+        self.downloaded_files += 1
+        self.current_file = filename
+        if backend:
+            stats = self.backend_stats.setdefault(backend, {'files': 0, 'failed': 0, 'size': 0})
+            stats['files' if success else 'failed'] += 1
+            stats['size'] += bytes_downloaded
+    
     def get_progress(self) -> Dict[str, Any]:
         """获取进度信息"""
         if not self.start_time:
@@ -3159,7 +3273,11 @@ class ProgressTracker:
             'speed_mbps': speed / (1024 * 1024),
             'eta_seconds': eta,
             'elapsed_seconds': elapsed,
-            'current_file': self.current_file
+            'current_file': self.current_file,
+            'backends': {
+                name: {**stats, 'speed_mbps': stats['size'] / elapsed / (1024 * 1024) if elapsed > 0 else 0}
+                for name, stats in self.backend_stats.items()
+            }
         }
 
 class ConfigurationManager:
@@ -3177,7 +3295,8 @@ class ConfigurationManager:
                 'output_dir': '/downloads/AppleMusic',
                 'quality': 'lossless',  # lossless, aac, atmos
                 'format': 'm4a',        # m4a, flac, alac
-                'concurrent_downloads': 3,
+                'concurrent_downloads': 3,       # amd 后端同时下载数（wrapper 的并发能力）
+                'gamdl_concurrent_downloads': 2,  # gamdl 可用时额外的同时下载数
                 'retry_attempts': 3,
                 'timeout': 300
             },
@@ -3403,7 +3522,7 @@ class CommandLineInterface:
         self.parser.print_help()
 
 class BatchDownloader:
-    """批量下载器"""
+    """批量下载器（按后端的并发能力同时下载多个链接）"""
     
     def __init__(self, downloader: AppleMusicDownloaderPlus, config: ConfigurationManager):
         self.downloader = downloader
@@ -3411,6 +3530,35 @@ class BatchDownloader:
         self.progress_tracker = ProgressTracker()
         self.error_handler = ErrorHandler()
     
+    def _create_workers(self) -> List[DownloadBackend]:
+        """
+        按后端创建工作槽：amd 后端每个槽一个独立实例（下载状态保存在实例上，工作目录和下载目录按槽分开），
+        并发数为 download.concurrent_downloads（wrapper 的 decrypt / get_m3u8 端口可同时服务多个会话）；
+        gamdl 可用时另外加入 download.gamdl_concurrent_downloads 个槽，两个后端从同一个队列中取链接
+        """
+        workers: List[DownloadBackend] = []
+        amd_slots = max(0, int(self.config.get('download.concurrent_downloads', 3)))
+        primary = self.downloader.primary_backend
+        if isinstance(primary, AppleMusicDownloaderBackend) and amd_slots:
+            # 每个槽使用独立的工作目录和暂存下载目录，完成信息只从本槽的文件中得到；
+            # 额外的实例不设置 _parent_downloader，避免并发任务共用父对象上的当前单曲名称
+            for slot in range(1, amd_slots + 1):
+                workers.append(AppleMusicDownloaderBackend(primary.decrypt_port, primary.get_m3u8_port, slot=slot))
+        
+        gamdl_slots = max(0, int(self.config.get('download.gamdl_concurrent_downloads', 2)))
+        gamdl = next((b for b in self.downloader.backends if isinstance(b, GamdlBackend)), None)
+        if gamdl is None and gamdl_slots:
+            candidate = GamdlBackend()
+            if candidate.is_available():
+                gamdl = candidate
+        if gamdl is not None:
+            # gamdl 后端没有按任务保存的状态，多个槽共用一个实例
+            workers.extend([gamdl] * gamdl_slots)
+        
+        if not workers and primary is not None:
+            workers.append(primary)
+        return workers
+    
     async def download_from_file(self, url_file: str, progress_callback=None) -> List[Dict[str, Any]]:
         """从文件批量下载"""
         try:
@@ -3418,77 +3566,84 @@ class BatchDownloader:
                 urls = [line.strip() for line in f if line.strip() and not line.startswith('#')]
             
             logger.info(f"📋 从文件加载了 {len(urls)} 个 URL")
+            return await self.download_urls(urls, progress_callback)
             
-            results = []
-            for i, url in enumerate(urls):
-                logger.info(f"🔄 处理第 {i+1}/{len(urls)} 个 URL: {url}")
+        except Exception as e:
+            logger.error(f"❌ 批量下载失败: {e}")
+            return []
+    
+    async def download_urls(self, urls: List[str], progress_callback=None) -> List[Dict[str, Any]]:
+        """批量下载多个 URL（结果按输入顺序返回，未知类型的 URL 被跳过）"""
+        workers = self._create_workers()
+        if not workers:
+            logger.error("❌ 没有可用的下载后端")
+            return [{'success': False, 'url': url, 'error': '没有可用的下载后端'} for url in urls]
+        
+        queue: asyncio.Queue = asyncio.Queue()
+        for i, url in enumerate(urls):
+            queue.put_nowait((i, url))
+        results: Dict[int, Dict[str, Any]] = {}
+        stop = asyncio.Event()
+        output_dir = str(self.downloader.output_dir)
+        cookies_path = self.downloader.cookies_path
+        quality = self.config.get('download.quality', 'lossless')
+        
+        self.progress_tracker = ProgressTracker(total_files=len(urls))
+        self.progress_tracker.start()
+        slot_counts: Dict[str, int] = {}
+        for backend in workers:
+            slot_counts[backend.name] = slot_counts.get(backend.name, 0) + 1
+        logger.info(f"🚀 批量下载 {len(urls)} 个 URL，并发槽: {slot_counts}")
+        
+        async def worker(backend: DownloadBackend):
+            while not stop.is_set():
+                try:
+                    i, url = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                logger.info(f"🔄 [{backend.name}] 处理第 {i+1}/{len(urls)} 个 URL: {url}")
                 
                 try:
                     if "/song/" in url:
-                        result = await self.downloader.download_song(url, progress_callback)
+                        result = await backend.download_song(url, output_dir, cookies_path, quality, progress_callback)
                     elif "/album/" in url:
-                        result = await self.downloader.download_album(url, progress_callback)
+                        result = await backend.download_album(url, output_dir, cookies_path, quality, progress_callback)
                     else:
                         logger.warning(f"⚠️ 未知的 URL 类型: {url}")
                         continue
                     
-                    results.append(result)
+                    result.setdefault('url', url)
+                    results[i] = result
                     
                     if result['success']:
+                        size_bytes = int((result.get('total_size_mb') or 0) * 1024 * 1024)
+                        self.progress_tracker.complete(size_bytes, url, backend.name)
                         logger.info(f"✅ 下载成功: {url}")
                     else:
+                        self.progress_tracker.complete(0, url, backend.name, success=False)
                         logger.error(f"❌ 下载失败: {url}")
+                    
+                    progress = self.progress_tracker.get_progress()
+                    logger.info(f"📊 批量进度: {progress['downloaded_files']}/{progress['total_files']}，"
+                                f"{progress['downloaded_size'] / (1024 * 1024):.1f}MB，"
+                                f"{progress['speed_mbps']:.2f}MB/s")
                         
                 except Exception as e:
-                    if not self.error_handler.handle_error(e, f"处理 URL: {url}"):
-                        break
-                    
-                    results.append({
+                    self.progress_tracker.complete(0, url, backend.name, success=False)
+                    results[i] = {
                         'success': False,
                         'url': url,
                         'error': str(e)
-                    })
-            
-            return results
-            
-        except Exception as e:
-            logger.error(f"❌ 批量下载失败: {e}")
-            return []
-    
-    async def download_urls(self, urls: List[str], progress_callback=None) -> List[Dict[str, Any]]:
-        """批量下载多个 URL"""
-        results = []
+                    }
+                    if not self.error_handler.handle_error(e, f"处理 URL: {url}"):
+                        stop.set()
         
-        for i, url in enumerate(urls):
-            logger.info(f"🔄 处理第 {i+1}/{len(urls)} 个 URL: {url}")
-            
-            try:
-                if "/song/" in url:
-                    result = await self.downloader.download_song(url, progress_callback)
-                elif "/album/" in url:
-                    result = await self.downloader.download_album(url, progress_callback)
-                else:
-                    logger.warning(f"⚠️ 未知的 URL 类型: {url}")
-                    continue
-                
-                results.append(result)
-                
-                if result['success']:
-                    logger.info(f"✅ 下载成功: {url}")
-                else:
-                    logger.error(f"❌ 下载失败: {url}")
-                    
-            except Exception as e:
-                if not self.error_handler.handle_error(e, f"处理 URL: {url}"):
-                    break
-                
-                results.append({
-                    'success': False,
-                    'url': url,
-                    'error': str(e)
-                })
+        await asyncio.gather(*(worker(backend) for backend in workers))
         
-        return results
+        for backend_name, stats in self.progress_tracker.get_progress().get('backends', {}).items():
+            logger.info(f"📈 后端 {backend_name}: {stats['files']} 个，{stats['size'] / (1024 * 1024):.1f}MB，"
+                        f"{stats['speed_mbps']:.2f}MB/s")
+        return [results[i] for i in sorted(results)]
 
 def setup_logging(config: ConfigurationManager):
     """设置日志"""
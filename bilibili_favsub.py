@@ -2,20 +2,86 @@
 """
 B站收藏夹订阅管理模块
 负责处理B站收藏夹的订阅、检查和自动下载功能
+
+定期检查时多个收藏夹并发进行（数量有上限），每个收藏夹只通过B站接口按收藏时间倒序
+翻页，直到遇到上次看到的最新视频（游标）为止；游标和 ETag 保存在独立的 SQLite 数据库中
 """
 
 import os
 import json
 import time
+import sqlite3
 import asyncio
 import logging
+import threading
+import http.cookiejar
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
+import requests
 import yt_dlp
 
 # 设置日志
 logger = logging.getLogger("savextube")
 
+FAV_RESOURCE_API = "https://api.bilibili.com/x/v3/fav/resource/list"
+FAV_PAGE_SIZE = 20
+
+
+class FavCursorStore:
+    """收藏夹检查游标：上次看到的最新视频、ETag、视频数量和检查时间"""
+
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS fav_cursors (
+                fav_id TEXT PRIMARY KEY,
+                last_bvid TEXT,
+                etag TEXT,
+                media_count INTEGER,
+                last_check REAL,
+                last_change REAL
+            )
+        ''')
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get(self, fav_id: str) -> Dict[str, Any]:
+        """获取游标，不存在时返回空字典"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_bvid, etag, media_count, last_check, last_change "
+                "FROM fav_cursors WHERE fav_id = ?", (fav_id,)).fetchone()
+        if not row:
+            return {}
+        return dict(zip(("last_bvid", "etag", "media_count", "last_check", "last_change"), row))
+
+    def last_checks(self) -> Dict[str, float]:
+        """所有收藏夹的最近检查时间"""
+        with self._lock:
+            rows = self._conn.execute("SELECT fav_id, last_check FROM fav_cursors").fetchall()
+        return {fav_id: last_check or 0 for fav_id, last_check in rows}
+
+    def update(self, fav_id: str, **fields):
+        """更新游标中的部分字段"""
+        columns = [key for key in ("last_bvid", "etag", "media_count", "last_check", "last_change")
+                   if key in fields]
+        if not columns:
+            return
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO fav_cursors (fav_id) VALUES (?)", (fav_id,))
+            self._conn.execute(
+                f"UPDATE fav_cursors SET {', '.join(f'{key} = ?' for key in columns)} WHERE fav_id = ?",
+                [fields[key] for key in columns] + [fav_id])
+
+    def delete(self, fav_id: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM fav_cursors WHERE fav_id = ?", (fav_id,))
+
+
 class BilibiliFavSubscriptionManager:
     """B站收藏夹订阅管理器"""
     
@@ -35,6 +101,28 @@ class BilibiliFavSubscriptionManager:
         
         # 从环境变量获取检查间隔（分钟）
         self.poll_interval = int(os.getenv("BILIBILI_POLL_INTERVAL", "60"))
+        # 同时检查的收藏夹数量、每次检查最多翻的页数
+        self.check_concurrency = max(1, int(os.getenv("BILIBILI_FAVSUB_CONCURRENCY", "4")))
+        self.max_pages = max(1, int(os.getenv("BILIBILI_FAVSUB_MAX_PAGES", "5")))
+
+        # 检查游标数据库
+        self.cursors = FavCursorStore(os.getenv("BILIBILI_FAVSUB_DB", "/app/db/bilibili_favsub.db"))
+
+        # 收藏夹接口会话（在线程池中使用）
+        self.session = requests.Session()
+        self.session.headers.update({
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+            "Referer": "https://www.bilibili.com/",
+        })
+        if self.cookies_path and os.path.exists(self.cookies_path):
+            try:
+                cookie_jar = http.cookiejar.MozillaCookieJar(self.cookies_path)
+                cookie_jar.load(ignore_discard=True, ignore_expires=True)
+                self.session.cookies.update(cookie_jar)
+            except Exception as e:
+                logger.warning(f"⚠️ 加载B站cookies失败，收藏夹接口将匿名访问: {e}")
+        if self.proxy_host:
+            self.session.proxies.update({"http": self.proxy_host, "https": self.proxy_host})
         
         # 订阅数据文件路径
         self.subscriptions_file = self.download_path / "bilibili_subscriptions.json"
@@ -112,22 +200,24 @@ class BilibiliFavSubscriptionManager:
                 ydl_opts["cookiefile"] = self.cookies_path
             
             # 获取收藏夹信息
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(fav_url, download=False)
+            info = await asyncio.get_running_loop().run_in_executor(
+                None, self._extract_fav_info, fav_url, ydl_opts)
             
             if not info:
                 return {"success": False, "error": "收藏夹不存在或无法访问"}
             
             # 提取收藏夹信息
             fav_title = info.get('title', f'收藏夹_{fav_id}')
-            video_count = len(info.get('entries', []))
+            entries = [entry for entry in info.get('entries') or [] if entry]
+            video_count = len(entries)
             
             return {
                 "success": True,
                 "fav_id": fav_id,
                 "fav_url": fav_url,
                 "title": fav_title,
-                "video_count": video_count
+                "video_count": video_count,
+                "latest_id": entries[0].get('id') if entries else None
             }
             
         except Exception as e:
@@ -177,6 +267,9 @@ class BilibiliFavSubscriptionManager:
             # 保存订阅
             if self.save_subscriptions(subscriptions):
                 logger.info(f"📚 成功添加订阅: {fav_id} - {validation_result['title']}")
+                self.cursors.update(fav_id, last_bvid=validation_result.get("latest_id"),
+                                    etag=None, media_count=validation_result["video_count"],
+                                    last_check=time.time(), last_change=time.time())
                 
                 # 启动检查任务（如果还没启动）
                 self.ensure_check_task_running()
@@ -220,6 +313,7 @@ class BilibiliFavSubscriptionManager:
             
             # 保存订阅
             if self.save_subscriptions(subscriptions):
+                self.cursors.delete(fav_id)
                 logger.info(f"📚 成功移除订阅: {fav_id} - {title}")
                 return {
                     "success": True,
@@ -237,6 +331,8 @@ class BilibiliFavSubscriptionManager:
         """获取订阅列表"""
         try:
             subscriptions = self.load_subscriptions()
+            # 检查时间只写入游标数据库，不再每次重写订阅文件
+            last_checks = self.cursors.last_checks()
             
             result = []
             for fav_id, sub_info in subscriptions.items():
@@ -245,7 +341,7 @@ class BilibiliFavSubscriptionManager:
                     'title': sub_info.get('title', f'收藏夹_{fav_id}'),
                     'video_count': sub_info.get('video_count', 0),
                     'added_time': sub_info.get('added_time', 0),
-                    'last_check': sub_info.get('last_check', 0),
+                    'last_check': max(sub_info.get('last_check', 0), last_checks.get(fav_id, 0)),
                     'download_count': sub_info.get('download_count', 0),
                     'url': sub_info.get('url', self.build_fav_url(fav_id))
                 })
@@ -298,106 +394,211 @@ class BilibiliFavSubscriptionManager:
                 await asyncio.sleep(300)  # 异常时等待5分钟
 
     async def _check_all_subscriptions(self):
-        """检查所有订阅的收藏夹"""
+        """并发检查所有订阅的收藏夹"""
         try:
             subscriptions = self.load_subscriptions()
             if not subscriptions:
                 return
 
-            logger.info(f"📚 开始检查 {len(subscriptions)} 个订阅的收藏夹")
+            logger.info(f"📚 开始检查 {len(subscriptions)} 个订阅的收藏夹（并发 {self.check_concurrency}）")
+            start = time.monotonic()
+            semaphore = asyncio.Semaphore(self.check_concurrency)
 
-            # 标记是否有更新
-            has_updates = False
+            async def check(fav_id: str) -> bool:
+                async with semaphore:
+                    try:
+                        # 传递整个subscriptions字典，以便修改能被保存
+                        return await self._check_single_subscription(fav_id, subscriptions)
+                    except Exception as e:
+                        logger.error(f"📚 检查收藏夹 {fav_id} 失败: {e}")
+                        return False
 
-            for fav_id in subscriptions.keys():
-                try:
-                    # 传递整个subscriptions字典，以便修改能被保存
-                    updated = await self._check_single_subscription(fav_id, subscriptions)
-                    if updated:
-                        has_updates = True
-                except Exception as e:
-                    logger.error(f"📚 检查收藏夹 {fav_id} 失败: {e}")
-
-            # 只有在有更新时才保存
-            if has_updates:
+            results = await asyncio.gather(*(check(fav_id) for fav_id in list(subscriptions)))
+            logger.info(f"📚 {len(subscriptions)} 个收藏夹检查完成，用时 {time.monotonic() - start:.1f}s")
+
+            # 只有订阅信息真正变化时才保存
+            if any(results):
                 self.save_subscriptions(subscriptions)
                 logger.info("📚 订阅信息已更新并保存")
 
         except Exception as e:
             logger.error(f"📚 检查订阅失败: {e}")
 
-    async def _check_single_subscription(self, fav_id: str, subscriptions: Dict[str, Any]) -> bool:
+    def _extract_fav_info(self, url: str, ydl_opts: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """用 yt-dlp 获取收藏夹或视频信息（阻塞，在线程池中调用）"""
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            return ydl.extract_info(url, download=False)
+
+    def _ydl_download(self, ydl_opts: Dict[str, Any], url: str):
+        """用 yt-dlp 下载单个视频（阻塞，在线程池中调用）"""
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            ydl.download([url])
+
+    def _fetch_new_entries(self, fav_id: str, cursor: Dict[str, Any],
+                           last_video_count: int) -> Tuple[Optional[List[Dict[str, Any]]], Dict[str, Any]]:
         """
-        检查单个订阅
+        通过收藏夹接口获取游标之后新增的视频（阻塞，在线程池中调用）
 
-        Args:
-            fav_id: 收藏夹ID
-            subscriptions: 完整的订阅字典
+        接口按收藏时间倒序返回，逐页读取直到遇到游标视频；第一页未变化（304）或
+        第一条就是游标视频时只需要一次请求
 
         Returns:
-            bool: 是否有更新
+            (新增视频条目列表，按收藏时间从新到旧；无变化时为空列表, 新游标字段)
         """
-        try:
-            sub_info = subscriptions[fav_id]
-            fav_url = sub_info['url']
-            logger.info(f"📚 检查收藏夹: {fav_id} - {sub_info.get('title', 'Unknown')}")
+        last_bvid = cursor.get("last_bvid")
+        new_entries: List[Dict[str, Any]] = []
+        fields: Dict[str, Any] = {}
+        exhausted = False
+
+        for page in range(1, self.max_pages + 1):
+            headers = {}
+            if page == 1 and cursor.get("etag"):
+                headers["If-None-Match"] = cursor["etag"]
+            response = self.session.get(FAV_RESOURCE_API, headers=headers, timeout=15, params={
+                "media_id": fav_id, "pn": page, "ps": FAV_PAGE_SIZE,
+                "order": "mtime", "type": 0, "platform": "web",
+            })
+            if page == 1 and response.status_code == 304:
+                return [], fields
+            response.raise_for_status()
+            if page == 1 and response.headers.get("ETag"):
+                fields["etag"] = response.headers["ETag"]
+
+            data = response.json()
+            if data.get("code") != 0:
+                raise RuntimeError(f"收藏夹接口返回错误: {data.get('message', data.get('code'))}")
+            data = data.get("data") or {}
+            if page == 1:
+                fields["media_count"] = (data.get("info") or {}).get("media_count")
+
+            for media in data.get("medias") or []:
+                bvid = media.get("bvid") or media.get("bv_id")
+                if not bvid:
+                    continue
+                # 游标始终指向收藏夹中最新的视频
+                fields.setdefault("last_bvid", bvid)
+                if bvid == last_bvid:
+                    return new_entries, fields
+                new_entries.append({
+                    "id": bvid,
+                    "url": f"https://www.bilibili.com/video/{bvid}",
+                    "title": media.get("title"),
+                })
+            if not data.get("has_more"):
+                exhausted = True
+                break
+            if last_bvid is None and len(new_entries) >= (fields.get("media_count") or 0) - last_video_count:
+                # 没有游标时只需要读到视频数量差覆盖的范围
+                break
 
-            # 获取当前收藏夹信息
-            ydl_opts = {
-                "quiet": True,
-                "no_warnings": True,
-                "extract_flat": True,
-                "socket_timeout": 30,
-                "retries": 3,
-            }
+        # 旧订阅还没有游标、游标视频已被取消收藏或前 max_pages 页都没有遇到游标视频：
+        # 按视频数量差确定新增范围，游标重置为当前最新的视频
+        if last_bvid and exhausted:
+            logger.warning(f"📚 收藏夹 {fav_id} 中找不到游标视频 {last_bvid}，按视频数量判断新增")
+        elif last_bvid:
+            logger.warning(f"📚 收藏夹 {fav_id} 前 {self.max_pages} 页未遇到游标视频 {last_bvid}，按视频数量判断新增")
+        media_count = fields.get("media_count")
+        new_count = max(0, (media_count if media_count is not None else len(new_entries)) - last_video_count)
+        return new_entries[:new_count], fields
+
+    def _fetch_entries_full(self, fav_id: str, fav_url: str, cursor: Dict[str, Any],
+                            last_video_count: int) -> Tuple[Optional[List[Dict[str, Any]]], Dict[str, Any]]:
+        """接口不可用时的回退：用 yt-dlp 获取整个收藏夹（阻塞，在线程池中调用）"""
+        ydl_opts = {
+            "quiet": True,
+            "no_warnings": True,
+            "extract_flat": True,
+            "socket_timeout": 30,
+            "retries": 3,
+        }
 
-            if self.proxy_host:
-                ydl_opts["proxy"] = self.proxy_host
-            if self.cookies_path and os.path.exists(self.cookies_path):
-                ydl_opts["cookiefile"] = self.cookies_path
+        if self.proxy_host:
+            ydl_opts["proxy"] = self.proxy_host
+        if self.cookies_path and os.path.exists(self.cookies_path):
+            ydl_opts["cookiefile"] = self.cookies_path
+
+        info = self._extract_fav_info(fav_url, ydl_opts)
+        if not info:
+            return None, {}
+
+        entries = [entry for entry in info.get('entries') or [] if entry]
+        fields: Dict[str, Any] = {"media_count": len(entries)}
+        ids = [entry.get('id') for entry in entries]
+        last_bvid = cursor.get("last_bvid")
+        if last_bvid and last_bvid in ids:
+            new_entries = entries[:ids.index(last_bvid)]
+        else:
+            new_entries = entries[:max(0, len(entries) - last_video_count)]
+        if entries:
+            fields["last_bvid"] = entries[0].get('id')
+        return new_entries, fields
 
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(fav_url, download=False)
+    async def _check_single_subscription(self, fav_id: str, subscriptions: Dict[str, Any]) -> bool:
+        """
+        检查单个订阅（只获取游标之后新增的视频）
 
-            if not info:
-                logger.warning(f"📚 收藏夹 {fav_id} 无法访问")
-                # 仍然更新检查时间
-                subscriptions[fav_id]['last_check'] = time.time()
-                return True
-
-            current_video_count = len(info.get('entries', []))
-            last_video_count = sub_info.get('last_video_count', 0)
-
-            # 更新检查时间和视频数量
-            subscriptions[fav_id]['last_check'] = time.time()
-            subscriptions[fav_id]['video_count'] = current_video_count
-
-            # 如果有新视频，进行下载
-            if current_video_count > last_video_count:
-                new_videos = current_video_count - last_video_count
-                logger.info(f"📚 收藏夹 {fav_id} 发现 {new_videos} 个新视频，开始下载新增视频")
-
-                # 只下载新增的视频
-                download_result = await self._download_new_videos(fav_url, sub_info, info, last_video_count)
-                if download_result["success"]:
-                    subscriptions[fav_id]['last_video_count'] = current_video_count
-                    subscriptions[fav_id]['download_count'] = subscriptions[fav_id].get('download_count', 0) + download_result.get('file_count', 0)
-                    logger.info(f"📚 收藏夹 {fav_id} 新增视频下载完成，下载了 {download_result.get('file_count', 0)} 个新文件")
-                else:
-                    logger.error(f"📚 收藏夹 {fav_id} 下载失败: {download_result.get('error', 'Unknown')}")
-            else:
-                logger.info(f"📚 收藏夹 {fav_id} 无新视频")
+        Args:
+            fav_id: 收藏夹ID
+            subscriptions: 完整的订阅字典
 
-            return True  # 总是返回True表示有更新（至少更新了检查时间）
+        Returns:
+            bool: 订阅信息是否有变化（需要保存订阅文件）
+        """
+        loop = asyncio.get_running_loop()
+        sub_info = subscriptions[fav_id]
+        fav_url = sub_info['url']
+        last_video_count = sub_info.get('last_video_count', 0)
+        cursor = self.cursors.get(fav_id)
+        logger.debug(f"📚 检查收藏夹: {fav_id} - {sub_info.get('title', 'Unknown')}")
 
+        try:
+            try:
+                new_entries, fields = await loop.run_in_executor(
+                    None, self._fetch_new_entries, fav_id, cursor, last_video_count)
+            except Exception as api_e:
+                logger.warning(f"📚 收藏夹 {fav_id} 接口检查失败，改用 yt-dlp 完整获取: {api_e}")
+                new_entries, fields = await loop.run_in_executor(
+                    None, self._fetch_entries_full, fav_id, fav_url, cursor, last_video_count)
         except Exception as e:
             logger.error(f"📚 检查收藏夹 {fav_id} 异常: {e}")
-            # 即使出错也更新检查时间
-            try:
-                subscriptions[fav_id]['last_check'] = time.time()
-                return True
-            except:
-                return False
+            self.cursors.update(fav_id, last_check=time.time())
+            return False
+
+        now = time.time()
+        if new_entries is None:
+            logger.warning(f"📚 收藏夹 {fav_id} 无法访问")
+            self.cursors.update(fav_id, last_check=now)
+            return False
+
+        changed = False
+        media_count = fields.get("media_count")
+        if media_count is not None and media_count != sub_info.get('video_count'):
+            sub_info['video_count'] = media_count
+            changed = True
+
+        if not new_entries:
+            logger.debug(f"📚 收藏夹 {fav_id} 无新视频")
+            if media_count is not None and media_count != last_video_count:
+                # 有视频被取消收藏，同步数量基准
+                sub_info['last_video_count'] = media_count
+                changed = True
+            self.cursors.update(fav_id, last_check=now, **fields)
+            return changed
+
+        logger.info(f"📚 收藏夹 {fav_id} 发现 {len(new_entries)} 个新视频，开始下载新增视频")
+        download_result = await self._download_new_videos(fav_url, sub_info, {"entries": new_entries}, 0)
+        if download_result["success"]:
+            sub_info['last_video_count'] = media_count if media_count is not None else last_video_count + len(new_entries)
+            sub_info['download_count'] = sub_info.get('download_count', 0) + download_result.get('file_count', 0)
+            sub_info['last_check'] = now
+            self.cursors.update(fav_id, last_check=now, last_change=now, **fields)
+            logger.info(f"📚 收藏夹 {fav_id} 新增视频下载完成，下载了 {download_result.get('file_count', 0)} 个新文件")
+            return True
+
+        # 下载失败时不推进游标，下次检查重试
+        logger.error(f"📚 收藏夹 {fav_id} 下载失败: {download_result.get('error', 'Unknown')}")
+        self.cursors.update(fav_id, last_check=now)
+        return changed
 
     async def _download_fav_videos(self, fav_url: str, sub_info: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -614,8 +815,8 @@ class BilibiliFavSubscriptionManager:
                             else:
                                 logger.info(f"📚 尝试下载策略 {strategy_idx + 1}: 默认格式")
 
-                            with yt_dlp.YoutubeDL(current_opts) as ydl:
-                                ydl.download([video_url])
+                            await asyncio.get_running_loop().run_in_executor(
+                                None, self._ydl_download, current_opts, video_url)
 
                             # 验证文件是否真的下载成功（使用相同的文件名模式）
                             downloaded_files = list(fav_download_path.glob(f"{safe_filename}.*"))
@@ -736,8 +937,8 @@ class BilibiliFavSubscriptionManager:
                 "socket_timeout": 30,
             })
 
-            with yt_dlp.YoutubeDL(info_opts) as ydl:
-                info = ydl.extract_info(video_url, download=False)
+            info = await asyncio.get_running_loop().run_in_executor(
+                None, self._extract_fav_info, video_url, info_opts)
 
             return {
                 "success": True,
@@ -790,8 +991,8 @@ class BilibiliFavSubscriptionManager:
             if self.cookies_path and os.path.exists(self.cookies_path):
                 ydl_opts["cookiefile"] = self.cookies_path
 
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(fav_url, download=False)
+            info = await asyncio.get_running_loop().run_in_executor(
+                None, self._extract_fav_info, fav_url, ydl_opts)
 
             if not info:
                 return {"success": False, "error": "收藏夹无法访问"}
@@ -801,7 +1002,11 @@ class BilibiliFavSubscriptionManager:
 
             if result["success"]:
                 # 更新订阅信息
-                current_video_count = len(info.get('entries', []))
+                entries = [entry for entry in info.get('entries') or [] if entry]
+                current_video_count = len(entries)
+                self.cursors.update(fav_id, last_bvid=entries[0].get('id') if entries else None,
+                                    media_count=current_video_count,
+                                    last_check=time.time(), last_change=time.time())
                 subscriptions[fav_id]['last_check'] = time.time()
                 subscriptions[fav_id]['video_count'] = current_video_count
                 subscriptions[fav_id]['last_video_count'] = current_video_count
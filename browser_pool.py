@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Playwright 浏览器池
+为抖音、快手、小红书等短视频解析提供常驻的 Chromium 实例，
+每个任务使用独立的 BrowserContext，避免每个链接都冷启动浏览器
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _PooledBrowser:
+    """池中的单个浏览器实例"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.browser = None
+        self.active_contexts = 0
+        self.last_used = time.time()
+
+    def is_alive(self) -> bool:
+        return self.browser is not None and self.browser.is_connected()
+
+
+class PlaywrightBrowserPool:
+    """
+    常驻 Chromium 浏览器池
+
+    - 最多 size 个浏览器，每个浏览器最多同时承载 contexts_per_browser 个任务
+    - 首次使用时才启动 Playwright 和浏览器
+    - 浏览器空闲超过 idle_timeout 秒后由后台任务关闭，下次使用时重新启动
+    - 浏览器崩溃（断开连接）时自动重启
+    """
+
+    def __init__(self, size: int = 2, contexts_per_browser: int = 2,
+                 idle_timeout: float = 300, launch_options: Optional[Dict[str, Any]] = None):
+        """
+        初始化浏览器池
+
+        Args:
+            size: 浏览器实例数量
+            contexts_per_browser: 每个浏览器同时承载的最大 BrowserContext 数量
+            idle_timeout: 浏览器空闲多少秒后被关闭
+            launch_options: 传递给 chromium.launch 的参数
+        """
+        self.size = max(1, int(size))
+        self.contexts_per_browser = max(1, int(contexts_per_browser))
+        self.idle_timeout = idle_timeout
+        self.launch_options = launch_options or {"headless": True}
+
+        self._playwright = None
+        self._browsers: List[_PooledBrowser] = [_PooledBrowser(i) for i in range(self.size)]
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._reaper_task: Optional[asyncio.Task] = None
+
+        # 统计信息
+        self.launch_count = 0
+        self.crash_count = 0
+        self.acquire_count = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.last_wait_time = 0.0
+
+    async def _ensure_started(self):
+        """延迟初始化：需要在事件循环中创建同步原语并启动 Playwright"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+            self._slots = asyncio.Semaphore(self.size * self.contexts_per_browser)
+        async with self._lock:
+            if self._playwright is None:
+                from playwright.async_api import async_playwright
+                self._playwright = await async_playwright().start()
+                logger.info(f"🌐 Playwright 浏览器池已启动 (浏览器数: {self.size})")
+            if self._reaper_task is None or self._reaper_task.done():
+                self._reaper_task = asyncio.create_task(self._reap_idle_browsers())
+
+    async def _checkout_browser(self) -> _PooledBrowser:
+        """选择负载最低的浏览器，必要时启动或重启"""
+        async with self._lock:
+            pooled = min(
+                (b for b in self._browsers if b.active_contexts < self.contexts_per_browser),
+                key=lambda b: (not b.is_alive(), b.active_contexts),
+            )
+            if not pooled.is_alive():
+                if pooled.browser is not None:
+                    self.crash_count += 1
+                    logger.warning(f"⚠️ 浏览器 #{pooled.index} 已断开，正在重启")
+                    try:
+                        await pooled.browser.close()
+                    except Exception:
+                        pass
+                start = time.time()
+                pooled.browser = await self._playwright.chromium.launch(**self.launch_options)
+                self.launch_count += 1
+                logger.info(f"🚀 浏览器 #{pooled.index} 启动完成，用时 {time.time() - start:.2f}s")
+            pooled.active_contexts += 1
+            return pooled
+
+    @asynccontextmanager
+    async def context(self, **context_options):
+        """
+        获取一个全新的 BrowserContext，退出时自动关闭
+
+        Args:
+            **context_options: 传递给 browser.new_context 的参数
+        """
+        await self._ensure_started()
+
+        wait_start = time.time()
+        await self._slots.acquire()
+        wait_time = time.time() - wait_start
+        self.acquire_count += 1
+        self.total_wait_time += wait_time
+        self.last_wait_time = wait_time
+        self.max_wait_time = max(self.max_wait_time, wait_time)
+        if wait_time > 1:
+            logger.info(f"⏳ 等待浏览器池空闲用时 {wait_time:.2f}s")
+
+        pooled = None
+        context = None
+        try:
+            pooled = await self._checkout_browser()
+            try:
+                context = await pooled.browser.new_context(**context_options)
+            except Exception:
+                # 浏览器可能刚好崩溃，强制重启后重试一次
+                if pooled.is_alive():
+                    raise
+                async with self._lock:
+                    pooled.active_contexts -= 1
+                pooled = await self._checkout_browser()
+                context = await pooled.browser.new_context(**context_options)
+            yield context
+        finally:
+            if context is not None:
+                try:
+                    await context.close()
+                except Exception as e:
+                    logger.debug(f"关闭 BrowserContext 失败: {e}")
+            if pooled is not None:
+                async with self._lock:
+                    pooled.active_contexts -= 1
+                    pooled.last_used = time.time()
+            self._slots.release()
+
+    async def _reap_idle_browsers(self):
+        """后台任务：关闭空闲超时的浏览器"""
+        interval = max(5.0, min(60.0, self.idle_timeout / 2))
+        while True:
+            await asyncio.sleep(interval)
+            async with self._lock:
+                now = time.time()
+                for pooled in self._browsers:
+                    if (pooled.browser is not None and pooled.active_contexts == 0
+                            and now - pooled.last_used > self.idle_timeout):
+                        try:
+                            await pooled.browser.close()
+                        except Exception as e:
+                            logger.debug(f"关闭空闲浏览器失败: {e}")
+                        pooled.browser = None
+                        logger.info(f"💤 浏览器 #{pooled.index} 空闲超时，已关闭")
+
+    def stats(self) -> Dict[str, Any]:
+        """获取浏览器池统计信息"""
+        return {
+            "size": self.size,
+            "alive": sum(1 for b in self._browsers if b.is_alive()),
+            "active_contexts": sum(b.active_contexts for b in self._browsers),
+            "launch_count": self.launch_count,
+            "crash_count": self.crash_count,
+            "acquire_count": self.acquire_count,
+            "avg_wait_time": self.total_wait_time / self.acquire_count if self.acquire_count else 0.0,
+            "max_wait_time": self.max_wait_time,
+            "last_wait_time": self.last_wait_time,
+        }
+
+    async def close(self):
+        """关闭所有浏览器和 Playwright"""
+        if self._reaper_task:
+            self._reaper_task.cancel()
+            self._reaper_task = None
+        for pooled in self._browsers:
+            if pooled.browser is not None:
+                try:
+                    await pooled.browser.close()
+                except Exception:
+                    pass
+                pooled.browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+        logger.info("🛑 Playwright 浏览器池已关闭")
@@ -2,26 +2,39 @@
 """
 SQLite 配置管理器
 用于管理 Telegram 机器人的配置开关状态
+
+配置在启动时一次性读入内存快照，读取只是字典查找；写入先更新快照并通知订阅者，
+再由后台定时器把一段时间内的修改合并成一个事务写回数据库（WAL 模式，单连接复用）
 """
 
 import sqlite3
 import json
 import os
+import atexit
 import logging
+import threading
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 logger = logging.getLogger(__name__)
 
+# 写回数据库前等待的时间（秒），期间的多次修改合并为一个事务
+DEFAULT_FLUSH_DELAY = 0.5
+
+ConfigListener = Callable[[str, Any, int], None]
+
 class ConfigManager:
-    def __init__(self, db_path: str = "/app/db/savextube.db"):
+    def __init__(self, db_path: str = "/app/db/savextube.db",
+                 flush_delay: float = DEFAULT_FLUSH_DELAY):
         """
         初始化配置管理器
         
         Args:
             db_path: SQLite 数据库文件路径
+            flush_delay: 修改写回数据库前的合并等待时间（秒）
         """
         self.db_path = Path(db_path)
+        self.flush_delay = max(0.0, float(flush_delay))
         self.default_config = {
             "auto_download_enabled": True,  # 默认启用自动下载
             "bilibili_auto_playlist": False,  # 默认不启用B站自动下载全集
@@ -46,13 +59,36 @@ class ConfigManager:
             logger.error(f"无法创建数据库目录 {self.db_path.parent}: {e}")
             raise  # 直接抛出异常，不回退到本地目录
         
-        # 初始化数据库
+        # 内存快照及其版本号，每次修改版本号加一
+        self._snapshot: Dict[str, Any] = {}
+        self.version = 0
+        self._lock = threading.RLock()
+        self._listeners: List[ConfigListener] = []
+
+        # 待写回数据库的修改及写回定时器
+        self._pending: Dict[str, Any] = {}
+        self._flush_timer: Optional[threading.Timer] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_lock = threading.Lock()
+
+        # 初始化数据库并加载快照
         self._init_database()
+        self._load_snapshot()
+        atexit.register(self.close)
+
+    def _connection(self) -> sqlite3.Connection:
+        """获取复用的数据库连接（调用方需持有 _conn_lock）"""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        return self._conn
     
     def _init_database(self):
         """初始化数据库表"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._conn_lock:
+                conn = self._connection()
                 cursor = conn.cursor()
                 
                 # 创建 tg_config 表
@@ -98,9 +134,28 @@ class ConfigManager:
                 (key, json.dumps(value))
             )
     
+    def _load_snapshot(self):
+        """从数据库读入全部配置，缺失的默认项补写回数据库"""
+        try:
+            with self._conn_lock:
+                rows = self._connection().execute("SELECT key, value FROM tg_config").fetchall()
+        except Exception as e:
+            logger.error(f"❌ 加载配置失败: {e}")
+            raise  # 直接抛出异常，不回退到其他方式
+
+        snapshot = {key: json.loads(value) for key, value in rows}
+        missing = {key: value for key, value in self.default_config.items() if key not in snapshot}
+        snapshot.update(missing)
+        with self._lock:
+            self._snapshot = snapshot
+            self.version += 1
+            self._pending.update(missing)
+        if missing:
+            self.flush()
+
     def get_config(self, key: str, default=None) -> Any:
         """
-        获取配置项的值
+        获取配置项的值（读取内存快照）
         
         Args:
             key: 配置项键名
@@ -109,94 +164,147 @@ class ConfigManager:
         Returns:
             配置项的值
         """
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    "SELECT value FROM tg_config WHERE key = ?",
-                    (key,)
-                )
-                result = cursor.fetchone()
-                
-                if result:
-                    return json.loads(result[0])
-                else:
-                    # 如果键不存在，返回默认值并插入到数据库
-                    if key in self.default_config:
-                        default_value = self.default_config[key]
-                        self.set_config(key, default_value)
-                        return default_value
-                    return default
-                    
-        except Exception as e:
-            logger.error(f"❌ 获取配置失败 ({key}): {e}")
-            raise  # 直接抛出异常，不回退到其他方式
+        with self._lock:
+            if key in self._snapshot:
+                return self._snapshot[key]
+        if key in self.default_config:
+            # 快照加载时已补齐默认项，这里只会在 reset 与读取交错时出现
+            return self.default_config[key]
+        return default
     
     def get_all_config(self) -> Dict[str, Any]:
         """
         获取所有配置项
         
         Returns:
-            包含所有配置项的字典
+            包含所有配置项的字典（快照的副本）
         """
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT key, value FROM tg_config")
-                results = cursor.fetchall()
-                
-                config = {}
-                for key, value in results:
-                    config[key] = json.loads(value)
-                
-                # 确保所有默认配置项都存在
-                for key, default_value in self.default_config.items():
-                    if key not in config:
-                        config[key] = default_value
-                        # 插入缺失的配置项
-                        self.set_config(key, default_value)
-                
-                return config
-                
-        except Exception as e:
-            logger.error(f"❌ 获取所有配置失败: {e}")
-            raise  # 直接抛出异常，不回退到其他方式
-    
+        with self._lock:
+            return dict(self._snapshot)
+
     def set_config(self, key: str, value: Any) -> bool:
         """
         设置配置项的值
         
+        快照立即更新，数据库在 flush_delay 秒后批量写回
+        
         Args:
             key: 配置项键名
             value: 配置项值
             
+        Returns:
+            是否设置成功
+        """
+        return self.set_many({key: value})
+
+    def set_many(self, values: Dict[str, Any]) -> bool:
+        """
+        批量设置配置项，只有值真正变化的项会写回数据库并通知订阅者
+        
+        Args:
+            values: 配置项键值对
+            
         Returns:
             是否设置成功
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # 尝试更新现有配置
-                cursor.execute(
-                    "UPDATE tg_config SET value = ? WHERE key = ?",
-                    (json.dumps(value), key)
-                )
-                
-                # 如果没有更新任何行，插入新配置
-                if cursor.rowcount == 0:
-                    cursor.execute(
-                        "INSERT INTO tg_config (key, value) VALUES (?, ?)",
-                        (key, json.dumps(value))
-                    )
-                
-                conn.commit()
-                logger.info(f"✅ 配置已更新: {key} = {value}")
-                return True
-                
-        except Exception as e:
-            logger.error(f"❌ 设置配置失败 ({key}={value}): {e}")
+            encoded = {key: json.dumps(value) for key, value in values.items()}
+        except (TypeError, ValueError) as e:
+            logger.error(f"❌ 设置配置失败 ({values}): {e}")
             raise  # 直接抛出异常，不回退到其他方式
+
+        changes = []
+        with self._lock:
+            for key, value in values.items():
+                if key in self._snapshot and json.dumps(self._snapshot[key]) == encoded[key]:
+                    continue
+                self._snapshot[key] = value
+                self._pending[key] = value
+                self.version += 1
+                changes.append((key, value, self.version))
+            if changes:
+                self._schedule_flush()
+
+        for key, value, version in changes:
+            logger.info(f"✅ 配置已更新: {key} = {value}")
+            self._notify(key, value, version)
+        return True
+
+    def subscribe(self, listener: ConfigListener) -> Callable[[], None]:
+        """
+        订阅配置变化，回调参数为 (键名, 新值, 版本号)，在修改配置的线程中同步调用
+        
+        Returns:
+            取消订阅的函数
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+        def unsubscribe():
+            with self._lock:
+                if listener in self._listeners:
+                    self._listeners.remove(listener)
+        return unsubscribe
+
+    def _notify(self, key: str, value: Any, version: int):
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(key, value, version)
+            except Exception as e:
+                logger.warning(f"⚠️ 配置订阅回调失败 ({key}): {e}")
+
+    def _schedule_flush(self):
+        """安排一次延迟写回（调用方需持有 _lock）"""
+        if self._flush_timer is not None:
+            return
+        self._flush_timer = threading.Timer(self.flush_delay, self.flush)
+        self._flush_timer.daemon = True
+        self._flush_timer.start()
+
+    def flush(self) -> int:
+        """
+        把待写回的修改在一个事务中写入数据库
+
+        取出修改与写入数据库都在 _conn_lock 内完成，并发的 flush 按取出顺序依次提交，
+        较旧的值不会覆盖较新的值（加锁顺序固定为 _conn_lock -> _lock）
+
+        Returns:
+            写入的配置项数量
+        """
+        with self._conn_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                timer, self._flush_timer = self._flush_timer, None
+            if timer is not None and timer is not threading.current_thread():
+                timer.cancel()
+            if not pending:
+                return 0
+
+            try:
+                conn = self._connection()
+                with conn:
+                    for key, value in pending.items():
+                        cursor = conn.execute(
+                            "UPDATE tg_config SET value = ? WHERE key = ?",
+                            (json.dumps(value), key)
+                        )
+                        if cursor.rowcount == 0:
+                            conn.execute(
+                                "INSERT INTO tg_config (key, value) VALUES (?, ?)",
+                                (key, json.dumps(value))
+                            )
+                logger.debug(f"💾 配置已写回数据库: {len(pending)} 项")
+                return len(pending)
+            except Exception as e:
+                logger.error(f"❌ 配置写回数据库失败: {e}")
+                # 保留未写入的修改（较新的修改优先），稍后重试
+                with self._lock:
+                    for key, value in pending.items():
+                        self._pending.setdefault(key, value)
+                    self._schedule_flush()
+                return 0
     
     def reset_to_default(self) -> bool:
         """
@@ -205,20 +313,35 @@ class ConfigManager:
         Returns:
             是否重置成功
         """
+        self.flush()
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # 删除所有现有配置
-                cursor.execute("DELETE FROM tg_config")
-                
-                # 插入默认配置
-                self._insert_default_config(cursor)
-                
-                conn.commit()
-                logger.info("✅ 配置已重置为默认值")
-                return True
-                
+            with self._conn_lock:
+                conn = self._connection()
+                with conn:
+                    # 删除所有现有配置
+                    conn.execute("DELETE FROM tg_config")
+                    # 插入默认配置
+                    self._insert_default_config(conn.cursor())
         except Exception as e:
             logger.error(f"❌ 重置配置失败: {e}")
             raise  # 直接抛出异常，不回退到其他方式
+
+        with self._lock:
+            previous, self._snapshot = self._snapshot, dict(self.default_config)
+            changes = []
+            for key, value in self.default_config.items():
+                if previous.get(key) != value:
+                    self.version += 1
+                    changes.append((key, value, self.version))
+        for key, value, version in changes:
+            self._notify(key, value, version)
+        logger.info("✅ 配置已重置为默认值")
+        return True
+
+    def close(self):
+        """写回未保存的修改并关闭数据库连接（可重复调用）"""
+        self.flush()
+        with self._conn_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
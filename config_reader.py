@@ -241,6 +241,54 @@ def get_youtube_config(config: Dict[str, Any]) -> Dict[str, Any]:
         'convert_to_mp4': youtube_config.get('youtube_convert_to_mp4', True),
     }
 
+def get_scheduler_config(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    从配置中提取下载调度器相关配置
+    
+    Args:
+        config: 完整的配置字典
+        
+    Returns:
+        下载调度器配置字典
+    """
+    scheduler_config = config.get('scheduler', {})
+    
+    return {
+        'max_concurrent_downloads': scheduler_config.get('max_concurrent_downloads', 3),
+        'platform_limits': {
+            'youtube': scheduler_config.get('youtube_max_concurrent', 2),
+            'bilibili': scheduler_config.get('bilibili_max_concurrent', 2),
+            'douyin': scheduler_config.get('douyin_max_concurrent', 2),
+            'netease': scheduler_config.get('netease_max_concurrent', 2),
+            'applemusic': scheduler_config.get('applemusic_max_concurrent', 1),
+        },
+    }
+
+def get_throughput_config(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    从配置中提取下载吞吐策略相关配置
+    
+    Args:
+        config: 完整的配置字典
+        
+    Returns:
+        下载吞吐策略配置字典
+    """
+    throughput_config = config.get('throughput', {})
+    
+    return {
+        'mode': throughput_config.get('throughput_mode', 'auto'),
+        'fragment_concurrency': throughput_config.get('fragment_concurrency', 3),
+        'platform_fragments': {
+            'youtube': throughput_config.get('youtube_fragment_concurrency', 8),
+            'bilibili': throughput_config.get('bilibili_fragment_concurrency', 4),
+            'x': throughput_config.get('x_fragment_concurrency', 4),
+        },
+        'large_file_mb': throughput_config.get('large_file_mb', 200),
+        'multi_connection_downloader': throughput_config.get('multi_connection_downloader', 'aria2c'),
+        'multi_connection_count': throughput_config.get('multi_connection_count', 8),
+    }
+
 def get_config_with_fallback(toml_config: Dict[str, Any], env_var: str, toml_key: str, default: str = "") -> str:
     """
     获取配置值，支持 TOML 配置和环境变量回退
@@ -361,6 +409,14 @@ def print_config_summary(config: Dict[str, Any]):
     youtube_config = get_youtube_config(config)
     logger.info(f"   ▶️ YouTube 转换为 MP4: {youtube_config['convert_to_mp4']}")
     
+    # 下载调度器配置
+    scheduler_config = get_scheduler_config(config)
+    logger.info(f"   🚦 全局最大并发下载数: {scheduler_config['max_concurrent_downloads']}")
+    
+    # 下载吞吐策略配置
+    throughput_config = get_throughput_config(config)
+    logger.info(f"   🚀 下载吞吐模式: {throughput_config['mode']}")
+    
     logger.info("📊 配置摘要完成")
 
 if __name__ == "__main__":
@@ -398,6 +454,12 @@ if __name__ == "__main__":
         youtube_config = get_youtube_config(config)
         print(f"YouTube 配置: {youtube_config}")
         
+        scheduler_config = get_scheduler_config(config)
+        print(f"下载调度器配置: {scheduler_config}")
+        
+        throughput_config = get_throughput_config(config)
+        print(f"下载吞吐策略配置: {throughput_config}")
+        
         is_valid = validate_telegram_config(telegram_config)
         print(f"配置有效性: {is_valid}")
     else:
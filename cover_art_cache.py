@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+专辑封面缓存
+同一张专辑的所有曲目共用一个封面地址：每个地址只下载一次，原图保存在磁盘 LRU 中
+（用于 cover.jpg），缩放/重新编码后的嵌入版本保存在内存 LRU 中（用于写入音频标签）
+"""
+
+import io
+import os
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# 可选依赖：Pillow 用于缩小过大的封面，未安装时直接嵌入原图
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    Image = None
+    PIL_AVAILABLE = False
+
+SUPPORTED_IMAGE_TYPES = ('image/jpeg', 'image/jpg', 'image/png')
+
+DEFAULT_CACHE_DIR = "/app/cache/covers"
+
+# 下载失败的地址在这段时间内不再重试（秒）
+FAILED_FETCH_TTL = 300
+
+# 按地址哈希分片的下载锁数量，锁的数量固定，不随地址增长
+URL_LOCK_STRIPES = 64
+
+
+class CoverArtCache:
+    """两级（内存 + 磁盘）LRU 封面缓存，并发请求同一地址时只下载一次"""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, memory_items: int = 32,
+                 disk_max_bytes: int = 200 * 1024 * 1024, max_dimension: int = 1400,
+                 max_embed_bytes: int = 1024 * 1024):
+        """
+        初始化封面缓存
+
+        Args:
+            cache_dir: 原图的磁盘缓存目录
+            memory_items: 内存中保留的嵌入版本封面数量
+            disk_max_bytes: 磁盘缓存的最大总字节数，超出时删除最久未使用的文件
+            max_dimension: 嵌入封面的最大边长（像素）
+            max_embed_bytes: 嵌入封面的最大字节数，超出时重新编码
+        """
+        self.cache_dir = Path(cache_dir)
+        self.memory_items = max(1, int(memory_items))
+        self.disk_max_bytes = disk_max_bytes
+        self.max_dimension = max_dimension
+        self.max_embed_bytes = max_embed_bytes
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        })
+
+        self._memory: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+        self._failed: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._url_locks = [threading.Lock() for _ in range(URL_LOCK_STRIPES)]
+
+        # 统计信息
+        self.fetch_count = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            logger.warning(f"⚠️ 无法创建封面缓存目录 {self.cache_dir}: {e}")
+
+    # ------------------------------------------------------------------
+    # 对外接口
+    # ------------------------------------------------------------------
+
+    def get_original(self, url: str) -> Optional[Tuple[bytes, str]]:
+        """获取原图 (数据, MIME)，用于保存 cover.jpg"""
+        if not url:
+            return None
+        with self._lock_for(url):
+            return self._load_original(url)
+
+    def get_embeddable(self, url: str) -> Optional[Tuple[bytes, str]]:
+        """获取适合嵌入音频标签的封面 (数据, MIME)，过大的图片只会缩放一次"""
+        if not url:
+            return None
+        with self._lock:
+            cached = self._memory.get(url)
+            if cached is not None:
+                self._memory.move_to_end(url)
+                self.memory_hits += 1
+                return cached
+
+        with self._lock_for(url):
+            # 等待锁期间可能已经被其他线程处理完成
+            with self._lock:
+                cached = self._memory.get(url)
+                if cached is not None:
+                    self._memory.move_to_end(url)
+                    self.memory_hits += 1
+                    return cached
+
+            original = self._load_original(url)
+            if original is None:
+                return None
+            embeddable = self._prepare_for_embedding(*original)
+
+            with self._lock:
+                self._memory[url] = embeddable
+                self._memory.move_to_end(url)
+                while len(self._memory) > self.memory_items:
+                    self._memory.popitem(last=False)
+            return embeddable
+
+    def save_to(self, url: str, file_path: str) -> bool:
+        """把原图写入指定文件（例如专辑目录下的 cover.jpg）"""
+        original = self.get_original(url)
+        if original is None:
+            return False
+        with open(file_path, 'wb') as f:
+            f.write(original[0])
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        """获取缓存统计"""
+        return {
+            'fetch_count': self.fetch_count,
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'memory_items': len(self._memory),
+        }
+
+    # ------------------------------------------------------------------
+    # 内部实现
+    # ------------------------------------------------------------------
+
+    def _lock_for(self, url: str) -> threading.Lock:
+        # 同一地址总是落在同一把锁上；不同地址偶尔共用一把锁只会让它们排队下载
+        digest = hashlib.md5(url.encode('utf-8')).digest()
+        return self._url_locks[int.from_bytes(digest[:4], 'big') % len(self._url_locks)]
+
+    def _disk_path(self, url: str) -> Path:
+        # 以完整地址为键，带不同 ?param= 尺寸参数的地址视为不同图片
+        return self.cache_dir / (hashlib.md5(url.encode('utf-8')).hexdigest() + '.img')
+
+    def _load_original(self, url: str) -> Optional[Tuple[bytes, str]]:
+        """从磁盘缓存读取原图，未命中时下载（调用方需持有该地址的锁）"""
+        path = self._disk_path(url)
+        try:
+            if path.exists():
+                data = path.read_bytes()
+                if data:
+                    os.utime(path)  # 更新访问时间，用于 LRU 淘汰
+                    self.disk_hits += 1
+                    return data, self._detect_mime(data)
+        except OSError as e:
+            logger.debug(f"读取封面缓存失败: {e}")
+
+        failed_at = self._failed.get(url)
+        if failed_at and time.time() - failed_at < FAILED_FETCH_TTL:
+            return None
+
+        data = self._fetch(url)
+        if data is None:
+            self._failed[url] = time.time()
+            return None
+        self._failed.pop(url, None)
+
+        try:
+            tmp_path = path.with_suffix('.tmp')
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+            self._prune_disk()
+        except OSError as e:
+            logger.debug(f"写入封面缓存失败: {e}")
+        return data, self._detect_mime(data)
+
+    def _fetch(self, url: str) -> Optional[bytes]:
+        try:
+            logger.info(f"🖼️ 下载专辑封面: {url}")
+            self.fetch_count += 1
+            response = self.session.get(url, timeout=30)
+            response.raise_for_status()
+
+            content_type = response.headers.get('content-type', '').lower()
+            if not any(img_type in content_type for img_type in SUPPORTED_IMAGE_TYPES):
+                logger.warning(f"⚠️ 不支持的图片格式: {content_type}")
+                return None
+
+            data = response.content
+            if not data:
+                logger.warning(f"⚠️ 专辑封面为空: {url}")
+                return None
+            logger.debug(f"✅ 成功下载专辑封面: {len(data)} 字节")
+            return data
+        except Exception as e:
+            logger.warning(f"⚠️ 下载专辑封面失败: {e}")
+            return None
+
+    def _prepare_for_embedding(self, data: bytes, mime: str) -> Tuple[bytes, str]:
+        """过大的封面缩小到 max_dimension 并重新编码为 JPEG"""
+        if not PIL_AVAILABLE:
+            return data, mime
+        try:
+            image = Image.open(io.BytesIO(data))
+            oversized = max(image.size) > self.max_dimension
+            if not oversized and len(data) <= self.max_embed_bytes:
+                return data, mime
+
+            if oversized:
+                image.thumbnail((self.max_dimension, self.max_dimension), Image.LANCZOS)
+            if image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            output = io.BytesIO()
+            image.save(output, format='JPEG', quality=90, optimize=True)
+            resized = output.getvalue()
+            logger.info(f"🖼️ 封面已压缩: {len(data)} -> {len(resized)} 字节, 尺寸 {image.size[0]}x{image.size[1]}")
+            return resized, 'image/jpeg'
+        except Exception as e:
+            logger.warning(f"⚠️ 压缩封面失败，使用原图: {e}")
+            return data, mime
+
+    @staticmethod
+    def _detect_mime(data: bytes) -> str:
+        return 'image/png' if data[:8] == b'\x89PNG\r\n\x1a\n' else 'image/jpeg'
+
+    def _prune_disk(self):
+        """磁盘缓存超过上限时，按访问时间删除最旧的文件"""
+        files = []
+        total = 0
+        for path in self.cache_dir.glob('*.img'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        if total <= self.disk_max_bytes:
+            return
+        files.sort()
+        for _, size, path in files:
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                continue
+            if total <= self.disk_max_bytes:
+                break
+
+
+_shared_cache: Optional[CoverArtCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_cover_art_cache() -> CoverArtCache:
+    """获取进程内共享的封面缓存（目录可通过 COVER_ART_CACHE_DIR 环境变量修改）"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = CoverArtCache(os.getenv("COVER_ART_CACHE_DIR", DEFAULT_CACHE_DIR))
+        return _shared_cache
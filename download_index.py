@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+下载索引
+以 (平台, 媒体ID, 规格) 为键记录已下载文件的最终路径、大小和内容指纹，
+重复发送的链接在发起任何网络请求之前就能从索引中得到结果；
+文件被改名或移动到同一目录的其他位置时，通过大小 + 内容指纹重新找到它
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = "/app/db/download_index.db"
+
+# 内容指纹：小文件计算完整哈希，大文件只读取开头、中间、结尾各一块
+FINGERPRINT_CHUNK = 1024 * 1024
+FULL_HASH_LIMIT = 3 * FINGERPRINT_CHUNK
+
+# 重新定位改名文件时，最多检查的目录条目数
+RELOCATE_SCAN_LIMIT = 5000
+
+# 路由中可以直接作为媒体ID使用的字段（与 yt-dlp 提取的 id 一致）
+ROUTE_MEDIA_ID_FIELDS = {
+    "youtube": "video_id",
+    "x": "status_id",
+    "tiktok": "id",
+    "douyin": "id",
+    "instagram": "id",
+}
+
+
+def fingerprint(path: str) -> str:
+    """计算文件的内容指纹（sha256，大文件为抽样哈希）"""
+    size = os.path.getsize(path)
+    digest = hashlib.sha256(str(size).encode())
+    with open(path, 'rb') as f:
+        if size <= FULL_HASH_LIMIT:
+            digest.update(f.read())
+        else:
+            for offset in (0, size // 2, size - FINGERPRINT_CHUNK):
+                f.seek(offset)
+                digest.update(f.read(FINGERPRINT_CHUNK))
+    return digest.hexdigest()
+
+
+def media_id_from_route(route) -> Optional[str]:
+    """从链接路由中取出媒体ID，无法在不请求网络的情况下确定时返回 None"""
+    field_name = ROUTE_MEDIA_ID_FIELDS.get(route.platform)
+    return route.get(field_name) if field_name else None
+
+
+@dataclass
+class IndexEntry:
+    """索引中的一条下载记录"""
+    platform: str
+    media_id: str
+    variant: str
+    path: str
+    size: int
+    fingerprint: str
+    title: Optional[str] = None
+    result: Dict[str, Any] = field(default_factory=dict)
+    downloaded_at: float = 0.0
+
+
+class DownloadIndex:
+    """SQLite 下载索引"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        """
+        初始化下载索引
+
+        Args:
+            db_path: SQLite 数据库文件路径
+        """
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self.enabled = True
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+        self.relocated = 0
+        self.stale = 0
+
+        try:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._init_database()
+        except Exception as e:
+            # 索引不可用时不影响下载，所有查询都视为未命中
+            logger.warning(f"⚠️ 下载索引不可用: {e}")
+            self.enabled = False
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """打开连接并在一个事务中使用，结束时提交（出错时回滚）并关闭连接"""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_database(self):
+        """初始化数据库表"""
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS downloads (
+                    platform TEXT NOT NULL,
+                    media_id TEXT NOT NULL,
+                    variant TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    title TEXT,
+                    result TEXT,
+                    downloaded_at REAL NOT NULL,
+                    PRIMARY KEY (platform, media_id, variant)
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_downloads_fingerprint ON downloads (fingerprint)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS download_urls (
+                    url TEXT NOT NULL,
+                    variant TEXT NOT NULL,
+                    platform TEXT NOT NULL,
+                    media_id TEXT NOT NULL,
+                    PRIMARY KEY (url, variant)
+                )
+            ''')
+            conn.commit()
+        logger.info(f"✅ 下载索引初始化成功: {self.db_path}")
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def lookup(self, platform: str, media_id: str, variant: str = "default") -> Optional[IndexEntry]:
+        """
+        查询已下载的文件，文件已被删除时移除该记录
+
+        Returns:
+            IndexEntry；未下载或文件已不存在时返回 None
+        """
+        if not self.enabled or not media_id:
+            return None
+        try:
+            with self._lock, self._connect() as conn:
+                row = conn.execute(
+                    "SELECT platform, media_id, variant, path, size, fingerprint, title, result, downloaded_at "
+                    "FROM downloads WHERE platform = ? AND media_id = ? AND variant = ?",
+                    (platform, str(media_id), variant)
+                ).fetchone()
+        except Exception as e:
+            logger.debug(f"读取下载索引失败 ({platform}:{media_id}): {e}")
+            return None
+        if row is None:
+            self.misses += 1
+            return None
+        entry = self._entry_from_row(row)
+        if not self._verify(entry):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def lookup_url(self, url: str, variant: str = "default") -> Optional[IndexEntry]:
+        """按之前下载过的原始链接查询"""
+        if not self.enabled or not url:
+            return None
+        try:
+            with self._lock, self._connect() as conn:
+                row = conn.execute(
+                    "SELECT platform, media_id FROM download_urls WHERE url = ? AND variant = ?",
+                    (url, variant)
+                ).fetchone()
+        except Exception as e:
+            logger.debug(f"读取下载索引失败 ({url}): {e}")
+            return None
+        if row is None:
+            self.misses += 1
+            return None
+        return self.lookup(row[0], row[1], variant)
+
+    def find_by_fingerprint(self, file_fingerprint: str) -> List[IndexEntry]:
+        """查找内容相同的所有记录"""
+        if not self.enabled:
+            return []
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                "SELECT platform, media_id, variant, path, size, fingerprint, title, result, downloaded_at "
+                "FROM downloads WHERE fingerprint = ?", (file_fingerprint,)
+            ).fetchall()
+        return [self._entry_from_row(row) for row in rows]
+
+    def duplicate_groups(self) -> List[List[IndexEntry]]:
+        """内容相同但路径不同的记录分组（每组按下载时间排序，第一条为最早的文件）"""
+        if not self.enabled:
+            return []
+        with self._lock, self._connect() as conn:
+            rows = conn.execute('''
+                SELECT platform, media_id, variant, path, size, fingerprint, title, result, downloaded_at
+                FROM downloads WHERE fingerprint IN (
+                    SELECT fingerprint FROM downloads GROUP BY fingerprint HAVING COUNT(DISTINCT path) > 1
+                ) ORDER BY fingerprint, downloaded_at
+            ''').fetchall()
+        groups: Dict[str, List[IndexEntry]] = {}
+        for row in rows:
+            entry = self._entry_from_row(row)
+            groups.setdefault(entry.fingerprint, []).append(entry)
+        return list(groups.values())
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def record(self, platform: str, media_id: str, path: str, variant: str = "default",
+               url: Optional[str] = None, title: Optional[str] = None,
+               result: Optional[Dict[str, Any]] = None) -> Optional[IndexEntry]:
+        """
+        记录下载成功的文件
+
+        Args:
+            platform: 平台名称（与 get_platform_name 一致）
+            media_id: 平台上的媒体ID
+            path: 最终文件路径
+            variant: 规格（例如 video / audio / 音质），同一媒体的不同规格分别记录
+            url: 原始链接，之后可以直接按链接查询
+            title: 标题
+            result: 下载结果中需要在命中时复用的字段
+        """
+        if not self.enabled or not media_id or not path:
+            return None
+        try:
+            size = os.path.getsize(path)
+            file_fingerprint = fingerprint(path)
+        except OSError as e:
+            logger.debug(f"无法记录下载索引 ({path}): {e}")
+            return None
+
+        entry = IndexEntry(platform, str(media_id), variant, str(path), size, file_fingerprint,
+                           title, dict(result or {}), time.time())
+        try:
+            with self._lock, self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO downloads "
+                    "(platform, media_id, variant, path, size, fingerprint, title, result, downloaded_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (entry.platform, entry.media_id, variant, entry.path, size, file_fingerprint, title,
+                     json.dumps(entry.result, ensure_ascii=False, default=str), entry.downloaded_at)
+                )
+                if url:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO download_urls (url, variant, platform, media_id) VALUES (?, ?, ?, ?)",
+                        (url, variant, entry.platform, entry.media_id)
+                    )
+        except Exception as e:
+            logger.debug(f"写入下载索引失败 ({platform}:{media_id}): {e}")
+            return None
+        logger.info(f"🗂️ 已记录下载索引: {platform}:{media_id} [{variant}] -> {path}")
+        return entry
+
+    def remember_url(self, url: str, platform: str, media_id: str, variant: str = "default"):
+        """把另一个链接（例如短链接）关联到已记录的媒体"""
+        if not self.enabled or not url or not media_id:
+            return
+        try:
+            with self._lock, self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO download_urls (url, variant, platform, media_id) VALUES (?, ?, ?, ?)",
+                    (url, variant, platform, str(media_id))
+                )
+        except Exception as e:
+            logger.debug(f"写入下载索引失败 ({url}): {e}")
+
+    def move_path(self, old_path: str, new_path: str):
+        """把指向 old_path 的记录改为指向 new_path（重复文件被合并后调用）"""
+        if not self.enabled:
+            return
+        with self._lock, self._connect() as conn:
+            conn.execute("UPDATE downloads SET path = ? WHERE path = ?", (str(new_path), str(old_path)))
+
+    def stats(self) -> Dict[str, Any]:
+        """获取索引统计信息，供 /status 使用"""
+        entries = 0
+        total_size = 0
+        if self.enabled:
+            try:
+                with self._lock, self._connect() as conn:
+                    entries, total_size = conn.execute(
+                        "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM downloads").fetchone()
+            except Exception as e:
+                logger.debug(f"统计下载索引失败: {e}")
+        return {
+            "enabled": self.enabled,
+            "entries": entries,
+            "total_size": total_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "relocated": self.relocated,
+            "stale": self.stale,
+        }
+
+    # ------------------------------------------------------------------
+    # 内部实现
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _entry_from_row(row) -> IndexEntry:
+        platform, media_id, variant, path, size, file_fingerprint, title, result, downloaded_at = row
+        return IndexEntry(platform, media_id, variant, path, size, file_fingerprint, title,
+                          json.loads(result) if result else {}, downloaded_at)
+
+    def _verify(self, entry: IndexEntry) -> bool:
+        """确认文件仍然存在；路径失效时在原目录中按大小和指纹查找改名后的文件"""
+        try:
+            if os.path.getsize(entry.path) == entry.size:
+                return True
+        except OSError:
+            pass
+
+        new_path = self._relocate(entry)
+        with self._lock, self._connect() as conn:
+            if new_path:
+                conn.execute("UPDATE downloads SET path = ? WHERE path = ?", (new_path, entry.path))
+            else:
+                conn.execute(
+                    "DELETE FROM downloads WHERE platform = ? AND media_id = ? AND variant = ?",
+                    (entry.platform, entry.media_id, entry.variant)
+                )
+        if new_path:
+            logger.info(f"🗂️ 索引中的文件已改名: {entry.path} -> {new_path}")
+            self.relocated += 1
+            entry.path = new_path
+            return True
+        self.stale += 1
+        return False
+
+    @staticmethod
+    def _relocate(entry: IndexEntry) -> Optional[str]:
+        directory = Path(entry.path).parent
+        if not directory.is_dir():
+            return None
+        scanned = 0
+        for root, _, files in os.walk(directory):
+            for name in files:
+                scanned += 1
+                if scanned > RELOCATE_SCAN_LIMIT:
+                    return None
+                candidate = os.path.join(root, name)
+                try:
+                    if os.path.getsize(candidate) != entry.size:
+                        continue
+                    if fingerprint(candidate) == entry.fingerprint:
+                        return candidate
+                except OSError:
+                    continue
+        return None
+
+
+_shared_index: Optional[DownloadIndex] = None
+_shared_index_lock = threading.Lock()
+
+
+def get_download_index() -> DownloadIndex:
+    """获取进程内共享的下载索引（路径可通过 DOWNLOAD_INDEX_DB 环境变量修改）"""
+    global _shared_index
+    with _shared_index_lock:
+        if _shared_index is None:
+            _shared_index = DownloadIndex(os.getenv("DOWNLOAD_INDEX_DB", DEFAULT_DB_PATH))
+        return _shared_index
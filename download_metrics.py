@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+下载任务指标
+记录每个任务各阶段的耗时（链接识别、信息提取、数据传输、ffmpeg 合并、媒体信息、
+文件查找、Telegram 消息编辑）、各平台的下载速度、排队时间和失败次数，
+通过 Flask 的 /metrics 以 Prometheus 文本格式导出，并在 /status 中汇总
+"""
+
+import time
+import logging
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "savextube"
+
+# 阶段名称 -> /status 中显示的名称
+PHASE_LABELS = {
+    "classify": "识别",
+    "extract": "解析",
+    "transfer": "传输",
+    "merge": "合并",
+    "postprocess": "后处理",
+    "media_info": "媒体信息",
+    "find_file": "查找文件",
+    "telegram": "Telegram",
+}
+
+# yt-dlp 中负责合并音视频的后处理器名称
+MERGER_POSTPROCESSORS = ("Merger", "FFmpegMerger")
+
+UNKNOWN_PLATFORM = "unknown"
+
+_current_job: contextvars.ContextVar = contextvars.ContextVar("savextube_download_job", default=None)
+
+
+class JobTimeline:
+    """单个下载任务的阶段耗时记录"""
+
+    def __init__(self, job_id: str, platform: str, queue_wait: float = 0.0):
+        self.job_id = job_id
+        self.platform = platform or UNKNOWN_PLATFORM
+        self.queue_wait = queue_wait
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.phases: Dict[str, float] = {}
+        self.bytes = 0
+        self.status: Optional[str] = None
+        self.error: Optional[str] = None
+        # 下载吞吐策略（throughput.DownloadStrategy.to_dict()）
+        self.strategy: Optional[Dict[str, Any]] = None
+
+    @property
+    def duration(self) -> float:
+        return (self.finished_at or time.time()) - self.started_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "platform": self.platform,
+            "status": self.status,
+            "error": self.error,
+            "queue_wait": self.queue_wait,
+            "duration": self.duration,
+            "bytes": self.bytes,
+            "phases": dict(self.phases),
+            "strategy": self.strategy,
+        }
+
+
+class _Summary:
+    """计数 / 总和 / 最大值，对应 Prometheus summary（不含分位数）"""
+
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    @property
+    def avg(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class YtdlpPhaseTracker:
+    """
+    通过 yt-dlp 的 progress_hooks / postprocessor_hooks 拆分一次 extract_info 的耗时：
+    开始到第一次 downloading 回调为信息提取，之后到最后一个文件 finished 为数据传输，
+    Merger 后处理器的 started -> finished 为 ffmpeg 合并
+
+    回调在 yt-dlp 所在的线程中执行，因此任务在创建时就绑定，不依赖上下文变量
+    """
+
+    def __init__(self, metrics: "DownloadMetrics", job: Optional[JobTimeline], platform: str):
+        self.metrics = metrics
+        self.job = job
+        self.platform = platform
+        self.started_at = time.perf_counter()
+        self.first_download_at: Optional[float] = None
+        self.last_finished_at: Optional[float] = None
+        self.bytes = 0
+        self._postprocessor_started: Dict[str, float] = {}
+        self._finished = False
+        self._lock = threading.Lock()
+
+    def progress_hook(self, d: Dict[str, Any]):
+        now = time.perf_counter()
+        status = d.get("status")
+        with self._lock:
+            if status == "downloading" and self.first_download_at is None:
+                self.first_download_at = now
+                self.metrics.observe_phase("extract", now - self.started_at, self.platform, self.job)
+            elif status == "finished":
+                if self.first_download_at is None:
+                    self.first_download_at = now
+                    self.metrics.observe_phase("extract", now - self.started_at, self.platform, self.job)
+                self.last_finished_at = now
+                self.bytes += d.get("total_bytes") or d.get("downloaded_bytes") or 0
+
+    def postprocessor_hook(self, d: Dict[str, Any]):
+        name = d.get("postprocessor") or "unknown"
+        now = time.perf_counter()
+        if d.get("status") == "started":
+            self._postprocessor_started[name] = now
+        elif d.get("status") == "finished" and name in self._postprocessor_started:
+            phase = "merge" if name in MERGER_POSTPROCESSORS else "postprocess"
+            self.metrics.observe_phase(phase, now - self._postprocessor_started.pop(name), self.platform, self.job)
+
+    def finish(self):
+        """yt-dlp 调用结束后记录传输耗时和字节数（重复调用无效）"""
+        with self._lock:
+            if self._finished:
+                return
+            self._finished = True
+            if self.first_download_at is None:
+                # 文件已存在等情况，没有触发下载回调
+                self.metrics.observe_phase(
+                    "extract", time.perf_counter() - self.started_at, self.platform, self.job)
+                return
+            if self.last_finished_at is not None:
+                self.metrics.record_transfer(
+                    self.platform, self.bytes, self.last_finished_at - self.first_download_at, self.job)
+
+
+class DownloadMetrics:
+    """进程内的下载指标注册表（线程安全）"""
+
+    def __init__(self, recent_jobs: int = 50):
+        self._lock = threading.Lock()
+        self._phases: Dict[Tuple[str, str], _Summary] = {}
+        self._transfer: Dict[str, List[float]] = {}
+        self._strategy_transfer: Dict[Tuple[str, str], List[float]] = {}
+        self._jobs: Dict[Tuple[str, str], int] = {}
+        self._queue_wait = _Summary()
+        self._telegram: Dict[str, _Summary] = {}
+        self._telegram_rate_limited: Dict[str, int] = {}
+        self._active: Dict[str, JobTimeline] = {}
+        self._recent: deque = deque(maxlen=max(1, int(recent_jobs)))
+        self._seq = 0
+
+    # ------------------------------------------------------------------
+    # 任务生命周期
+    # ------------------------------------------------------------------
+
+    def start_job(self, platform: str, job_id: Optional[str] = None,
+                  queue_wait: float = 0.0) -> JobTimeline:
+        """
+        开始记录一个任务，并把它设为当前异步上下文中的任务
+
+        之后在同一个协程（以及其中创建的子任务）里记录的阶段耗时都会归入该任务
+        """
+        with self._lock:
+            self._seq += 1
+            job = JobTimeline(job_id or f"job-{self._seq}", platform, queue_wait)
+            self._active[job.job_id] = job
+            self._queue_wait.observe(queue_wait)
+        _current_job.set(job)
+        return job
+
+    def current_job(self) -> Optional[JobTimeline]:
+        return _current_job.get()
+
+    def mark_current_job(self, status: str, error: Optional[str] = None):
+        """设置当前任务的结果（success / failed / cancelled），由 finish_job 统计"""
+        job = _current_job.get()
+        if job is not None and job.status is None:
+            job.status = status
+            job.error = error
+
+    def finish_job(self, job: JobTimeline, status: Optional[str] = None, error: Optional[str] = None):
+        """结束任务；未指定结果时使用 mark_current_job 设置的结果，默认为 success"""
+        if job.finished_at is not None:
+            return
+        job.finished_at = time.time()
+        if status is not None:
+            job.status = status
+            job.error = error
+        job.status = job.status or "success"
+        with self._lock:
+            self._active.pop(job.job_id, None)
+            key = (job.platform, job.status)
+            self._jobs[key] = self._jobs.get(key, 0) + 1
+            self._recent.append(job)
+        if job.status == "failed":
+            logger.info(f"📉 任务失败: {job.job_id} ({job.platform}) {job.error or ''}")
+        strategy = f" [策略 {job.strategy['name']}]" if job.strategy else ""
+        logger.info(f"⏱️ 任务耗时 {job.job_id} ({job.platform}){strategy}: {self._format_phases(job.phases)}")
+
+    # ------------------------------------------------------------------
+    # 阶段 / 传输 / Telegram
+    # ------------------------------------------------------------------
+
+    def observe_phase(self, phase: str, seconds: float, platform: Optional[str] = None,
+                      job: Optional[JobTimeline] = None):
+        """记录一次阶段耗时，未指定任务时归入当前上下文中的任务"""
+        job = job or _current_job.get()
+        platform = platform or (job.platform if job else UNKNOWN_PLATFORM)
+        with self._lock:
+            summary = self._phases.get((platform, phase))
+            if summary is None:
+                summary = self._phases[(platform, phase)] = _Summary()
+            summary.observe(seconds)
+            if job is not None:
+                job.phases[phase] = job.phases.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, phase: str, platform: Optional[str] = None):
+        """计时上下文管理器：with metrics.phase("merge"): ..."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_phase(phase, time.perf_counter() - start, platform)
+
+    def record_transfer(self, platform: str, nbytes: int, seconds: float,
+                        job: Optional[JobTimeline] = None):
+        """记录一次数据传输的字节数与耗时"""
+        job = job or _current_job.get()
+        platform = platform or (job.platform if job else UNKNOWN_PLATFORM)
+        self.observe_phase("transfer", seconds, platform, job)
+        with self._lock:
+            totals = self._transfer.setdefault(platform, [0, 0.0])
+            totals[0] += nbytes
+            totals[1] += seconds
+            if job is not None:
+                job.bytes += nbytes
+                if job.strategy:
+                    totals = self._strategy_transfer.setdefault((platform, job.strategy["name"]), [0, 0.0])
+                    totals[0] += nbytes
+                    totals[1] += seconds
+
+    def record_strategy(self, strategy: Dict[str, Any], job: Optional[JobTimeline] = None):
+        """记录任务使用的下载吞吐策略，之后的传输速度按策略分别统计"""
+        job = job or _current_job.get()
+        if job is not None:
+            job.strategy = dict(strategy)
+
+    def observe_telegram(self, method: str, seconds: float, rate_limited: bool = False):
+        """记录一次 Bot API 请求（在任务上下文中发出的请求同时计入任务的 telegram 阶段）"""
+        job = _current_job.get()
+        with self._lock:
+            summary = self._telegram.get(method)
+            if summary is None:
+                summary = self._telegram[method] = _Summary()
+            summary.observe(seconds)
+            if rate_limited:
+                self._telegram_rate_limited[method] = self._telegram_rate_limited.get(method, 0) + 1
+        if job is not None:
+            self.observe_phase("telegram", seconds, job.platform, job)
+
+    def ytdlp_tracker(self, platform: Optional[str] = None) -> YtdlpPhaseTracker:
+        """创建 yt-dlp 阶段跟踪器，需要在任务所在的协程中创建"""
+        job = _current_job.get()
+        return YtdlpPhaseTracker(self, job, platform or (job.platform if job else UNKNOWN_PLATFORM))
+
+    # ------------------------------------------------------------------
+    # 导出
+    # ------------------------------------------------------------------
+
+    def render_prometheus(self) -> str:
+        """生成 Prometheus 文本格式（text/plain; version=0.0.4）"""
+        p = METRIC_PREFIX
+        lines: List[str] = []
+        with self._lock:
+            lines += [f"# HELP {p}_jobs_total 已完成的下载任务数", f"# TYPE {p}_jobs_total counter"]
+            for (platform, status), count in sorted(self._jobs.items()):
+                lines.append(f'{p}_jobs_total{{platform="{_escape(platform)}",status="{_escape(status)}"}} {count}')
+
+            lines += [f"# HELP {p}_jobs_in_progress 正在执行的下载任务数", f"# TYPE {p}_jobs_in_progress gauge",
+                      f"{p}_jobs_in_progress {len(self._active)}"]
+
+            lines += [f"# HELP {p}_queue_wait_seconds 任务在调度队列中的等待时间",
+                      f"# TYPE {p}_queue_wait_seconds summary",
+                      f"{p}_queue_wait_seconds_sum {self._queue_wait.total:.6f}",
+                      f"{p}_queue_wait_seconds_count {self._queue_wait.count}",
+                      f"# TYPE {p}_queue_wait_seconds_max gauge",
+                      f"{p}_queue_wait_seconds_max {self._queue_wait.max:.6f}"]
+
+            lines += [f"# HELP {p}_phase_seconds 各阶段耗时", f"# TYPE {p}_phase_seconds summary"]
+            for (platform, phase), summary in sorted(self._phases.items()):
+                labels = f'platform="{_escape(platform)}",phase="{_escape(phase)}"'
+                lines.append(f"{p}_phase_seconds_sum{{{labels}}} {summary.total:.6f}")
+                lines.append(f"{p}_phase_seconds_count{{{labels}}} {summary.count}")
+            lines.append(f"# TYPE {p}_phase_seconds_max gauge")
+            for (platform, phase), summary in sorted(self._phases.items()):
+                labels = f'platform="{_escape(platform)}",phase="{_escape(phase)}"'
+                lines.append(f"{p}_phase_seconds_max{{{labels}}} {summary.max:.6f}")
+
+            lines += [f"# HELP {p}_transfer_bytes_total 下载的字节数", f"# TYPE {p}_transfer_bytes_total counter"]
+            for platform, (nbytes, _) in sorted(self._transfer.items()):
+                lines.append(f'{p}_transfer_bytes_total{{platform="{_escape(platform)}"}} {int(nbytes)}')
+            lines += [f"# HELP {p}_transfer_seconds_total 数据传输耗时", f"# TYPE {p}_transfer_seconds_total counter"]
+            for platform, (_, seconds) in sorted(self._transfer.items()):
+                lines.append(f'{p}_transfer_seconds_total{{platform="{_escape(platform)}"}} {seconds:.6f}')
+            lines += [f"# HELP {p}_transfer_bytes_per_second 平均下载速度",
+                      f"# TYPE {p}_transfer_bytes_per_second gauge"]
+            for platform, (nbytes, seconds) in sorted(self._transfer.items()):
+                rate = nbytes / seconds if seconds > 0 else 0.0
+                lines.append(f'{p}_transfer_bytes_per_second{{platform="{_escape(platform)}"}} {rate:.1f}')
+
+            lines += [f"# HELP {p}_strategy_transfer_bytes_total 按下载策略统计的字节数",
+                      f"# TYPE {p}_strategy_transfer_bytes_total counter"]
+            for (platform, strategy), (nbytes, _) in sorted(self._strategy_transfer.items()):
+                labels = f'platform="{_escape(platform)}",strategy="{_escape(strategy)}"'
+                lines.append(f"{p}_strategy_transfer_bytes_total{{{labels}}} {int(nbytes)}")
+            lines += [f"# HELP {p}_strategy_transfer_seconds_total 按下载策略统计的传输耗时",
+                      f"# TYPE {p}_strategy_transfer_seconds_total counter"]
+            for (platform, strategy), (_, seconds) in sorted(self._strategy_transfer.items()):
+                labels = f'platform="{_escape(platform)}",strategy="{_escape(strategy)}"'
+                lines.append(f"{p}_strategy_transfer_seconds_total{{{labels}}} {seconds:.6f}")
+
+            lines += [f"# HELP {p}_telegram_request_seconds Bot API 请求耗时",
+                      f"# TYPE {p}_telegram_request_seconds summary"]
+            for method, summary in sorted(self._telegram.items()):
+                lines.append(f'{p}_telegram_request_seconds_sum{{method="{_escape(method)}"}} {summary.total:.6f}')
+                lines.append(f'{p}_telegram_request_seconds_count{{method="{_escape(method)}"}} {summary.count}')
+            lines += [f"# HELP {p}_telegram_rate_limited_total 被 Telegram 限流（HTTP 429）的请求数",
+                      f"# TYPE {p}_telegram_rate_limited_total counter"]
+            for method, count in sorted(self._telegram_rate_limited.items()):
+                lines.append(f'{p}_telegram_rate_limited_total{{method="{_escape(method)}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> Dict[str, Any]:
+        """获取汇总信息，供 /status 使用"""
+        with self._lock:
+            jobs: Dict[str, int] = {}
+            for (_, status), count in self._jobs.items():
+                jobs[status] = jobs.get(status, 0) + count
+            recent = list(self._recent)
+            phase_avg: Dict[str, float] = {}
+            for job in recent:
+                for phase, seconds in job.phases.items():
+                    phase_avg[phase] = phase_avg.get(phase, 0.0) + seconds
+            phase_avg = {phase: total / len(recent) for phase, total in phase_avg.items()}
+            throughput = {platform: nbytes / seconds for platform, (nbytes, seconds) in self._transfer.items()
+                          if seconds > 0}
+            strategy_throughput = {f"{platform}/{strategy}": nbytes / seconds
+                                   for (platform, strategy), (nbytes, seconds) in self._strategy_transfer.items()
+                                   if seconds > 0}
+            telegram_calls = sum(s.count for s in self._telegram.values())
+            telegram_time = sum(s.total for s in self._telegram.values())
+            return {
+                "jobs": jobs,
+                "in_progress": len(self._active),
+                "recent_jobs": len(recent),
+                "avg_queue_wait": self._queue_wait.avg,
+                "max_queue_wait": self._queue_wait.max,
+                "phase_avg": phase_avg,
+                "throughput": throughput,
+                "strategy_throughput": strategy_throughput,
+                "telegram_calls": telegram_calls,
+                "telegram_avg": telegram_time / telegram_calls if telegram_calls else 0.0,
+                "telegram_rate_limited": sum(self._telegram_rate_limited.values()),
+                "last_job": recent[-1].to_dict() if recent else None,
+            }
+
+    @staticmethod
+    def _format_phases(phases: Dict[str, float]) -> str:
+        if not phases:
+            return "无阶段记录"
+        return ", ".join(f"{PHASE_LABELS.get(name, name)} {seconds:.2f}s" for name, seconds in phases.items())
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+_shared_metrics: Optional[DownloadMetrics] = None
+_shared_metrics_lock = threading.Lock()
+
+
+def get_download_metrics() -> DownloadMetrics:
+    """获取进程内共享的指标注册表"""
+    global _shared_metrics
+    with _shared_metrics_lock:
+        if _shared_metrics is None:
+            _shared_metrics = DownloadMetrics()
+        return _shared_metrics
+
+
+def timed_phase(phase: str) -> Callable:
+    """
+    装饰器：把同步函数的执行时间记为当前任务的一个阶段
+    （在线程池中调用时要通过 contextvars.copy_context().run 执行，否则线程中拿不到当前任务）
+    """
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_download_metrics().phase(phase):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+try:
+    from telegram.request import HTTPXRequest
+
+    class MetricsHTTPXRequest(HTTPXRequest):
+        """记录每次 Bot API 请求耗时和 429 限流次数的 HTTPXRequest"""
+
+        async def do_request(self, url: str, method: str, *args, **kwargs):
+            start = time.perf_counter()
+            code = None
+            try:
+                code, payload = await super().do_request(url, method, *args, **kwargs)
+                return code, payload
+            finally:
+                get_download_metrics().observe_telegram(
+                    url.rsplit("/", 1)[-1], time.perf_counter() - start, rate_limited=code == 429)
+except ImportError:
+    MetricsHTTPXRequest = None
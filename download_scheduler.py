@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+下载任务调度器
+在 _process_download_async 之前对下载任务进行排队，限制全局与各平台的并发数，
+并在多个用户之间按轮询方式公平分配下载槽位
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 调度器按这些平台分别限流，其余平台只受全局并发数限制
+DEFAULT_PLATFORM_LIMITS = {
+    "youtube": 2,
+    "bilibili": 2,
+    "douyin": 2,
+    "netease": 2,
+    "applemusic": 1,
+}
+
+
+class ScheduledJob:
+    """调度器中的单个下载任务"""
+
+    def __init__(self, job_id: str, user_id: Any, platform: str, priority: int,
+                 seq: int, job_factory: Callable[[], Awaitable[Any]],
+                 on_position: Optional[Callable[[int], Awaitable[None]]] = None,
+                 payload: Optional[Dict[str, Any]] = None):
+        self.job_id = job_id
+        self.user_id = user_id
+        self.platform = platform
+        self.priority = priority
+        self.seq = seq
+        self.job_factory = job_factory
+        self.on_position = on_position
+        self.payload = payload or {}
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.last_reported_position: Optional[int] = None
+        self.cancelled = False
+        self.done: asyncio.Future = asyncio.get_running_loop().create_future()
+        # 调用方可以不等待结果，这里消费异常避免 "exception was never retrieved" 警告
+        self.done.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+    def __lt__(self, other: "ScheduledJob") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class DownloadScheduler:
+    """
+    有界的全局下载调度器
+
+    - 每个用户拥有自己的优先级队列（priority 越小越优先）
+    - 出队时先选出可运行任务中的最高优先级，再在同优先级的用户之间轮询
+    - 全局并发数与各平台并发数同时生效，平台满载时跳过该平台的任务
+    """
+
+    def __init__(self, max_concurrent: int = 3,
+                 platform_limits: Optional[Dict[str, int]] = None):
+        """
+        初始化调度器
+
+        Args:
+            max_concurrent: 全局最大并发下载数
+            platform_limits: 各平台最大并发下载数，例如 {"youtube": 2}
+        """
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.platform_limits = dict(DEFAULT_PLATFORM_LIMITS)
+        if platform_limits:
+            for platform, limit in platform_limits.items():
+                self.platform_limits[platform] = max(1, int(limit))
+
+        self._user_queues: "OrderedDict[Any, List[ScheduledJob]]" = OrderedDict()
+        self._running: Dict[str, ScheduledJob] = {}
+        self._running_per_platform: Dict[str, int] = {}
+        self._seq = itertools.count()
+        self._last_user: Any = None
+
+        self.total_submitted = 0
+        self.total_finished = 0
+        self.total_failed = 0
+
+        logger.info(
+            f"🚦 下载调度器初始化完成: 全局并发 {self.max_concurrent}, 平台限制 {self.platform_limits}")
+
+    # ------------------------------------------------------------------
+    # 对外接口
+    # ------------------------------------------------------------------
+
+    async def submit(self, job_id: str, user_id: Any, platform: str,
+                     job_factory: Callable[[], Awaitable[Any]], priority: int = 0,
+                     on_position: Optional[Callable[[int], Awaitable[None]]] = None,
+                     payload: Optional[Dict[str, Any]] = None) -> asyncio.Future:
+        """
+        提交下载任务
+
+        Args:
+            job_id: 任务ID
+            user_id: 提交任务的用户ID，用于轮询公平调度
+            platform: 平台名称（get_platform_name 的返回值）
+            job_factory: 无参协程工厂，获得槽位后才会被调用
+            priority: 优先级，数值越小越优先
+            on_position: 排队位置变化时的回调，参数为从1开始的排队位置
+            payload: 附加数据（例如状态消息），取消任务时原样返回
+
+        Returns:
+            任务完成时被设置结果的 Future
+        """
+        job = ScheduledJob(job_id, user_id, platform, priority,
+                           next(self._seq), job_factory, on_position, payload)
+        heapq.heappush(self._user_queues.setdefault(user_id, []), job)
+        self.total_submitted += 1
+        logger.info(
+            f"🚦 任务入队: {job_id} (用户: {user_id}, 平台: {platform}, 优先级: {priority})")
+
+        self._dispatch()
+        await self._notify_positions()
+        return job.done
+
+    def cancel(self, job_id: str) -> bool:
+        """取消仍在排队中的任务，正在运行的任务由调用方自行取消"""
+        return bool(self._remove_queued(lambda job: job.job_id == job_id))
+
+    def cancel_user_jobs(self, user_id: Any) -> List[ScheduledJob]:
+        """取消某个用户所有仍在排队中的任务，返回被取消的任务"""
+        return self._remove_queued(lambda job: job.user_id == user_id)
+
+    def _remove_queued(self, predicate: Callable[[ScheduledJob], bool]) -> List[ScheduledJob]:
+        removed = []
+        for user_id, queue in list(self._user_queues.items()):
+            matched = [job for job in queue if predicate(job)]
+            if not matched:
+                continue
+            for job in matched:
+                job.cancelled = True
+                queue.remove(job)
+                if not job.done.done():
+                    job.done.cancel()
+                logger.info(f"🚫 已从队列移除任务: {job.job_id}")
+            heapq.heapify(queue)
+            if not queue:
+                del self._user_queues[user_id]
+            removed.extend(matched)
+        if removed:
+            asyncio.ensure_future(self._notify_positions())
+        return removed
+
+    def is_queued(self, job_id: str) -> bool:
+        """检查任务是否仍在排队"""
+        return any(job.job_id == job_id for queue in self._user_queues.values() for job in queue)
+
+    def queue_position(self, job_id: str) -> Optional[int]:
+        """获取任务当前的排队位置（从1开始），不在队列中返回 None"""
+        for position, job in enumerate(self._planned_order(), 1):
+            if job.job_id == job_id:
+                return position
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        """获取调度器状态，供 /status 使用"""
+        queued = sum(len(queue) for queue in self._user_queues.values())
+        return {
+            "max_concurrent": self.max_concurrent,
+            "running": len(self._running),
+            "queued": queued,
+            "running_per_platform": {k: v for k, v in self._running_per_platform.items() if v},
+            "platform_limits": dict(self.platform_limits),
+            "total_submitted": self.total_submitted,
+            "total_finished": self.total_finished,
+            "total_failed": self.total_failed,
+        }
+
+    # ------------------------------------------------------------------
+    # 内部调度逻辑
+    # ------------------------------------------------------------------
+
+    def _platform_has_capacity(self, platform: str) -> bool:
+        limit = self.platform_limits.get(platform)
+        if limit is None:
+            return True
+        return self._running_per_platform.get(platform, 0) < limit
+
+    def _rotated_users(self) -> List[Any]:
+        """返回从上次服务用户的下一位开始的用户轮询顺序"""
+        users = list(self._user_queues.keys())
+        if self._last_user in users:
+            index = users.index(self._last_user) + 1
+            users = users[index:] + users[:index]
+        return users
+
+    def _pick_next(self) -> Optional[ScheduledJob]:
+        """选出下一个可运行的任务"""
+        candidates = []
+        for user_id in self._rotated_users():
+            # 每个用户取其可运行的最高优先级任务
+            runnable = [job for job in self._user_queues[user_id]
+                        if self._platform_has_capacity(job.platform)]
+            if runnable:
+                candidates.append(min(runnable))
+        if not candidates:
+            return None
+
+        best_priority = min(job.priority for job in candidates)
+        # candidates 已按轮询顺序排列，取第一个达到最高优先级的用户
+        job = next(job for job in candidates if job.priority == best_priority)
+
+        queue = self._user_queues[job.user_id]
+        queue.remove(job)
+        heapq.heapify(queue)
+        if not queue:
+            del self._user_queues[job.user_id]
+        self._last_user = job.user_id
+        return job
+
+    def _planned_order(self) -> List[ScheduledJob]:
+        """模拟轮询出队顺序（忽略平台限制），用于计算排队位置"""
+        queues = {user_id: sorted(queue) for user_id, queue in self._user_queues.items()}
+        users = self._rotated_users()
+        order = []
+        while any(queues.values()):
+            heads = [(user_id, queues[user_id][0]) for user_id in users if queues[user_id]]
+            best_priority = min(job.priority for _, job in heads)
+            for user_id, job in heads:
+                if job.priority == best_priority:
+                    order.append(queues[user_id].pop(0))
+                    # 轮询：下一轮从该用户之后开始
+                    index = users.index(user_id) + 1
+                    users = users[index:] + users[:index]
+                    break
+        return order
+
+    def _dispatch(self):
+        """在有空闲槽位时启动排队任务"""
+        while len(self._running) < self.max_concurrent:
+            job = self._pick_next()
+            if job is None:
+                break
+            job.started_at = time.time()
+            self._running[job.job_id] = job
+            self._running_per_platform[job.platform] = self._running_per_platform.get(job.platform, 0) + 1
+            wait_time = job.started_at - job.submitted_at
+            logger.info(
+                f"▶️ 任务出队开始执行: {job.job_id} (平台: {job.platform}, 排队 {wait_time:.1f}s, 运行中 {len(self._running)}/{self.max_concurrent})")
+            asyncio.ensure_future(self._run(job))
+
+    async def _run(self, job: ScheduledJob):
+        try:
+            result = await job.job_factory()
+            self.total_finished += 1
+            if not job.done.done():
+                job.done.set_result(result)
+        except asyncio.CancelledError:
+            if not job.done.done():
+                job.done.cancel()
+        except Exception as e:
+            self.total_failed += 1
+            logger.error(f"❌ 调度任务执行失败: {job.job_id}: {e}", exc_info=True)
+            if not job.done.done():
+                job.done.set_exception(e)
+        finally:
+            self._running.pop(job.job_id, None)
+            self._running_per_platform[job.platform] = max(
+                0, self._running_per_platform.get(job.platform, 1) - 1)
+            self._dispatch()
+            await self._notify_positions()
+
+    async def _notify_positions(self):
+        """通知排队任务其最新的排队位置（仅在位置变化时）"""
+        for position, job in enumerate(self._planned_order(), 1):
+            if job.on_position is None or job.last_reported_position == position:
+                continue
+            job.last_reported_position = position
+            try:
+                await job.on_position(position)
+            except Exception as e:
+                logger.debug(f"更新排队位置失败 ({job.job_id}): {e}")
@@ -0,0 +1,530 @@
+#!/usr/bin/env python3
+"""
+下载目录监视器
+下载任务开始前创建，之后把该目录中新建/写完的文件以事件的形式交给这个任务：
+Linux 上使用 inotify（通过 ctypes 调用，无需额外依赖），其他系统或 inotify 不可用时
+回退为 scandir 轮询（只重新列出修改时间发生变化的目录）。
+进度显示和下载结果查找的开销只与新文件数量有关，不再随目录中已有文件的数量增长。
+递归监视需要为每个已有子目录添加监视，因此同一目录在进程内只创建一个长期运行的监视器，
+各下载任务通过 watch_directory() 得到一个只包含任务开始后新文件的会话
+"""
+
+import os
+import time
+import errno
+import select
+import struct
+import asyncio
+import logging
+import threading
+import ctypes
+import ctypes.util
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# inotify 事件掩码（<sys/inotify.h>）
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_IGNORED = 0x00008000
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0o2000000)
+
+WATCH_MASK = IN_CREATE | IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct("iIII")
+READ_SIZE = 64 * 1024
+
+# 文件状态
+CREATED = "created"
+CLOSED = "closed"
+
+# 长期运行的监视器最多记住的新文件数（超出时丢弃最早的记录）
+MAX_TRACKED_FILES = 20000
+
+
+def _load_libc():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+_libc = _load_libc() if os.name == "posix" else None
+
+
+class DirectoryWatcher:
+    """监视一个下载目录，记录监视开始后新出现的文件"""
+
+    def __init__(self, root, recursive: bool = True, poll_interval: float = 1.0,
+                 force_polling: bool = False):
+        """
+        初始化目录监视器
+
+        Args:
+            root: 要监视的目录（不存在时会被创建）
+            recursive: 是否包含子目录（新建的子目录会自动加入监视）
+            poll_interval: 轮询模式下的扫描间隔（秒）
+            force_polling: 不使用 inotify，直接使用轮询
+        """
+        self.root = Path(root)
+        self.recursive = recursive
+        self.poll_interval = poll_interval
+        self.backend = "poll" if force_polling or _libc is None else "inotify"
+
+        # 新文件（按出现顺序）-> 状态
+        self._files: "OrderedDict[str, str]" = OrderedDict()
+        # 新文件 -> 首次出现的序号（会话按序号筛选自己开始之后的文件）
+        self._file_seq: Dict[str, int] = {}
+        self._seq = 0
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+        self.changes = 0
+        self._started_at = 0.0
+
+        # inotify 状态
+        self._fd: Optional[int] = None
+        self._watches: Dict[int, str] = {}
+        # 轮询状态：目录 -> (修改时间, 目录中的文件名)；新文件 -> 上次看到的大小
+        self._dirs: Dict[str, Tuple[int, Set[str]]] = {}
+        self._sizes: Dict[str, int] = {}
+
+    # ------------------------------------------------------------------
+    # 生命周期
+    # ------------------------------------------------------------------
+
+    def start(self) -> "DirectoryWatcher":
+        """开始监视（在启动下载之前调用）"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._started_at = time.time()
+        if self.backend == "inotify":
+            try:
+                self._start_inotify()
+            except OSError as e:
+                logger.warning(f"⚠️ inotify 不可用，改用目录轮询: {e}")
+                self._close_fd()
+                self.backend = "poll"
+        if self.backend == "poll":
+            self._start_polling()
+
+        self._thread = threading.Thread(target=self._run, name="dir-watcher", daemon=True)
+        self._thread.start()
+        logger.debug(f"👀 开始监视目录 ({self.backend}): {self.root}")
+        return self
+
+    def stop(self):
+        """停止监视（已记录的文件仍可读取）"""
+        self.flush()
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        self._close_fd()
+
+    def __enter__(self) -> "DirectoryWatcher":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def new_files(self, suffixes: Optional[Iterable[str]] = None) -> List[Path]:
+        """监视开始后出现且仍然存在的文件（按出现顺序）"""
+        return self._select(None, suffixes)
+
+    def completed_files(self, suffixes: Optional[Iterable[str]] = None) -> List[Path]:
+        """已经写完的新文件（inotify 为关闭写入或移入；轮询模式为两次扫描间大小不变）"""
+        return self._select(CLOSED, suffixes)
+
+    def relative(self, path) -> str:
+        """相对于监视目录的路径"""
+        return os.path.relpath(str(path), str(self.root))
+
+    def flush(self):
+        """立即处理尚未读取的事件，保证随后的查询包含到目前为止的所有变化"""
+        if self._fd is not None:
+            self._read_events()
+        elif self.backend == "poll" and self._dirs:
+            self._poll_once()
+
+    async def wait_for_change(self, timeout: float) -> bool:
+        """等待下一次文件变化，超时返回 False"""
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        waiter = (loop, event)
+        with self._lock:
+            self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+    # ------------------------------------------------------------------
+    # 内部实现：公共
+    # ------------------------------------------------------------------
+
+    def _select(self, state: Optional[str], suffixes: Optional[Iterable[str]],
+                since: int = 0, until: Optional[int] = None) -> List[Path]:
+        self.flush()
+        wanted = tuple(s.lower() for s in suffixes) if suffixes else None
+        with self._lock:
+            items = [(path, file_state) for path, file_state in self._files.items()
+                     if self._file_seq.get(path, 0) >= since
+                     and (until is None or self._file_seq.get(path, 0) < until)]
+        result = []
+        for path, file_state in items:
+            if state is not None and file_state != state:
+                continue
+            if wanted and not path.lower().endswith(wanted):
+                continue
+            if os.path.isfile(path):
+                result.append(Path(path))
+        return result
+
+    def _mark(self, path: str, state: str, rewritten: bool = False):
+        """
+        记录文件状态
+
+        Args:
+            rewritten: 文件内容被重新写入（关闭写入或移入事件）：即使状态没有变化也分配新序号，
+                之后开始的会话会把它当作新文件
+        """
+        with self._lock:
+            known = path in self._files
+            if known and self._files[path] == state and not rewritten:
+                return
+            if not known or rewritten:
+                self._file_seq[path] = self._seq
+                self._seq += 1
+                if known:
+                    self._files.move_to_end(path)
+                elif len(self._files) >= MAX_TRACKED_FILES:
+                    oldest, _ = self._files.popitem(last=False)
+                    self._file_seq.pop(oldest, None)
+            self._files[path] = state
+            self.changes += 1
+            self._notify()
+
+    def _forget(self, path: str):
+        with self._lock:
+            if self._files.pop(path, None) is not None:
+                self._file_seq.pop(path, None)
+                self.changes += 1
+                self._notify()
+
+    def next_seq(self) -> int:
+        """下一个新文件将得到的序号"""
+        with self._lock:
+            return self._seq
+
+    @property
+    def alive(self) -> bool:
+        """监视线程仍在运行且根目录仍被监视"""
+        if self._thread is None or not self._thread.is_alive() or self._stop.is_set():
+            return False
+        if self.backend == "inotify":
+            return str(self.root) in self._watches.values()
+        return str(self.root) in self._dirs
+
+    def _notify(self):
+        for loop, event in self._waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                if self._fd is not None:
+                    readable, _, _ = select.select([self._fd], [], [], 0.5)
+                    if readable:
+                        self._read_events()
+                else:
+                    self._stop.wait(self.poll_interval)
+                    self._poll_once()
+        except Exception as e:
+            logger.warning(f"⚠️ 目录监视线程异常退出: {e}")
+
+    # ------------------------------------------------------------------
+    # 内部实现：inotify
+    # ------------------------------------------------------------------
+
+    def _start_inotify(self):
+        fd = _libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._fd = fd
+        self._add_watch(str(self.root))
+        if self.recursive:
+            # 只列出目录，不对文件执行 stat
+            for directory in self._subdirectories(str(self.root)):
+                self._add_watch(directory)
+
+    def _add_watch(self, directory: str):
+        wd = _libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"{os.strerror(err)}: {directory}")
+        self._watches[wd] = directory
+
+    def _close_fd(self):
+        if self._fd is not None:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+            self._fd = None
+
+    def _read_events(self):
+        with self._lock:
+            if self._fd is None:
+                return
+            while True:
+                try:
+                    buf = os.read(self._fd, READ_SIZE)
+                except OSError as e:
+                    if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                        return
+                    raise
+                if not buf:
+                    return
+                self._handle_buffer(buf)
+
+    def _handle_buffer(self, buf: bytes):
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(buf):
+            wd, mask, _cookie, length = EVENT_HEADER.unpack_from(buf, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(buf[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                logger.warning(f"⚠️ inotify 事件队列溢出，补扫最近修改的文件: {self.root}")
+                self._rescan_recent()
+                continue
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            directory = self._watches.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+
+            if mask & IN_ISDIR:
+                if self.recursive and mask & (IN_CREATE | IN_MOVED_TO):
+                    self._watch_new_directory(path)
+                continue
+            if mask & (IN_DELETE | IN_MOVED_FROM):
+                self._forget(path)
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                self._mark(path, CLOSED, rewritten=True)
+            elif mask & IN_CREATE:
+                self._mark(path, CREATED)
+
+    def _watch_new_directory(self, directory: str):
+        """新建的子目录：加入监视，并补录加入监视前已经写入其中的文件"""
+        try:
+            self._add_watch(directory)
+            for sub in self._subdirectories(directory):
+                self._add_watch(sub)
+        except OSError as e:
+            logger.warning(f"⚠️ 无法监视新目录 {directory}: {e}")
+        for root, _, files in os.walk(directory):
+            for name in files:
+                self._mark(os.path.join(root, name), CREATED)
+
+    def _rescan_recent(self):
+        """事件丢失后的补救：把监视开始后修改过的文件都记为新文件"""
+        for root, dirs, files in os.walk(self.root):
+            if not self.recursive:
+                dirs[:] = []
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if os.stat(path).st_mtime >= self._started_at:
+                        self._mark(path, CLOSED)
+                except OSError:
+                    continue
+
+    @staticmethod
+    def _subdirectories(directory: str) -> List[str]:
+        result = []
+        stack = [directory]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            result.append(entry.path)
+                            stack.append(entry.path)
+            except OSError:
+                continue
+        return result
+
+    # ------------------------------------------------------------------
+    # 内部实现：轮询
+    # ------------------------------------------------------------------
+
+    def _start_polling(self):
+        directories = [str(self.root)]
+        if self.recursive:
+            directories += self._subdirectories(str(self.root))
+        for directory in directories:
+            self._snapshot_directory(directory)
+
+    def _snapshot_directory(self, directory: str) -> Optional[Set[str]]:
+        """记录目录当前的修改时间和文件名，返回其中的子目录"""
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+            names, subdirs = set(), set()
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.add(entry.path)
+                    else:
+                        names.add(entry.name)
+        except OSError:
+            self._dirs.pop(directory, None)
+            return None
+        self._dirs[directory] = (mtime, names)
+        return subdirs
+
+    def _adopt_directory(self, directory: str):
+        """轮询中发现的新子目录：连同其下的子目录一起记录，其中的文件都是新文件"""
+        stack = [directory]
+        while stack:
+            current = stack.pop()
+            subdirs = self._snapshot_directory(current)
+            if subdirs is None:
+                continue
+            for name in self._dirs[current][1]:
+                path = os.path.join(current, name)
+                self._sizes[path] = -1
+                self._mark(path, CREATED)
+            stack.extend(sub for sub in subdirs if sub not in self._dirs)
+
+    def _poll_once(self):
+        with self._lock:
+            for directory, (mtime, names) in list(self._dirs.items()):
+                try:
+                    if os.stat(directory).st_mtime_ns == mtime:
+                        continue
+                except OSError:
+                    self._dirs.pop(directory, None)
+                    continue
+                subdirs = self._snapshot_directory(directory)
+                if subdirs is None:
+                    continue
+                current = self._dirs[directory][1]
+                for name in current - names:
+                    path = os.path.join(directory, name)
+                    self._sizes[path] = -1
+                    self._mark(path, CREATED)
+                for name in names - current:
+                    path = os.path.join(directory, name)
+                    self._sizes.pop(path, None)
+                    self._forget(path)
+                if self.recursive:
+                    for sub in subdirs:
+                        if sub not in self._dirs:
+                            self._adopt_directory(sub)
+
+            # 大小在两次扫描之间没有变化的新文件视为已写完
+            for path, last_size in list(self._sizes.items()):
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    self._sizes.pop(path, None)
+                    continue
+                if size == last_size:
+                    self._sizes.pop(path, None)
+                    self._mark(path, CLOSED)
+                else:
+                    self._sizes[path] = size
+
+
+class WatchSession:
+    """共享监视器上的一次下载任务：只返回会话开始之后（到停止为止）出现的文件"""
+
+    def __init__(self, watcher: DirectoryWatcher):
+        self.watcher = watcher
+        self.root = watcher.root
+        self.backend = watcher.backend
+        self._since = 0
+        self._until: Optional[int] = None
+
+    def start(self) -> "WatchSession":
+        self.watcher.flush()
+        self._since = self.watcher.next_seq()
+        self._until = None
+        return self
+
+    def stop(self):
+        """结束会话（共享监视器继续运行，已记录的文件仍可读取）"""
+        if self._until is None:
+            self.watcher.flush()
+            self._until = self.watcher.next_seq()
+
+    def __enter__(self) -> "WatchSession":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def new_files(self, suffixes: Optional[Iterable[str]] = None) -> List[Path]:
+        return self.watcher._select(None, suffixes, self._since, self._until)
+
+    def completed_files(self, suffixes: Optional[Iterable[str]] = None) -> List[Path]:
+        return self.watcher._select(CLOSED, suffixes, self._since, self._until)
+
+    def relative(self, path) -> str:
+        return self.watcher.relative(path)
+
+    def flush(self):
+        self.watcher.flush()
+
+    async def wait_for_change(self, timeout: float) -> bool:
+        return await self.watcher.wait_for_change(timeout)
+
+
+_shared_watchers: Dict[Tuple[str, bool], DirectoryWatcher] = {}
+_shared_watchers_lock = threading.Lock()
+
+
+def watch_directory(root, recursive: bool = True) -> WatchSession:
+    """
+    开始监视下载目录：同一目录在进程内共用一个长期运行的监视器（已有子目录只在首次使用时加入监视），
+    返回只包含本次任务新文件的会话
+    """
+    key = (os.path.abspath(str(root)), recursive)
+    with _shared_watchers_lock:
+        watcher = _shared_watchers.get(key)
+        if watcher is None or not watcher.alive:
+            if watcher is not None:
+                watcher.stop()
+            watcher = DirectoryWatcher(key[0], recursive=recursive).start()
+            _shared_watchers[key] = watcher
+    return WatchSession(watcher).start()
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+非阻塞日志管道
+日志记录先进入内存队列，由后台线程写入文件/控制台，下载线程和事件循环不再等待磁盘（或 NAS）I/O；
+进度类日志按任务采样，并统计每个任务产生的日志量。可选输出 JSON 行格式
+"""
+
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+# 进度类日志的标记：logger.info(..., extra=PROGRESS_LOG)
+PROGRESS_LOG = {"progress": True}
+
+# 队列上限，超出时丢弃新日志（并计数），避免内存无限增长
+DEFAULT_QUEUE_SIZE = 10000
+# 每个任务每隔多少秒最多输出一条进度日志
+DEFAULT_PROGRESS_INTERVAL = 5.0
+# 最多保留多少个任务的日志量统计
+MAX_TRACKED_JOBS = 200
+
+NO_JOB = "-"
+
+try:
+    from download_metrics import get_download_metrics
+except ImportError:
+    get_download_metrics = None
+
+
+def _current_job() -> Optional[Any]:
+    if get_download_metrics is None:
+        return None
+    return get_download_metrics().current_job()
+
+
+class LogVolume:
+    """按任务统计日志条数、字节数和被采样丢弃的进度日志数"""
+
+    def __init__(self, max_jobs: int = MAX_TRACKED_JOBS):
+        self.max_jobs = max_jobs
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+        self.records_per_level: Dict[str, int] = {}
+        self.sampled_out = 0
+        self.queue_dropped = 0
+
+    def record(self, job_id: str, level: str, size: int):
+        with self._lock:
+            self.records_per_level[level] = self.records_per_level.get(level, 0) + 1
+            stats = self._job_stats(job_id)
+            stats["records"] += 1
+            stats["bytes"] += size
+
+    def sampled(self, job_id: str):
+        with self._lock:
+            self.sampled_out += 1
+            self._job_stats(job_id)["sampled_out"] += 1
+
+    def _job_stats(self, job_id: str) -> Dict[str, int]:
+        stats = self._jobs.get(job_id)
+        if stats is None:
+            stats = self._jobs[job_id] = {"records": 0, "bytes": 0, "sampled_out": 0}
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+        else:
+            self._jobs.move_to_end(job_id)
+        return stats
+
+    def job(self, job_id: str) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._jobs.get(job_id, {"records": 0, "bytes": 0, "sampled_out": 0}))
+
+    def stats(self, top: int = 5) -> Dict[str, Any]:
+        """获取日志量统计，jobs 为日志最多的前 top 个任务"""
+        with self._lock:
+            jobs = sorted(((job_id, dict(stats)) for job_id, stats in self._jobs.items() if job_id != NO_JOB),
+                          key=lambda item: -item[1]["bytes"])[:top]
+            return {
+                "records_per_level": dict(self.records_per_level),
+                "sampled_out": self.sampled_out,
+                "queue_dropped": self.queue_dropped,
+                "unattributed": dict(self._jobs.get(NO_JOB, {})),
+                "jobs": jobs,
+            }
+
+
+class JobLogFilter(logging.Filter):
+    """
+    在产生日志的线程中运行：附加任务信息、对进度日志按任务采样并统计日志量
+
+    需要挂在入口处理器（QueueHandler 或同步模式下的各个处理器）上，
+    这样才能读到当前协程的任务上下文
+    """
+
+    def __init__(self, volume: LogVolume, progress_interval: float = DEFAULT_PROGRESS_INTERVAL):
+        super().__init__()
+        self.volume = volume
+        self.progress_interval = progress_interval
+        self._last_progress: Dict[Any, float] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # 同步模式下同一条记录会经过多个处理器，只判断一次
+        decision = getattr(record, "_job_log_decision", None)
+        if decision is not None:
+            return decision
+        record._job_log_decision = self._decide(record)
+        return record._job_log_decision
+
+    def _decide(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "job_id", None) is None:
+            job = _current_job()
+            record.job_id = job.job_id if job else NO_JOB
+            record.platform = job.platform if job else None
+
+        if getattr(record, "progress", False) and record.levelno < logging.WARNING and self.progress_interval > 0:
+            # 没有任务上下文时（例如下载线程中）按线程采样
+            key = record.job_id if record.job_id != NO_JOB else ("thread", record.thread)
+            now = time.monotonic()
+            with self._lock:
+                last = self._last_progress.get(key)
+                if last is not None and now - last < self.progress_interval:
+                    self.volume.sampled(record.job_id)
+                    return False
+                self._last_progress[key] = now
+                if len(self._last_progress) > MAX_TRACKED_JOBS * 4:
+                    self._last_progress.clear()
+
+        self.volume.record(record.job_id, record.levelname, len(record.getMessage()))
+        return True
+
+
+class JsonLineFormatter(logging.Formatter):
+    """每条日志输出一行 JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        job_id = getattr(record, "job_id", None)
+        if job_id and job_id != NO_JOB:
+            entry["job_id"] = job_id
+            entry["platform"] = getattr(record, "platform", None)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """队列满时丢弃日志并计数，而不是阻塞或打印异常"""
+
+    def __init__(self, log_queue: queue.Queue, volume: LogVolume):
+        super().__init__(log_queue)
+        self.volume = volume
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.volume.queue_dropped += 1
+
+
+_volume = LogVolume()
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def get_log_volume() -> LogVolume:
+    """获取进程内的日志量统计"""
+    return _volume
+
+
+def install(root_logger: logging.Logger, handlers: List[logging.Handler], async_mode: bool = True,
+            json_format: bool = False, progress_interval: float = DEFAULT_PROGRESS_INTERVAL,
+            queue_size: int = DEFAULT_QUEUE_SIZE, date_format: Optional[str] = None):
+    """
+    把处理器接入根日志记录器
+
+    Args:
+        root_logger: 根日志记录器
+        handlers: 实际输出的处理器（文件、控制台）
+        async_mode: 是否由后台线程写日志
+        json_format: 是否输出 JSON 行格式（替换处理器原有的格式化器）
+        progress_interval: 每个任务进度日志的最小间隔（秒），0 表示不采样
+        queue_size: 异步模式下的队列上限
+        date_format: 时间格式
+    """
+    global _listener
+    if json_format:
+        formatter = JsonLineFormatter(datefmt=date_format)
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+    job_filter = JobLogFilter(_volume, progress_interval)
+    if not async_mode:
+        for handler in handlers:
+            handler.addFilter(job_filter)
+            root_logger.addHandler(handler)
+        return
+
+    if _listener is not None:
+        _listener.stop()
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    queue_handler = DroppingQueueHandler(log_queue, _volume)
+    queue_handler.addFilter(job_filter)
+    root_logger.addHandler(queue_handler)
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown():
+    """停止后台写日志线程，写完队列中剩余的日志"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown)
+
+
+def render_prometheus(prefix: str = "savextube") -> str:
+    """日志量指标（Prometheus 文本格式）"""
+    stats = _volume.stats(top=0)
+    lines = [f"# HELP {prefix}_log_records_total 输出的日志条数",
+             f"# TYPE {prefix}_log_records_total counter"]
+    for level, count in sorted(stats["records_per_level"].items()):
+        lines.append(f'{prefix}_log_records_total{{level="{level}"}} {count}')
+    lines += [f"# HELP {prefix}_log_sampled_out_total 被采样丢弃的进度日志条数",
+              f"# TYPE {prefix}_log_sampled_out_total counter",
+              f"{prefix}_log_sampled_out_total {stats['sampled_out']}",
+              f"# HELP {prefix}_log_queue_dropped_total 队列已满而丢弃的日志条数",
+              f"# TYPE {prefix}_log_queue_dropped_total counter",
+              f"{prefix}_log_queue_dropped_total {stats['queue_dropped']}"]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+LRC 歌词合并
+每份歌词只解析一次，得到按时间排序的 (毫秒, 时间标签, 内容) 列表，
+再用一次有序归并把翻译/罗马音对齐到原文的时间轴上，整体为线性复杂度
+
+直接运行本文件可以对长歌词做合并基准测试：
+    python lrc_merge.py --lines 5000 --rounds 20
+"""
+
+import re
+import time
+import random
+import argparse
+from typing import List, Optional, Tuple
+
+# 时间标签：[mm:ss] / [mm:ss.f] / [mm:ss.ff] / [mm:ss.fff]，一行可以带多个时间标签
+TIMESTAMP_PATTERN = re.compile(r'\[(\d{1,3}):(\d{2})(?:[.:](\d{1,3}))?\]')
+
+# 默认的时间容差（毫秒）：不同版本歌词的时间标签常有几十毫秒的偏差
+DEFAULT_TOLERANCE_MS = 50
+
+LrcLine = Tuple[int, str, str]
+
+
+def parse_lrc(lyrics: str) -> List[LrcLine]:
+    """
+    解析 LRC 歌词
+
+    Args:
+        lyrics: 原始歌词内容
+
+    Returns:
+        按时间排序的 [(毫秒, 时间标签文本, 内容), ...]，没有内容的行会被忽略
+    """
+    lines = []
+    for raw_line in (lyrics or '').splitlines():
+        line = raw_line.strip()
+        if not line.startswith('['):
+            continue
+
+        # 收集行首的所有时间标签
+        stamps = []
+        pos = 0
+        while True:
+            match = TIMESTAMP_PATTERN.match(line, pos)
+            if not match:
+                break
+            minutes, seconds, fraction = match.groups()
+            ms = (int(minutes) * 60 + int(seconds)) * 1000
+            if fraction:
+                ms += int(fraction.ljust(3, '0'))
+            stamps.append((ms, line[match.start() + 1:match.end() - 1]))
+            pos = match.end()
+
+        content = line[pos:].strip()
+        if not stamps or not content:
+            continue
+        for ms, stamp in stamps:
+            lines.append((ms, stamp, content))
+
+    # 稳定排序：相同时间的行保持原有顺序
+    lines.sort(key=lambda item: item[0])
+    return lines
+
+
+def align_lines(primary: List[LrcLine], other: List[LrcLine],
+                tolerance_ms: int = DEFAULT_TOLERANCE_MS) -> List[Optional[str]]:
+    """
+    将 other 中的行对齐到 primary 的每一行（双指针归并，O(n + m)）
+
+    每行 other 最多被使用一次，容差窗口内有多个候选时取时间最接近的一行
+
+    Returns:
+        与 primary 等长的列表，未匹配的位置为 None
+    """
+    aligned: List[Optional[str]] = []
+    j = 0
+    count = len(other)
+    for ms, _, _ in primary:
+        # 跳过已经落后于窗口的行
+        while j < count and other[j][0] < ms - tolerance_ms:
+            j += 1
+
+        best = None
+        k = j
+        while k < count and other[k][0] <= ms + tolerance_ms:
+            if best is None or abs(other[k][0] - ms) < abs(other[best][0] - ms):
+                best = k
+            k += 1
+
+        if best is None:
+            aligned.append(None)
+        else:
+            aligned.append(other[best][2])
+            j = best + 1
+    return aligned
+
+
+def merge_lrc(primary: str, *others: str, tolerance_ms: int = DEFAULT_TOLERANCE_MS) -> str:
+    """
+    合并多份歌词，按时间轴垂直对齐：每个时间点先输出原文，再依次输出 others 中对应的行
+
+    Args:
+        primary: 原文歌词，决定输出的时间轴
+        *others: 翻译、罗马音等歌词
+        tolerance_ms: 判定为同一时间点的最大时间差（毫秒）
+
+    Returns:
+        合并后的歌词；原文无法解析时返回空字符串
+    """
+    primary_lines = parse_lrc(primary)
+    if not primary_lines:
+        return ''
+
+    aligned_others = [align_lines(primary_lines, parse_lrc(other), tolerance_ms) for other in others]
+
+    merged = []
+    for index, (_, stamp, content) in enumerate(primary_lines):
+        merged.append(f"[{stamp}]{content}")
+        for aligned in aligned_others:
+            if aligned[index]:
+                merged.append(f"[{stamp}]{aligned[index]}")
+    return "\n".join(merged)
+
+
+def _generate_lrc(line_count: int, jitter_ms: int, seed: int) -> str:
+    """生成卡拉OK风格的测试歌词（每行间隔 200~800 毫秒，时间标签带随机偏差）"""
+    timing = random.Random(0)
+    rng = random.Random(seed)
+    ms = 0
+    lines = []
+    for i in range(line_count):
+        ms += timing.randint(200, 800)
+        stamp_ms = max(0, ms + rng.randint(-jitter_ms, jitter_ms))
+        minutes, rest = divmod(stamp_ms, 60000)
+        seconds, millis = divmod(rest, 1000)
+        lines.append(f"[{minutes:02d}:{seconds:02d}.{millis:03d}]line {i} " + "啦" * rng.randint(4, 16))
+    return "\n".join(lines)
+
+
+def benchmark(line_count: int = 5000, rounds: int = 10, tolerance_ms: int = DEFAULT_TOLERANCE_MS):
+    """对原文+翻译+罗马音三份长歌词进行合并基准测试"""
+    original = _generate_lrc(line_count, 0, seed=1)
+    translation = _generate_lrc(line_count, 20, seed=2)
+    romanized = _generate_lrc(line_count, 20, seed=3)
+
+    merge_lrc(original, translation, romanized, tolerance_ms=tolerance_ms)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        merged = merge_lrc(original, translation, romanized, tolerance_ms=tolerance_ms)
+    elapsed = (time.perf_counter() - start) / rounds
+
+    print(f"歌词行数: {line_count} x 3")
+    print(f"合并结果: {merged.count(chr(10)) + 1} 行")
+    print(f"平均耗时: {elapsed * 1000:.2f} ms/次 ({rounds} 次)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LRC 歌词合并基准测试")
+    parser.add_argument("--lines", type=int, default=5000, help="每份歌词的行数")
+    parser.add_argument("--rounds", type=int, default=10, help="重复次数")
+    parser.add_argument("--tolerance", type=int, default=DEFAULT_TOLERANCE_MS, help="时间容差（毫秒）")
+    args = parser.parse_args()
+    benchmark(args.lines, args.rounds, args.tolerance)
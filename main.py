@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 # 在最开始就禁用SSL警告
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from telegram.error import NetworkError, TimedOut, RetryAfter
 import httpx
 from concurrent.futures import ThreadPoolExecutor
@@ -28,6 +28,7 @@ from telegram import (
 )
 from telethon.sessions import StringSession
 from telethon import TelegramClient, types
+from telethon.errors import RPCError
 import subprocess
 import json
 import mimetypes
@@ -44,6 +45,7 @@ from urllib.parse import urlparse
 from pathlib import Path
 import logging
 import asyncio
+import contextvars
 import sys
 import logging.handlers
 import warnings
@@ -154,6 +156,49 @@ except ImportError:
     print_config_summary = None
     CONFIG_READER_AVAILABLE = False
 
+# 导入下载调度器
+try:
+    from download_scheduler import DownloadScheduler
+    from config_reader import get_scheduler_config
+except ImportError:
+    DownloadScheduler = None
+    get_scheduler_config = None
+
+# 导入元数据缓存（网易云歌曲/专辑/歌词/头像）
+try:
+    from metadata_cache import get_metadata_cache
+except ImportError:
+    get_metadata_cache = None
+
+# 状态消息渲染器（按聊天合并所有任务的进度消息编辑）
+from status_renderer import get_status_renderer
+from url_router import pick_route, route_url
+from short_link_resolver import get_short_link_resolver, is_short_link
+from download_index import get_download_index, media_id_from_route
+from media_info import YtdlpInfoCollector, format_duration, get_media_probe, media_info_from_ytdlp
+from file_watcher import WatchSession, watch_directory
+from apple_music_library import get_library_index
+from throughput import configure_throughput_planner, get_throughput_planner
+from ytdlp_batch import YtdlpBatch, is_anthology, list_download_workers
+from telethon_parallel import (
+    ParallelDownloadUnavailable, ParallelMediaDownloader, parallel_download_settings, unique_filename,
+)
+
+try:
+    from config_reader import get_throughput_config
+except ImportError:
+    get_throughput_config = None
+
+# 导入下载指标（/metrics 与 /status 中的阶段耗时统计）
+try:
+    from download_metrics import get_download_metrics, timed_phase, MetricsHTTPXRequest, PHASE_LABELS
+except ImportError:
+    get_download_metrics = None
+    MetricsHTTPXRequest = None
+
+    def timed_phase(phase):
+        return lambda func: func
+
 # 适配器：为缺少 download_album_by_id 的旧版 NeteaseDownloader 提供兼容实现
 
 
@@ -393,6 +438,7 @@ def extract_xiaohongshu_url(text):
 # 抖音和小红书下载相关导入
 try:
     from playwright.async_api import async_playwright
+    from browser_pool import PlaywrightBrowserPool
     PLAYWRIGHT_AVAILABLE = True
 except ImportError:
     PLAYWRIGHT_AVAILABLE = False
@@ -416,6 +462,17 @@ try:
 except Exception as _e:
     logging.getLogger(__name__).warning(f"⚠️ 注册 /setup 失败: {_e}")
 
+
+@app.route("/metrics")
+def download_metrics_endpoint():
+    """Prometheus 格式的下载指标"""
+    if get_download_metrics is None:
+        return Response("# download_metrics 不可用\n", status=503, mimetype="text/plain")
+    body = get_download_metrics().render_prometheus()
+    if log_pipeline:
+        body += log_pipeline.render_prometheus()
+    return Response(body, content_type="text/plain; version=0.0.4; charset=utf-8")
+
 # 尝试导入 gallery-dl
 try:
     import gallery_dl
@@ -523,6 +580,15 @@ def _escape_markdown_v2(text: str) -> str:
 # 配置增强的日志系统
 
 
+# 非阻塞日志管道（后台写日志、进度日志采样、JSON 格式）
+try:
+    import log_pipeline
+    from log_pipeline import PROGRESS_LOG
+except ImportError:
+    log_pipeline = None
+    PROGRESS_LOG = {"progress": True}
+
+
 def setup_logging():
     """配置增强的日志系统，支持远程NAS目录"""
     # 从环境变量获取日志配置
@@ -532,6 +598,10 @@ def setup_logging():
     log_backup_count = int(os.getenv("LOG_BACKUP_COUNT", "5"))
     log_to_console = os.getenv("LOG_TO_CONSOLE", "true").lower() == "true"
     log_to_file = os.getenv("LOG_TO_FILE", "true").lower() == "true"
+    # 后台线程写日志（队列模式）、JSON 行格式、每个任务进度日志的最小间隔（秒）
+    log_async = os.getenv("LOG_ASYNC", "true").lower() == "true"
+    log_json = os.getenv("LOG_FORMAT", "text").lower() == "json"
+    log_progress_interval = float(os.getenv("LOG_PROGRESS_INTERVAL", "5"))
     # 创建日志目录（支持远程NAS路径）
     log_path = Path(log_dir)
     try:
@@ -553,6 +623,7 @@ def setup_logging():
     # 清除现有的处理器
     for handler in root_logger.handlers[:]:
         root_logger.removeHandler(handler)
+    handlers = []
     # 文件日志处理器（带轮转）
     if log_to_file:
         try:
@@ -564,7 +635,7 @@ def setup_logging():
             )
             file_handler.setFormatter(formatter)
             file_handler.setLevel(getattr(logging, log_level))
-            root_logger.addHandler(file_handler)
+            handlers.append(file_handler)
         except Exception as e:
             print(f"警告：无法创建文件日志处理器: {e}")
             log_to_file = False
@@ -573,7 +644,14 @@ def setup_logging():
         console_handler = logging.StreamHandler()
         console_handler.setFormatter(formatter)
         console_handler.setLevel(getattr(logging, log_level))
-        root_logger.addHandler(console_handler)
+        handlers.append(console_handler)
+    if log_pipeline:
+        # 日志先进入队列，由后台线程写入文件/控制台；进度日志按任务采样
+        log_pipeline.install(root_logger, handlers, async_mode=log_async, json_format=log_json,
+                             progress_interval=log_progress_interval, date_format=date_format)
+    else:
+        for handler in handlers:
+            root_logger.addHandler(handler)
 
     # 设置第三方库的日志级别，减少冗余输出
     # httpx - Telegram API 请求日志
@@ -655,7 +733,8 @@ def create_unified_progress_hook(message_updater=None, progress_data=None):
 
                 # 记录进度信息
                 logger.info(
-                    f"下载进度: {percent:.1f}% ({downloaded}/{total} bytes) - {speed_str} - 剩余: {eta_str}")
+                    f"下载进度: {percent:.1f}% ({downloaded}/{total} bytes) - {speed_str} - 剩余: {eta_str}",
+                    extra=PROGRESS_LOG)
 
                 # 如果有消息更新器，调用它
                 if message_updater:
@@ -783,8 +862,8 @@ def create_bilibili_message_updater(status_message, context, progress_data):
     async def bilibili_message_updater(text_or_dict):
         try:
             logger.info(
-                f"🔍 bilibili_message_updater 被调用，参数类型: {type(text_or_dict)}")
-            logger.info(f"🔍 bilibili_message_updater 参数内容: {text_or_dict}")
+                f"🔍 bilibili_message_updater 被调用，参数类型: {type(text_or_dict)}", extra=PROGRESS_LOG)
+            logger.debug(f"🔍 bilibili_message_updater 参数内容: {text_or_dict}")
 
             # 如果已经显示完成状态，忽略所有后续调用
             if progress_state["finished_shown"]:
@@ -797,7 +876,7 @@ def create_bilibili_message_updater(status_message, context, progress_data):
                     logger.info("🔍 跳过重复内容")
                     return  # 跳过重复内容
                 last_progress_text["text"] = text_or_dict
-                await status_message.edit_text(text_or_dict, parse_mode=None)
+                get_status_renderer().submit(status_message, text_or_dict)
                 return
 
             # 检查是否为字典类型（来自progress_hook的进度数据）
@@ -821,9 +900,8 @@ def create_bilibili_message_updater(status_message, context, progress_data):
                     return
                 elif text_or_dict.get("status") == "downloading":
                     # 这是来自progress_hook的下载进度数据
-                    logger.info("🔍 检测到下载进度数据，准备调用 update_progress...")
                     # 这里需要实现update_progress逻辑，暂时先记录
-                    logger.info(f"📊 B站下载进度: {text_or_dict}")
+                    logger.info(f"📊 B站下载进度: {text_or_dict}", extra=PROGRESS_LOG)
                 else:
                     # 其他字典状态，转换为文本
                     logger.info(f"🔍 其他字典状态: {text_or_dict}")
@@ -832,7 +910,7 @@ def create_bilibili_message_updater(status_message, context, progress_data):
                         logger.info("🔍 跳过重复字典内容")
                         return  # 跳过重复内容
                     last_progress_text["text"] = dict_text
-                    await status_message.edit_text(dict_text, parse_mode=None)
+                    get_status_renderer().submit(status_message, dict_text)
             else:
                 # 普通文本消息
                 logger.info(f"🔍 普通文本消息: {text_or_dict}")
@@ -841,7 +919,7 @@ def create_bilibili_message_updater(status_message, context, progress_data):
                     logger.info("🔍 跳过重复文本内容")
                     return  # 跳过重复内容
                 last_progress_text["text"] = text_str
-                await status_message.edit_text(text_str, parse_mode=None)
+                get_status_renderer().submit(status_message, text_str)
         except Exception as e:
             logger.error(f"❌ bilibili_message_updater 处理错误: {e}")
             logger.error(f"❌ 异常类型: {type(e)}")
@@ -859,7 +937,6 @@ def single_video_progress_hook(message_updater=None, progress_data=None, status_
     整合了完整的进度显示逻辑，包括进度条、速度、剩余时间等。
     """
     import os  # 导入os模块以解决作用域问题
-    import time
     import threading
 
     # 定义工具函数，避免作用域问题
@@ -890,40 +967,20 @@ def single_video_progress_hook(message_updater=None, progress_data=None, status_
     if progress_data is None:
         progress_data = {"final_filename": None, "lock": threading.Lock()}
 
-    # 初始化更新频率控制
-    last_update_time = {"time": 0}
-
     def progress_hook(d):
         # 显示进度日志
-        logger.info(f"🔍 [PROGRESS_HOOK] 被调用: {d.get('status', 'unknown')}")
-        logger.info(
-            f"🔍 [PROGRESS_DEBUG] status_message: {status_message is not None}, context: {context is not None}")
+        logger.debug(f"🔍 [PROGRESS_HOOK] 被调用: {d.get('status', 'unknown')}")
         if isinstance(d, dict) and d.get('status') == 'downloading':
             progress = (d.get('downloaded_bytes', 0) /
                         (d.get('total_bytes', 1))) * 100
-            logger.info(f"📊 下载进度: {progress:.1f}%")
+            logger.info(f"📊 下载进度: {progress:.1f}%", extra=PROGRESS_LOG)
         elif isinstance(d, dict) and d.get('status') == 'finished':
             logger.info("✅ 下载完成")
 
         # 支持字符串类型，直接发到Telegram
         if isinstance(d, str):
             if message_updater and status_message:
-                try:
-                    loop = asyncio.get_running_loop()
-                except RuntimeError:
-                    try:
-                        loop = asyncio.get_event_loop()
-                    except RuntimeError:
-                        loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(loop)
-
-                async def do_update():
-                    try:
-                        await status_message.edit_text(d, parse_mode=None)
-                    except Exception as e:
-                        logger.warning(f"发送字符串进度到TG失败: {e}")
-
-                asyncio.run_coroutine_threadsafe(do_update(), loop)
+                get_status_renderer().submit(status_message, d)
             return
 
         # 添加类型检查，确保d是字典类型
@@ -960,7 +1017,7 @@ def single_video_progress_hook(message_updater=None, progress_data=None, status_
             logger.error(f"更新 progress_data 错误: {str(e)}")
 
         # 如果没有status_message和context，使用简单的message_updater
-        logger.info(
+        logger.debug(
             f"🔍 [PROGRESS_DEBUG] status_message: {status_message is not None}, context: {context is not None}")
         if not status_message or not context:
             if message_updater:
@@ -1004,55 +1061,8 @@ def single_video_progress_hook(message_updater=None, progress_data=None, status_
                 logger.warning("⚠️ message_updater 为空，跳过进度回调")
             return
 
-        # 完整的进度显示逻辑
-        now = time.time()
-
-        # 动态更新频率控制：更宽松的频率控制
-        total_bytes = d.get('total_bytes') or d.get('total_bytes_estimate', 0)
-        if total_bytes > 0 and total_bytes < 5 * 1024 * 1024:  # 小于5MB的文件
-            update_interval = 0.01  # 10ms更新一次，确保小文件也能看到进度
-        else:
-            update_interval = 0.1  # 大文件0.1秒更新一次
-
-        time_since_last = now - last_update_time['time']
-
-        # 计算当前进度
-        current_progress = 0
-        if total_bytes > 0:
-            current_progress = (
-                d.get('downloaded_bytes', 0) / total_bytes) * 100
-
-        # 获取上次的进度
-        if progress_data and isinstance(progress_data, dict):
-            last_progress = progress_data.get('last_progress', 0)
-        else:
-            last_progress = 0
-
-        # 强制更新条件：
-        # 1. 超过1秒没有更新
-        # 2. 进度变化超过1%
-        # 3. 下载完成
-        force_update = (time_since_last > 1.0 or
-                        abs(current_progress - last_progress) >= 1.0 or
-                        d.get('status') == 'finished')
-
-        if time_since_last < update_interval and not force_update:
-            logger.info(
-                f"⏰ 跳过更新，距离上次更新仅 {time_since_last:.2f}秒，需要等待 {update_interval}秒")
-            return
-
-        if force_update:
-            if time_since_last > 1.0:
-                logger.info(f"🔄 强制更新，距离上次更新已 {time_since_last:.2f}秒")
-            elif abs(current_progress - last_progress) >= 1.0:
-                logger.info(
-                    f"🔄 强制更新，进度变化 {last_progress:.1f}% -> {current_progress:.1f}%")
-            elif d.get('status') == 'finished':
-                logger.info(f"🔄 强制更新，下载完成")
-
-        # 更新进度记录
-        if progress_data and isinstance(progress_data, dict):
-            progress_data['last_progress'] = current_progress
+        # 完整的进度显示逻辑：编辑频率、去重和限流退避由状态消息渲染器统一处理
+        renderer = get_status_renderer()
 
         # 处理下载完成状态 - 直接显示完成信息并返回
         if d.get('status') == 'finished':
@@ -1088,50 +1098,24 @@ def single_video_progress_hook(message_updater=None, progress_data=None, status_
                 f"⏳ 预计剩余：0秒\n"
                 f"📊 进度：{progress_bar} (100.0%)"
             )
-
-            async def do_update():
-                try:
-                    await status_message.edit_text(completion_text, parse_mode=None)
-                    logger.info("📱 显示下载完成进度信息")
-                except Exception as e:
-                    logger.warning(f"显示完成进度信息失败: {e}")
-
-            try:
-                loop = asyncio.get_running_loop()
-            except RuntimeError:
-                try:
-                    loop = asyncio.get_event_loop()
-                except RuntimeError:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-
-            asyncio.run_coroutine_threadsafe(do_update(), loop)
+            renderer.submit(status_message, completion_text)
             return
 
-        # 处理下载中状态 - 这是关键部分，需要发送到Telegram
+        # 处理下载中状态
         if d.get('status') == 'downloading':
-            logger.info(f"🔍 [DOWNLOADING_DEBUG] 进入下载中状态处理")
-            logger.info(
-                f"🔍 [DOWNLOADING_DEBUG] status_message: {status_message is not None}, context: {context is not None}")
-            last_update_time['time'] = now
-
             total_bytes = d.get('total_bytes') or d.get(
                 'total_bytes_estimate', 0)
             downloaded_bytes = d.get('downloaded_bytes', 0)
             speed_bytes_s = d.get('speed', 0)
-            eta_seconds = d.get('eta', 0)
             filename = d.get('filename', '') or "正在下载..."
-            logger.info(
-                f"🔍 [DOWNLOADING_DEBUG] 文件信息: {filename}, 总大小: {total_bytes}, 已下载: {downloaded_bytes}")
+            display_filename = _clean_filename_for_display_local(filename)
+            speed_mb = (speed_bytes_s or 0) / (1024 * 1024)
 
             # 计算进度
-            logger.info(
-                f"🔍 [TOTAL_BYTES_DEBUG] total_bytes: {total_bytes}, 条件检查: {total_bytes > 0}")
             if total_bytes > 0:
                 progress = (downloaded_bytes / total_bytes) * 100
                 progress_bar = _create_progress_bar_local(progress)
                 size_mb = total_bytes / (1024 * 1024)
-                speed_mb = (speed_bytes_s or 0) / (1024 * 1024)
 
                 # 计算预计剩余时间
                 eta_text = ""
@@ -1148,7 +1132,6 @@ def single_video_progress_hook(message_updater=None, progress_data=None, status_
                 else:
                     eta_text = "未知"
 
-                display_filename = _clean_filename_for_display_local(filename)
                 progress_text = (
                     f"📝 文件：{display_filename}\n"
                     f"💾 大小：{size_mb:.2f}MB\n"
@@ -1156,67 +1139,8 @@ def single_video_progress_hook(message_updater=None, progress_data=None, status_
                     f"⏳ 预计剩余：{eta_text}\n"
                     f"📊 进度：{progress_bar} ({progress:.1f}%)"
                 )
-
-                async def do_update():
-                    try:
-                        logger.info(f"🔍 [DO_UPDATE_DEBUG] 开始更新Telegram消息")
-                        logger.info(
-                            f"🔍 [DO_UPDATE_DEBUG] status_message: {status_message is not None}")
-                        logger.info(
-                            f"🔍 [DO_UPDATE_DEBUG] progress_text: {progress_text[:100]}...")
-                        await status_message.edit_text(progress_text, parse_mode=None)
-                        logger.info(
-                            f"📱 更新Telegram进度: {progress:.1f}% - 文件: {display_filename}")
-                    except Exception as e:
-                        logger.error(f"🔍 [DO_UPDATE_ERROR] 更新Telegram失败: {e}")
-                        if "Message is not modified" not in str(e):
-                            logger.warning(f"更新Telegram进度失败: {e}")
-                        else:
-                            logger.info(f"📱 Telegram消息未修改，跳过更新")
-
-                logger.info(f"🔍 [DO_UPDATE_DEFINED] do_update 协程已定义")
-
-                try:
-                    loop = asyncio.get_running_loop()
-                except RuntimeError:
-                    try:
-                        loop = asyncio.get_event_loop()
-                    except RuntimeError:
-                        loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(loop)
-
-                logger.info(
-                    f"🔍 [ASYNC_DEBUG] 调用 asyncio.run_coroutine_threadsafe (下载中状态)")
-                logger.info(f"🔍 [ASYNC_DEBUG] loop: {loop is not None}")
-                logger.info(f"🔍 [ASYNC_DEBUG] do_update 函数: {do_update}")
-
-                # 检查事件循环是否正在运行
-                try:
-                    if loop.is_running():
-                        logger.info(
-                            f"🔍 [ASYNC_DEBUG] 事件循环正在运行，使用 run_coroutine_threadsafe")
-                        future = asyncio.run_coroutine_threadsafe(
-                            do_update(), loop)
-                        logger.info(
-                            f"🔍 [ASYNC_DEBUG] asyncio.run_coroutine_threadsafe 调用完成, future: {future}")
-                        logger.info(
-                            f"🔍 [ASYNC_DEBUG] future.done(): {future.done()}")
-                    else:
-                        logger.info(f"🔍 [ASYNC_DEBUG] 事件循环未运行，直接运行协程")
-                        # 如果事件循环没有运行，直接运行协程
-                        asyncio.run(do_update())
-                        logger.info(f"🔍 [ASYNC_DEBUG] 协程直接运行完成")
-                except Exception as e:
-                    logger.error(f"🔍 [ASYNC_ERROR] 异步调用失败: {e}")
-                    # 备用方案：使用线程池
-                    import concurrent.futures
-                    with concurrent.futures.ThreadPoolExecutor() as executor:
-                        future = executor.submit(asyncio.run, do_update())
-                        logger.info(f"🔍 [ASYNC_DEBUG] 使用线程池运行协程: {future}")
             else:
                 # 没有总大小信息时的处理
-                display_filename = _clean_filename_for_display_local(filename)
-                speed_mb = (speed_bytes_s or 0) / (1024 * 1024)
                 progress_text = (
                     f"📝 文件：{display_filename}\n"
                     f"💾 大小：计算中...\n"
@@ -1224,28 +1148,7 @@ def single_video_progress_hook(message_updater=None, progress_data=None, status_
                     f"⏳ 预计剩余：未知\n"
                     f"📊 进度：下载中..."
                 )
-
-                async def do_update():
-                    try:
-                        await status_message.edit_text(progress_text, parse_mode=None)
-                        logger.info(
-                            f"📱 更新Telegram进度（无大小信息）- 文件: {display_filename}")
-                    except Exception as e:
-                        if "Message is not modified" not in str(e):
-                            logger.warning(f"更新Telegram进度失败: {e}")
-                        else:
-                            logger.info(f"📱 Telegram消息未修改，跳过更新")
-
-                try:
-                    loop = asyncio.get_running_loop()
-                except RuntimeError:
-                    try:
-                        loop = asyncio.get_event_loop()
-                    except RuntimeError:
-                        loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(loop)
-
-                asyncio.run_coroutine_threadsafe(do_update(), loop)
+            renderer.submit(status_message, progress_text)
 
     return progress_hook
 
@@ -1262,10 +1165,6 @@ def apple_music_progress_hook(message_updater=None, progress_data=None, status_m
     if progress_data is None:
         progress_data = {"final_filename": None, "lock": threading.Lock()}
 
-    # 初始化更新频率控制
-    last_update_time = {"time": 0}
-    last_message_content = {"text": ""}
-
     def progress_hook(progress_info):
         # 处理新的进度信息格式
         if isinstance(progress_info, dict):
@@ -1346,22 +1245,7 @@ def apple_music_progress_hook(message_updater=None, progress_data=None, status_m
 
                     # 发送进度信息到Telegram
                     if message_updater and status_message:
-                        try:
-                            loop = asyncio.get_running_loop()
-                        except RuntimeError:
-                            try:
-                                loop = asyncio.get_event_loop()
-                            except RuntimeError:
-                                loop = asyncio.new_event_loop()
-                                asyncio.set_event_loop(loop)
-
-                        async def do_update():
-                            try:
-                                await status_message.edit_text(progress_text, parse_mode='Markdown')
-                            except Exception as e:
-                                logger.warning(f"发送Apple Music进度到TG失败: {e}")
-
-                        asyncio.run_coroutine_threadsafe(do_update(), loop)
+                        get_status_renderer().submit(status_message, progress_text, parse_mode='Markdown')
                     return
 
                 else:
@@ -1375,581 +1259,88 @@ def apple_music_progress_hook(message_updater=None, progress_data=None, status_m
 
         # 兼容旧的字符串类型，直接发到Telegram
         if isinstance(progress_info, str):
-            text = progress_info
             if message_updater and status_message:
-                try:
-                    loop = asyncio.get_running_loop()
-                except RuntimeError:
-                    try:
-                        loop = asyncio.get_event_loop()
-                    except RuntimeError:
-                        loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(loop)
-
-                async def do_update():
-                    try:
-                        await status_message.edit_text(progress_info)
-                    except Exception as e:
-                        logger.warning(f"发送字符串进度到TG失败: {e}")
-
-                asyncio.run_coroutine_threadsafe(do_update(), loop)
+                get_status_renderer().submit(status_message, progress_info)
             return
 
     return progress_hook
 
 
-# 全局变量，在函数外部定义，确保状态持久化
-_netease_last_update_time = {"time": 0}
-
-
 def netease_music_progress_hook(message_updater=None, progress_data=None, status_message=None, context=None):
     """
     网易云音乐下载进度回调，参考YouTube单集下载的进度显示样式
     """
     import os
-    import time
     import threading
 
-    # 定义工具函数，避免作用域问题
-    def _clean_filename_for_display_local(filename: str) -> str:
-        try:
-            import re
-            # 只保留文件名，移除路径
-            display_name = os.path.basename(filename) if filename else ""
-            # 移除时间戳前缀(10位数字+下划线)
-            if display_name and re.match(r"^\d{10}_", display_name):
-                display_name = display_name[11:]
-            # 智能截断过长文件名
-            if len(display_name) > 35:
-                name, ext = os.path.splitext(display_name)
-                display_name = name[:30] + "..." + ext
-            return display_name
-        except Exception:
-            filename = filename or ""
-            # 确保只返回文件名
-            display_name = os.path.basename(filename)
-            return display_name if len(display_name) <= 35 else display_name[:32] + "..."
-
-    def _create_progress_bar_local(percent: float, length: int = 20) -> str:
-        filled_length = int(length * percent / 100)
-        return "█" * filled_length + "░" * (length - filled_length)
-
     # 初始化进度数据
     if progress_data is None:
         progress_data = {"final_filename": None, "lock": threading.Lock()}
 
-    # 使用全局变量，确保状态在多次调用间持久化
-    global _netease_last_update_time
-    last_update_time = _netease_last_update_time
-
-    def progress_hook(d):
-        # 添加调试日志
-        logger.info(f"🔍 [NETEASE_PROGRESS] 收到进度回调: {d}")
-        logger.info(
-            f"🔍 [NETEASE_PROGRESS] status_message: {status_message is not None}, context: {context is not None}, message_updater: {message_updater is not None}")
-
-        # 支持字符串类型，直接发到Telegram
-        if isinstance(d, str):
-            if message_updater and status_message:
-                try:
-                    loop = asyncio.get_running_loop()
-                except RuntimeError:
-                    try:
-                        loop = asyncio.get_event_loop()
-                    except RuntimeError:
-                        loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(loop)
-
-                async def do_update():
-                    try:
-                        await status_message.edit_text(d, parse_mode=None)
-                    except Exception as e:
-                        logger.warning(f"发送字符串进度到TG失败: {e}")
-
-                asyncio.run_coroutine_threadsafe(do_update(), loop)
-            return
-
-        # 添加类型检查，确保d是字典类型
-        if not isinstance(d, dict):
-            logger.warning(
-                f"netease_progress_hook接收到非字典类型参数: {type(d)}, 内容: {d}")
-            return
-
-        # 更新 progress_data
-        try:
-            if d['status'] == 'downloading':
-                raw_filename = d.get('filename', '')
-                display_filename = os.path.basename(
-                    raw_filename) if raw_filename else 'music.mp3'
-                progress_data.update({
-                    'filename': display_filename,
-                    'total_bytes': d.get('total_bytes', 0),
-                    'downloaded_bytes': d.get('downloaded_bytes', 0),
-                    'speed': d.get('speed', 0),
-                    'status': 'downloading',
-                    'progress': (d.get('downloaded_bytes', 0) / d.get('total_bytes', 1)) * 100 if d.get('total_bytes', 0) > 0 else 0.0
-                })
-            elif d['status'] == 'finished':
-                final_filename = d.get('filename', '')
-                display_filename = os.path.basename(
-                    final_filename) if final_filename else 'music.mp3'
-                progress_data.update({
-                    'filename': display_filename,
-                    'status': 'finished',
-                    'final_filename': final_filename,
-                    'progress': 100.0
-                })
-                logger.info(f"📝 网易云音乐下载完成: {final_filename}")
-        except Exception as e:
-            logger.error(f"更新网易云音乐进度数据错误: {str(e)}")
-
-        # 如果没有status_message和context，使用简单的message_updater（但仍要执行完整的进度显示逻辑）
-        simple_mode = not status_message or not context
-        logger.info(f"🔍 [NETEASE_PROGRESS] simple_mode: {simple_mode}")
-
-        if simple_mode and message_updater:
-            logger.info(
-                f"🔍 netease_progress_hook 简单模式: status={d.get('status')}")
-
-            # 简单模式（参考Apple Music实现，移除频率控制）
-            # 为简单模式创建格式化的进度文本
+    def send_progress(text):
+        # 编辑频率、去重和限流退避由状态消息渲染器统一处理，下载线程不等待 Bot API
+        if status_message:
+            get_status_renderer().submit(status_message, text)
+        elif message_updater and not asyncio.iscoroutinefunction(message_updater):
             try:
-                if isinstance(d, dict) and d.get('status') == 'downloading':
-                    downloaded_bytes = d.get('downloaded_bytes', 0)
-                    speed = d.get('speed', 0)
-                    filename = d.get('filename', 'music.mp3')
-                    total_bytes = d.get('total_bytes', 0)
-
-                    if total_bytes > 0:
-                        progress = (downloaded_bytes / total_bytes) * 100
-                        speed_mb = speed / (1024 * 1024) if speed > 0 else 0
-                        total_mb = total_bytes / (1024 * 1024)
-                        downloaded_mb = downloaded_bytes / (1024 * 1024)
-
-                        # 计算预计剩余时间
-                        if speed > 0 and total_bytes > downloaded_bytes:
-                            remaining = total_bytes - downloaded_bytes
-                            eta_seconds = int(remaining / speed)
-                            mins, secs = divmod(eta_seconds, 60)
-                            if mins > 0:
-                                eta_str = f"{mins:02d}:{secs:02d}"
-                            else:
-                                eta_str = f"00:{secs:02d}"
-                        else:
-                            eta_str = "未知"
-
-                        # 创建进度条（和单集下载一样的样式）
-                        progress_bar = _create_progress_bar(progress)
-
-                        # 使用和单集下载相同的格式
-                        display_filename = _clean_filename_for_display(
-                            filename)
-                        progress_text = (
-                            f"📝 文件: `{display_filename}`\n"
-                            f"💾 大小: `{downloaded_mb:.2f}MB / {total_mb:.2f}MB`\n"
-                            f"⚡ 速度: `{speed_mb:.2f}MB/s`\n"
-                            f"⏳ 预计剩余: `{eta_str}`\n"
-                            f"📊 进度: {progress_bar} `{progress:.1f}%`"
-                        )
-                    else:
-                        display_filename = _clean_filename_for_display(
-                            filename)
-                        progress_text = (
-                            f"📝 文件: `{display_filename}`\n"
-                            f"💾 大小: 未知\n"
-                            f"⚡ 速度: 未知\n"
-                            f"⏳ 预计剩余: 未知\n"
-                            f"📊 进度: 下载中..."
-                        )
-
-                    # 使用普通文本
-                    simple_message = progress_text
-
-                    # 发送消息到Telegram
-                    try:
-                        loop = asyncio.get_running_loop()
-                    except RuntimeError:
-                        try:
-                            loop = asyncio.get_event_loop()
-                        except RuntimeError:
-                            loop = asyncio.new_event_loop()
-                            asyncio.set_event_loop(loop)
-
-                    async def do_update():
-                        try:
-                            await status_message.edit_text(simple_message, parse_mode=None)
-                        except Exception as e:
-                            logger.warning(f"发送简单模式进度到TG失败: {e}")
-
-                    asyncio.run_coroutine_threadsafe(do_update(), loop)
-
-                elif isinstance(d, dict) and d.get('status') == 'finished':
-                    filename = d.get('filename', 'music.mp3')
-                    total_bytes = d.get('total_bytes', 0)
-                    total_mb = total_bytes / \
-                        (1024 * 1024) if total_bytes > 0 else 0
-
-                    # 使用和单集下载相同的完成格式
-                    display_filename = _clean_filename_for_display(filename)
-                    progress_bar = _create_progress_bar(100.0)
-                    finish_text = (
-                        f"📝 文件: `{display_filename}`\n"
-                        f"💾 大小: `{total_mb:.2f}MB`\n"
-                        f"⚡ 速度: 完成\n"
-                        f"⏳ 预计剩余: 0秒\n"
-                        f"📊 进度: {progress_bar} `100.0%`"
-                    )
-                    # 使用普通文本
-                    simple_message = finish_text
-
-                    # 发送消息到Telegram
-                    try:
-                        loop = asyncio.get_running_loop()
-                    except RuntimeError:
-                        try:
-                            loop = asyncio.get_event_loop()
-                        except RuntimeError:
-                            loop = asyncio.new_event_loop()
-                            asyncio.set_event_loop(loop)
-
-                    async def do_update():
-                        try:
-                            await status_message.edit_text(simple_message, parse_mode=None)
-                        except Exception as e:
-                            logger.warning(f"发送简单模式完成消息到TG失败: {e}")
-
-                    asyncio.run_coroutine_threadsafe(do_update(), loop)
-
+                message_updater(text)
             except Exception as e:
-                logger.warning(f"网易云音乐简单模式回调失败: {e}")
-        elif simple_mode:
-            logger.warning("⚠️ 网易云音乐简单模式但无message_updater")
-
-        # 继续执行完整的进度显示逻辑（无论是否为简单模式）
-
-        # 完整的进度显示逻辑（参考Apple Music实现，移除频率控制）
-        logger.info(
-            f"🔍 [NETEASE_PROGRESS] 进入完整进度显示逻辑: status={d.get('status')}")
-
-        # 处理下载中状态
-        if d.get('status') == 'downloading':
-            logger.info(f"🔍 [NETEASE_PROGRESS] 处理下载中状态")
-
-            total_bytes = d.get('total_bytes', 0)
-            downloaded_bytes = d.get('downloaded_bytes', 0)
-            speed_bytes_s = d.get('speed', 0)
-            eta_seconds = d.get('eta', 0)
-            filename = d.get('filename', '') or "正在下载..."
-            now = time.time()
-
-            # 计算进度
-            if total_bytes > 0:
-                progress = (downloaded_bytes / total_bytes) * 100
-                progress_bar = _create_progress_bar(progress)
-                size_mb = total_bytes / (1024 * 1024)
-                speed_mb = (speed_bytes_s or 0) / (1024 * 1024)
-
-                # 计算预计剩余时间
-                eta_text = ""
-                if speed_bytes_s and total_bytes and downloaded_bytes < total_bytes:
-                    remaining = total_bytes - downloaded_bytes
-                    eta = int(remaining / speed_bytes_s)
-                    mins, secs = divmod(eta, 60)
-                    if mins > 0:
-                        eta_text = f"{mins}分{secs}秒"
-                    else:
-                        eta_text = f"{secs}秒"
-                elif speed_bytes_s:
-                    eta_text = "计算中"
-                else:
-                    eta_text = "未知"
-
-                display_filename = _clean_filename_for_display(filename)
-                progress_text = (
-                    f"🎵 音乐：{display_filename}\n"
-                    f"💾 大小：{downloaded_bytes/(1024*1024):.2f}MB / {size_mb:.2f}MB\n"
-                    f"⚡ 速度：{speed_mb:.2f}MB/s\n"
-                    f"⏳ 预计剩余：{eta_text}\n"
-                    f"📊 进度：{progress_bar} ({progress:.1f}%)"
-                )
-
-                async def do_update():
-                    try:
-                        await status_message.edit_text(progress_text)
-                        logger.info(
-                            f"📱 更新Telegram进度: {progress:.1f}% - 文件: {display_filename}")
-                        # 更新成功后才更新时间戳
-                        last_update_time['time'] = now
-                    except Exception as e:
-                        logger.warning(
-                            f"🔍 [NETEASE_PROGRESS] 更新网易云音乐进度失败: {e}")
-                        if "Message is not modified" not in str(e):
-                            # 备用：如果status_message更新失败，尝试使用message_updater
-                            if message_updater:
-                                try:
-                                    logger.info(
-                                        f"🔍 [NETEASE_PROGRESS] 尝试使用备用message_updater")
-                                    if asyncio.iscoroutinefunction(message_updater):
-                                        await message_updater(progress_text)
-                                    else:
-                                        message_updater(progress_text)
-                                    logger.info("✅ 使用备用message_updater更新成功")
-                                    # 备用方案成功也更新时间戳
-                                    last_update_time['time'] = now
-                                except Exception as backup_e:
-                                    logger.warning(
-                                        f"备用message_updater也失败: {backup_e}")
-
-                try:
-                    loop = asyncio.get_running_loop()
-                except RuntimeError:
-                    try:
-                        loop = asyncio.get_event_loop()
-                    except RuntimeError:
-                        loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(loop)
-
-                if loop.is_running():
-                    # 事件循环正在运行，使用 run_coroutine_threadsafe
-                    try:
-                        future = asyncio.run_coroutine_threadsafe(
-                            do_update(), loop)
-                        # 尝试获取结果，设置短超时
-                        try:
-                            result = future.result(timeout=0.1)
-                        except asyncio.TimeoutError:
-                            pass  # 超时是正常的，任务在后台执行
-                        except Exception as e:
-                            logger.error(
-                                f"🔍 [NETEASE_PROGRESS] 进度更新任务执行失败: {e}")
-                    except Exception as e:
-                        logger.error(f"🔍 [NETEASE_PROGRESS] 提交进度更新任务失败: {e}")
-                else:
-                    # 事件循环没有运行，直接运行协程
-                    try:
-                        asyncio.run(do_update())
-                    except Exception as e:
-                        logger.error(f"🔍 [NETEASE_PROGRESS] 直接运行协程失败: {e}")
-            return
-
-        # 处理下载完成状态 - 直接显示完成信息并返回
-        if d.get('status') == 'finished':
-            logger.info("🎵 网易云音乐下载完成，显示完成信息")
-
-            # 获取进度信息
-            filename = progress_data.get('filename', 'music.mp3')
-            total_bytes = progress_data.get('total_bytes', 0)
-            downloaded_bytes = progress_data.get('downloaded_bytes', 0)
-
-            # 显示完成信息
-            display_filename = _clean_filename_for_display(filename)
-            progress_bar = _create_progress_bar(100.0)
-            size_mb = total_bytes / \
-                (1024 * 1024) if total_bytes > 0 else downloaded_bytes / (1024 * 1024)
-
-            completion_text = (
-                f"🎵 音乐：{display_filename}\n"
-                f"💾 大小：{size_mb:.2f}MB\n"
-                f"⚡ 速度：完成\n"
-                f"⏳ 预计剩余：0秒\n"
-                f"📊 进度：{progress_bar} (100.0%)"
-            )
-
-            async def do_update():
-                try:
-                    await status_message.edit_text(completion_text)
-                    logger.info("🎵 显示网易云音乐下载完成进度信息")
-                    # 更新成功后才更新时间戳
-                    last_update_time['time'] = now
-                except Exception as e:
-                    logger.warning(f"显示网易云音乐完成进度信息失败: {e}")
-                    # 备用：如果status_message更新失败，尝试使用message_updater
-                    if message_updater:
-                        try:
-                            if asyncio.iscoroutinefunction(message_updater):
-                                await message_updater(completion_text)
-                            else:
-                                message_updater(completion_text)
-                            logger.info("✅ 使用备用message_updater显示完成信息成功")
-                            # 备用方案成功也更新时间戳
-                            last_update_time['time'] = now
-                        except Exception as backup_e:
-                            logger.warning(
-                                f"备用message_updater显示完成信息也失败: {backup_e}")
-
-            try:
-                loop = asyncio.get_running_loop()
-            except RuntimeError:
-                try:
-                    loop = asyncio.get_event_loop()
-                except RuntimeError:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-
-            if loop.is_running():
-                # 事件循环正在运行，使用 run_coroutine_threadsafe
-                try:
-                    future = asyncio.run_coroutine_threadsafe(
-                        do_update(), loop)
-                    # 尝试获取结果，设置短超时
-                    try:
-                        result = future.result(timeout=0.1)
-                    except asyncio.TimeoutError:
-                        pass  # 超时是正常的，任务在后台执行
-                    except Exception as e:
-                        logger.error(f"🔍 [NETEASE_PROGRESS] 完成状态更新任务执行失败: {e}")
-                except Exception as e:
-                    logger.error(f"🔍 [NETEASE_PROGRESS] 提交完成状态更新任务失败: {e}")
-            else:
-                # 事件循环没有运行，直接运行协程
-                try:
-                    asyncio.run(do_update())
-                except Exception as e:
-                    logger.error(f"🔍 [NETEASE_PROGRESS] 直接运行完成状态协程失败: {e}")
-            return
-
-        # 处理下载中状态
-        if d.get('status') == 'downloading':
-            last_update_time['time'] = now
-
-            total_bytes = d.get('total_bytes', 0)
-            downloaded_bytes = d.get('downloaded_bytes', 0)
-            speed_bytes_s = d.get('speed', 0)
-            eta_seconds = d.get('eta', 0)
-            filename = d.get('filename', '') or "正在下载..."
+                logger.warning(f"网易云音乐进度回调失败: {e}")
 
-            # 计算进度
-            if total_bytes > 0:
-                progress = (downloaded_bytes / total_bytes) * 100
-                progress_bar = _create_progress_bar(progress)
-                size_mb = total_bytes / (1024 * 1024)
-                speed_mb = (speed_bytes_s or 0) / (1024 * 1024)
-
-                # 计算预计剩余时间
-                eta_text = ""
-                if speed_bytes_s and total_bytes and downloaded_bytes < total_bytes:
-                    remaining = total_bytes - downloaded_bytes
-                    eta = int(remaining / speed_bytes_s)
-                    mins, secs = divmod(eta, 60)
-                    if mins > 0:
-                        eta_text = f"{mins}分{secs}秒"
-                    else:
-                        eta_text = f"{secs}秒"
-                elif speed_bytes_s:
-                    eta_text = "计算中"
-                else:
-                    eta_text = "未知"
-
-                display_filename = _clean_filename_for_display(filename)
-                progress_text = (
-                    f"🎵 音乐：{display_filename}\n"
-                    f"💾 大小：{downloaded_bytes/(1024*1024):.2f}MB / {size_mb:.2f}MB\n"
-                    f"⚡ 速度：{speed_mb:.2f}MB/s\n"
-                    f"⏳ 预计剩余：{eta_text}\n"
-                    f"📊 进度：{progress_bar} ({progress:.1f}%)"
-                )
-
-                async def do_update():
-                    try:
-                        await status_message.edit_text(progress_text)
-                    except Exception as e:
-                        if "Message is not modified" not in str(e):
-                            logger.warning(f"更新网易云音乐进度失败: {e}")
-                            # 备用：如果status_message更新失败，尝试使用message_updater
-                            if message_updater:
-                                try:
-                                    if asyncio.iscoroutinefunction(message_updater):
-                                        await message_updater(progress_text)
-                                    else:
-                                        message_updater(progress_text)
-                                    logger.info("✅ 使用备用message_updater更新成功")
-                                except Exception as backup_e:
-                                    logger.warning(
-                                        f"备用message_updater也失败: {backup_e}")
-
-                try:
-                    loop = asyncio.get_running_loop()
-                except RuntimeError:
-                    try:
-                        loop = asyncio.get_event_loop()
-                    except RuntimeError:
-                        loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(loop)
-
-                asyncio.run_coroutine_threadsafe(do_update(), loop)
-
-        # 处理下载完成状态 - 直接显示完成信息并返回
-        if d.get('status') == 'finished':
-            logger.info("🎵 网易云音乐下载完成，显示完成信息")
-
-            # 获取进度信息
-            if progress_data and isinstance(progress_data, dict):
-                filename = progress_data.get('filename', 'music.mp3')
-                total_bytes = progress_data.get('total_bytes', 0)
-                downloaded_bytes = progress_data.get('downloaded_bytes', 0)
-            else:
-                filename = 'music.mp3'
-                total_bytes = 0
-                downloaded_bytes = 0
-
-            # 显示完成信息
-            display_filename = _clean_filename_for_display_local(filename)
-            progress_bar = _create_progress_bar_local(100.0)
-            size_mb = total_bytes / \
-                (1024 * 1024) if total_bytes > 0 else downloaded_bytes / (1024 * 1024)
-
-            completion_text = (
-                f"🎵 音乐：{display_filename}\n"
-                f"💾 大小：{size_mb:.2f}MB\n"
-                f"⚡ 速度：完成\n"
-                f"⏳ 预计剩余：0秒\n"
-                f"📊 进度：{progress_bar} (100.0%)"
-            )
-
-            async def do_update():
-                try:
-                    await status_message.edit_text(completion_text, parse_mode=None)
-                    logger.info("🎵 显示网易云音乐下载完成进度信息")
-                except Exception as e:
-                    logger.warning(f"显示网易云音乐完成进度信息失败: {e}")
-                    # 备用：如果status_message更新失败，尝试使用message_updater
-                    if message_updater:
-                        try:
-                            if asyncio.iscoroutinefunction(message_updater):
-                                await message_updater(completion_text)
-                            else:
-                                message_updater(completion_text)
-                            logger.info("✅ 使用备用message_updater显示完成信息成功")
-                        except Exception as backup_e:
-                            logger.warning(
-                                f"备用message_updater显示完成信息也失败: {backup_e}")
+    def progress_hook(d):
+        logger.debug(f"🔍 [NETEASE_PROGRESS] 收到进度回调: {d}")
 
-            try:
-                loop = asyncio.get_running_loop()
-            except RuntimeError:
-                try:
-                    loop = asyncio.get_event_loop()
-                except RuntimeError:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
+        # 支持字符串类型，直接发到Telegram
+        if isinstance(d, str):
+            if message_updater and status_message:
+                send_progress(d)
+            return
 
-            asyncio.run_coroutine_threadsafe(do_update(), loop)
+        # 添加类型检查，确保d是字典类型
+        if not isinstance(d, dict):
+            logger.warning(
+                f"netease_progress_hook接收到非字典类型参数: {type(d)}, 内容: {d}")
             return
 
+        # 更新 progress_data
+        try:
+            if d['status'] == 'downloading':
+                raw_filename = d.get('filename', '')
+                display_filename = os.path.basename(
+                    raw_filename) if raw_filename else 'music.mp3'
+                progress_data.update({
+                    'filename': display_filename,
+                    'total_bytes': d.get('total_bytes', 0),
+                    'downloaded_bytes': d.get('downloaded_bytes', 0),
+                    'speed': d.get('speed', 0),
+                    'status': 'downloading',
+                    'progress': (d.get('downloaded_bytes', 0) / d.get('total_bytes', 1)) * 100 if d.get('total_bytes', 0) > 0 else 0.0
+                })
+            elif d['status'] == 'finished':
+                final_filename = d.get('filename', '')
+                display_filename = os.path.basename(
+                    final_filename) if final_filename else 'music.mp3'
+                progress_data.update({
+                    'filename': display_filename,
+                    'status': 'finished',
+                    'final_filename': final_filename,
+                    'progress': 100.0
+                })
+                logger.info(f"📝 网易云音乐下载完成: {final_filename}")
+        except Exception as e:
+            logger.error(f"更新网易云音乐进度数据错误: {str(e)}")
+
         # 处理下载中状态
         if d.get('status') == 'downloading':
-            last_update_time['time'] = now
-
             total_bytes = d.get('total_bytes', 0)
             downloaded_bytes = d.get('downloaded_bytes', 0)
             speed_bytes_s = d.get('speed', 0)
-            eta_seconds = d.get('eta', 0)
             filename = d.get('filename', '') or "正在下载..."
 
             # 计算进度
             if total_bytes > 0:
                 progress = (downloaded_bytes / total_bytes) * 100
-                progress_bar = _create_progress_bar_local(progress)
+                progress_bar = _create_progress_bar(progress)
                 size_mb = total_bytes / (1024 * 1024)
                 speed_mb = (speed_bytes_s or 0) / (1024 * 1024)
 
@@ -1968,43 +1359,40 @@ def netease_music_progress_hook(message_updater=None, progress_data=None, status
                 else:
                     eta_text = "未知"
 
-                display_filename = _clean_filename_for_display_local(filename)
+                display_filename = _clean_filename_for_display(filename)
                 progress_text = (
                     f"🎵 音乐：{display_filename}\n"
-                    f"💾 大小：{size_mb:.2f}MB\n"
+                    f"💾 大小：{downloaded_bytes/(1024*1024):.2f}MB / {size_mb:.2f}MB\n"
                     f"⚡ 速度：{speed_mb:.2f}MB/s\n"
                     f"⏳ 预计剩余：{eta_text}\n"
                     f"📊 进度：{progress_bar} ({progress:.1f}%)"
                 )
+                send_progress(progress_text)
+            return
 
-                async def do_update():
-                    try:
-                        await status_message.edit_text(progress_text, parse_mode=None)
-                    except Exception as e:
-                        if "Message is not modified" not in str(e):
-                            logger.warning(f"更新网易云音乐进度失败: {e}")
-                            # 备用：如果status_message更新失败，尝试使用message_updater
-                            if message_updater:
-                                try:
-                                    if asyncio.iscoroutinefunction(message_updater):
-                                        await message_updater(progress_text)
-                                    else:
-                                        message_updater(progress_text)
-                                    logger.info("✅ 使用备用message_updater更新成功")
-                                except Exception as backup_e:
-                                    logger.warning(
-                                        f"备用message_updater也失败: {backup_e}")
+        # 处理下载完成状态 - 直接显示完成信息并返回
+        if d.get('status') == 'finished':
+            logger.info("🎵 网易云音乐下载完成，显示完成信息")
 
-                try:
-                    loop = asyncio.get_running_loop()
-                except RuntimeError:
-                    try:
-                        loop = asyncio.get_event_loop()
-                    except RuntimeError:
-                        loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(loop)
+            # 获取进度信息
+            filename = progress_data.get('filename', 'music.mp3')
+            total_bytes = progress_data.get('total_bytes', 0)
+            downloaded_bytes = progress_data.get('downloaded_bytes', 0)
+
+            # 显示完成信息
+            display_filename = _clean_filename_for_display(filename)
+            progress_bar = _create_progress_bar(100.0)
+            size_mb = total_bytes / \
+                (1024 * 1024) if total_bytes > 0 else downloaded_bytes / (1024 * 1024)
 
-                asyncio.run_coroutine_threadsafe(do_update(), loop)
+            completion_text = (
+                f"🎵 音乐：{display_filename}\n"
+                f"💾 大小：{size_mb:.2f}MB\n"
+                f"⚡ 速度：完成\n"
+                f"⏳ 预计剩余：0秒\n"
+                f"📊 进度：{progress_bar} (100.0%)"
+            )
+            send_progress(completion_text)
 
     return progress_hook
 
@@ -2244,6 +1632,14 @@ class VideoDownloader:
             import traceback
             logger.error(f"📋 错误堆栈: {traceback.format_exc()}")
             self.apple_music_downloader = None
+        # Playwright 浏览器池（抖音/快手/小红书解析共用，首次使用时才启动浏览器）
+        self.browser_pool = None
+        if PLAYWRIGHT_AVAILABLE:
+            self.browser_pool = PlaywrightBrowserPool(
+                size=int(os.getenv("PLAYWRIGHT_POOL_SIZE", "2")),
+                contexts_per_browser=int(os.getenv("PLAYWRIGHT_CONTEXTS_PER_BROWSER", "2")),
+                idle_timeout=float(os.getenv("PLAYWRIGHT_IDLE_TIMEOUT", "300")),
+            )
         self._main_loop = None
         try:
             import asyncio
@@ -2518,49 +1914,23 @@ class VideoDownloader:
 
     def is_x_url(self, url: str) -> bool:
         """检查是否为 X (Twitter) URL"""
-        parsed = urlparse(url)
-        return parsed.netloc.lower() in [
-            "twitter.com",
-            "x.com",
-            "www.twitter.com",
-            "www.x.com",
-        ]
+        return route_url(url).platform == "x"
 
     def is_youtube_url(self, url: str) -> bool:
         """检查是否为 YouTube URL"""
-        parsed = urlparse(url)
-        return parsed.netloc.lower() in [
-            "youtube.com",
-            "www.youtube.com",
-            "youtu.be",
-            "m.youtube.com",
-        ]
+        return route_url(url).platform == "youtube"
 
     def is_facebook_url(self, url: str) -> bool:
         """检查是否为 Facebook URL"""
-        parsed = urlparse(url)
-        return parsed.netloc.lower() in [
-            "facebook.com",
-            "www.facebook.com",
-            "m.facebook.com",
-            "fb.watch",
-            "fb.com",
-        ]
+        return route_url(url).platform == "facebook"
 
     def is_xvideos_url(self, url: str) -> bool:
         """检查是否为 xvideos URL"""
-        parsed = urlparse(url)
-        return any(
-            domain in parsed.netloc for domain in ["xvideos.com", "www.xvideos.com"]
-        )
+        return route_url(url).platform == "xvideos"
 
     def is_pornhub_url(self, url: str) -> bool:
         """检查是否为 pornhub URL"""
-        parsed = urlparse(url)
-        return any(
-            domain in parsed.netloc
-            for domain in ["pornhub.com", "www.pornhub.com", "cn.pornhub.com"]
-        )
+        return route_url(url).platform == "pornhub"
 
     def _get_bilibili_best_format(self) -> str:
         """
@@ -2662,57 +2032,23 @@ class VideoDownloader:
 
     def is_bilibili_url(self, url: str) -> bool:
         """检查是否为 Bilibili URL"""
-        parsed = urlparse(url)
-        return parsed.netloc.lower() in [
-            "bilibili.com",
-            "www.bilibili.com",
-            "space.bilibili.com",
-            "b23.tv",
-        ]
+        return route_url(url).platform == "bilibili"
 
     def is_telegraph_url(self, url: str) -> bool:
         """检查是否为 Telegraph URL"""
-        parsed = urlparse(url)
-        return parsed.netloc.lower() in ["telegra.ph", "telegraph.co"]
+        return route_url(url).platform == "telegraph"
 
     def is_douyin_url(self, url: str) -> bool:
         """检查是否为抖音 URL"""
-        parsed = urlparse(url)
-        return parsed.netloc.lower() in [
-            "douyin.com",
-            "www.douyin.com",
-            "v.douyin.com",
-            "www.iesdouyin.com",
-            "iesdouyin.com"
-        ]
+        return route_url(url).platform == "douyin"
 
     def is_kuaishou_url(self, url: str) -> bool:
         """检查是否为快手 URL"""
-        parsed = urlparse(url)
-        # 支持多种快手URL格式
-        if parsed.netloc.lower() in [
-            "kuaishou.com",
-            "www.kuaishou.com",
-            "v.kuaishou.com",
-            "m.kuaishou.com",
-            "f.kuaishou.com"
-        ]:
-            return True
-
-        # 检查URL路径是否包含快手特征
-        if 'kuaishou.com' in url.lower():
-            return True
-
-        return False
+        return route_url(url).platform == "kuaishou"
 
     def is_toutiao_url(self, url: str) -> bool:
         """检查是否为头条视频 URL"""
-        parsed = urlparse(url)
-        return parsed.netloc.lower() in [
-            "toutiao.com",
-            "www.toutiao.com",
-            "m.toutiao.com",
-        ]
+        return route_url(url).platform == "toutiao"
 
     def extract_urls_from_text(self, text: str) -> list:
         """从文本中提取所有URL - 改进版本支持更多格式"""
@@ -2825,12 +2161,7 @@ class VideoDownloader:
 
     def is_xiaohongshu_url(self, url: str) -> bool:
         """检查是否为小红书 URL"""
-        parsed = urlparse(url)
-        return parsed.netloc.lower() in [
-            "xiaohongshu.com",
-            "www.xiaohongshu.com",
-            "xhslink.com",
-        ]
+        return route_url(url).platform == "xiaohongshu"
 
     async def _detect_xiaohongshu_content_type(self, url: str) -> str:
         """检测小红书内容类型（图片或视频）"""
@@ -2838,12 +2169,9 @@ class VideoDownloader:
             # 对于短链接，先展开再检测
             if 'xhslink.com' in url:
                 logger.info(f"🔗 检测到小红书短链接，先展开: {url}")
-                # 使用 xiaohongshu_downloader 展开短链接
                 try:
-                    from xiaohongshu_downloader import XiaohongshuDownloader
-                    downloader = XiaohongshuDownloader()
-                    # 先展开短链接获取完整URL
-                    expanded_url = downloader._expand_short_url(url)
+                    # 先展开短链接获取完整URL（共享缓存，下载器中不会再次请求）
+                    expanded_url = await get_short_link_resolver().resolve(url)
                     if expanded_url and expanded_url != url:
                         logger.info(f"✅ 短链接展开成功: {expanded_url}")
                         url = expanded_url
@@ -2888,82 +2216,26 @@ class VideoDownloader:
 
     def is_weibo_url(self, url: str) -> bool:
         """检查是否为微博 URL"""
-        parsed = urlparse(url)
-        return parsed.netloc.lower() in [
-            "weibo.com",
-            "www.weibo.com",
-            "m.weibo.com",
-            "video.weibo.com",
-            "t.cn",  # 微博短链接
-            "weibo.cn",  # 微博短链接
-            "sinaurl.cn",  # 新浪短链接
-        ]
+        return route_url(url).platform == "weibo"
 
-    def _expand_weibo_short_url(self, url: str) -> str:
+    async def _expand_weibo_short_url(self, url: str) -> str:
         """展开微博短链接为长链接"""
-        import requests
         import re
 
         try:
             # 检查是否为微博短链接
-            parsed = urlparse(url)
-            short_domains = ["t.cn", "weibo.cn", "sinaurl.cn"]
-
-            if parsed.netloc.lower() in short_domains:
+            if route_url(url).kind == "short":
                 logger.info(f"🔄 检测到微博短链接，开始展开: {url}")
 
-                # 优先使用移动端User-Agent，避免重定向到登录页面
-                mobile_headers = {
-                    'User-Agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 14_7_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.1.2 Mobile/15E148 Safari/604.1',
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-                    'Connection': 'keep-alive',
-                    'Upgrade-Insecure-Requests': '1'
-                }
-
-                # 桌面端User-Agent作为备用
-                desktop_headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-                    'Accept-Encoding': 'gzip, deflate, br',
-                    'Connection': 'keep-alive',
-                    'Upgrade-Insecure-Requests': '1'
-                }
-
-                # 先尝试移动端User-Agent的GET请求
-                expanded_url = None
-                try:
-                    logger.info(f"🔄 使用移动端User-Agent请求...")
-                    response = requests.get(
-                        url, headers=mobile_headers, allow_redirects=True, timeout=10)
-                    expanded_url = response.url
-                    logger.info(f"🔄 移动端请求重定向到: {expanded_url}")
-
-                    # 检查是否得到了有效的微博视频URL
-                    if "weibo.com" in expanded_url and ("tv/show" in expanded_url or "video" in expanded_url):
-                        logger.info(f"✅ 移动端请求成功获取微博视频URL")
-                        # 如果是h5.video.weibo.com，转换为标准的weibo.com格式
-                        if "h5.video.weibo.com" in expanded_url:
-                            expanded_url = expanded_url.replace(
-                                "h5.video.weibo.com", "weibo.com/tv")
-                            logger.info(f"🔄 转换为标准格式: {expanded_url}")
-                    else:
-                        logger.info(f"⚠️ 移动端请求未获取到标准微博视频URL，尝试桌面端...")
-                        raise Exception("移动端未获取到标准URL")
-
-                except Exception as e:
-                    logger.warning(f"⚠️ 移动端请求失败: {e}")
-                    # 如果移动端请求失败，尝试桌面端请求
-                    try:
-                        logger.info(f"🔄 使用桌面端User-Agent请求...")
-                        response = requests.get(
-                            url, headers=desktop_headers, allow_redirects=True, timeout=10)
-                        expanded_url = response.url
-                        logger.info(f"🔄 桌面端请求重定向到: {expanded_url}")
-                    except Exception as e2:
-                        logger.warning(f"⚠️ 桌面端请求也失败: {e2}")
-                        return url
+                # 通过共享的短链接解析器展开（移动端User-Agent，结果缓存，重复转发的短链接直接命中）
+                expanded_url = await get_short_link_resolver().resolve(url)
+                if not expanded_url:
+                    return url
+                # 如果是h5.video.weibo.com，转换为标准的weibo.com格式
+                if "h5.video.weibo.com" in expanded_url:
+                    expanded_url = expanded_url.replace(
+                        "h5.video.weibo.com", "weibo.com/tv")
+                    logger.info(f"🔄 转换为标准格式: {expanded_url}")
 
                 # 检查展开后的URL是否有效
                 if expanded_url and expanded_url != url:
@@ -3022,93 +2294,29 @@ class VideoDownloader:
 
     def is_instagram_url(self, url: str) -> bool:
         """检查是否为Instagram URL"""
-        parsed = urlparse(url)
-        return parsed.netloc.lower() in [
-            "instagram.com",
-            "www.instagram.com",
-            "m.instagram.com",
-        ]
+        return route_url(url).platform == "instagram"
 
     def is_tiktok_url(self, url: str) -> bool:
         """检查是否为TikTok URL"""
-        parsed = urlparse(url)
-        return parsed.netloc.lower() in [
-            "tiktok.com",
-            "www.tiktok.com",
-            "m.tiktok.com",
-            "vm.tiktok.com",
-        ]
+        return route_url(url).platform == "tiktok"
 
     def is_netease_url(self, url: str) -> bool:
         """检查是否为网易云音乐 URL"""
-        parsed = urlparse(url)
-        # 检查官方域名
-        if parsed.netloc.lower() in [
-            "music.163.com",
-            "y.music.163.com",
-            "m.music.163.com",
-        ]:
-            return True
-
-        # 检查短链接域名
-        if parsed.netloc.lower() in [
-            "163cn.tv",
-            "music.163.cn",
-        ]:
-            return True
-
-        return False
+        return route_url(url).platform == "netease"
 
     def is_qqmusic_url(self, url: str) -> bool:
         """检查是否为QQ音乐 URL"""
-        parsed = urlparse(url)
-        # 检查官方域名
-        if parsed.netloc.lower() in [
-            "y.qq.com",
-            "music.qq.com",
-            "c.y.qq.com",
-            "c6.y.qq.com",
-            "i.y.qq.com",
-        ]:
-            return True
-
-        # 检查短链接域名
-        if parsed.netloc.lower() in [
-            "qq.cn",
-            "qq.com",
-        ]:
-            return True
-
-        return False
+        return route_url(url).platform == "qqmusic"
 
     def is_apple_music_url(self, url: str) -> bool:
         """检查是否为 Apple Music URL"""
-        parsed = urlparse(url)
-        return parsed.netloc.lower() in [
-            "music.apple.com",
-        ]
+        return route_url(url).platform == "applemusic"
 
     def is_youtube_music_url(self, url: str) -> bool:
         """检查是否为 YouTube Music URL"""
-        parsed = urlparse(url)
-        # 检查YouTube Music专用域名
-        if parsed.netloc.lower() in [
-            "music.youtube.com",
-        ]:
-            return True
-
-        # 检查普通YouTube链接但包含播放列表标识（可能是YouTube Music播放列表）
-        if parsed.netloc.lower() in [
-            "youtube.com",
-            "www.youtube.com",
-            "youtu.be",
-            "m.youtube.com",
-        ]:
-            # 检查URL中是否包含播放列表参数
-            if 'list=' in url:
-                return True
-
-        return False
+        platform = route_url(url).platform
+        # 普通YouTube链接但包含播放列表标识（可能是YouTube Music播放列表）
+        return platform == "youtubemusic" or (platform == "youtube" and 'list=' in url)
 
     def is_x_playlist_url(self, url: str) -> tuple:
         """
@@ -3176,16 +2384,11 @@ class VideoDownloader:
         Returns:
             tuple: (is_list, uid, list_id) 或 (False, None, None)
         """
-        import re
-
         # 匹配B站用户列表URL:
         # https://space.bilibili.com/477348669/lists/2111173?type=season
-        pattern = r"space\.bilibili\.com/(\d+)/lists/(\d+)"
-        match = re.search(pattern, url)
-        if match:
-            uid = match.group(1)
-            list_id = match.group(2)
-            return True, uid, list_id
+        route = route_url(url)
+        if route.platform == "bilibili" and route.kind == "list":
+            return True, route.get("uid"), route.get("list_id")
         return False, None, None
 
     def is_bilibili_user_lists_url(self, url: str) -> tuple:
@@ -3194,15 +2397,11 @@ class VideoDownloader:
         Returns:
             tuple: (is_user_lists, uid) 或 (False, None)
         """
-        import re
-
         # 匹配B站用户合集列表页面URL:
         # https://space.bilibili.com/3546380987533935/lists
-        pattern = r"space\.bilibili\.com/(\d+)/lists/?$"
-        match = re.search(pattern, url)
-        if match:
-            uid = match.group(1)
-            return True, uid
+        route = route_url(url)
+        if route.platform == "bilibili" and route.kind == "user_lists":
+            return True, route.get("uid")
         return False, None
 
     def is_bilibili_ugc_season(self, url: str) -> tuple:
@@ -3214,6 +2413,10 @@ class VideoDownloader:
         import re
         import requests
 
+        # 只有B站链接才可能是合集，避免其他平台链接中的 "BV" 字样触发 API 请求
+        if not self.is_bilibili_url(url):
+            return False, None, None
+
         try:
             # 首先尝试从URL中提取BV号和season_id
             bv_pattern = r'BV[a-zA-Z0-9]+'
@@ -3226,12 +2429,9 @@ class VideoDownloader:
             if not bv_match and ("b23.tv" in url or "b23.wtf" in url):
                 logger.info(f"🔄 检测UGC合集：解析短链接 {url}")
                 try:
-                    headers = {
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                    }
-                    response = requests.get(
-                        url, headers=headers, allow_redirects=True, timeout=10)
-                    real_url = response.url
+                    real_url = get_short_link_resolver().resolve_sync(url)
+                    if not real_url:
+                        return False, None, None
                     logger.info(f"🔄 短链接解析结果: {real_url}")
 
                     # 重新提取BV号和season_id
@@ -3287,6 +2487,8 @@ class VideoDownloader:
         """
         import re
         import yt_dlp
+        if not self.is_bilibili_url(url):
+            return False, None
         try:
             # 首先尝试从URL中提取BV号
             bv_pattern = r'BV[a-zA-Z0-9]+'
@@ -3296,21 +2498,15 @@ class VideoDownloader:
             if not bv_match and ("b23.tv" in url or "b23.wtf" in url):
                 logger.info(f"🔄 检测到B站短链接，先解析获取真实URL: {url}")
                 try:
-                    # 使用yt-dlp解析短链接
-                    temp_opts = {
-                        'quiet': True,
-                        'no_warnings': True,
-                    }
-                    with yt_dlp.YoutubeDL(temp_opts) as ydl:
-                        temp_info = ydl.extract_info(url, download=False)
-
-                    if temp_info.get('webpage_url'):
-                        real_url = temp_info['webpage_url']
+                    # 通过共享的短链接解析器展开（只跟随重定向，不需要 yt-dlp 解析页面）
+                    real_url = get_short_link_resolver().resolve_sync(url)
+                    if real_url:
                         logger.info(f"🔄 短链接解析结果: {real_url}")
                         # 从真实URL中提取BV号
                         bv_match = re.search(bv_pattern, real_url)
                         if bv_match:
                             logger.info(f"✅ 从短链接中提取到BV号: {bv_match.group(0)}")
+                            url = real_url  # 后续的 yt-dlp 检测直接使用真实URL，不再重复跳转
                 except Exception as e:
                     logger.warning(f"⚠️ 解析短链接失败: {e}")
 
@@ -3490,153 +2686,42 @@ class VideoDownloader:
 
     def is_youtube_playlist_url(self, url: str) -> tuple:
         """检查是否为 YouTube 播放列表 URL"""
-        import re
-
-        logger.info(f"🔍 检查是否为YouTube播放列表URL: {url}")
-
-        # 匹配 YouTube 播放列表 URL（支持移动版和桌面版）
-        patterns = [
-            r"(?:(?:m\.)?youtube\.com/playlist\?list=|(?:m\.)?youtube\.com/watch\?.*&list=)([a-zA-Z0-9_-]+)",
-            r"(?:m\.)?youtube\.com/playlist\?list=([a-zA-Z0-9_-]+)",
-        ]
-        for i, pattern in enumerate(patterns, 1):
-            match = re.search(pattern, url)
-            if match:
-                playlist_id = match.group(1)
-                logger.info(f"🎯 模式{i}匹配成功，捕获播放列表ID: {playlist_id}")
-                logger.info(f"📋 检测到播放列表: {playlist_id}")
-                return True, playlist_id
-
-        logger.info("❌ 未检测到播放列表参数")
+        # 匹配 YouTube 播放列表 URL（/playlist?list= 或 /watch?v=...&list=，支持移动版和桌面版）
+        route = route_url(url)
+        if route.platform in ("youtube", "youtubemusic") and route.kind == "playlist":
+            playlist_id = route.get("playlist_id")
+            logger.info(f"📋 检测到播放列表: {playlist_id}")
+            return True, playlist_id
         return False, None
 
     def is_youtube_channel_playlists_url(self, url: str) -> tuple:
         """检查是否为 YouTube 频道播放列表页面 URL 或频道主页 URL"""
-        import re
+        route = route_url(url)
+        if route.platform not in ("youtube", "youtubemusic"):
+            return False, None
 
-        # 首先匹配已经包含 /playlists 的URL（支持移动版和桌面版）
-        playlists_patterns = [
-            r"(?:m\.)?youtube\.com/@([^/\?]+)/playlists",
-            r"(?:m\.)?youtube\.com/c/([^/\?]+)/playlists",
-            r"(?:m\.)?youtube\.com/channel/([^/\?]+)/playlists",
-            r"(?:m\.)?youtube\.com/user/([^/\?]+)/playlists",
-        ]
-        for pattern in playlists_patterns:
-            match = re.search(pattern, url)
-            if match:
-                channel_identifier = match.group(1)
-                return True, url
-
-        # 然后匹配频道主页URL，自动转换为播放列表URL（支持移动版和桌面版）
-        channel_patterns = [
-            r"(?:m\.)?youtube\.com/@([^/\?]+)(?:\?.*)?$",  # @username 格式
-            r"(?:m\.)?youtube\.com/c/([^/\?]+)(?:\?.*)?$",  # /c/channel 格式
-            # /channel/ID 格式
-            r"(?:m\.)?youtube\.com/channel/([^/\?]+)(?:\?.*)?$",
-            # /user/username 格式
-            r"(?:m\.)?youtube\.com/user/([^/\?]+)(?:\?.*)?$",
-        ]
-        for pattern in channel_patterns:
-            match = re.search(pattern, url)
-            if match:
-                channel_identifier = match.group(1)
-                # 构建播放列表URL
-                if "@" in url:
-                    playlists_url = f"https://www.youtube.com/@{channel_identifier}/playlists"
-                elif "/c/" in url:
-                    playlists_url = f"https://www.youtube.com/c/{channel_identifier}/playlists"
-                elif "/channel/" in url:
-                    playlists_url = f"https://www.youtube.com/channel/{channel_identifier}/playlists"
-                elif "/user/" in url:
-                    playlists_url = f"https://www.youtube.com/user/{channel_identifier}/playlists"
-                else:
-                    playlists_url = url
+        # 已经是 /playlists 页面（支持移动版和桌面版）
+        if route.kind == "channel_playlists":
+            return True, url
 
-                logger.info(f"🔍 检测到YouTube频道主页，转换为播放列表URL: {playlists_url}")
-                return True, playlists_url
+        # 频道主页URL（@username、/c/、/channel/、/user/），自动转换为播放列表URL
+        if route.kind == "channel":
+            playlists_url = f"https://www.youtube.com/{route.get('channel')}/playlists"
+            logger.info(f"🔍 检测到YouTube频道主页，转换为播放列表URL: {playlists_url}")
+            return True, playlists_url
         return False, None
 
     def get_download_path(self, url: str) -> Path:
         """根据 URL 确定下载路径"""
-        if self.is_x_url(url):
-            return self.x_download_path.resolve()
-        elif self.is_youtube_url(url):
-            return self.youtube_download_path.resolve()
-        elif self.is_xvideos_url(url):
-            return self.xvideos_download_path.resolve()
-        elif self.is_pornhub_url(url):
-            return self.pornhub_download_path.resolve()
-        elif self.is_bilibili_url(url):
-            return self.bilibili_download_path.resolve()
-        elif self.is_telegraph_url(url):
-            return self.telegraph_download_path.resolve()
-        elif self.is_douyin_url(url):
-            return self.douyin_download_path.resolve()
-        elif self.is_kuaishou_url(url):
-            return self.kuaishou_download_path.resolve()
-        elif self.is_toutiao_url(url):
-            return self.toutiao_download_path.resolve()
-        elif self.is_facebook_url(url):
-            return self.facebook_download_path.resolve()
-        elif self.is_xiaohongshu_url(url):
-            return self.xiaohongshu_download_path.resolve()  # 小红书使用自己的目录
-        elif self.is_weibo_url(url):
-            return self.weibo_download_path.resolve()
-        elif self.is_instagram_url(url):
-            return self.instagram_download_path.resolve()
-        elif self.is_tiktok_url(url):
-            return self.tiktok_download_path.resolve()
-        elif self.is_netease_url(url):
-            return self.netease_download_path.resolve()
-        elif self.is_qqmusic_url(url):
-            return self.qqmusic_download_path.resolve()
-        elif self.is_youtube_music_url(url):
-            return self.youtubemusic_download_path.resolve()
-        elif self.is_apple_music_url(url):
-            return self.apple_music_download_path.resolve()
-        else:
-            return self.youtube_download_path.resolve()
+        platform = route_url(url).platform
+        attr = "apple_music_download_path" if platform == "applemusic" else f"{platform}_download_path"
+        # 不支持的网站和未配置目录的平台使用 YouTube 目录
+        return getattr(self, attr, self.youtube_download_path).resolve()
 
+    @timed_phase("classify")
     def get_platform_name(self, url: str) -> str:
         """获取平台名称"""
-        if self.is_x_url(url):
-            return "x"
-        elif self.is_youtube_url(url):
-            return "youtube"
-        elif self.is_xvideos_url(url):
-            return "xvideos"
-        elif self.is_pornhub_url(url):
-            return "pornhub"
-        elif self.is_bilibili_url(url):
-            return "bilibili"
-        elif self.is_telegraph_url(url):
-            return "telegraph"
-        elif self.is_douyin_url(url):
-            return "douyin"
-        elif self.is_kuaishou_url(url):
-            return "kuaishou"
-        elif self.is_toutiao_url(url):
-            return "toutiao"
-        elif self.is_facebook_url(url):
-            return "facebook"
-        elif self.is_xiaohongshu_url(url):
-            return "xiaohongshu"
-        elif self.is_weibo_url(url):
-            return "weibo"
-        elif self.is_instagram_url(url):
-            return "instagram"
-        elif self.is_tiktok_url(url):
-            return "tiktok"
-        elif self.is_netease_url(url):
-            return "netease"
-        elif self.is_qqmusic_url(url):
-            return "qqmusic"
-        elif self.is_youtube_music_url(url):
-            return "youtubemusic"
-        elif self.is_apple_music_url(url):
-            return "applemusic"
-        else:
-            return "other"
+        return route_url(url).platform
 
     def check_ytdlp_version(self) -> Dict[str, Any]:
         """检查yt-dlp版本"""
@@ -3716,6 +2801,7 @@ class VideoDownloader:
             logger.error(f"格式检查失败: {str(e)}")
             return {"success": False, "error": str(e)}
 
+    @timed_phase("media_info")
     def get_media_info(self, file_path: str) -> Dict[str, Any]:
         """使用 ffprobe 获取媒体文件的详细信息"""
         try:
@@ -3733,37 +2819,15 @@ class VideoDownloader:
             logger.info(f"🔍 开始获取媒体信息: {file_path}")
             logger.info(f"📦 文件大小: {file_size / (1024 * 1024):.2f} MB")
 
-            cmd = [
-                "ffprobe",
-                "-loglevel",
-                "quiet",
-                "-print_format",
-                "json",
-                "-show_format",
-                "-show_streams",
-                str(file_path),
-            ]
-
-            logger.info(f"🔧 执行ffprobe命令: {' '.join(cmd)}")
-            result = subprocess.run(
-                cmd, capture_output=True, text=True, check=True)
-
-            if result.returncode != 0:
-                logger.warning(f"⚠️ ffprobe返回非零状态码: {result.returncode}")
-                logger.warning(f"⚠️ stderr: {result.stderr}")
-
-            info = json.loads(result.stdout)
+            # 共享探测服务：结果按 (路径, 大小, 修改时间) 缓存，并限制同时运行的 ffprobe 数量
+            info = get_media_probe().probe(str(file_path))
             logger.info(f"✅ ffprobe解析成功，流数量: {len(info.get('streams', []))}")
 
             media_info = {}
             if "format" in info:
                 duration = float(info["format"].get("duration", 0))
                 if duration > 0:
-                    media_info["duration"] = (
-                        time.strftime("%H:%M:%S", time.gmtime(duration))
-                        if duration >= 3600
-                        else time.strftime("%M:%S", time.gmtime(duration))
-                    )
+                    media_info["duration"] = format_duration(duration)
                     logger.info(f"⏱️ 视频时长: {media_info['duration']}")
                 size = int(info["format"].get("size", 0) or 0)
                 if size > 0:
@@ -3847,6 +2911,7 @@ class VideoDownloader:
             return media_info
         except (
             subprocess.CalledProcessError,
+            subprocess.TimeoutExpired,
             FileNotFoundError,
             json.JSONDecodeError,
         ) as e:
@@ -3866,6 +2931,27 @@ class VideoDownloader:
                 logger.warning(f"⚠️ 获取文件大小失败: {e2}")
             return {}
 
+    async def get_media_info_async(self, file_path: str, ytdlp_info: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        在协程中获取媒体信息：yt-dlp 已给出分辨率时直接使用，否则在探测线程池中执行 ffprobe
+
+        Args:
+            file_path: 媒体文件路径
+            ytdlp_info: 该文件对应的 yt-dlp 信息字典（可选）
+        """
+        media_info = media_info_from_ytdlp(ytdlp_info)
+        if media_info:
+            logger.debug(f"📊 使用yt-dlp提供的媒体信息: {file_path} -> {media_info}")
+            return media_info
+        return await get_media_probe().run(self.get_media_info, str(file_path))
+
+    async def get_media_infos(self, file_paths, collector: Optional[YtdlpInfoCollector] = None) -> list:
+        """并发获取多个文件的媒体信息（播放列表/合集完成时使用），返回顺序与 file_paths 一致"""
+        return await asyncio.gather(*(
+            self.get_media_info_async(str(path), collector.get(path) if collector else None)
+            for path in file_paths
+        ))
+
     def _extract_resolution_from_filename(self, filename: str) -> str:
         """从文件名中提取分辨率信息"""
         try:
@@ -3936,6 +3022,7 @@ class VideoDownloader:
             logger.warning(f"⚠️ 从文件名提取分辨率时出错: {e}")
             return ""
 
+    @timed_phase("find_file")
     def single_video_find_downloaded_file(
         self, download_path: Path, progress_data: dict = None, expected_title: str = None, url: str = None
     ) -> str:
@@ -4133,11 +3220,19 @@ class VideoDownloader:
             except Exception as e:
                 logger.warning(f"⚠️ 平台特定查找失败: {e}")
 
-        # 4. 最后尝试：扫描下载目录中的所有视频文件
+        # 4. 最后尝试：优先使用目录监视器记录的本次新文件，没有监视器时扫描下载目录中的所有视频文件
+        video_extensions = ['.mp4', '.mkv',
+                            '.webm', '.avi', '.mov', '.m4a', '.mp3']
+        watcher = progress_data.get("watcher") if isinstance(progress_data, dict) else None
+        if watcher is not None:
+            new_files = watcher.completed_files(video_extensions) or watcher.new_files(video_extensions)
+            if new_files:
+                logger.info(f"✅ 从目录监视器找到新文件: {new_files[-1]}")
+                return str(new_files[-1])
+            logger.warning("⚠️ 目录监视器未记录到新的视频文件")
+
         logger.info("🔍 最后尝试：扫描下载目录中的所有视频文件")
         try:
-            video_extensions = ['.mp4', '.mkv',
-                                '.webm', '.avi', '.mov', '.m4a', '.mp3']
             all_files = []
 
             for file_path in download_path.rglob('*'):
@@ -4232,10 +3327,18 @@ class VideoDownloader:
 
             ydl_opts["progress_hooks"] = [progress_hook]
 
+            # 阶段耗时统计：信息提取 / 数据传输 / ffmpeg 合并
+            phase_tracker = get_download_metrics().ytdlp_tracker() if get_download_metrics else None
+            if phase_tracker:
+                ydl_opts["progress_hooks"].append(phase_tracker.progress_hook)
+                ydl_opts["postprocessor_hooks"] = [phase_tracker.postprocessor_hook]
+
             # 开始下载
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                 logger.info(f"🎬 yt-dlp 开始下载 {platform_name} {content_type}...")
                 info = ydl.extract_info(url, download=True)
+                if phase_tracker:
+                    phase_tracker.finish()
 
                 if not info:
                     raise Exception(f"yt-dlp 未获取到{content_type}信息")
@@ -4392,11 +3495,37 @@ class VideoDownloader:
                                     cleaned_count += 1
                                 except Exception as e:
                                     logger.error(f"删除文件失败: {e}")
+            cleaned_count += self._cleanup_indexed_duplicates()
             return cleaned_count
         except Exception as e:
             logger.error(f"清理重复文件失败: {e}")
             return 0
 
+    def _cleanup_indexed_duplicates(self) -> int:
+        """按下载索引中的内容指纹清理重复文件（改名后的文件同样能识别），保留最早下载的一份"""
+        from download_index import fingerprint
+
+        index = get_download_index()
+        cleaned_count = 0
+        for group in index.duplicate_groups():
+            keep = group[0]
+            if not os.path.exists(keep.path):
+                continue
+            for entry in group[1:]:
+                if entry.path == keep.path or not os.path.exists(entry.path):
+                    continue
+                try:
+                    # 删除前重新计算指纹，避免误删已被覆盖的文件
+                    if fingerprint(entry.path) != keep.fingerprint:
+                        continue
+                    os.remove(entry.path)
+                    index.move_path(entry.path, keep.path)
+                    logger.info(f"删除重复文件: {entry.path}（与 {keep.path} 内容相同）")
+                    cleaned_count += 1
+                except Exception as e:
+                    logger.error(f"删除文件失败: {e}")
+        return cleaned_count
+
     def _generate_display_filename(self, original_filename, timestamp):
         """生成用户友好的显示文件名"""
         try:
@@ -4614,7 +3743,7 @@ class VideoDownloader:
         # 自动展开微博短链接
         if self.is_weibo_url(url):
             logger.info(f"🔍 检测到微博URL，开始展开短链接: {url}")
-            expanded_url = self._expand_weibo_short_url(url)
+            expanded_url = await self._expand_weibo_short_url(url)
             if expanded_url != url:
                 logger.info(f"🔄 短链接展开成功: {url} -> {expanded_url}")
                 url = expanded_url
@@ -4654,19 +3783,10 @@ class VideoDownloader:
 
         # 通用URL重定向检测和平台重新识别（完全跳过网易云音乐链接）
         if not self.is_netease_url(url):
-            logger.info(f"🔄 开始URL重定向检测: {url}")
             try:
-                # 使用yt-dlp检测URL重定向
-                temp_opts = {
-                    'quiet': True,
-                    'no_warnings': True,
-                    'extract_flat': True,
-                }
-                with yt_dlp.YoutubeDL(temp_opts) as ydl:
-                    temp_info = ydl.extract_info(url, download=False)
-
-                if temp_info and temp_info.get("webpage_url") and temp_info["webpage_url"] != url:
-                    redirected_url = temp_info["webpage_url"]
+                # 短链接通过共享的短链接解析器展开（有缓存，只跟随重定向，不需要 yt-dlp 解析页面）
+                redirected_url = await get_short_link_resolver().resolve(url) if is_short_link(url) else None
+                if redirected_url and redirected_url != url:
                     logger.info(f"🔄 检测到URL重定向: {url} -> {redirected_url}")
 
                     # 检查重定向后的URL是否为网易云音乐
@@ -4678,6 +3798,10 @@ class VideoDownloader:
                         logger.info(
                             f"🍎 重定向后检测到Apple Music链接，更新URL: {redirected_url}")
                         url = redirected_url
+                    elif route_url(redirected_url).platform == "bilibili":
+                        # B站短链接展开后，合集/多P检测直接使用带BV号的链接
+                        logger.info(f"📺 B站短链接已展开，更新URL: {redirected_url}")
+                        url = redirected_url
                     # 可以添加其他平台的重定向检测
             except Exception as e:
                 logger.info(f"URL重定向检测失败: {e}")
@@ -4694,16 +3818,18 @@ class VideoDownloader:
         # 添加详细的调试日志
         logger.info(f"🔍 download_video 开始处理URL: {url}")
         logger.info(f"🔍 自动下载全集模式: {'开启' if auto_playlist else '关闭'}")
-        # 检查URL类型
-        is_bilibili = self.is_bilibili_url(url)
+        # 检查URL类型（清理/重定向后的链接只路由一次，以下判断都复用同一个结果）
+        route = route_url(url)
+        is_bilibili = route.platform == "bilibili"
         is_list, uid, list_id = self.is_bilibili_list_url(url)
         is_user_lists, user_uid = self.is_bilibili_user_lists_url(url)
-        is_ugc_season, ugc_bv_id, season_id = self.is_bilibili_ugc_season(url)
-        is_multi_part, bv_id = self.is_bilibili_multi_part_video(url)
-        logger.info(f"🔍 即将调用is_youtube_playlist_url检查: {url}")
+        if is_bilibili and route.kind in ("video", "short"):
+            is_ugc_season, ugc_bv_id, season_id = self.is_bilibili_ugc_season(url)
+            is_multi_part, bv_id = self.is_bilibili_multi_part_video(url)
+        else:
+            is_ugc_season, ugc_bv_id, season_id = False, None, None
+            is_multi_part, bv_id = False, None
         is_youtube_playlist, playlist_id = self.is_youtube_playlist_url(url)
-        logger.info(
-            f"🎯 is_youtube_playlist_url返回结果: is_playlist={is_youtube_playlist}, playlist_id={playlist_id}")
 
         # 检查是否为Mix播放列表但功能关闭的情况，需要清理URL
         is_mix_playlist_disabled = False
@@ -4724,13 +3850,15 @@ class VideoDownloader:
             url)
         logger.info(
             f"🔍 YouTube频道识别结果: is_youtube_channel={is_youtube_channel}, channel_url={channel_url}")
-        is_x = self.is_x_url(url)
-        is_telegraph = self.is_telegraph_url(url)
-        is_douyin = self.is_douyin_url(url)
-        is_kuaishou = self.is_kuaishou_url(url)
-        is_facebook = self.is_facebook_url(url)
-        is_netease = self.is_netease_url(url)
-        platform = self.get_platform_name(url)
+        # Mix 播放列表清理后链接可能已变化，重新取路由（命中缓存）
+        route = route_url(url)
+        platform = route.platform
+        is_x = platform == "x"
+        is_telegraph = platform == "telegraph"
+        is_douyin = platform == "douyin"
+        is_kuaishou = platform == "kuaishou"
+        is_facebook = platform == "facebook"
+        is_netease = platform == "netease"
         logger.info(f"🔍 URL识别结果:")
         logger.info(f"  - is_bilibili_url: {is_bilibili}")
         logger.info(
@@ -5154,8 +4282,10 @@ class VideoDownloader:
 
         try:
             loop = asyncio.get_running_loop()
+            # 在复制的上下文中执行，线程中的 timed_phase 阶段仍记到当前任务
             result = await loop.run_in_executor(
                 None,
+                contextvars.copy_context().run,
                 self.smart_download_bilibili,
                 url,
                 str(download_path),
@@ -5441,10 +4571,11 @@ class VideoDownloader:
                     total_size_mb = 0
                     file_info_list = []
                     all_resolutions = set()
-                    for file_path, mtime in video_files:
+                    media_infos = await self.get_media_infos(
+                        [file_path for file_path, _ in video_files])
+                    for (file_path, mtime), media_info in zip(video_files, media_infos):
                         size_mb = os.path.getsize(file_path) / (1024 * 1024)
                         total_size_mb += size_mb
-                        media_info = self.get_media_info(str(file_path))
                         resolution = media_info.get('resolution', '未知')
                         if resolution != '未知':
                             all_resolutions.add(resolution)
@@ -5487,11 +4618,12 @@ class VideoDownloader:
                         total_size_mb = 0
                         file_info_list = []
                         all_resolutions = set()
-                        for file_path, mtime in video_files:
+                        media_infos = await self.get_media_infos(
+                            [file_path for file_path, _ in video_files])
+                        for (file_path, mtime), media_info in zip(video_files, media_infos):
                             size_mb = os.path.getsize(
                                 file_path) / (1024 * 1024)
                             total_size_mb += size_mb
-                            media_info = self.get_media_info(str(file_path))
                             resolution = media_info.get('resolution', '未知')
                             if resolution != '未知':
                                 all_resolutions.add(resolution)
@@ -5525,7 +4657,7 @@ class VideoDownloader:
                         # 只有一个文件，使用单个视频格式
                         video_files.sort(key=lambda x: x[1], reverse=True)
                         final_file_path = str(video_files[0][0])
-                        media_info = self.get_media_info(final_file_path)
+                        media_info = await self.get_media_info_async(final_file_path)
                         size_mb = os.path.getsize(
                             final_file_path) / (1024 * 1024)
                         return {
@@ -5545,6 +4677,29 @@ class VideoDownloader:
             logger.error(f"B站下载失败: {e}")
             return {"success": False, "error": str(e)}
 
+    def _download_index_variant(self, url: str) -> str:
+        """下载索引中的规格：YouTube 音频模式与视频分开记录"""
+        if (self.is_youtube_url(url) and hasattr(self, 'bot')
+                and getattr(self.bot, 'youtube_audio_mode', False)):
+            return "audio"
+        return "video"
+
+    def _indexed_download_result(self, entry, url: str, download_path: Path) -> Dict[str, Any]:
+        """把下载索引中的记录转换为与实际下载相同格式的结果"""
+        logger.info(f"🗂️ 下载索引命中，跳过下载: {entry.platform}:{entry.media_id} -> {entry.path}")
+        return {
+            "success": True,
+            "filename": os.path.basename(entry.path),
+            "full_path": entry.path,
+            "size_mb": entry.size / (1024 * 1024),
+            "platform": self.get_platform_name(url),
+            "download_path": str(download_path),
+            "resolution": entry.result.get("resolution", "未知"),
+            "abr": entry.result.get("abr"),
+            "title": entry.title,
+            "from_index": True,
+        }
+
     async def _download_single_video(
         self, url: str, download_path: Path, message_updater=None, no_playlist: bool = False, status_message=None, context=None
     ) -> Dict[str, Any]:
@@ -5582,7 +4737,21 @@ class VideoDownloader:
                 "platform": "YouTubeMusic",
                 "content_type": "music"
             }
+
+        # 0. 查询下载索引：同一媒体已经下载过且文件仍在时直接返回，不发起网络请求
+        route = route_url(url)
+        index_variant = self._download_index_variant(url)
+        video_id = media_id_from_route(route)
+        # 索引项失效时会在磁盘上查找被移动的文件，放到线程中执行以免阻塞事件循环
+        loop = asyncio.get_running_loop()
+        indexed = await loop.run_in_executor(
+            None, lambda: (get_download_index().lookup(route.platform, video_id, index_variant) if video_id
+                           else get_download_index().lookup_url(url, index_variant)))
+        if indexed:
+            return self._indexed_download_result(indexed, url, download_path)
+
         # 1. 预先获取信息以确定文件名
+        prefetched_info = None
         try:
             logger.info("🔍 步骤1: 预先获取视频信息...")
             info_opts = {
@@ -5647,6 +4816,7 @@ class VideoDownloader:
                     loop.run_in_executor(None, extract_video_info), timeout=60.0
                 )
                 logger.info(f"✅ 视频信息获取完成，数据类型: {type(info)}")
+                prefetched_info = info
 
                 video_id = info.get("id")
                 title = info.get("title")
@@ -5657,6 +4827,14 @@ class VideoDownloader:
                     title = self._sanitize_filename(video_id)
                 logger.info(f"📝 视频标题: {title}")
                 logger.info(f"🆔 视频ID: {video_id}")
+
+                # 链接中无法直接得到ID的平台（短链接等），拿到ID后再查一次索引
+                indexed = await loop.run_in_executor(
+                    None, get_download_index().lookup, route.platform, video_id, index_variant)
+                if indexed:
+                    await loop.run_in_executor(
+                        None, get_download_index().remember_url, url, route.platform, video_id, index_variant)
+                    return self._indexed_download_result(indexed, url, download_path)
             except asyncio.TimeoutError:
                 logger.error("❌ 获取视频信息超时（60秒）")
                 return {
@@ -5837,9 +5015,8 @@ class VideoDownloader:
             # HLS下载特殊配置
             "hls_use_mpegts": False,  # 使用mp4容器而不是ts
             "hls_prefer_native": True,  # 优先使用原生HLS下载器
-            "concurrent_fragment_downloads": 3,  # 并发下载分片数量
+            # 并发分片数、分块大小和多连接下载由下面的吞吐策略设置
             "buffersize": 1024,  # 缓冲区大小
-            "http_chunk_size": 10485760,  # 10MB分块大小
 
             # 🎯 修复：移除extractor_args，让yt-dlp使用默认配置获取最高质量
             # 注释掉extractor_args，避免iOS客户端限制格式选择
@@ -5852,6 +5029,13 @@ class VideoDownloader:
             # },
         }
 
+        # 按平台、协议和文件大小选择吞吐策略（分片并发 / 多连接），并记入任务指标
+        strategy = get_throughput_planner().plan(route.platform, prefetched_info)
+        strategy.apply(ydl_opts)
+        if get_download_metrics:
+            get_download_metrics().record_strategy(strategy.to_dict())
+        logger.info(f"🚀 下载策略: {strategy.name}（{strategy.describe()}，{strategy.reason}）")
+
         # 如果是音频模式，添加音频转换后处理器
         if self.is_youtube_url(url) and hasattr(self, 'bot') and hasattr(self.bot, 'youtube_audio_mode') and self.bot.youtube_audio_mode:
             ydl_opts["postprocessors"] = [
@@ -6047,6 +5231,17 @@ class VideoDownloader:
 
         ydl_opts['progress_hooks'] = [progress_hook]
         logger.info("✅ 进度回调已设置")
+
+        # 阶段耗时统计：在协程中创建，回调在下载线程中执行
+        phase_tracker = get_download_metrics().ytdlp_tracker() if get_download_metrics else None
+        if phase_tracker:
+            ydl_opts['progress_hooks'].append(phase_tracker.progress_hook)
+            ydl_opts['postprocessor_hooks'] = [phase_tracker.postprocessor_hook]
+        # 收集最终文件的 yt-dlp 信息，完成后可直接得到分辨率而不必再运行 ffprobe
+        info_collector = YtdlpInfoCollector()
+        ydl_opts.setdefault('postprocessor_hooks', []).append(info_collector.postprocessor_hook)
+        # 监视输出目录，下载后直接从新文件中查找结果，不必扫描整个下载目录
+        progress_data["watcher"] = watch_directory(Path(outtmpl).parent, recursive=False)
         # 4. 运行下载
         logger.info("🔍 步骤4: 开始下载视频（设置60秒超时）...")
 
@@ -6065,6 +5260,8 @@ class VideoDownloader:
 
                     # 开始下载
                     ydl.download([url])
+                    if phase_tracker:
+                        phase_tracker.finish()
                 return True
             except KeyboardInterrupt:
                 # 🎯 关键修复：处理用户取消
@@ -6081,23 +5278,28 @@ class VideoDownloader:
 
         # 设置60秒超时用于下载
         try:
+            # 复制当前上下文，下载线程中的日志和指标仍归属到当前任务
             success = await asyncio.wait_for(
                 # 增加到10分钟
-                loop.run_in_executor(None, run_download), timeout=600.0
+                loop.run_in_executor(None, contextvars.copy_context().run, run_download), timeout=600.0
             )
+            if success:
+                await asyncio.sleep(1)  # 等待文件系统同步
         except asyncio.TimeoutError:
             logger.error("❌ 视频下载超时（10分钟）")
             return {
                 "success": False,
                 "error": "视频下载超时，请检查网络连接或稍后重试。",
             }
+        finally:
+            # 取消或出错时也结束监视
+            progress_data["watcher"].stop()
         if not success:
             error = progress_data.get("error", "下载器在执行时发生未知错误") if progress_data and isinstance(
                 progress_data, dict) else "下载器在执行时发生未知错误"
             return {"success": False, "error": error}
         # 5. 查找文件并返回结果
         logger.info("🔍 步骤5: 查找下载的文件...")
-        time.sleep(1)  # 等待文件系统同步
 
         # 使用单视频文件查找方法
         final_file_path = self.single_video_find_downloaded_file(
@@ -6106,7 +5308,8 @@ class VideoDownloader:
         # 处理最终文件
         if final_file_path and os.path.exists(final_file_path):
             logger.info("🔍 步骤6: 获取媒体信息...")
-            media_info = self.get_media_info(final_file_path)
+            media_info = await self.get_media_info_async(
+                final_file_path, info_collector.get(final_file_path))
 
             # 安全地获取文件大小
             try:
@@ -6115,6 +5318,14 @@ class VideoDownloader:
             except (OSError, TypeError):
                 size_mb = 0.0
 
+            # 记录到下载索引（计算内容指纹需要读文件，放到线程中执行）
+            if video_id:
+                await asyncio.get_running_loop().run_in_executor(
+                    None, lambda: get_download_index().record(
+                        route.platform, video_id, final_file_path, index_variant, url=url, title=title,
+                        result={"resolution": media_info.get("resolution", "未知"),
+                                "abr": media_info.get("bit_rate")}))
+
             logger.info("🎉 视频下载任务完成!")
             return {
                 "success": True,
@@ -6400,8 +5611,9 @@ class VideoDownloader:
                 logger.info(f"    📋 播放列表ID: {playlist_id}")
 
                 # 先检查播放列表是否已完整下载
-                check_result = self._check_playlist_already_downloaded(
-                    playlist_id, channel_path)
+                check_result = await asyncio.get_running_loop().run_in_executor(
+                    None, contextvars.copy_context().run,
+                    self._check_playlist_already_downloaded, playlist_id, channel_path)
 
                 if message_updater:
                     try:
@@ -7075,7 +6287,6 @@ class VideoDownloader:
     ):
         """智能下载B站视频，支持单视频、分集、合集"""
         import re
-        import subprocess
         import os
         import threading
         import asyncio
@@ -7115,118 +6326,93 @@ class VideoDownloader:
                 final_download_path = Path(download_path) / safe_playlist_title
                 final_download_path.mkdir(parents=True, exist_ok=True)
                 logger.info(f"📁 为合集创建下载目录: {final_download_path}")
-                # 使用yt-dlp print记录文件名的方案（与多P下载保持一致）
+                # 进程内批量下载：每个工作线程复用一个 YoutubeDL，每个视频只提取一次，
+                # 实际文件名直接取自下载后的信息字典（与多P下载保持一致的 "序号. 标题" 命名）
                 success_count = 0
                 downloaded_files = []  # 记录实际下载的文件信息
 
+                # 创建安全的进度回调函数，避免 'NoneType' object is not callable 错误
+                def safe_progress_hook(d):
+                    try:
+                        if progress_callback and callable(progress_callback):
+                            if asyncio.iscoroutinefunction(progress_callback):
+                                # 异步函数处理
+                                try:
+                                    loop = asyncio.get_running_loop()
+                                    asyncio.run_coroutine_threadsafe(
+                                        progress_callback(d), loop)
+                                except RuntimeError:
+                                    logger.warning("没有运行的事件循环，跳过异步进度回调")
+                            else:
+                                # 同步函数，直接调用
+                                progress_callback(d)
+                        # 如果progress_callback为None或不可调用，静默忽略
+                    except Exception as e:
+                        logger.error(f"B站下载进度回调错误: {e}")
+
+                ydl_opts_list = {
+                    'outtmpl': str(final_download_path / "%(list_index)02d. %(list_title)s.%(ext)s"),
+                    'merge_output_format': 'mp4',
+                    'quiet': False,
+                    'no_warnings': False,
+                    'progress_hooks': [safe_progress_hook],
+                    # 🎯 B站4K支持：使用多策略格式选择，优先4K，回退到会员/非会员可用格式
+                    'format': self._get_bilibili_best_format(),
+                }
+
+                # 添加代理和cookies配置
+                if self.proxy_host:
+                    ydl_opts_list['proxy'] = self.proxy_host
+                if self.b_cookies_path and os.path.exists(self.b_cookies_path):
+                    ydl_opts_list['cookiefile'] = self.b_cookies_path
+
+                items = []
                 for idx, (bv, title) in enumerate(bv_list, 1):
                     safe_title = re.sub(r'[\\/:*?"<>|]', "", title)[:60]
-                    # 使用绝对路径构建输出模板
-                    outtmpl = str(
-                        final_download_path /
-                        f"{idx:02d}. {safe_title}.%(ext)s"
-                    )
+                    items.append((f"https://www.bilibili.com/video/{bv}",
+                                  {'list_index': idx, 'list_title': safe_title}))
+                logger.info(f"📝 文件名模板: {ydl_opts_list['outtmpl']}")
 
-                    # 更新下载进度显示
+                def on_item_done(item):
                     if progress_callback:
-                        progress_callback({
+                        safe_progress_hook({
                             'status': 'downloading',
-                            'filename': f'{idx:02d}. {safe_title}',
-                            '_percent_str': f'{idx}/{len(bv_list)}',
-                            '_eta_str': f'第{idx}个，共{len(bv_list)}个',
-                            'info_dict': {'title': title}
+                            'filename': os.path.basename(item.filepath or ''),
+                            '_percent_str': f'{item.index}/{len(bv_list)}',
+                            '_eta_str': f'第{item.index}个，共{len(bv_list)}个',
+                            'info_dict': {'title': bv_list[item.index - 1][1]}
                         })
 
-                    # 1. 先用yt-dlp print获取实际文件名
-                    video_url = f"https://www.bilibili.com/video/{bv}"
-                    cmd_print = [
-                        "yt-dlp", "--print", "filename", "-o", outtmpl, video_url
-                    ]
-
-                    try:
-                        print_result = subprocess.run(
-                            cmd_print, capture_output=True, text=True, cwd=str(final_download_path))
-                        if print_result.returncode == 0:
-                            full_expected_path = print_result.stdout.strip()
-                            # 只保留文件名部分，不包含路径
-                            expected_filename = os.path.basename(
-                                full_expected_path)
-                            logger.info(f"📝 预期文件名: {expected_filename}")
-                        else:
-                            # 如果print失败，使用构造的文件名
-                            expected_filename = f"{idx:02d}. {safe_title}.mp4"
-                            logger.warning(
-                                f"⚠️ print文件名失败，使用构造文件名: {expected_filename}")
-                    except Exception as e:
-                        expected_filename = f"{idx:02d}. {safe_title}.mp4"
-                        logger.warning(
-                            f"⚠️ print文件名异常: {e}，使用构造文件名: {expected_filename}")
-
-                    # 2. 执行下载（使用yt-dlp Python API支持进度回调）
-                    # 创建安全的进度回调函数，避免 'NoneType' object is not callable 错误
-                    def safe_progress_hook(d):
-                        try:
-                            if progress_callback and callable(progress_callback):
-                                if asyncio.iscoroutinefunction(progress_callback):
-                                    # 异步函数处理
-                                    try:
-                                        loop = asyncio.get_running_loop()
-                                        asyncio.run_coroutine_threadsafe(
-                                            progress_callback(d), loop)
-                                    except RuntimeError:
-                                        logger.warning("没有运行的事件循环，跳过异步进度回调")
-                                else:
-                                    # 同步函数，直接调用
-                                    progress_callback(d)
-                            # 如果progress_callback为None或不可调用，静默忽略
-                        except Exception as e:
-                            logger.error(f"B站下载进度回调错误: {e}")
-
-                    ydl_opts_single = {
-                        'outtmpl': outtmpl,
-                        'merge_output_format': 'mp4',
-                        'quiet': False,
-                        'no_warnings': False,
-                        'progress_hooks': [safe_progress_hook],
-                        # 🎯 B站4K支持：使用多策略格式选择，优先4K，回退到会员/非会员可用格式
-                        'format': self._get_bilibili_best_format(),
-                    }
-
-                    # 添加代理和cookies配置
-                    if self.proxy_host:
-                        ydl_opts_single['proxy'] = self.proxy_host
-                if self.b_cookies_path and os.path.exists(self.b_cookies_path):
-                    ydl_opts_single['cookiefile'] = self.b_cookies_path
-
-                    logger.info(f"🚀 下载第{idx}个: {bv} - {title}")
-                    logger.info(f"📝 文件名模板: {outtmpl}")
+                workers = list_download_workers()
+                logger.info(f"🚀 开始批量下载 {len(bv_list)} 个视频（并发 {workers}）")
+                with YtdlpBatch(ydl_opts_list, max_workers=workers) as batch:
+                    results = batch.download_all(items, on_result=on_item_done)
 
-                    try:
-                        # 使用yt-dlp Python API，支持进度回调
-                        with yt_dlp.YoutubeDL(ydl_opts_single) as ydl:
-                            ydl.download([video_url])
-                        success_count += 1
-                        logger.info(f"✅ 第{idx}个下载成功")
+                for item in results:
+                    bv, title = bv_list[item.index - 1]
+                    if not item.success:
+                        logger.error(f"❌ 第{item.index}个下载失败: {bv} - {item.error}")
+                        continue
+                    success_count += 1
+                    logger.info(f"✅ 第{item.index}个下载成功: {bv} - {title}")
 
-                        # 3. 根据预期文件名查找实际文件
-                        expected_path = final_download_path / expected_filename
-                        if expected_path.exists():
-                            size_mb = os.path.getsize(
-                                expected_path) / (1024 * 1024)
-                            media_info = self.get_media_info(
-                                str(expected_path))
-                            downloaded_files.append({
-                                'filename': expected_filename,
-                                'size_mb': size_mb,
-                                'resolution': media_info.get('resolution', '未知'),
-                                'abr': media_info.get('bit_rate')
-                            })
-                            logger.info(
-                                f"📁 记录文件: {expected_filename} ({size_mb:.1f}MB)")
-                        else:
-                            logger.warning(f"⚠️ 预期文件不存在: {expected_filename}")
-                    except Exception as e:
-                        logger.error(f"❌ 第{idx}个下载失败: {e}")
+                    # 根据下载后的实际文件名记录文件信息
+                    expected_path = Path(item.filepath) if item.filepath else None
+                    if expected_path and expected_path.exists():
+                        size_mb = os.path.getsize(
+                            expected_path) / (1024 * 1024)
+                        media_info = self.get_media_info(
+                            str(expected_path))
+                        downloaded_files.append({
+                            'filename': expected_path.name,
+                            'size_mb': size_mb,
+                            'resolution': media_info.get('resolution', '未知'),
+                            'abr': media_info.get('bit_rate')
+                        })
+                        logger.info(
+                            f"📁 记录文件: {expected_path.name} ({size_mb:.1f}MB)")
+                    else:
+                        logger.warning(f"⚠️ 下载后的文件不存在: {item.filepath}")
 
                 logger.info(
                     f"🎉 BV号循环法下载完成: {success_count}/{len(bv_list)} 个成功"
@@ -7276,16 +6462,10 @@ class VideoDownloader:
             if "b23.tv" in url or "b23.wtf" in url:
                 logger.info("🔄 检测到B站短链接，尝试提取BV号...")
                 try:
-                    # 先获取重定向后的URL
-                    temp_opts = {
-                        "quiet": True,
-                        "no_warnings": True,
-                    }
-                    with yt_dlp.YoutubeDL(temp_opts) as ydl:
-                        temp_info = ydl.extract_info(url, download=False)
+                    # 通过共享的短链接解析器获取重定向后的URL（只跟随重定向，不需要 yt-dlp 解析页面）
+                    redirected_url = get_short_link_resolver().resolve_sync(url)
 
-                    if temp_info.get("webpage_url"):
-                        redirected_url = temp_info["webpage_url"]
+                    if redirected_url:
                         logger.info(f"🔄 短链接重定向到: {redirected_url}")
 
                         # 从重定向URL中提取BV号
@@ -7333,78 +6513,31 @@ class VideoDownloader:
             count = len(entries) if entries else 1
             logger.info(f"📋 检测到 {count} 个视频")
 
-            # 如果只有一个视频，尝试anthology检测和强制playlist检测
-            if count == 1:
-                # 特殊检测：使用模拟下载检测anthology
-                logger.info("🔍 使用模拟下载检测anthology...")
-                anthology_detected = False
+            # 如果只有一个视频且检测时阻止了playlist，允许playlist再提取一次（进程内）：
+            # B站 anthology（多P）此时会返回多个条目，直接从信息字典判断，无需模拟下载
+            if count == 1 and not auto_playlist:
+                force_check_opts = {
+                    "quiet": True,
+                    "flat_playlist": True,
+                    "extract_flat": True,
+                    "noplaylist": False,
+                    "yes_playlist": True,
+                }
+
                 try:
-                    # 捕获yt-dlp的输出来检测anthology
-                    cmd_simulate = ['yt-dlp', '--simulate',
-                                    '--verbose', original_url]
-                    result = subprocess.run(
-                        cmd_simulate, capture_output=True, text=True)
-                    output = result.stdout + result.stderr
-
-                    if 'extracting videos in anthology' in output.lower():
-                        anthology_detected = True
-                        logger.info("✅ 检测到anthology关键词，这是一个合集")
+                    with yt_dlp.YoutubeDL(force_check_opts) as ydl:
+                        force_info = ydl.extract_info(
+                            original_url, download=False)
+                    if is_anthology(force_info):
+                        force_entries = force_info.get("entries", [])
+                        logger.info(f"✅ 检测到anthology，这是一个合集，共 {len(force_entries)} 个视频")
+                        entries = force_entries
+                        count = len(force_entries)
+                        info = force_info
                     else:
-                        logger.info("❌ 未检测到anthology关键词")
-
+                        logger.info("❌ 未检测到anthology")
                 except Exception as e:
                     logger.warning(f"⚠️ anthology检测失败: {e}")
-
-                # 如果检测到anthology或开启了auto_playlist，尝试强制检测playlist
-                if anthology_detected or auto_playlist:
-                    if anthology_detected:
-                        logger.info("🔄 检测到anthology，强制使用合集模式")
-                    else:
-                        logger.info("🔄 开启自动下载全集，尝试强制检测playlist...")
-
-                    force_check_opts = {
-                        "quiet": True,
-                        "flat_playlist": True,
-                        "extract_flat": True,
-                        "print": "%(id)s %(title)s",
-                        "noplaylist": False,
-                        "yes_playlist": True,
-                    }
-
-                    try:
-                        with yt_dlp.YoutubeDL(force_check_opts) as ydl:
-                            force_info = ydl.extract_info(
-                                original_url, download=False)
-                        force_entries = force_info.get("entries", [])
-                        force_count = len(
-                            force_entries) if force_entries else 1
-
-                        if force_count > count:
-                            logger.info(f"🔄 强制检测成功！检测到 {force_count} 个视频")
-                            entries = force_entries
-                            count = force_count
-                            info = force_info
-                        elif anthology_detected:
-                            # 检测到anthology，但需要进一步确认是否真的是多集
-                            logger.info("🔄 anthology检测成功，但需要确认是否真的是多集")
-                            # 不强制设置count，保持原有的检测结果
-                            if count <= 1:
-                                logger.info("🔍 anthology检测到，但实际只有1集，按单集处理")
-                            else:
-                                logger.info(
-                                    f"🔍 anthology检测到，确认有{count}集，按合集处理")
-                    except Exception as e:
-                        logger.warning(f"⚠️ 强制检测失败: {e}")
-                        if anthology_detected:
-                            # 如果anthology检测成功但强制检测失败，需要谨慎处理
-                            logger.info("🔄 anthology检测成功，但强制检测失败，按实际检测结果处理")
-                            # 不强制设置count，保持原有的检测结果
-                            if count <= 1:
-                                logger.info(
-                                    "🔍 anthology检测到但强制检测失败，且实际只有1集，按单集处理")
-                            else:
-                                logger.info(
-                                    f"🔍 anthology检测到，实际有{count}集，按合集处理")
             playlist_title = info.get("title", "Unknown Playlist")
             safe_playlist_title = re.sub(
                 r'[\\/:*?"<>|]', "_", playlist_title).strip()
@@ -7701,7 +6834,6 @@ class VideoDownloader:
         Returns:
             bool: 下载是否成功
         """
-        import subprocess
         import re
 
         logger.info(f"🔧 使用BV号循环法下载B站列表:")
@@ -7715,31 +6847,37 @@ class VideoDownloader:
             logger.error("❌ 未找到任何视频")
             return False
 
-        logger.info(f"📦 找到 {len(bv_list)} 个视频，开始逐个下载")
+        logger.info(f"📦 找到 {len(bv_list)} 个视频，开始下载")
 
-        # 2. 依次下载每个BV号
-        success_count = 0
+        # 2. 在进程内的有界线程池中下载所有BV号
+        ydl_opts = {
+            "outtmpl": str(Path(download_path) / "%(list_index)02d. %(list_title)s.%(ext)s"),
+            "merge_output_format": "mp4",
+        }
+        if self.proxy_host:
+            ydl_opts["proxy"] = self.proxy_host
+        if self.b_cookies_path and os.path.exists(self.b_cookies_path):
+            ydl_opts["cookiefile"] = self.b_cookies_path
+
+        items = []
         for idx, (bv, title) in enumerate(bv_list, 1):
             # 清理标题中的非法字符
             safe_title = re.sub(r'[\\/:*?"<>|]', "", title)[:60]
-            outtmpl = f"{idx:02d}. {safe_title}.%(ext)s"
-            cmd_dl = [
-                "yt-dlp",
-                "-o",
-                outtmpl,
-                "--merge-output-format",
-                "mp4",
-                f"https://www.bilibili.com/video/{bv}",
-            ]
-            logger.info(f"🚀 下载第{idx}个: {bv} - {title}")
-            logger.info(f"📝 文件名模板: {outtmpl}")
+            items.append((f"https://www.bilibili.com/video/{bv}",
+                          {"list_index": idx, "list_title": safe_title}))
+        logger.info(f"📝 文件名模板: {ydl_opts['outtmpl']}")
 
-            result = subprocess.run(cmd_dl, cwd=download_path)
-            if result.returncode == 0:
+        with YtdlpBatch(ydl_opts, max_workers=list_download_workers()) as batch:
+            results = batch.download_all(items)
+
+        success_count = 0
+        for item in results:
+            bv, title = bv_list[item.index - 1]
+            if item.success:
                 success_count += 1
-                logger.info(f"✅ 第{idx}个下载成功")
+                logger.info(f"✅ 第{item.index}个下载成功: {bv} - {title}")
             else:
-                logger.error(f"❌ 第{idx}个下载失败")
+                logger.error(f"❌ 第{item.index}个下载失败: {bv} - {item.error}")
 
         logger.info(f"🎉 BV号循环法下载完成: {success_count}/{len(bv_list)} 个成功")
         return success_count > 0
@@ -8010,6 +7148,7 @@ class VideoDownloader:
                     loop = asyncio.get_running_loop()
                     result = await loop.run_in_executor(
                         None,
+                        contextvars.copy_context().run,
                         self.smart_download_bilibili_for_ugc,
                         video_url,
                         str(season_download_path),
@@ -8090,7 +7229,7 @@ class VideoDownloader:
                             file_path = season_download_path / actual_filename
                             if file_path.exists():
                                 # 使用现有的get_media_info方法检测视频信息
-                                media_info = self.get_media_info(
+                                media_info = await self.get_media_info_async(
                                     str(file_path))
                                 resolution_info = media_info.get(
                                     'resolution', '')
@@ -8206,7 +7345,7 @@ class VideoDownloader:
                                 f"🔍 使用get_media_info检测分辨率: {file_path}")
 
                             # 使用现有的get_media_info方法
-                            media_info = self.get_media_info(file_path)
+                            media_info = await self.get_media_info_async(file_path)
                             if media_info.get('resolution'):
                                 resolution_display = media_info['resolution']
                                 logger.info(f"✅ 成功获取分辨率: {resolution_display}")
@@ -9867,8 +9006,10 @@ class VideoDownloader:
         try:
             # 检查播放列表是否已经完整下载
             logger.info("🔍 检查播放列表是否已完整下载...")
-            check_result = self._check_playlist_already_downloaded(
-                playlist_id, download_path
+            # 检查需要获取播放列表信息并探测已有文件，放到线程中执行，不阻塞事件循环
+            check_result = await asyncio.get_running_loop().run_in_executor(
+                None, contextvars.copy_context().run,
+                self._check_playlist_already_downloaded, playlist_id, download_path
             )
 
             if check_result.get("already_downloaded", False):
@@ -9992,6 +9133,9 @@ class VideoDownloader:
 
             logger.info(f"📋 预期文件列表: {len(expected_files)} 个文件")
 
+            # 收集每个文件的 yt-dlp 信息，完成后统计分辨率时不必逐个运行 ffprobe
+            info_collector = YtdlpInfoCollector()
+
             # 下载播放列表（带进度回调）
             def download_playlist():
                 logger.info("🚀 开始下载播放列表...")
@@ -10064,8 +9208,9 @@ class VideoDownloader:
                     logger.info(
                         f"🎯 [FORMAT_FIX] 已设置format到base_opts: {format_spec}")
 
-                ydl_opts = self._get_enhanced_ydl_opts(base_opts)
+                ydl_opts = self._get_enhanced_ydl_opts(base_opts, platform="youtube")
                 logger.info("🛡️ 使用增强配置，避免PART文件产生")
+                ydl_opts.setdefault("postprocessor_hooks", []).append(info_collector.postprocessor_hook)
 
                 # 如果是音频模式，添加音频转换后处理器
                 if hasattr(self, 'bot') and hasattr(self.bot, 'youtube_audio_mode') and self.bot.youtube_audio_mode:
@@ -10175,12 +9320,6 @@ class VideoDownloader:
                         file_size_mb = file_size / (1024 * 1024)
                         total_size_mb += file_size_mb
 
-                        # 获取媒体信息
-                        media_info = self.get_media_info(str(actual_path))
-                        resolution = media_info.get('resolution', '未知')
-                        if resolution != '未知':
-                            all_resolutions.add(resolution)
-
                         downloaded_files.append({
                             "filename": actual_path.name,  # 使用实际文件名
                             "path": str(actual_path),      # 使用实际路径
@@ -10194,6 +9333,13 @@ class VideoDownloader:
                 except Exception as e:
                     logger.warning(f"⚠️ 无法检查预期文件: {actual_path.name}, 错误: {e}")
 
+            # 获取媒体信息：优先使用 yt-dlp 提供的信息，其余文件并发探测
+            for media_info in await self.get_media_infos(
+                    [file_info["path"] for file_info in downloaded_files], info_collector):
+                resolution = media_info.get('resolution', '未知')
+                if resolution != '未知':
+                    all_resolutions.add(resolution)
+
             # 计算分辨率显示
             resolution = ', '.join(
                 sorted(all_resolutions)) if all_resolutions else '未知'
@@ -10309,7 +9455,12 @@ class VideoDownloader:
 
             logger.info(f"📁 检查播放列表目录: {playlist_path}")
 
-            # 使用预期文件名检查文件是否存在（和下载逻辑一致）
+            # 先查询下载索引，未命中时再使用预期文件名检查文件是否存在（和下载逻辑一致）
+            index = get_download_index()
+            index_variant = self._download_index_variant(
+                f"https://www.youtube.com/playlist?list={playlist_id}")
+            # 通过文件名找到、需要补记到下载索引的文件 (video_id, 路径, 标题)
+            unindexed_files = []
             missing_files = []
             existing_files = []
             total_size_mb = 0
@@ -10342,6 +9493,19 @@ class VideoDownloader:
                 expected_path = playlist_path / expected_filename
                 title = expected_file['title']
 
+                indexed = index.lookup("youtube", expected_file['id'], index_variant) if expected_file['id'] else None
+                if indexed:
+                    file_size_mb = indexed.size / (1024 * 1024)
+                    total_size_mb += file_size_mb
+                    existing_files.append({
+                        "filename": os.path.basename(indexed.path),
+                        "path": indexed.path,
+                        "size_mb": file_size_mb,
+                        "video_title": title,
+                    })
+                    logger.info(f"🗂️ 下载索引命中: {indexed.path} ({file_size_mb:.2f}MB)")
+                    continue
+
                 if expected_path.exists():
                     try:
                         file_size = expected_path.stat().st_size
@@ -10349,19 +9513,13 @@ class VideoDownloader:
                             file_size_mb = file_size / (1024 * 1024)
                             total_size_mb += file_size_mb
 
-                            # 获取媒体信息
-                            media_info = self.get_media_info(
-                                str(expected_path))
-                            resolution = media_info.get('resolution', '未知')
-                            if resolution != '未知':
-                                all_resolutions.add(resolution)
-
                             existing_files.append({
                                 "filename": expected_filename,
                                 "path": str(expected_path),
                                 "size_mb": file_size_mb,
                                 "video_title": title,
                             })
+                            unindexed_files.append((expected_file['id'], str(expected_path), title))
                             logger.info(
                                 f"✅ 找到文件: {expected_filename} ({file_size_mb:.2f}MB)")
                         else:
@@ -10393,20 +9551,13 @@ class VideoDownloader:
                                             (1024 * 1024)
                                         total_size_mb += file_size_mb
 
-                                        # 获取媒体信息
-                                        media_info = self.get_media_info(
-                                            str(file_path))
-                                        resolution = media_info.get(
-                                            'resolution', '未知')
-                                        if resolution != '未知':
-                                            all_resolutions.add(resolution)
-
                                         existing_files.append({
                                             "filename": actual_filename,
                                             "path": str(file_path),
                                             "size_mb": file_size_mb,
                                             "video_title": title,
                                         })
+                                        unindexed_files.append((expected_file['id'], str(file_path), title))
                                         logger.info(
                                             f"✅ 通过模糊匹配找到文件: {actual_filename} ({file_size_mb:.2f}MB)")
                                         found = True
@@ -10421,6 +9572,12 @@ class VideoDownloader:
                             f"{expected_file['index']}. {title}")
                         logger.warning(f"⚠️ 未找到文件: {expected_filename}")
 
+            # 按文件名找到的文件补记到下载索引，下次检查（以及单视频下载）直接命中索引
+            for video_id, found_path, video_title in unindexed_files:
+                if video_id:
+                    index.record("youtube", video_id, found_path, index_variant,
+                                 url=f"https://www.youtube.com/watch?v={video_id}", title=video_title)
+
             # 计算完成度
             total_videos = len(expected_files)
             downloaded_videos = len(existing_files)
@@ -10437,31 +9594,21 @@ class VideoDownloader:
             if completion_rate >= 95:
                 logger.info(f"✅ 播放列表已完整下载 ({completion_rate:.1f}%)")
 
+                # 只有判定为已下载时才需要分辨率：在探测线程池中并发获取（结果有缓存）
+                for media_info in get_media_probe().map(
+                        self.get_media_info, [file_info["path"] for file_info in existing_files]):
+                    resolution = media_info.get('resolution', '未知')
+                    if resolution != '未知':
+                        all_resolutions.add(resolution)
+
                 # 计算分辨率信息
                 resolution = ', '.join(
                     sorted(all_resolutions)) if all_resolutions else '未知'
                 if existing_files:
                     try:
-                        import subprocess
-
                         first_file_path = existing_files[0]["path"]
-                        result = subprocess.run(
-                            [
-                                "ffprobe",
-                                "-v",
-                                "quiet",
-                                "-print_format",
-                                "json",
-                                "-show_streams",
-                                first_file_path,
-                            ],
-                            capture_output=True,
-                            text=True,
-                        )
-                        if result.returncode == 0:
-                            import json
-
-                            data = json.loads(result.stdout)
+                        data = get_media_probe().probe(first_file_path)
+                        if data:
                             for stream in data.get("streams", []):
                                 if stream.get("codec_type") == "video":
                                     width = stream.get("width", 0)
@@ -10530,6 +9677,7 @@ class VideoDownloader:
                 "error": "gallery-dl 未安装，无法下载图片。请运行: pip install gallery-dl"
             }
 
+        watcher = None
         try:
             # 确保下载目录存在
             download_path.mkdir(parents=True, exist_ok=True)
@@ -10565,19 +9713,10 @@ class VideoDownloader:
                 actual_download_dir = str(download_path)
                 logger.info(f"🎯 使用默认下载目录: {actual_download_dir}")
 
-            # 记录下载前的文件
+            # 监视下载目录：只处理本次下载新出现的文件，不再遍历已有文件
             actual_download_path = Path(actual_download_dir)
-            before_files = set()
-            if actual_download_path.exists():
-                for file_path in actual_download_path.rglob("*"):
-                    if file_path.is_file():
-                        relative_path = str(
-                            file_path.relative_to(actual_download_path))
-                        before_files.add(relative_path)
-
-            logger.info(f"📊 下载前文件数量: {len(before_files)}")
-            if before_files:
-                logger.info(f"📊 下载前文件示例: {list(before_files)[:5]}")
+            watcher = watch_directory(actual_download_path)
+            logger.info(f"👀 监视下载目录 ({watcher.backend}): {actual_download_path}")
 
             # 发送开始下载消息
             if message_updater:
@@ -10594,7 +9733,7 @@ class VideoDownloader:
             progress_task = None
             if message_updater:
                 progress_task = asyncio.create_task(self._monitor_gallery_dl_progress(
-                    actual_download_path, before_files, message_updater
+                    watcher, message_updater
                 ))
 
             # 使用正确的 gallery-dl API - 与容器中完全一致
@@ -10646,21 +9785,11 @@ class VideoDownloader:
 
             logger.info(f"🔍 开始查找新下载的文件...")
             logger.info(f"🔍 查找目录: {actual_download_dir}")
-            logger.info(f"🔍 下载前文件数量: {len(before_files)}")
 
             if actual_download_path.exists():
-                # 获取当前所有文件
-                current_files = set()
-                for file_path in actual_download_path.rglob("*"):
-                    if file_path.is_file():
-                        relative_path = str(
-                            file_path.relative_to(actual_download_path))
-                        current_files.add(relative_path)
-
-                logger.info(f"🔍 当前文件数量: {len(current_files)}")
-
-                # 计算新文件
-                new_files = current_files - before_files
+                # 新文件来自目录监视器记录的事件
+                watcher.stop()
+                new_files = [watcher.relative(path) for path in watcher.new_files()]
                 logger.info(f"🔍 新文件数量: {len(new_files)}")
 
                 # 记录一些新文件作为示例
@@ -10750,7 +9879,6 @@ class VideoDownloader:
                 return result
             else:
                 logger.warning(f"⚠️ 未找到新下载的文件，查找目录: {actual_download_dir}")
-                logger.warning(f"⚠️ 下载前文件数量: {len(before_files)}")
                 return {
                     "success": False,
                     "error": "未找到下载的文件"
@@ -10804,40 +9932,29 @@ class VideoDownloader:
                 "success": False,
                 "error": error_msg
             }
+        finally:
+            if watcher:
+                watcher.stop()
 
-    async def _monitor_gallery_dl_progress(self, download_path: Path, before_files: set, message_updater):
-        """监控 gallery-dl 下载进度"""
+    async def _monitor_gallery_dl_progress(self, watcher: WatchSession, message_updater):
+        """监控 gallery-dl 下载进度（由目录监视器的文件事件驱动）"""
         try:
             last_count = 0
             last_update_time = time.time()
             update_interval = 3  # 每3秒更新一次进度
 
             logger.info(f"📊 开始监控 gallery-dl 进度")
-            logger.info(f"📊 监控目录: {download_path}")
-            logger.info(f"📊 下载前文件数量: {len(before_files)}")
-            if before_files:
-                logger.info(f"📊 下载前文件示例: {list(before_files)[:3]}")
+            logger.info(f"📊 监控目录: {watcher.root}")
 
             while True:
-                await asyncio.sleep(2)  # 每2秒检查一次
-
-                # 计算当前文件数量
-                current_files = set()
-                if download_path.exists():
-                    for file_path in download_path.rglob("*"):
-                        if file_path.is_file():
-                            relative_path = str(
-                                file_path.relative_to(download_path))
-                            current_files.add(relative_path)
+                # 有新文件时立即检查，最多等待2秒
+                await watcher.wait_for_change(timeout=2)
 
                 # 计算新文件数量
-                new_files = current_files - before_files
+                new_files = watcher.new_files()
                 current_count = len(new_files)
 
-                logger.info(
-                    f"📊 当前文件数量: {len(current_files)}, 新文件数量: {current_count}")
-                if new_files:
-                    logger.info(f"📊 新文件示例: {list(new_files)[:3]}")
+                logger.debug(f"📊 新文件数量: {current_count}")
 
                 # 如果文件数量有变化或时间间隔到了，更新进度
                 if current_count != last_count or time.time() - last_update_time > update_interval:
@@ -10847,10 +9964,8 @@ class VideoDownloader:
                     # 获取当前正在下载的文件路径
                     current_file_path = "准备中..."
                     if new_files:
-                        # 获取最新的文件
-                        latest_file = sorted(new_files)[-1]
-                        # 显示完整的相对路径
-                        current_file_path = latest_file
+                        # 获取最新的文件，显示完整的相对路径
+                        current_file_path = watcher.relative(new_files[-1])
 
                     progress_text = (
                         f"🖼️ **图片下载中**\n"
@@ -11061,7 +10176,7 @@ class VideoDownloader:
             }
 
             # 获取增强配置，避免PART文件
-            ydl_opts = self._get_enhanced_ydl_opts(base_opts)
+            ydl_opts = self._get_enhanced_ydl_opts(base_opts, platform="x")
             logger.info("🛡️ 使用增强配置，避免PART文件产生")
 
             # 确保为X链接添加正确的cookies（覆盖增强配置中的通用cookies）
@@ -11156,10 +10271,11 @@ class VideoDownloader:
                 file_info_list = []
                 all_resolutions = set()
 
-                for file_path, mtime in video_files:
+                media_infos = await self.get_media_infos(
+                    [file_path for file_path, _ in video_files])
+                for (file_path, mtime), media_info in zip(video_files, media_infos):
                     size_mb = os.path.getsize(file_path) / (1024 * 1024)
                     total_size_mb += size_mb
-                    media_info = self.get_media_info(str(file_path))
                     resolution = media_info.get('resolution', '未知')
                     if resolution != '未知':
                         all_resolutions.add(resolution)
@@ -11368,7 +10484,6 @@ class VideoDownloader:
             }
 
         try:
-            from playwright.async_api import async_playwright
             import httpx
             from dataclasses import dataclass
             from typing import Optional
@@ -11423,12 +10538,9 @@ class VideoDownloader:
             os.makedirs(download_dir, exist_ok=True)
 
             # 使用 Playwright 提取视频信息
-            async with async_playwright() as p:
-                # 小红书不需要 cookies
-
-                # 小红书浏览器配置 - 参考douyin.py
-                browser = await p.chromium.launch(headless=True)
-                context = await browser.new_context(
+            # 小红书浏览器配置 - 参考douyin.py（浏览器来自常驻浏览器池）
+            async with self._platform_browser_context(
+                    platform,
                     user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
                     viewport={'width': 1920, 'height': 1080},
                     device_scale_factor=1,
@@ -11443,15 +10555,11 @@ class VideoDownloader:
                         'Connection': 'keep-alive',
                         'Upgrade-Insecure-Requests': '1',
                     }
-                )
-
+            ) as context:
                 # 小红书不需要 cookies
 
                 page = await context.new_page()
 
-                # 设置平台特定的请求头
-                await self._set_platform_headers(page, platform)
-
                 # 监听网络请求，捕获小红书视频URL
                 video_url_holder = {'url': None}
 
@@ -11472,29 +10580,19 @@ class VideoDownloader:
                 logger.info("[extract] goto 后，开始极速嗅探")
 
                 # 极速嗅探：只监听network，不做任何交互 - 参考douyin.py
+                fast_sniffed = False
+                title = None
+                author = None
                 for _ in range(5):  # 1.5秒内监听
                     if video_url_holder['url']:
                         logger.info(
                             f"[cat-catch][fast] 极速嗅探到小红书视频流: {video_url_holder['url']}")
-                        # 立即获取标题和作者，参考douyin.py
+                        # 立即获取标题和作者，参考douyin.py，跳过后续的页面提取
                         title = await self._get_video_title(page, platform)
                         author = await self._get_video_author(page, platform)
-                        # 直接返回结果，不继续后续逻辑
-                        video_info = VideoInfo(
-                            video_id=str(int(time.time())),
-                            platform=platform.value,
-                            share_url=url,
-                            download_url=video_url_holder['url'],
-                            title=title,
-                            author=author)
+                        fast_sniffed = True
                         logger.info("[cat-catch][fast] 极速嗅探流程完成")
-                        # 关闭浏览器
-                        await page.close()
-                        await context.close()
-                        await browser.close()
-
-                        # 下载视频
-                        return await self._download_video_file(video_info, download_dir, message_updater, start_message)
+                        break
                     await asyncio.sleep(0.3)
                 # 兜底：未捕获到流，直接进入正则/其它逻辑（不再做自动交互）
 
@@ -11537,9 +10635,7 @@ class VideoDownloader:
                                 break
 
                 # 如果HTML提取成功，获取标题和作者
-                title = None
-                author = None
-                if video_url_holder['url']:
+                if video_url_holder['url'] and not fast_sniffed:
                     try:
                         title = await self._get_video_title(page, platform)
                         author = await self._get_video_author(page, platform)
@@ -11548,25 +10644,11 @@ class VideoDownloader:
                     except Exception as e:
                         logger.warning(f"⚠️ 获取标题和作者失败: {e}")
 
-                # 关闭浏览器
+                # 关闭页面（context 由浏览器池回收）
                 await page.close()
-                await context.close()
-                await browser.close()
-
-                if not video_url_holder['url']:
-                    # 如果仍然没有获取到视频URL，保存调试信息
-                    debug_html_path = f"/tmp/xiaohongshu_debug_{int(time.time())}.html"
-                    try:
-                        with open(debug_html_path, 'w', encoding='utf-8') as f:
-                            f.write(html)
-                        logger.error(
-                            f"❌ 无法提取小红书视频直链，已保存调试HTML到: {debug_html_path}")
-                    except Exception as e:
-                        logger.error(f"❌ 无法提取小红书视频直链，保存调试文件失败: {e}")
 
-                    raise Exception(f"无法提取小红书视频直链，请检查链接有效性")
-
-                # 创建VideoInfo对象
+            # 页面数据已提取完毕，浏览器上下文已归还浏览器池，下载期间不再占用浏览器
+            if fast_sniffed:
                 video_info = VideoInfo(
                     video_id=str(int(time.time())),
                     platform=platform.value,
@@ -11574,25 +10656,48 @@ class VideoDownloader:
                     download_url=video_url_holder['url'],
                     title=title,
                     author=author)
+                return await self._download_video_file(video_info, download_dir, message_updater, start_message)
+
+            if not video_url_holder['url']:
+                # 如果仍然没有获取到视频URL，保存调试信息
+                debug_html_path = f"/tmp/xiaohongshu_debug_{int(time.time())}.html"
+                try:
+                    with open(debug_html_path, 'w', encoding='utf-8') as f:
+                        f.write(html)
+                    logger.error(
+                        f"❌ 无法提取小红书视频直链，已保存调试HTML到: {debug_html_path}")
+                except Exception as e:
+                    logger.error(f"❌ 无法提取小红书视频直链，保存调试文件失败: {e}")
 
-                # 使用统一的下载方法
-                result = await self._download_video_file(video_info, download_dir, message_updater, start_message)
+                raise Exception(f"无法提取小红书视频直链，请检查链接有效性")
 
-                if not result.get("success"):
-                    raise Exception(result.get("error", "下载失败"))
+            # 创建VideoInfo对象
+            video_info = VideoInfo(
+                video_id=str(int(time.time())),
+                platform=platform.value,
+                share_url=url,
+                download_url=video_url_holder['url'],
+                title=title,
+                author=author)
 
-                # 删除开始消息（如果存在）
-                if start_message and hasattr(self, 'bot') and self.bot:
-                    try:
-                        await start_message.delete()
-                    except Exception as e:
-                        logger.warning(f"⚠️ 删除开始消息失败: {e}")
+            # 使用统一的下载方法
+            result = await self._download_video_file(video_info, download_dir, message_updater, start_message)
 
-                # 文件信息现在在 _download_video_file 方法中处理
-                logger.info(f"✅ {platform.value}视频下载成功")
+            if not result.get("success"):
+                raise Exception(result.get("error", "下载失败"))
 
-                # 返回下载结果
-                return result
+            # 删除开始消息（如果存在）
+            if start_message and hasattr(self, 'bot') and self.bot:
+                try:
+                    await start_message.delete()
+                except Exception as e:
+                    logger.warning(f"⚠️ 删除开始消息失败: {e}")
+
+            # 文件信息现在在 _download_video_file 方法中处理
+            logger.info(f"✅ {platform.value}视频下载成功")
+
+            # 返回下载结果
+            return result
 
         except Exception as e:
             error_msg = str(e)
@@ -12041,18 +11146,29 @@ class VideoDownloader:
 
         return True
 
-    async def _set_platform_headers(self, page, platform: 'VideoDownloader.Platform'):
-        """设置平台特定的请求头"""
+    def _get_platform_headers(self, platform: 'VideoDownloader.Platform') -> dict:
+        """获取平台特定的请求头"""
         headers = {
-            self.Platform.DOUYIN: {'Referer': 'https://www.douyin.com/'},
-            self.Platform.KUAISHOU: {'Referer': 'https://www.kuaishou.com/'},
-            self.Platform.XIAOHONGSHU: {'Referer': 'https://www.xiaohongshu.com/'},
+            self.Platform.DOUYIN.value: {'Referer': 'https://www.douyin.com/'},
+            self.Platform.KUAISHOU.value: {'Referer': 'https://www.kuaishou.com/'},
+            self.Platform.XIAOHONGSHU.value: {'Referer': 'https://www.xiaohongshu.com/'},
         }
+        return dict(headers.get(getattr(platform, 'value', platform), {}))
 
-        if platform in headers:
-            await page.set_extra_http_headers(headers[platform])
+    async def _set_platform_headers(self, page, platform: 'VideoDownloader.Platform'):
+        """设置平台特定的请求头"""
+        headers = self._get_platform_headers(platform)
+        if headers:
+            await page.set_extra_http_headers(headers)
             logger.info(f"🎬 已设置 {platform.value} 平台请求头")
 
+    def _platform_browser_context(self, platform: 'VideoDownloader.Platform', **context_options):
+        """从浏览器池获取带平台请求头的 BrowserContext（async with 使用）"""
+        extra_http_headers = dict(context_options.pop('extra_http_headers', None) or {})
+        extra_http_headers.update(self._get_platform_headers(platform))
+        context_options['extra_http_headers'] = extra_http_headers
+        return self.browser_pool.context(**context_options)
+
     async def _download_douyin_with_playwright(self, url: str, message: types.Message, message_updater=None) -> dict:
         """使用Playwright下载抖音视频 - 完全复制douyin.py的extract逻辑"""
         if not PLAYWRIGHT_AVAILABLE:
@@ -12064,7 +11180,6 @@ class VideoDownloader:
             }
 
         try:
-            from playwright.async_api import async_playwright
             import httpx
             from dataclasses import dataclass
             from typing import Optional
@@ -12092,13 +11207,12 @@ class VideoDownloader:
 
             total_start = time.time()
             platform = Platform.DOUYIN
+            # 从页面中提取到的视频信息（退出浏览器上下文后再下载）
+            extracted_info = None
 
-            async with async_playwright() as p:
-                # 按照douyin.py启动浏览器（无特殊参数）
-                browser = await p.chromium.launch(headless=True)
-
-                # 按照douyin.py的context配置（抖音用手机版）
-                context = await browser.new_context(
+            # 按照douyin.py的context配置（抖音用手机版，浏览器来自常驻浏览器池）
+            async with self._platform_browser_context(
+                    platform,
                     user_agent='Mozilla/5.0 (iPhone; CPU iPhone OS 16_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.0 Mobile/15E148 Safari/604.1',
                     viewport={'width': 375, 'height': 667},
                     device_scale_factor=2,
@@ -12113,8 +11227,7 @@ class VideoDownloader:
                         'Connection': 'keep-alive',
                         'Upgrade-Insecure-Requests': '1',
                     }
-                )
-
+            ) as context:
                 page = await context.new_page()
 
                 # 尝试加载cookies（如果存在）
@@ -12150,14 +11263,14 @@ class VideoDownloader:
                 page.on("request", handle_video_id)
 
                 try:
-                    # 按照douyin.py设置headers
-                    await self._set_platform_headers(page, platform)
-
                     # 处理短链接重定向（关键修复）
                     if 'v.douyin.com' in url:
                         logger.info(f"[extract] 检测到短链接，先获取重定向: {url}")
-                        response = await page.goto(url, wait_until="domcontentloaded", timeout=30000)
-                        real_url = page.url
+                        # 优先用共享的短链接解析器（有缓存），失败时再让浏览器跟随跳转
+                        real_url = await get_short_link_resolver().resolve(url)
+                        if not real_url or real_url == url:
+                            response = await page.goto(url, wait_until="domcontentloaded", timeout=30000)
+                            real_url = page.url
                         logger.info(f"[extract] 短链接重定向到: {real_url}")
 
                         # 提取video_id并构造标准douyin.com链接
@@ -12284,19 +11397,7 @@ class VideoDownloader:
                                 thumbnail_url=None
                             )
                             logger.info("[extract] 正则流程完成")
-
-                            # 下载视频
-                            download_result = await self._download_video_file(
-                                video_info,
-                                str(self.douyin_download_path),
-                                message_updater,
-                                None
-                            )
-
-                            await page.close()
-                            await context.close()
-                            await browser.close()
-                            return download_result
+                            extracted_info = video_info
                         else:
                             logger.warning(f"[extract] 提取的URL无效: {video_url}")
                             video_url = None
@@ -12306,12 +11407,17 @@ class VideoDownloader:
                         raise TimeoutError("未能捕获到视频数据")
 
                 finally:
-                    logger.info("[extract] 关闭 page/context 前")
+                    logger.info("[extract] 关闭 page 前")
                     await page.close()
-                    await context.close()
-                    logger.info("[extract] 关闭 page/context 后")
-
-                await browser.close()
+                    logger.info("[extract] 关闭 page 后")
+
+            # 页面数据已提取完毕，浏览器上下文已归还浏览器池，下载期间不再占用浏览器
+            return await self._download_video_file(
+                extracted_info,
+                str(self.douyin_download_path),
+                message_updater,
+                None
+            )
 
         except Exception as e:
             logger.error(f"抖音下载异常: {str(e)}")
@@ -12333,7 +11439,6 @@ class VideoDownloader:
             }
 
         try:
-            from playwright.async_api import async_playwright
             import httpx
             from dataclasses import dataclass
             from typing import Optional
@@ -12374,15 +11479,21 @@ class VideoDownloader:
 
             url = clean_url  # 使用清理后的URL
 
+            # 短链接先通过共享的短链接解析器展开（有缓存），失败时再让浏览器跟随跳转
+            if is_short_link(url):
+                real_url = await get_short_link_resolver().resolve(url)
+                if real_url:
+                    logger.info(f"[extract] 快手短链接重定向到: {real_url}")
+                    url = real_url
+
             total_start = time.time()
             platform = Platform.KUAISHOU
+            # 从页面中提取到的视频信息（退出浏览器上下文后再下载）
+            extracted_info = None
 
-            async with async_playwright() as p:
-                # 启动浏览器（参考抖音配置）
-                browser = await p.chromium.launch(headless=True)
-
-                # 快手使用手机版配置
-                context = await browser.new_context(
+            # 快手使用手机版配置（浏览器来自常驻浏览器池）
+            async with self._platform_browser_context(
+                    platform,
                     user_agent='Mozilla/5.0 (iPhone; CPU iPhone OS 16_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.0 Mobile/15E148 Safari/604.1',
                     viewport={'width': 375, 'height': 667},
                     device_scale_factor=2,
@@ -12398,8 +11509,7 @@ class VideoDownloader:
                         'Connection': 'keep-alive',
                         'Upgrade-Insecure-Requests': '1',
                     }
-                )
-
+            ) as context:
                 page = await context.new_page()
 
                 # 尝试加载cookies（如果存在）
@@ -12463,9 +11573,6 @@ class VideoDownloader:
                 page.on("request", handle_video_id)
 
                 try:
-                    # 设置快手平台headers
-                    await self._set_platform_headers(page, platform)
-
                     # 访问页面
                     logger.info(f"[extract] 开始访问快手页面: {url}")
                     await page.goto(url, wait_until="domcontentloaded", timeout=30000)
@@ -12561,22 +11668,11 @@ class VideoDownloader:
                         logger.info(
                             f"[extract] 快手视频信息: 标题={video_info.title}, 作者={video_info.author}")
                         logger.info("[extract] 正则流程完成")
-
-                        # 下载视频
-                        download_result = await self._download_video_file(
-                            video_info,
-                            str(self.kuaishou_download_path),
-                            message_updater,
-                            None
-                        )
-
+                        extracted_info = video_info
                         await page.close()
-                        await context.close()
-                        return download_result
                     else:
                         logger.error("[extract] 未能提取到快手视频直链")
                         await page.close()
-                        await context.close()
                         return {
                             "success": False,
                             "error": "未能提取到快手视频直链",
@@ -12588,12 +11684,25 @@ class VideoDownloader:
                     logger.error(f"[extract] 快手页面处理异常: {str(e)}")
                     try:
                         await page.close()
-                        await context.close()
                     except:
                         pass
-                    logger.info("[extract] 关闭 page/context 后")
+                    logger.info("[extract] 关闭 page 后")
+
+            if extracted_info is None:
+                return {
+                    "success": False,
+                    "error": "未能提取到快手视频直链",
+                    "platform": "Kuaishou",
+                    "content_type": "video"
+                }
 
-                await browser.close()
+            # 页面数据已提取完毕，浏览器上下文已归还浏览器池，下载期间不再占用浏览器
+            return await self._download_video_file(
+                extracted_info,
+                str(self.kuaishou_download_path),
+                message_updater,
+                None
+            )
 
         except Exception as e:
             logger.error(f"快手下载异常: {str(e)}")
@@ -13013,7 +12122,7 @@ class VideoDownloader:
             # 使用 ffprobe 获取视频分辨率信息
             resolution = "未知"
             try:
-                media_info = self.get_media_info(file_path)
+                media_info = await self.get_media_info_async(file_path)
                 if media_info.get("resolution"):
                     resolution = media_info["resolution"]
                     logger.info(f"📺 获取到视频分辨率: {resolution}")
@@ -13656,8 +12765,8 @@ class VideoDownloader:
         else:
             logger.info("✅ 未发现PART文件，所有下载都已完成")
 
-    def _get_enhanced_ydl_opts(self, base_opts=None):
-        """获取增强的yt-dlp配置，避免PART文件产生"""
+    def _get_enhanced_ydl_opts(self, base_opts=None, platform=None):
+        """获取增强的yt-dlp配置，避免PART文件产生（platform 用于选择分片并发数）"""
         enhanced_opts = {
             # 基础配置
             'quiet': False,
@@ -13701,9 +12810,7 @@ class VideoDownloader:
             # 🎯 修复：添加高质量下载的关键配置（与单独下载保持一致）
             'hls_use_mpegts': False,        # 使用mp4容器而不是ts
             'hls_prefer_native': True,      # 优先使用原生HLS下载器
-            'concurrent_fragment_downloads': 3,  # 并发下载分片数量
             'buffersize': 1024,             # 缓冲区大小
-            'http_chunk_size': 10485760,    # 10MB分块大小
 
             # 错误处理配置 - 注意：base_opts 中的 ignoreerrors 会覆盖这个设置
             'abort_on_error': False,        # 单个文件错误时不中止整个下载
@@ -13714,6 +12821,12 @@ class VideoDownloader:
             'writeautomaticsub': False,     # 不下载自动字幕
         }
 
+        # 并发分片数按平台选择（批量下载时无法预知单个文件大小）
+        strategy = get_throughput_planner().plan(platform)
+        strategy.apply(enhanced_opts)
+        if get_download_metrics:
+            get_download_metrics().record_strategy(strategy.to_dict())
+
         # 合并基础配置
         if base_opts:
             logger.info(
@@ -13802,7 +12915,7 @@ class VideoDownloader:
                     'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
                     'continue_dl': True,  # 启用断点续传
                     'part': True,         # 允许PART文件
-                })
+                }, platform=route_url(original_url).platform)
 
                 import yt_dlp
                 with yt_dlp.YoutubeDL(resume_opts) as ydl:
@@ -15020,6 +14133,9 @@ class TelegramBot:
         self.bilibili_thumbnail_download = self.config.get(
             "bilibili_thumbnail_download", False)  # 默认关闭B站封面下载
 
+        # 配置在其他地方被修改（例如重置为默认值）时同步到对应属性
+        self.config_manager.subscribe(self._on_config_changed)
+
         # B站收藏夹订阅管理器 - 确保属性始终存在
         self.fav_manager = None  # 先设置默认值
         try:
@@ -15108,6 +14224,20 @@ class TelegramBot:
             os.getenv("TELEGRAM_BOT_ALLOWED_USER_IDS", ""))
         logger.info(f"🔐 允许的用户: {self.allowed_user_ids}")
 
+        # 下载调度器：限制全局与各平台并发，多用户之间轮询
+        self.download_scheduler = None
+        if DownloadScheduler:
+            scheduler_config = get_scheduler_config(toml_config or {})
+            self.download_scheduler = DownloadScheduler(
+                max_concurrent=int(os.getenv(
+                    "MAX_CONCURRENT_DOWNLOADS", scheduler_config['max_concurrent_downloads'])),
+                platform_limits=scheduler_config['platform_limits'],
+            )
+
+        # 下载吞吐策略：按 savextube.toml 的 [throughput] 段选择分片并发与多连接下载
+        if get_throughput_config:
+            configure_throughput_planner(get_throughput_config(toml_config or {}))
+
     async def hot_reload_user_client(self, session_string: str, api_id: Optional[str] = None, api_hash: Optional[str] = None) -> str:
         """在主事件循环中热重载 Telethon user_client"""
         try:
@@ -15213,11 +14343,10 @@ class TelegramBot:
                     "youtube_mix_playlist": self.youtube_mix_playlist
                 }
 
-            # 使用数据库保存配置
+            # 使用数据库保存配置（内存快照立即生效，数据库由配置管理器批量写回）
             if self.config_manager:
                 try:
-                    for key, value in config_data.items():
-                        self.config_manager.set_config(key, value)
+                    self.config_manager.set_many(config_data)
                     logger.info("配置已保存到数据库")
                 except Exception as e:
                     logger.error(f"❌ 数据库保存失败: {e}")
@@ -15230,9 +14359,14 @@ class TelegramBot:
             raise  # 直接抛出异常，不回退到文件保存
 
     async def _save_config_async(self):
-        """异步保存配置到文件或数据库"""
-        loop = asyncio.get_running_loop()
-        await loop.run_in_executor(None, self._save_config_sync)
+        """异步保存配置到数据库（只更新内存快照，不阻塞事件循环，无需切换线程）"""
+        self._save_config_sync()
+
+    def _on_config_changed(self, key: str, value, version: int):
+        """配置变化回调：保持机器人属性与配置快照一致"""
+        if key in self.config_manager.default_config and getattr(self, key, value) != value:
+            setattr(self, key, value)
+            logger.debug(f"🔄 配置 {key} 已同步为 {value} (版本 {version})")
 
     def _extract_duration_from_filename(self, filename: str) -> str:
         """从文件名中提取时长信息"""
@@ -15426,6 +14560,8 @@ class TelegramBot:
     async def post_init(self, application: Application):
         """在应用启动后运行的初始化任务, 获取机器人自身 ID"""
         print("🚀 [INIT] post_init 开始执行...")
+        # 下载线程提交的进度文本都在 Bot 所在的事件循环中发送
+        get_status_renderer().bind_loop(asyncio.get_running_loop())
         bot_info = await application.bot.get_me()
         self.bot_id = bot_info.id
         print(f"🤖 [INIT] 机器人已启动: @{bot_info.username} (ID: {self.bot_id})")
@@ -15894,17 +15030,20 @@ class TelegramBot:
         logger.info("启动 Telegram Bot (PTB)...")
 
         # 创建应用程序实例
+        builder = Application.builder().token(self.token).post_init(self.post_init)
         if self.downloader.proxy_host:
             logger.info(f"Telegram Bot 使用代理: {self.downloader.proxy_host}")
-            self.application = (
-                Application.builder().token(self.token).proxy(
-                    self.downloader.proxy_host).post_init(self.post_init).build()
-            )
         else:
             logger.info("Telegram Bot 直接连接")
-            self.application = (
-                Application.builder().token(self.token).post_init(self.post_init).build()
-            )
+        if MetricsHTTPXRequest:
+            # 记录 Bot API 请求耗时与限流次数（连接池大小与 PTB 默认值一致）
+            builder = builder.request(MetricsHTTPXRequest(
+                connection_pool_size=256, proxy=self.downloader.proxy_host or None))
+            if self.downloader.proxy_host:
+                builder = builder.get_updates_proxy(self.downloader.proxy_host)
+        elif self.downloader.proxy_host:
+            builder = builder.proxy(self.downloader.proxy_host)
+        self.application = builder.build()
         self._setup_handlers()
 
         # 启动应用程序
@@ -16322,13 +15461,13 @@ class TelegramBot:
             logger.info(
                 f"🔍 当前任务数量: {len(self.download_tasks) if hasattr(self, 'download_tasks') else 0}")
 
+            cancelled_count = 0
             if hasattr(self, 'download_tasks') and self.download_tasks:
                 # 打印所有任务信息用于调试
                 for tid, tinfo in self.download_tasks.items():
                     logger.info(
                         f"🔍 任务 {tid}: user_id={tinfo.get('user_id')}, done={tinfo.get('task').done() if tinfo.get('task') else 'None'}")
 
-                cancelled_count = 0
                 for task_id, task_info in list(self.download_tasks.items()):
                     task_user_id = task_info.get('user_id')
                     task_done = task_info.get('task').done(
@@ -16352,10 +15491,19 @@ class TelegramBot:
                             logger.debug(f"编辑取消消息失败: {e}")
                             pass  # 忽略编辑消息失败的错误
 
-                if cancelled_count > 0:
-                    await update.message.reply_text(f"✅ 已取消 {cancelled_count} 个下载任务")
-                else:
-                    await update.message.reply_text("ℹ️ 没有找到正在进行的下载任务")
+            # 同时取消该用户仍在排队中的任务
+            if self.download_scheduler:
+                for job in self.download_scheduler.cancel_user_jobs(user_id):
+                    cancelled_count += 1
+                    try:
+                        status_message = job.payload.get('status_message')
+                        if status_message:
+                            await status_message.edit_text("❌ 下载已被用户取消", parse_mode=None)
+                    except Exception as e:
+                        logger.debug(f"编辑取消消息失败: {e}")
+
+            if cancelled_count > 0:
+                await update.message.reply_text(f"✅ 已取消 {cancelled_count} 个下载任务")
             else:
                 await update.message.reply_text("ℹ️ 没有找到正在进行的下载任务")
 
@@ -16442,6 +15590,98 @@ class TelegramBot:
                 status_text += f"<b>qBittorrent 任务</b>: {len(torrents)} (活动: {len(active_torrents)})"
             else:
                 status_text += "<b>qBittorrent</b>: 未连接"
+            # 下载调度器状态
+            if self.download_scheduler:
+                stats = self.download_scheduler.stats()
+                status_text += (
+                    f"\n<b>下载队列</b>: 运行中 {stats['running']}/{stats['max_concurrent']}，"
+                    f"排队 {stats['queued']}"
+                )
+                if stats['running_per_platform']:
+                    per_platform = ", ".join(
+                        f"{name} {count}/{stats['platform_limits'].get(name, '-')}"
+                        for name, count in stats['running_per_platform'].items())
+                    status_text += f"\n  - 平台占用: {per_platform}"
+            # Playwright 浏览器池状态
+            if self.downloader.browser_pool:
+                pool_stats = self.downloader.browser_pool.stats()
+                status_text += (
+                    f"\n<b>浏览器池</b>: 存活 {pool_stats['alive']}/{pool_stats['size']}，"
+                    f"使用中 {pool_stats['active_contexts']}，"
+                    f"平均等待 {pool_stats['avg_wait_time']:.2f}s (最长 {pool_stats['max_wait_time']:.2f}s)"
+                )
+            # 元数据缓存命中情况
+            if get_metadata_cache and self.netease_downloader:
+                cache_stats = get_metadata_cache().stats()
+                if cache_stats['enabled']:
+                    status_text += (
+                        f"\n<b>元数据缓存</b>: 命中 {cache_stats['hits']}，未命中 {cache_stats['misses']}"
+                        f"（命中率 {cache_stats['hit_rate']:.0%}），"
+                        f"条目 {sum(cache_stats['entries'].values())}"
+                    )
+            # 下载指标：任务结果、排队、阶段耗时、各平台速度、Telegram 请求
+            if get_download_metrics:
+                summary = get_download_metrics().summary()
+                jobs = summary['jobs']
+                status_text += (
+                    f"\n<b>下载指标</b>: 成功 {jobs.get('success', 0)}，失败 {jobs.get('failed', 0)}，"
+                    f"取消 {jobs.get('cancelled', 0)}，进行中 {summary['in_progress']}"
+                    f"\n  - 平均排队: {summary['avg_queue_wait']:.1f}s (最长 {summary['max_queue_wait']:.1f}s)"
+                )
+                if summary['phase_avg']:
+                    phases = " | ".join(
+                        f"{PHASE_LABELS.get(name, name)} {seconds:.1f}s"
+                        for name, seconds in sorted(summary['phase_avg'].items(), key=lambda item: -item[1]))
+                    status_text += f"\n  - 阶段耗时(最近 {summary['recent_jobs']} 个任务平均): {phases}"
+                if summary['throughput']:
+                    throughput = ", ".join(
+                        f"{name} {rate / 1024 / 1024:.2f}MB/s" for name, rate in summary['throughput'].items())
+                    status_text += f"\n  - 下载速度: {throughput}"
+                if summary['strategy_throughput']:
+                    strategies = ", ".join(
+                        f"{name} {rate / 1024 / 1024:.2f}MB/s"
+                        for name, rate in summary['strategy_throughput'].items())
+                    status_text += f"\n  - 各下载策略速度: {strategies}"
+                status_text += (
+                    f"\n  - Telegram: {summary['telegram_calls']} 次请求，"
+                    f"平均 {summary['telegram_avg']:.2f}s，限流 {summary['telegram_rate_limited']} 次"
+                )
+            # 状态消息渲染器：合并与跳过的编辑次数
+            render_stats = get_status_renderer().stats()
+            status_text += (
+                f"\n<b>状态消息</b>: 已编辑 {render_stats['edits']}，合并 {render_stats['coalesced']}，"
+                f"内容未变跳过 {render_stats['unchanged']}，限流 {render_stats['rate_limited']} 次"
+            )
+            # 短链接解析：缓存命中、并发合并与实际请求次数
+            link_stats = get_short_link_resolver().stats()
+            status_text += (
+                f"\n<b>短链接</b>: 内存命中 {link_stats['memory_hits']}，磁盘命中 {link_stats['disk_hits']}，"
+                f"并发合并 {link_stats['shared']}，请求 {link_stats['fetches']}（失败 {link_stats['failures']}）"
+            )
+            # 媒体信息探测：ffprobe 调用次数与缓存命中
+            probe_stats = get_media_probe().stats()
+            status_text += (
+                f"\n<b>媒体信息</b>: ffprobe {probe_stats['probes']} 次（平均 {probe_stats['avg_seconds']:.2f}s，"
+                f"失败 {probe_stats['failures']}），缓存命中 {probe_stats['hits']}"
+            )
+            # 下载索引：已记录的文件与命中次数
+            index_stats = get_download_index().stats()
+            status_text += (
+                f"\n<b>下载索引</b>: {index_stats['entries']} 个文件（{index_stats['total_size'] / 1024 ** 3:.2f}GB），"
+                f"命中 {index_stats['hits']}，改名后找回 {index_stats['relocated']}，失效 {index_stats['stale']}"
+            )
+            # 日志量：各级别条数、采样丢弃的进度日志、日志最多的任务
+            if log_pipeline:
+                log_stats = log_pipeline.get_log_volume().stats(top=3)
+                status_text += (
+                    f"\n<b>日志</b>: {sum(log_stats['records_per_level'].values())} 条，"
+                    f"进度日志采样丢弃 {log_stats['sampled_out']}，队列溢出 {log_stats['queue_dropped']}"
+                )
+                if log_stats['jobs']:
+                    heaviest = ", ".join(
+                        f"{job_id} {stats['records']}条/{stats['bytes'] / 1024:.0f}KB"
+                        for job_id, stats in log_stats['jobs'])
+                    status_text += f"\n  - 日志最多的任务: {heaviest}"
             await update.message.reply_text(status_text, parse_mode="HTML")
         except Exception as e:
             await update.message.reply_text(f"❌ 获取状态失败: {str(e)}")
@@ -16506,7 +15746,8 @@ class TelegramBot:
             extracted_urls = self.downloader.extract_urls_from_text(
                 message.text)
             if extracted_urls:
-                url = extracted_urls[0]  # 使用第一个找到的URL
+                # 多个链接时优先使用第一个受支持平台的链接
+                url = pick_route(extracted_urls).url
                 logger.info(f"🔧 智能提取URL: {message.text} -> {url}")
             else:
                 # 备选方案：修复错误的协议
@@ -16591,8 +15832,27 @@ class TelegramBot:
         status_message = await message.reply_text("🚀 正在处理您的请求...")
 
         # 异步处理下载任务，不阻塞响应
-        asyncio.create_task(
-            self._process_download_async(update, context, url, status_message)
+        job_id = f"{user_id}_{status_message.message_id}"
+        route = route_url(url)
+        if not self.download_scheduler:
+            asyncio.create_task(
+                self._run_download_job(job_id, update, context, url, status_message, route=route)
+            )
+            return
+
+        async def on_queue_position(position: int):
+            await status_message.edit_text(
+                f"⏳ 已加入下载队列，前面还有 {position - 1} 个任务，请稍候...", parse_mode=None)
+
+        submitted_at = time.time()
+        await self.download_scheduler.submit(
+            job_id=job_id,
+            user_id=user_id,
+            platform=route.platform,
+            job_factory=lambda: self._run_download_job(
+                job_id, update, context, url, status_message, submitted_at, route),
+            on_position=on_queue_position,
+            payload={"status_message": status_message},
         )
 
     async def _handle_search_command(self, message, context):
@@ -16962,14 +16222,37 @@ class TelegramBot:
             await status_message.edit_text(f"❌ 处理qBittorrent链接时发生错误: {str(e)}")
             return True  # 表示已处理（出错也算处理了）
 
+    async def _run_download_job(self, job_id: str, update: Update, context: ContextTypes.DEFAULT_TYPE,
+                                url: str, status_message, submitted_at: float = None, route=None):
+        """执行下载任务，并记录排队时间、各阶段耗时和任务结果"""
+        route = route or route_url(url)
+        if not get_download_metrics:
+            return await self._process_download_async(update, context, url, status_message, route)
+
+        metrics = get_download_metrics()
+        job = metrics.start_job(
+            route.platform, job_id,
+            queue_wait=time.time() - submitted_at if submitted_at else 0.0)
+        try:
+            return await self._process_download_async(update, context, url, status_message, route)
+        except asyncio.CancelledError:
+            metrics.finish_job(job, "cancelled")
+            raise
+        except Exception as e:
+            metrics.finish_job(job, "failed", str(e))
+            raise
+        finally:
+            metrics.finish_job(job)
+
     async def _process_download_async(
         self,
         update: Update,
         context: ContextTypes.DEFAULT_TYPE,
         url: str,
         status_message,
+        route=None,
     ):
-        """异步处理下载任务"""
+        """异步处理下载任务（route 为消息处理时算好的链接路由）"""
         import os  # 导入os模块以解决作用域问题
 
         # 在方法开始时定义chat_id，确保在所有异常处理路径中都可访问
@@ -16981,12 +16264,14 @@ class TelegramBot:
                 return  # 如果是qB相关链接，处理完就返回
 
             # 检查是否为B站自定义列表URL
-            is_list, uid, list_id = self.downloader.is_bilibili_list_url(url)
-            if is_list:
-                logger.info(f"🔧 检测到B站用户列表URL: 用户{uid}, 列表{list_id}")
+            route = route or route_url(url)
+            if route.platform == "bilibili" and route.kind == "list":
+                logger.info(f"🔧 检测到B站用户列表URL: 用户{route.get('uid')}, 列表{route.get('list_id')}")
             # 链接有效性检查
-            platform_name = self.downloader.get_platform_name(url)
+            platform_name = route.platform
             if platform_name == "未知":
+                if get_download_metrics:
+                    get_download_metrics().mark_current_job("failed", "不支持的网站")
                 await status_message.edit_text("🙁 抱歉，暂不支持您发送的网站。", parse_mode=None)
                 return
 
@@ -17006,7 +16291,6 @@ class TelegramBot:
         last_progress_text = {"text": None}
 
         # --- 进度回调 ---
-        last_update_time = {"time": time.time()}
         last_progress_percent = {"value": 0}
         progress_state = {"last_stage": None, "last_percent": 0,
                           "finished_shown": False}  # 跟踪上一次的状态和是否已显示完成
@@ -17017,8 +16301,8 @@ class TelegramBot:
         async def message_updater(text_or_dict, bilibili_progress_data=None):
             try:
                 logger.info(
-                    f"🔍 message_updater 被调用，参数类型: {type(text_or_dict)}")
-                logger.info(f"🔍 message_updater 参数内容: {text_or_dict}")
+                    f"🔍 message_updater 被调用，参数类型: {type(text_or_dict)}", extra=PROGRESS_LOG)
+                logger.debug(f"🔍 message_updater 参数内容: {text_or_dict}")
 
                 # 如果已经显示完成状态，忽略所有后续调用
                 if progress_state["finished_shown"]:
@@ -17031,7 +16315,7 @@ class TelegramBot:
                         logger.info("🔍 跳过重复内容")
                         return  # 跳过重复内容
                     last_progress_text["text"] = text_or_dict
-                    await status_message.edit_text(text_or_dict, parse_mode=None)
+                    get_status_renderer().submit(status_message, text_or_dict)
                     return
 
                 # 检查是否为字典类型（来自progress_hook的进度数据）
@@ -17060,10 +16344,8 @@ class TelegramBot:
                         return
                     elif text_or_dict.get("status") == "downloading":
                         # 这是来自progress_hook的下载进度数据
-                        logger.info("🔍 检测到下载进度数据，准备调用 update_progress...")
                         # 调用update_progress函数处理进度数据
                         update_progress(text_or_dict)
-                        logger.info("✅ update_progress 调用完成")
 
                         # 注意：这里不需要再次调用message_updater，因为update_progress已经处理了显示
                         # 如果需要额外的消息显示，应该在update_progress内部处理
@@ -17075,7 +16357,7 @@ class TelegramBot:
                             logger.info("🔍 跳过重复字典内容")
                             return  # 跳过重复内容
                         last_progress_text["text"] = dict_text
-                        await status_message.edit_text(dict_text, parse_mode=None)
+                        get_status_renderer().submit(status_message, dict_text)
                 else:
                     # 普通文本消息
                     logger.info(f"🔍 普通文本消息: {text_or_dict}")
@@ -17084,7 +16366,7 @@ class TelegramBot:
                         logger.info("🔍 跳过重复文本内容")
                         return  # 跳过重复内容
                     last_progress_text["text"] = text_str
-                    await status_message.edit_text(text_str, parse_mode=None)
+                    get_status_renderer().submit(status_message, text_str)
             except Exception as e:
                 logger.error(f"❌ message_updater 处理错误: {e}")
                 logger.error(f"❌ 异常类型: {type(e)}")
@@ -17171,10 +16453,7 @@ class TelegramBot:
                         return
 
                     logger.info(f"🚀 即将发送消息到TG: {d}")
-                    asyncio.run_coroutine_threadsafe(
-                        status_message.edit_text(d, parse_mode=None),
-                        loop
-                    )
+                    get_status_renderer().submit(status_message, d)
                     logger.info(f"✅ [DEBUG] 字符串消息发送成功")
                 except Exception as e:
                     logger.warning(f"发送字符串进度到TG失败: {e}")
@@ -17212,14 +16491,10 @@ class TelegramBot:
             except Exception as e:
                 logger.error(f"更新 progress_data 错误: {str(e)}")
 
-            now = time.time()
-            # 使用 main.v0.3.py 的方式：每1秒更新一次
-            if now - last_update_time['time'] < 1.0:
-                return
+            # 编辑频率、去重和限流退避由状态消息渲染器统一处理
             # 处理B站合集下载进度
             if d.get('status') == 'downloading' and d.get('bv'):
                 # B站合集下载进度
-                last_update_time['time'] = now
                 bv = d.get('bv', '')
                 filename = d.get('filename', '')
                 template = d.get('template', '')
@@ -17232,31 +16507,12 @@ class TelegramBot:
                     f"📊 **进度**: {index}/{total}"
                 )
 
-                async def do_update():
-                    try:
-                        await asyncio.wait_for(
-                            context.bot.edit_message_text(
-                                text=progress_text,
-                                chat_id=status_message.chat_id,
-                                message_id=status_message.message_id,
-                                parse_mode=None
-                            ),
-                            timeout=10.0  # 增加到10秒超时，减少超时错误
-                        )
-                        logger.info(f"B站合集进度更新: 第{index}/{total}个")
-                    except asyncio.TimeoutError:
-                        logger.warning(f"B站合集进度更新超时: 第{index}/{total}个")
-                    except Exception as e:
-                        if "Message is not modified" not in str(e):
-                            logger.warning(f"更新B站合集进度失败: {e}")
-
-                asyncio.run_coroutine_threadsafe(do_update(), loop)
+                get_status_renderer().submit(status_message, progress_text)
                 return
 
             # 处理B站合集下载完成/失败
             if d.get('status') in ['finished', 'error'] and d.get('bv'):
                 # B站合集下载完成/失败
-                last_update_time['time'] = now
                 bv = d.get('bv', '')
                 filename = d.get('filename', '')
                 index = d.get('index', 0)
@@ -17270,25 +16526,7 @@ class TelegramBot:
                     f"📊 **进度**: {index}/{total}"
                 )
 
-                async def do_update():
-                    try:
-                        await asyncio.wait_for(
-                            context.bot.edit_message_text(
-                                text=progress_text,
-                                chat_id=status_message.chat_id,
-                                message_id=status_message.message_id,
-                                parse_mode=None
-                            ),
-                            timeout=10.0  # 增加到10秒超时，减少超时错误
-                        )
-                        logger.info(f"B站合集状态更新: 第{index}个{status_text}")
-                    except asyncio.TimeoutError:
-                        logger.warning(f"B站合集状态更新超时: 第{index}个{status_text}")
-                    except Exception as e:
-                        if "Message is not modified" not in str(e):
-                            logger.warning(f"更新B站合集状态失败: {e}")
-
-                asyncio.run_coroutine_threadsafe(do_update(), loop)
+                get_status_renderer().submit(status_message, progress_text)
                 return
 
             # 处理下载完成状态 - 直接显示完成信息并返回（参考 main.v0.3.py）
@@ -17327,19 +16565,11 @@ class TelegramBot:
                     f"📊 进度：{progress_bar} (100.0%)"
                 )
 
-                async def do_update():
-                    try:
-                        await status_message.edit_text(completion_text, parse_mode=None)
-                        logger.info("显示下载完成进度信息")
-                    except Exception as e:
-                        logger.warning(f"显示完成进度信息失败: {e}")
-
-                asyncio.run_coroutine_threadsafe(do_update(), loop)
+                get_status_renderer().submit(status_message, completion_text)
                 return
 
             if d.get('status') == 'downloading':
                 logger.debug(f"收到下载进度回调: {d}")
-                last_update_time['time'] = now
 
                 total_bytes = d.get('total_bytes') or d.get(
                     'total_bytes_estimate', 0)
@@ -17385,14 +16615,7 @@ class TelegramBot:
                         f"📊 进度: {progress_bar} {progress:.1f}%"
                     )
 
-                    async def do_update():
-                        try:
-                            await status_message.edit_text(progress_text, parse_mode=None)
-                        except Exception as e:
-                            if "Message is not modified" not in str(e):
-                                logger.warning(f"更新进度失败: {e}")
-
-                    asyncio.run_coroutine_threadsafe(do_update(), loop)
+                    get_status_renderer().submit(status_message, progress_text)
                 else:
                     # 没有总大小信息时的处理
                     downloaded_mb = downloaded_bytes / \
@@ -17412,14 +16635,7 @@ class TelegramBot:
                         f"📊 进度: 下载中..."
                     )
 
-                    async def do_update():
-                        try:
-                            await status_message.edit_text(progress_text, parse_mode=None)
-                        except Exception as e:
-                            if "Message is not modified" not in str(e):
-                                logger.warning(f"更新进度失败: {e}")
-
-                    asyncio.run_coroutine_threadsafe(do_update(), loop)
+                    get_status_renderer().submit(status_message, progress_text)
 
         # --- 执行下载 ---
         # 检查是否为YouTube Music URL，如果是则使用专门的下载器
@@ -17471,10 +16687,14 @@ class TelegramBot:
             result = await download_task
         except asyncio.CancelledError:
             logger.info(f"🚫 下载任务被取消: {task_id}")
+            if get_download_metrics:
+                get_download_metrics().mark_current_job("cancelled")
             await status_message.edit_text("🚫 下载任务已取消", parse_mode=None)
             return
         except Exception as e:
             logger.error(f"❌ 下载任务执行异常: {e}")
+            if get_download_metrics:
+                get_download_metrics().mark_current_job("failed", str(e))
             await status_message.edit_text(f"❌ 下载失败: {str(e)}")
             return
         finally:
@@ -17483,13 +16703,22 @@ class TelegramBot:
             # 🔥 关键修复：下载完成后立即锁死进度回调，防止后续回调覆盖完成信息
             progress_state["finished_shown"] = True
             logger.info("🔒 下载任务完成，锁死进度回调")
+            # 丢弃尚未发送的进度文本，避免覆盖接下来的完成消息
+            await get_status_renderer().settle(status_message)
 
         # 检查result是否为None
         if not result:
             logger.error("❌ 下载任务返回None结果")
+            if get_download_metrics:
+                get_download_metrics().mark_current_job("failed", "下载任务返回空结果")
             await status_message.edit_text("❌ 下载失败: 未知错误", parse_mode=None)
             return
 
+        if get_download_metrics:
+            succeeded = result.get("success") or result.get("status") == "success"
+            get_download_metrics().mark_current_job(
+                "success" if succeeded else "failed", None if succeeded else result.get("error"))
+
         # 兼容不同的返回格式：有些返回"success"，有些返回"status"
         if result.get("success") or result.get("status") == "success":
             # 添加调试日志
@@ -19154,99 +18383,34 @@ class TelegramBot:
                             artist_name = music_info.get('artist', '未知艺术家')
                             album_name = music_info.get('album', '未知专辑')
 
-                            # 构建专辑目录路径 - 改为包含匹配，更灵活
+                            # 从曲库索引中查询专辑目录和曲目（首次使用时索引要遍历现有曲库，放到线程中）
+                            library_index = await asyncio.get_running_loop().run_in_executor(
+                                None, get_library_index, amd_downloads_dir)
                             album_dir = os.path.join(
                                 amd_downloads_dir, artist_name, album_name)
-
-                            if os.path.exists(album_dir):
-                                # 只遍历专辑目录，而不是整个AM-DL downloads目录
-                                logger.info(f"🔍 遍历专辑目录: {album_dir}")
-                                for root, dirs, files in os.walk(album_dir):
-                                    for file in files:
-                                        if file.lower().endswith(('.m4a', '.flac', '.aac', '.mp3')):
-                                            file_path = os.path.join(
-                                                root, file)
-                                            file_size = os.path.getsize(
-                                                file_path)
-                                            total_size += file_size
-
-                                            # 从文件路径提取音乐信息
-                                            relative_path = os.path.relpath(
-                                                file_path, album_dir)
-                                            files_info.append({
-                                                'name': file,
-                                                'path': relative_path,
-                                                'size': file_size
-                                            })
-                            else:
-                                # 如果专辑目录不存在，尝试包含匹配
+                            if not os.path.isdir(album_dir):
+                                # 专辑目录不存在时按专辑名包含匹配
                                 logger.warning(
                                     f"⚠️ 专辑目录不存在: {album_dir}，尝试包含匹配")
-
-                                # 先尝试在艺术家目录中查找包含专辑名称的目录
-                                artist_dir = os.path.join(
-                                    amd_downloads_dir, artist_name)
-                                if os.path.exists(artist_dir):
-                                    artist_items = os.listdir(artist_dir)
-                                    logger.info(
-                                        f"🔍 艺术家目录 '{artist_name}' 中的子目录: {artist_items}")
-
-                                    # 查找包含专辑名称的目录
-                                    for item in artist_items:
-                                        item_path = os.path.join(
-                                            artist_dir, item)
-                                        if os.path.isdir(item_path) and album_name in item:
-                                            album_dir = item_path
-                                            logger.info(
-                                                f"✅ 找到包含匹配的专辑目录: '{item}' 包含 '{album_name}'")
-                                            break
-
-                                    if album_dir:
-                                        # 遍历包含匹配的专辑目录
-                                        logger.info(
-                                            f"🔍 遍历包含匹配的专辑目录: {album_dir}")
-                                        for root, dirs, files in os.walk(album_dir):
-                                            for file in files:
-                                                if file.lower().endswith(('.m4a', '.flac', '.aac', '.mp3')):
-                                                    file_path = os.path.join(
-                                                        root, file)
-                                                    file_size = os.path.getsize(
-                                                        file_path)
-                                                    total_size += file_size
-
-                                                    # 从文件路径提取音乐信息
-                                                    relative_path = os.path.relpath(
-                                                        file_path, album_dir)
-                                                    files_info.append({
-                                                        'name': file,
-                                                        'path': relative_path,
-                                                        'size': file_size
-                                                    })
-
-                                        logger.info(
-                                            f"✅ 包含匹配目录中找到 {len(files_info)} 个音频文件")
-
-                                # 如果仍然没有找到，回退到整个AM-DL downloads目录
-                                if not files_info:
-                                    logger.warning(f"⚠️ 包含匹配也失败，回退到整个目录遍历")
-                                    if os.path.exists(amd_downloads_dir):
-                                        for root, dirs, files in os.walk(amd_downloads_dir):
-                                            for file in files:
-                                                if file.lower().endswith(('.m4a', '.flac', '.aac', '.mp3')):
-                                                    file_path = os.path.join(
-                                                        root, file)
-                                                    file_size = os.path.getsize(
-                                                        file_path)
-                                                    total_size += file_size
-
-                                                    # 从文件路径提取音乐信息
-                                                    relative_path = os.path.relpath(
-                                                        file_path, amd_downloads_dir)
-                                                    files_info.append({
-                                                        'name': file,
-                                                        'path': relative_path,
-                                                        'size': file_size
-                                                    })
+                                album_dir = library_index.find_album_dir(album_name)
+
+                            tracks = library_index.album_tracks(album_dir) if album_dir else []
+                            if not tracks:
+                                # 仍然没有找到时使用最近写入的曲目
+                                logger.warning(f"⚠️ 包含匹配也失败，使用曲库索引中最近写入的曲目")
+                                latest = library_index.latest_track()
+                                if latest:
+                                    album_dir = os.path.dirname(latest[0])
+                                    tracks = [latest]
+
+                            logger.info(f"🔍 专辑目录: {album_dir}，找到 {len(tracks)} 个音频文件")
+                            for file_path, file_size in tracks:
+                                total_size += file_size
+                                files_info.append({
+                                    'name': os.path.basename(file_path),
+                                    'path': os.path.relpath(file_path, album_dir),
+                                    'size': file_size
+                                })
 
                             # 计算总大小（MB）
                             # 修复：优先使用result中的total_size_mb，避免重复统计
@@ -19317,12 +18481,11 @@ class TelegramBot:
                                         possible_paths.append(os.path.join(
                                             amd_downloads_dir, first_file['path']))
 
-                                # 方式4：直接在amd_downloads_dir中查找
-                                for root, dirs, files in os.walk(amd_downloads_dir):
-                                    if first_file['name'] in files:
-                                        possible_paths.append(
-                                            os.path.join(root, first_file['name']))
-                                        break
+                                # 方式4：在曲库索引中按曲目名查找
+                                indexed_track = library_index.find_track(
+                                    os.path.splitext(first_file['name'])[0])
+                                if indexed_track:
+                                    possible_paths.append(indexed_track[0])
 
                                 # 尝试每种路径，找到第一个存在的文件
                                 first_file_path = None
@@ -21052,6 +20215,14 @@ class TelegramBot:
             return self.download_tasks[task_id]["cancelled"]
         return False
 
+    def _get_parallel_media_downloader(self) -> ParallelMediaDownloader:
+        """获取绑定到当前 user_client 的并行下载器（客户端重建后重新创建）"""
+        downloader = getattr(self, "_parallel_media_downloader", None)
+        if downloader is None or downloader.client is not self.user_client:
+            downloader = ParallelMediaDownloader(self.user_client, **parallel_download_settings())
+            self._parallel_media_downloader = downloader
+        return downloader
+
     async def download_user_media(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """
         通过 Telethon 处理用户发送或转发的媒体文件，以支持大文件下载。
@@ -21400,7 +20571,8 @@ class TelegramBot:
                     nonlocal last_update_time, last_downloaded
                     now = time.time()
 
-                    if now - last_update_time < 5 and current != total:
+                    # 每秒采样一次用于计算速度，消息编辑频率由状态消息渲染器控制
+                    if now - last_update_time < 1 and current != total:
                         return
 
                     diff_time = now - last_update_time
@@ -21434,36 +20606,34 @@ class TelegramBot:
                         f"⏳ 预计剩余：{eta_str}\n"
                         f"📊 进度：{bar}"
                     )
-                    try:
-                        if current != total:
-                            await context.bot.edit_message_text(
-                                text=progress_text,
-                                chat_id=chat_id,
-                                message_id=status_message.message_id,
-                                parse_mode=None
-                            )
-                    except Exception as e:
-                        if "Message is not modified" not in str(e):
-                            logger.warning(f"更新TG下载进度时出错: {e}")
+                    if current != total:
+                        get_status_renderer().submit(status_message, progress_text)
 
                 try:
                     # 生成唯一文件名，防止覆盖
-                    def get_unique_filename(base_path, filename):
-                        name, ext = os.path.splitext(filename)
-                        counter = 1
-                        unique_filename = filename
-                        while os.path.exists(os.path.join(base_path, unique_filename)):
-                            unique_filename = f"{name}_{counter}{ext}"
-                            counter += 1
-                        return unique_filename
-
-                    unique_file_name = get_unique_filename(
-                        download_path, file_name)
-                    downloaded_file = await self.user_client.download_media(
-                        telethon_message,
-                        file=os.path.join(download_path, unique_file_name),
-                        progress_callback=progress
-                    )
+                    unique_file_name = unique_filename(download_path, file_name)
+                    target_file = os.path.join(download_path, unique_file_name)
+                    downloaded_file = None
+                    # 大文件通过多个连接并行分块下载（支持断点续传），不可用时回退到 download_media
+                    parallel_downloader = self._get_parallel_media_downloader()
+                    if parallel_downloader.supports(telethon_message):
+                        try:
+                            downloaded_file = await parallel_downloader.download(
+                                telethon_message, target_file, progress_callback=progress)
+                        except ParallelDownloadUnavailable as e:
+                            logger.info(f"ℹ️ 并行下载不可用，使用普通下载: {e}")
+                        except (RPCError, OSError) as e:
+                            # 分块失败、文件引用过期、限流等：.partial 中的状态保留供下次续传，
+                            # 这次改用 download_media（会刷新文件引用）
+                            logger.warning(f"⚠️ 并行下载失败，改用普通下载: {e}")
+                    if not downloaded_file:
+                        downloaded_file = await self.user_client.download_media(
+                            telethon_message,
+                            file=target_file,
+                            progress_callback=progress
+                        )
+                    # 丢弃尚未发送的进度文本，避免覆盖完成消息
+                    await get_status_renderer().settle(status_message)
                     if downloaded_file:
                         # 下载成功，获取文件信息
                         file_size_mb = os.path.getsize(
@@ -21484,7 +20654,7 @@ class TelegramBot:
                         if is_audio_file:
                             try:
                                 logger.info(f"🎵 开始提取音频文件信息: {downloaded_file}")
-                                media_info = self.downloader.get_media_info(
+                                media_info = await self.downloader.get_media_info_async(
                                     downloaded_file)
                                 logger.info(
                                     f"🎵 get_media_info返回: {media_info}")
@@ -21731,27 +20901,17 @@ class GlobalProgressManager:
     """全局进度管理器，统一管理所有下载任务的进度更新"""
 
     def __init__(self):
-        self.last_update_time = time.time()
-        self.update_interval = 15  # 全局更新间隔15秒
         self.active_downloads = {}  # 存储活跃下载任务
-        self.lock = asyncio.Lock()
 
     async def update_progress(
         self, task_id: str, progress_data: dict, context, status_message
     ):
-        """更新单个任务的进度"""
-        async with self.lock:
-            self.active_downloads[task_id] = progress_data
-
-            now = time.time()
-            if now - self.last_update_time < self.update_interval:
-                return  # 未到更新时间
-
-            # 构建汇总进度消息
-            await self._send_summary_progress(context, status_message)
-            self.last_update_time = now
+        """更新单个任务的进度（编辑频率由状态消息渲染器按聊天统一控制）"""
+        self.active_downloads[task_id] = progress_data
+        # 构建汇总进度消息
+        self._send_summary_progress(status_message)
 
-    async def _send_summary_progress(self, context, status_message):
+    def _send_summary_progress(self, status_message):
         """发送汇总进度消息"""
         if not self.active_downloads:
             return
@@ -21794,19 +20954,7 @@ class GlobalProgressManager:
             progress_lines.append(f"... 还有 {remaining} 个任务进行中")
 
         progress_text = "\n".join(progress_lines)
-
-        try:
-            await context.bot.edit_message_text(
-                text=progress_text,
-                chat_id=status_message.chat_id,
-                message_id=status_message.message_id,
-                parse_mode=None,
-            )
-        except Exception as e:
-            if "Message is not modified" not in str(e) and "Flood control" not in str(
-                e
-            ):
-                logger.warning(f"更新汇总进度失败: {e}")
+        get_status_renderer().submit(status_message, progress_text)
 
     def remove_task(self, task_id: str):
         """移除完成的任务"""
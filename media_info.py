@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+媒体信息服务
+下载完成后的 ffprobe 探测统一从这里发起：结果按 (路径, 大小, 修改时间) 缓存，
+同时运行的 ffprobe 进程数量有上限；异步调用在专用线程池中执行，不阻塞事件循环。
+yt-dlp 已经给出分辨率和时长的文件直接使用 yt-dlp 的信息，不再探测
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+import subprocess
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_PARALLEL = 4
+DEFAULT_CACHE_ITEMS = 4096
+DEFAULT_TIMEOUT = 60
+
+
+def format_duration(seconds: float) -> str:
+    """把秒数格式化为 MM:SS，超过一小时为 HH:MM:SS"""
+    return (time.strftime("%H:%M:%S", time.gmtime(seconds)) if seconds >= 3600
+            else time.strftime("%M:%S", time.gmtime(seconds)))
+
+
+def media_info_from_ytdlp(info: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    从 yt-dlp 的信息字典构造与 get_media_info 相同格式的结果
+
+    只处理带宽高的视频；纯音频文件可能经过转码，码率以 ffprobe 为准
+
+    Returns:
+        媒体信息；信息不足时返回 None
+    """
+    if not info:
+        return None
+    width, height = info.get("width"), info.get("height")
+    if not width or not height or info.get("vcodec") == "none":
+        return None
+
+    media_info: Dict[str, Any] = {"resolution": f"{width}x{height}"}
+    duration = info.get("duration")
+    if duration:
+        media_info["duration"] = format_duration(float(duration))
+    abr = info.get("abr")
+    if abr:
+        media_info["bit_rate"] = f"{int(abr)} kbps"
+    filepath = info.get("filepath")
+    if filepath and os.path.exists(filepath):
+        media_info["size"] = f"{os.path.getsize(filepath) / (1024 * 1024):.2f} MB"
+    return media_info
+
+
+class YtdlpInfoCollector:
+    """
+    yt-dlp 后处理回调：按最终文件路径收集信息字典
+
+    用法: ydl_opts['postprocessor_hooks'].append(collector.postprocessor_hook)
+    """
+
+    def __init__(self):
+        self._infos: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def postprocessor_hook(self, d: Dict[str, Any]):
+        if d.get("status") != "finished":
+            return
+        info = d.get("info_dict") or {}
+        filepath = info.get("filepath")
+        if filepath:
+            with self._lock:
+                self._infos[os.path.abspath(filepath)] = info
+
+    def get(self, path: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._infos.get(os.path.abspath(str(path)))
+
+
+class MediaProbeService:
+    """带缓存和并发上限的 ffprobe 探测服务"""
+
+    def __init__(self, max_parallel: int = DEFAULT_MAX_PARALLEL,
+                 cache_items: int = DEFAULT_CACHE_ITEMS, timeout: float = DEFAULT_TIMEOUT):
+        """
+        初始化探测服务
+
+        Args:
+            max_parallel: 同时运行的 ffprobe 进程数上限
+            cache_items: 缓存的探测结果数量
+            timeout: 单次 ffprobe 的超时时间（秒）
+        """
+        self.max_parallel = max(1, int(max_parallel))
+        self.cache_items = max(1, int(cache_items))
+        self.timeout = timeout
+
+        # 同步调用（下载线程）和异步调用（线程池）共用同一个并发上限
+        self._slots = threading.BoundedSemaphore(self.max_parallel)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_parallel,
+                                            thread_name_prefix="ffprobe")
+        # (路径, 大小, 修改时间) -> ffprobe 的 JSON 输出
+        self._cache: "OrderedDict[Tuple[str, int, int], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.hits = 0
+        self.probes = 0
+        self.probe_seconds = 0.0
+        self.failures = 0
+
+    def probe(self, file_path: str) -> Dict[str, Any]:
+        """
+        获取 ffprobe -show_format -show_streams 的结果（同步）
+
+        Raises:
+            与 subprocess.run / json.loads 相同的异常（CalledProcessError、FileNotFoundError、
+            TimeoutExpired、JSONDecodeError）
+        """
+        stat = os.stat(file_path)
+        key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached
+
+        cmd = ["ffprobe", "-loglevel", "quiet", "-print_format", "json",
+               "-show_format", "-show_streams", str(file_path)]
+        logger.debug(f"🔧 执行ffprobe命令: {' '.join(cmd)}")
+        with self._slots:
+            start = time.perf_counter()
+            try:
+                result = subprocess.run(cmd, capture_output=True, text=True, check=True,
+                                        timeout=self.timeout)
+                info = json.loads(result.stdout)
+            except Exception:
+                self.failures += 1
+                raise
+            finally:
+                self.probes += 1
+                self.probe_seconds += time.perf_counter() - start
+
+        with self._lock:
+            self._cache[key] = info
+            while len(self._cache) > self.cache_items:
+                self._cache.popitem(last=False)
+        return info
+
+    async def run(self, func: Callable, *args) -> Any:
+        """在探测线程池中执行 func（保留当前任务上下文），用于从协程中调用同步的探测逻辑"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, contextvars.copy_context().run, func, *args)
+
+    def map(self, func: Callable, items: Iterable) -> List[Any]:
+        """
+        在探测线程池中并发执行 func(item)，按输入顺序返回结果（同步，供下载线程中的代码使用）
+
+        不要在探测线程池自身的线程中调用，否则可能互相等待
+        """
+        futures = [self._executor.submit(contextvars.copy_context().run, func, item) for item in items]
+        return [future.result() for future in futures]
+
+    def stats(self) -> Dict[str, Any]:
+        """获取探测统计"""
+        return {
+            "hits": self.hits,
+            "probes": self.probes,
+            "failures": self.failures,
+            "avg_seconds": self.probe_seconds / self.probes if self.probes else 0.0,
+            "cached": len(self._cache),
+        }
+
+
+_shared_service: Optional[MediaProbeService] = None
+_shared_service_lock = threading.Lock()
+
+
+def get_media_probe() -> MediaProbeService:
+    """获取进程内共享的探测服务（并发上限可通过 FFPROBE_MAX_PARALLEL 环境变量修改）"""
+    global _shared_service
+    with _shared_service_lock:
+        if _shared_service is None:
+            _shared_service = MediaProbeService(
+                max_parallel=int(os.getenv("FFPROBE_MAX_PARALLEL", DEFAULT_MAX_PARALLEL)))
+        return _shared_service
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+SQLite 元数据缓存
+缓存歌曲、专辑、歌词、艺术家头像等接口结果，按实体类型设置过期时间与条目上限，
+未找到的结果也会被缓存（负缓存），避免重复下载同一专辑时再次请求接口
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = "/app/db/metadata_cache.db"
+
+# 各实体类型的缓存策略：ttl 为命中结果的有效期，negative_ttl 为"未找到"结果的有效期（秒），
+# max_entries 为该类型保留的最大条目数（超出时按最近访问时间淘汰）
+DEFAULT_POLICIES = {
+    "song": {"ttl": 7 * 86400, "negative_ttl": 3600, "max_entries": 20000},
+    "album": {"ttl": 7 * 86400, "negative_ttl": 3600, "max_entries": 5000},
+    "lyrics": {"ttl": 30 * 86400, "negative_ttl": 7 * 86400, "max_entries": 20000},
+    "artist_avatar": {"ttl": 30 * 86400, "negative_ttl": 86400, "max_entries": 5000},
+    "apple_music": {"ttl": 7 * 86400, "negative_ttl": 3600, "max_entries": 5000},
+}
+
+
+class MetadataCache:
+    """按 (实体类型, 实体ID) 存储 JSON 结果的 SQLite 缓存"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH,
+                 policies: Optional[Dict[str, Dict[str, int]]] = None):
+        """
+        初始化元数据缓存
+
+        Args:
+            db_path: SQLite 数据库文件路径
+            policies: 覆盖默认缓存策略，例如 {"song": {"ttl": 86400}}
+        """
+        self.db_path = Path(db_path)
+        self.policies = {kind: dict(policy) for kind, policy in DEFAULT_POLICIES.items()}
+        for kind, policy in (policies or {}).items():
+            self.policies.setdefault(kind, dict(DEFAULT_POLICIES["song"])).update(policy)
+
+        self._lock = threading.Lock()
+        self._writes_since_prune: Dict[str, int] = {}
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self.enabled = True
+
+        try:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._init_database()
+        except Exception as e:
+            # 缓存不可用时不影响下载，所有查询都视为未命中
+            logger.warning(f"⚠️ 元数据缓存不可用，将直接请求接口: {e}")
+            self.enabled = False
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """打开连接并在一个事务中使用，结束时提交（出错时回滚）并关闭连接"""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_database(self):
+        """初始化数据库表"""
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS metadata_cache (
+                    kind TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (kind, key)
+                )
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_metadata_cache_lru
+                ON metadata_cache (kind, last_access)
+            ''')
+            conn.commit()
+        logger.info(f"✅ 元数据缓存初始化成功: {self.db_path}")
+
+    def lookup(self, kind: str, key: Any) -> Tuple[bool, Any]:
+        """
+        查询缓存
+
+        Returns:
+            (是否命中, 缓存的值)；负缓存命中时返回 (True, None)
+        """
+        if not self.enabled:
+            return False, None
+
+        key = str(key)
+        now = time.time()
+        try:
+            with self._lock, self._connect() as conn:
+                row = conn.execute(
+                    "SELECT value, expires_at FROM metadata_cache WHERE kind = ? AND key = ?",
+                    (kind, key)
+                ).fetchone()
+                if row is None or row[1] <= now:
+                    if row is not None:
+                        conn.execute("DELETE FROM metadata_cache WHERE kind = ? AND key = ?", (kind, key))
+                    self.misses[kind] = self.misses.get(kind, 0) + 1
+                    return False, None
+                conn.execute(
+                    "UPDATE metadata_cache SET last_access = ? WHERE kind = ? AND key = ?",
+                    (now, kind, key)
+                )
+                self.hits[kind] = self.hits.get(kind, 0) + 1
+                return True, (json.loads(row[0]) if row[0] is not None else None)
+        except Exception as e:
+            logger.debug(f"读取元数据缓存失败 ({kind}:{key}): {e}")
+            return False, None
+
+    def put(self, kind: str, key: Any, value: Any):
+        """写入缓存，value 为 None 时记录为"未找到"（负缓存）"""
+        if not self.enabled:
+            return
+
+        policy = self.policies.get(kind, DEFAULT_POLICIES["song"])
+        ttl = policy["ttl"] if value is not None else policy["negative_ttl"]
+        now = time.time()
+        try:
+            with self._lock, self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO metadata_cache (kind, key, value, expires_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (kind, str(key), json.dumps(value, ensure_ascii=False) if value is not None else None,
+                     now + ttl, now)
+                )
+                # 每写入一定次数检查一次条目上限，避免每次写入都统计行数
+                writes = self._writes_since_prune.get(kind, 0) + 1
+                if writes >= 100:
+                    self._prune(conn, kind, policy["max_entries"])
+                    writes = 0
+                self._writes_since_prune[kind] = writes
+        except Exception as e:
+            logger.debug(f"写入元数据缓存失败 ({kind}:{key}): {e}")
+
+    def _prune(self, conn: sqlite3.Connection, kind: str, max_entries: int):
+        """删除过期条目，并按最近访问时间淘汰超出上限的条目"""
+        conn.execute("DELETE FROM metadata_cache WHERE kind = ? AND expires_at <= ?", (kind, time.time()))
+        count = conn.execute("SELECT COUNT(*) FROM metadata_cache WHERE kind = ?", (kind,)).fetchone()[0]
+        if count > max_entries:
+            conn.execute('''
+                DELETE FROM metadata_cache WHERE kind = ? AND key IN (
+                    SELECT key FROM metadata_cache WHERE kind = ?
+                    ORDER BY last_access ASC LIMIT ?
+                )
+            ''', (kind, kind, count - max_entries))
+            logger.info(f"🧹 元数据缓存 {kind} 淘汰 {count - max_entries} 条")
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息，供 /status 使用"""
+        entries = {}
+        if self.enabled:
+            try:
+                with self._lock, self._connect() as conn:
+                    entries = dict(conn.execute(
+                        "SELECT kind, COUNT(*) FROM metadata_cache GROUP BY kind").fetchall())
+            except Exception as e:
+                logger.debug(f"统计元数据缓存失败: {e}")
+        hits = sum(self.hits.values())
+        misses = sum(self.misses.values())
+        return {
+            "enabled": self.enabled,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "hits_per_kind": dict(self.hits),
+            "misses_per_kind": dict(self.misses),
+            "entries": entries,
+        }
+
+
+_shared_cache: Optional[MetadataCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_metadata_cache() -> MetadataCache:
+    """获取进程内共享的元数据缓存（路径可通过 METADATA_CACHE_DB 环境变量修改）"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = MetadataCache(os.getenv("METADATA_CACHE_DB", DEFAULT_DB_PATH))
+        return _shared_cache
@@ -7,11 +7,13 @@ import os
 import sys
 import logging
 from pathlib import Path
-from typing import Dict, Optional, Union
+from typing import Dict, Optional, Tuple, Union
 import requests
 from urllib.parse import urlparse
 import tempfile
 
+from cover_art_cache import get_cover_art_cache
+
 # 配置日志
 logger = logging.getLogger(__name__)
 
@@ -25,6 +27,9 @@ class MusicMetadataManager:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
         
+        # 同一专辑的曲目共用封面缓存，每个封面地址只下载一次
+        self.cover_cache = get_cover_art_cache()
+        
         # 检查可用的音频标签库
         self.available_libraries = self._check_available_libraries()
         logger.info(f"🔧 可用的音频标签库: {', '.join(self.available_libraries) if self.available_libraries else '无'}")
@@ -108,19 +113,16 @@ class MusicMetadataManager:
             
             logger.info(f"🎵 使用mutagen为文件添加元数据: {file_path.name}")
             
-            # 尝试加载音频文件
-            audio_file = File(str(file_path))
-            
-            if audio_file is None:
-                logger.error(f"❌ mutagen无法识别音频文件: {file_path}")
-                return False
-            
             file_ext = file_path.suffix.lower()
             
+            # MP3/FLAC 各自只加载一次标签、修改后保存一次
             if file_ext == '.mp3':
                 return self._add_metadata_mp3_mutagen(file_path, metadata, cover_url)
             elif file_ext == '.flac':
                 return self._add_metadata_flac_mutagen(file_path, metadata, cover_url)
+            elif File(str(file_path)) is None:
+                logger.error(f"❌ mutagen无法识别音频文件: {file_path}")
+                return False
             else:
                 logger.warning(f"⚠️ mutagen暂不支持处理 {file_ext} 文件的元数据")
                 return False
@@ -204,11 +206,12 @@ class MusicMetadataManager:
             
             # 添加封面
             if cover_url:
-                cover_data = self._download_cover_image(cover_url)
-                if cover_data:
+                cover = self._get_cover(cover_url)
+                if cover:
+                    cover_data, cover_mime = cover
                     tags[APIC] = APIC(
                         encoding=3,
-                        mime='image/jpeg',
+                        mime=cover_mime,
                         type=3,  # 封面图片
                         desc='Cover',
                         data=cover_data
@@ -289,11 +292,12 @@ class MusicMetadataManager:
             
             # 添加封面
             if cover_url:
-                cover_data = self._download_cover_image(cover_url)
-                if cover_data:
+                cover = self._get_cover(cover_url)
+                if cover:
+                    cover_data, cover_mime = cover
                     picture = Picture()
                     picture.type = 3  # 封面图片
-                    picture.mime = 'image/jpeg'
+                    picture.mime = cover_mime
                     picture.desc = 'Cover'
                     picture.data = cover_data
                     audio_file.clear_pictures()
@@ -367,9 +371,10 @@ class MusicMetadataManager:
             
             # 添加封面
             if cover_url:
-                cover_data = self._download_cover_image(cover_url)
-                if cover_data:
-                    audiofile.tag.images.set(3, cover_data, "image/jpeg", "Cover")
+                cover = self._get_cover(cover_url)
+                if cover:
+                    cover_data, cover_mime = cover
+                    audiofile.tag.images.set(3, cover_data, cover_mime, "Cover")
                     logger.debug("  添加专辑封面")
             
             # 保存标签
@@ -384,36 +389,22 @@ class MusicMetadataManager:
             logger.error(f"❌ eyed3处理文件时出错: {e}")
             return False
     
+    def _get_cover(self, cover_url: str) -> Optional[Tuple[bytes, str]]:
+        """从共享封面缓存获取可嵌入的封面 (数据, MIME)，同一地址只下载并压缩一次"""
+        cover = self.cover_cache.get_embeddable(cover_url)
+        if cover is None:
+            return None
+        
+        # 无法压缩时仍限制嵌入封面大小为5MB
+        if len(cover[0]) > 5 * 1024 * 1024:
+            logger.warning("⚠️ 专辑封面过大，跳过添加")
+            return None
+        return cover
+    
     def _download_cover_image(self, cover_url: str) -> Optional[bytes]:
         """下载专辑封面图片"""
-        try:
-            if not cover_url:
-                return None
-            
-            logger.debug(f"🖼️ 下载专辑封面: {cover_url}")
-            
-            response = self.session.get(cover_url, timeout=30)
-            response.raise_for_status()
-            
-            # 检查内容类型
-            content_type = response.headers.get('content-type', '').lower()
-            if not any(img_type in content_type for img_type in ['image/jpeg', 'image/jpg', 'image/png']):
-                logger.warning(f"⚠️ 不支持的图片格式: {content_type}")
-                return None
-            
-            image_data = response.content
-            
-            # 检查图片大小（限制为5MB）
-            if len(image_data) > 5 * 1024 * 1024:
-                logger.warning("⚠️ 专辑封面过大，跳过添加")
-                return None
-            
-            logger.debug(f"✅ 成功下载专辑封面: {len(image_data)} 字节")
-            return image_data
-            
-        except Exception as e:
-            logger.warning(f"⚠️ 下载专辑封面失败: {e}")
-            return None
+        cover = self._get_cover(cover_url)
+        return cover[0] if cover else None
     
     def get_file_metadata(self, file_path: Union[str, Path]) -> Optional[Dict[str, str]]:
         """读取音乐文件的现有元数据"""
@@ -5,11 +5,20 @@ import re
 import json
 import time
 import logging
+import threading
 import requests
 import urllib.parse
 from pathlib import Path
-from typing import Optional, Dict, List, Tuple, Any
+from collections import deque
+from typing import Optional, Dict, List, Tuple, Any, Callable, Iterable, Iterator
 from hashlib import md5
+from concurrent.futures import ThreadPoolExecutor
+from transfer_engine import get_transfer_engine
+from metadata_cache import get_metadata_cache
+from lrc_merge import merge_lrc, parse_lrc
+from cover_art_cache import get_cover_art_cache
+from short_link_resolver import get_short_link_resolver
+from download_index import get_download_index
 # from cryptography.hazmat.primitives import padding
 # from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 
@@ -17,6 +26,9 @@ from hashlib import md5
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('netease_downloader')
 
+# 接口返回这些 code（或 code 为 200 但没有数据）时才视为"不存在"写入负缓存
+NOT_FOUND_CODES = (200, 404)
+
 # 导入音乐元数据处理模块
 try:
     from music_metadata import MusicMetadataManager
@@ -40,6 +52,9 @@ class APIConstants:
     SONG_URL_V1 = "https://interface3.music.163.com/eapi/song/enhance/player/url/v1"
     SONG_DETAIL_V3 = "https://interface3.music.163.com/api/v3/song/detail"
     PLAYLIST_DETAIL_API = 'https://music.163.com/api/v6/playlist/detail'
+
+    # 歌曲URL接口单次请求的最大歌曲数
+    SONG_URL_BATCH_SIZE = 100
     
     # 默认配置
     DEFAULT_CONFIG = {
@@ -77,7 +92,77 @@ class CryptoUtils:
         # 简化版本：直接返回MD5哈希，不使用AES加密
         return CryptoUtils.hex_digest(params.encode())
 
+class TrackProgressAggregator:
+    """
+    并发下载多首歌曲时的进度汇总器
+
+    各曲目的 downloading 回调被合并成一条专辑/歌单级别的进度（已下载字节、总字节、
+    速度均为所有曲目之和），并在锁内串行转发，避免多个线程同时刷新同一条消息
+    """
+
+    def __init__(self, progress_callback, total_tracks: int, min_interval: float = 0.5):
+        self.progress_callback = progress_callback
+        self.total_tracks = total_tracks
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._tracks: Dict[str, Dict[str, float]] = {}
+        self._completed = 0
+        self._last_emit = 0.0
+
+    def track_finished(self):
+        """记录一首歌曲处理完成（无论成功与否）"""
+        with self._lock:
+            self._completed += 1
+
+    def __call__(self, d):
+        if not self.progress_callback:
+            return
+        with self._lock:
+            # 非 downloading 事件（字符串提示、单曲 finished 等）原样串行转发
+            if not isinstance(d, dict) or d.get('status') != 'downloading':
+                self._emit(d)
+                return
+
+            filename = d.get('filename', '')
+            self._tracks[filename] = {
+                'total_bytes': d.get('total_bytes', 0) or 0,
+                'downloaded_bytes': d.get('downloaded_bytes', 0) or 0,
+                'speed': d.get('speed', 0) or 0,
+            }
+            now = time.time()
+            if now - self._last_emit < self.min_interval:
+                return
+            self._last_emit = now
+
+            total_bytes = sum(t['total_bytes'] for t in self._tracks.values())
+            downloaded_bytes = sum(t['downloaded_bytes'] for t in self._tracks.values())
+            # 已下载完的曲目不再计入速度
+            speed = sum(t['speed'] for t in self._tracks.values()
+                        if t['downloaded_bytes'] < t['total_bytes'])
+            eta = (total_bytes - downloaded_bytes) / speed if speed > 0 and total_bytes > downloaded_bytes else 0
+            self._emit({
+                'status': 'downloading',
+                'filename': f"[{self._completed}/{self.total_tracks}] {filename}",
+                'total_bytes': total_bytes,
+                'downloaded_bytes': downloaded_bytes,
+                'speed': speed,
+                'eta': eta,
+                'completed_tracks': self._completed,
+                'total_tracks': self.total_tracks,
+            })
+
+    def _emit(self, d):
+        try:
+            self.progress_callback(d)
+        except Exception as e:
+            logger.warning(f"⚠️ 进度回调失败: {e}")
+
+
 class NeteaseDownloader:
+    # 下载链接缓存：接口未返回有效期时的默认值，以及"该音质不可用"结果的缓存时间（秒）
+    URL_CACHE_DEFAULT_TTL = 1200
+    URL_CACHE_NEGATIVE_TTL = 300
+
     def __init__(self, bot=None):
         self.session = requests.Session()
         self.crypto_utils = CryptoUtils()
@@ -97,6 +182,32 @@ class NeteaseDownloader:
 
         # 设置cookies - 从环境变量或配置文件加载
         self._load_cookies()
+
+        # 音频文件传输使用共享的连接池下载引擎（支持断点续传）
+        self.transfer_engine = get_transfer_engine()
+
+        # 歌曲/专辑/歌词/艺术家头像的持久化元数据缓存
+        self.metadata_cache = get_metadata_cache()
+
+        # 专辑封面缓存：标签嵌入和 cover.jpg 共用，同一封面只下载一次
+        self.cover_cache = get_cover_art_cache()
+
+        # 专辑/歌单内并发处理的曲目数（解析链接、下载、元数据、歌词按曲目并行）
+        try:
+            self.track_workers = max(1, int(os.getenv('NCM_TRACK_WORKERS', '4')))
+        except ValueError:
+            self.track_workers = 4
+        logger.info(f"🧵 专辑/歌单并发下载数: {self.track_workers}")
+
+        # 获取大歌单时同时在途的分页/详情请求数
+        try:
+            self.listing_workers = max(1, int(os.getenv('NCM_LISTING_WORKERS', '4')))
+        except ValueError:
+            self.listing_workers = 4
+
+        # 下载链接缓存 {(song_id, quality_code): {'url', 'format', 'expires_at'}}
+        self._url_cache: Dict[Tuple[str, str], Dict] = {}
+        self._url_cache_lock = threading.Lock()
         
         # 初始化音乐元数据管理器
         logger.info(f"🔧 元数据初始化: METADATA_AVAILABLE = {METADATA_AVAILABLE}")
@@ -114,6 +225,11 @@ class NeteaseDownloader:
         
         # 歌词下载配置
         self.enable_lyrics_download = os.getenv('NCM_DOWNLOAD_LYRICS', 'true').lower() in ['true', '1', 'yes', 'on']
+        # 合并歌词时判定为同一时间点的最大时间差（毫秒）
+        try:
+            self.lyrics_merge_tolerance_ms = max(0, int(os.getenv('NCM_LYRICS_MERGE_TOLERANCE_MS', '50')))
+        except ValueError:
+            self.lyrics_merge_tolerance_ms = 50
         if self.enable_lyrics_download:
             logger.info("🎤 歌词下载功能已启用")
         else:
@@ -324,18 +440,16 @@ class NeteaseDownloader:
                     'error': f'不支持的链接格式: {short_url}'
                 }
             
-            # 发送请求获取重定向后的URL
-            response = self.session.get(short_url, allow_redirects=True, timeout=10)
+            # 获取重定向后的URL（共享的短链接解析器，结果缓存）
+            final_url = get_short_link_resolver().resolve_sync(short_url)
             
-            if response.status_code != 200:
-                logger.error(f"❌ 请求短链接失败，状态码: {response.status_code}")
+            if not final_url:
+                logger.error(f"❌ 请求短链接失败: {short_url}")
                 return {
                     'success': False,
-                    'error': f'请求短链接失败，状态码: {response.status_code}'
+                    'error': f'请求短链接失败: {short_url}'
                 }
             
-            # 获取最终URL
-            final_url = response.url
             logger.info(f"🔗 短链接重定向到: {final_url}")
             
             # 解析URL，提取音乐类型和ID
@@ -587,10 +701,13 @@ class NeteaseDownloader:
         返回: {quality: format_type}
         """
         available_formats = {}
+        song_id = str(song_id)
         
         for quality in self.quality_fallback:
             quality_code = self.quality_map[quality]
-            result = self.get_music_url(song_id, quality_code)
+            result = self._get_cached_music_url(song_id, quality_code)
+            if result is None:
+                result = self.get_music_urls_batch([song_id], quality_code).get(song_id)
             if result and result['url']:
                 format_type = result['format']
                 available_formats[quality] = format_type
@@ -598,53 +715,74 @@ class NeteaseDownloader:
         
         return available_formats
 
-    def get_music_url_with_fallback(self, song_id: str, preferred_quality: str = None) -> tuple:
+    def _quality_chain(self, preferred_quality: str = None) -> List[Tuple[str, str]]:
         """
-        获取音乐下载链接，保持原文件格式
-        返回: (url, actual_quality, file_format)
+        从首选音质开始的降级链，去掉对应同一API码率的重复项
+        返回: [(quality, quality_code), ...]
         """
         if not preferred_quality:
             preferred_quality = self.get_quality_setting()
-        
-        # 检测歌曲所有可用的格式
-        available_formats = self._detect_available_formats(song_id)
-        logger.info(f"🔍 歌曲 {song_id} 可用格式: {available_formats}")
-        
-        # 从首选音质开始，按降级顺序尝试
+
         start_index = 0
         if preferred_quality in self.quality_fallback:
             start_index = self.quality_fallback.index(preferred_quality)
-        
-        # 记录已尝试的格式，避免重复
-        tried_formats = set()
-        
-        # 优先尝试用户指定的音质
-        for i in range(start_index, len(self.quality_fallback)):
-            quality = self.quality_fallback[i]
+
+        chain = []
+        seen_codes = set()
+        for quality in self.quality_fallback[start_index:]:
             quality_code = self.quality_map[quality]
-            
-            logger.info(f"🔗 尝试获取音质 {quality} ({quality_code}) 的下载链接: {song_id}")
-            result = self.get_music_url(song_id, quality_code)
-            
-            if result and result['url']:
-                file_format = result['format']
-                logger.info(f"✅ 获取到 {quality} ({quality_code}) 音质链接，格式: {file_format}")
-                
-                # 如果这个格式还没尝试过，直接返回
-                if file_format not in tried_formats:
-                    tried_formats.add(file_format)
-                    logger.info(f"🎯 选择格式: {file_format} (音质: {quality})")
-                    return result['url'], quality, file_format
+            if quality_code not in seen_codes:
+                seen_codes.add(quality_code)
+                chain.append((quality, quality_code))
+        return chain
+
+    def resolve_music_urls(self, song_ids: List[str], preferred_quality: str = None) -> Dict[str, tuple]:
+        """
+        批量获取多首歌曲的下载链接（支持音质降级）
+
+        每个音质等级只对仍未解析的歌曲发送一次批量请求，结果按过期时间缓存，
+        因此整张专辑/歌单通常只需要几次请求
+        返回: {song_id: (url, actual_quality, file_format)}，不可用的歌曲为 (None, None, None)
+        """
+        pending = list(dict.fromkeys(str(song_id) for song_id in song_ids))
+        resolved = {}
+
+        for quality, quality_code in self._quality_chain(preferred_quality):
+            if not pending:
+                break
+
+            uncached = [song_id for song_id in pending if self._get_cached_music_url(song_id, quality_code) is None]
+            if uncached:
+                self.get_music_urls_batch(uncached, quality_code)
+
+            still_pending = []
+            for song_id in pending:
+                result = self._get_cached_music_url(song_id, quality_code)
+                if result and result['url']:
+                    resolved[song_id] = (result['url'], quality, result['format'])
                 else:
-                    logger.info(f"⚠️ 格式 {file_format} 已尝试过，跳过")
-        
-        # 如果所有音质都尝试过了，返回最后一个可用的
-        if result and result['url']:
-            logger.warning(f"❌ 所有音质都尝试过，使用最后可用的: {quality} -> {file_format}")
-            return result['url'], quality, file_format
-        
-        logger.error(f"❌ 所有音质都不可用: {song_id}")
-        return None, None, None
+                    still_pending.append(song_id)
+            pending = still_pending
+
+        for song_id in pending:
+            resolved[song_id] = (None, None, None)
+
+        if len(resolved) > 1:
+            logger.info(f"🔗 批量解析下载链接完成: {len(resolved) - len(pending)}/{len(resolved)} 首可用")
+        return resolved
+
+    def get_music_url_with_fallback(self, song_id: str, preferred_quality: str = None) -> tuple:
+        """
+        获取音乐下载链接，保持原文件格式
+        返回: (url, actual_quality, file_format)
+        """
+        song_id = str(song_id)
+        url, quality, file_format = self.resolve_music_urls([song_id], preferred_quality)[song_id]
+        if url:
+            logger.info(f"🎯 选择格式: {file_format} (音质: {quality})")
+        else:
+            logger.error(f"❌ 所有音质都不可用: {song_id}")
+        return url, quality, file_format
     
 
         
@@ -824,6 +962,11 @@ class NeteaseDownloader:
 
     def get_album_songs(self, album_id: str) -> Optional[List[Dict]]:
         """获取专辑中的所有歌曲"""
+        found, cached_songs = self.metadata_cache.lookup('album', album_id)
+        if found:
+            logger.info(f"📦 专辑缓存命中: {album_id}")
+            return cached_songs
+
         try:
             url = f"https://music.163.com/api/album/{album_id}"
 
@@ -865,10 +1008,14 @@ class NeteaseDownloader:
                     processed_songs.append(song_info)
 
                 logger.info(f"✅ 获取到专辑 {album_info.get('name')} 中的 {len(processed_songs)} 首歌曲")
+                self.metadata_cache.put('album', album_id, processed_songs)
                 return processed_songs
             else:
                 logger.error(f"❌ 获取专辑歌曲失败: {data.get('msg', '未知错误')}")
                 logger.error(f"❌ API响应: {data}")
+                # 只缓存确实不存在的专辑；限流、风控等临时错误不缓存，下次重新请求
+                if data.get('code') in NOT_FOUND_CODES:
+                    self.metadata_cache.put('album', album_id, None)
 
         except Exception as e:
             logger.error(f"❌ 获取专辑歌曲时出错: {e}")
@@ -877,6 +1024,11 @@ class NeteaseDownloader:
 
     def get_song_info(self, song_id: str) -> Optional[Dict]:
         """通过歌曲ID获取歌曲详细信息"""
+        found, cached_info = self.metadata_cache.lookup('song', song_id)
+        if found:
+            logger.info(f"📦 歌曲信息缓存命中: {song_id}")
+            return cached_info
+
         try:
             # 使用网易云音乐的歌曲详情API
             url = f"https://music.163.com/api/song/detail/?id={song_id}&ids=[{song_id}]"
@@ -908,9 +1060,13 @@ class NeteaseDownloader:
                 }
 
                 logger.info(f"✅ 获取歌曲信息成功: {song_info['name']} - {song_info['artist']}")
+                self.metadata_cache.put('song', song_id, song_info)
                 return song_info
             else:
                 logger.warning(f"⚠️ 歌曲详情API返回异常: {data}")
+                # 只缓存确实不存在的歌曲；限流、风控等临时错误不缓存，下次重新请求
+                if data.get('code') in NOT_FOUND_CODES:
+                    self.metadata_cache.put('song', song_id, None)
                 return None
 
         except Exception as e:
@@ -922,67 +1078,102 @@ class NeteaseDownloader:
         获取网易云音乐下载链接和格式信息
         返回: {'url': str, 'format': str} 或 None
         """
-        try:
-            # 使用网易云音乐的歌曲URL获取API
-            url = f"{self.api_url}/api/song/enhance/player/url"
-
-            # 音质映射 - 网易云API参数
-            quality_map = {
-                '128k': 128000,        # 标准音质
-                '320k': 320000,        # 较高音质
-                'flac': 999000,        # 极高/无损
-                'flac24bit': 1999000,  # Hi-Res 24bit及以上
-                # 兼容旧参数
-                'high': 320000,        # 兼容：较高
-                'lossless': 999000,    # 兼容：无损
-                'hires': 1999000,      # 兼容：高解析度无损
-                'master': 1999000,     # 兼容：超清母带
-                'surround': 1999000    # 兼容：沉浸环绕声
+        song_id = str(song_id)
+        result = self._get_cached_music_url(song_id, quality)
+        if result is None:
+            result = self.get_music_urls_batch([song_id], quality).get(song_id)
+        if result and result['url']:
+            return {
+                'url': result['url'],
+                'format': result['format']
             }
+        return None
+
+    def get_music_urls_batch(self, song_ids: List[str], quality: str = '128k') -> Dict[str, Dict]:
+        """
+        一次请求获取多首歌曲在指定音质下的下载链接，并写入缓存
+        返回: {song_id: {'url': str 或 None, 'format': str 或 None, 'expires_at': float}}
+        """
+        # 使用网易云音乐的歌曲URL获取API
+        url = f"{self.api_url}/api/song/enhance/player/url"
 
-            br = quality_map.get(quality, 128000)
+        # 音质映射 - 网易云API参数
+        quality_map = {
+            '128k': 128000,        # 标准音质
+            '320k': 320000,        # 较高音质
+            'flac': 999000,        # 极高/无损
+            'flac24bit': 1999000,  # Hi-Res 24bit及以上
+            # 兼容旧参数
+            'high': 320000,        # 兼容：较高
+            'lossless': 999000,    # 兼容：无损
+            'hires': 1999000,      # 兼容：高解析度无损
+            'master': 1999000,     # 兼容：超清母带
+            'surround': 1999000    # 兼容：沉浸环绕声
+        }
 
+        br = quality_map.get(quality, 128000)
+        results = {}
+        song_ids = [str(song_id) for song_id in song_ids]
+
+        for offset in range(0, len(song_ids), APIConstants.SONG_URL_BATCH_SIZE):
+            batch = song_ids[offset:offset + APIConstants.SONG_URL_BATCH_SIZE]
             params = {
-                'ids': f'[{song_id}]',
+                'ids': f"[{','.join(batch)}]",
                 'br': br,
                 # 移除强制的encodeType参数，让API返回原始格式
-                # 'encodeType': 'flac' if br >= 999000 else 'mp3'  # 指定编码类型
             }
 
-            logger.info(f"🔗 请求音乐链接: {song_id} (音质: {quality}, API参数: {br})")
-
-            response = self.session.get(url, params=params, timeout=15)
-            response.raise_for_status()
-
-            data = response.json()
+            logger.info(f"🔗 请求音乐链接: {len(batch)} 首 (音质: {quality}, API参数: {br})")
 
-            if data.get('code') == 200:
-                song_data = data.get('data', [])
-                if song_data and len(song_data) > 0:
-                    song_info = song_data[0]
-                    music_url = song_info.get('url')
+            try:
+                response = self.session.get(url, params=params, timeout=15)
+                response.raise_for_status()
+                data = response.json()
+            except Exception as e:
+                logger.error(f"❌ 获取音乐链接时出错: {e}")
+                continue
 
-                    if music_url:
+            if data.get('code') != 200:
+                logger.error(f"❌ 获取音乐链接失败: {data.get('message', '未知错误')}")
+                continue
+
+            now = time.time()
+            for song_data in data.get('data') or []:
+                song_id = str(song_data.get('id'))
+                music_url = song_data.get('url')
+                if music_url:
+                    # 链接有效期（秒），提前一分钟视为过期
+                    ttl = max(0, (song_data.get('expi') or self.URL_CACHE_DEFAULT_TTL) - 60)
+                    entry = {
+                        'url': music_url,
                         # 从URL中推断文件格式
-                        file_format = self._extract_format_from_url(music_url)
-                        logger.info(f"✅ 获取音乐链接成功: {song_id}, 格式: {file_format}")
-                        return {
-                            'url': music_url,
-                            'format': file_format
-                        }
-                    else:
-                        logger.warning(f"⚠️ 音乐链接为空，可能需要VIP或版权限制: {song_id}")
-                        return None
+                        'format': self._extract_format_from_url(music_url),
+                        'expires_at': now + ttl
+                    }
                 else:
-                    logger.warning(f"⚠️ 未获取到歌曲数据: {song_id}")
-                    return None
-            else:
-                logger.error(f"❌ 获取音乐链接失败: {data.get('message', '未知错误')}")
-
-        except Exception as e:
-            logger.error(f"❌ 获取音乐链接时出错: {e}")
-
-        return None
+                    logger.debug(f"⚠️ 音乐链接为空，可能需要VIP或版权限制: {song_id} ({quality})")
+                    entry = {'url': None, 'format': None, 'expires_at': now + self.URL_CACHE_NEGATIVE_TTL}
+                results[song_id] = entry
+
+            missing = [song_id for song_id in batch if song_id not in results]
+            if missing:
+                logger.warning(f"⚠️ 未获取到歌曲数据: {', '.join(missing)}")
+
+        with self._url_cache_lock:
+            for song_id, entry in results.items():
+                self._url_cache[(song_id, quality)] = entry
+        return results
+
+    def _get_cached_music_url(self, song_id: str, quality: str) -> Optional[Dict]:
+        """读取未过期的链接缓存（包括"该音质不可用"的结果），未命中返回 None"""
+        with self._url_cache_lock:
+            entry = self._url_cache.get((str(song_id), quality))
+            if entry is None:
+                return None
+            if entry['expires_at'] <= time.time():
+                del self._url_cache[(str(song_id), quality)]
+                return None
+            return entry
     
     def _extract_format_from_url(self, url: str) -> str:
         """
@@ -1018,7 +1209,7 @@ class NeteaseDownloader:
     def get_file_size(self, url: str) -> int:
         """获取文件大小（字节）"""
         try:
-            response = requests.head(url, timeout=10)
+            response = self.transfer_engine.session.head(url, timeout=10)
             if response.status_code == 200:
                 content_length = response.headers.get('content-length')
                 if content_length:
@@ -1042,99 +1233,35 @@ class NeteaseDownloader:
         return f"{size_bytes:.1f}TB"
 
     def download_file(self, url: str, filepath: str, song_name: str = "", retries: int = 3, progress_callback=None) -> bool:
-        """下载文件并记录统计信息，支持进度回调"""
-        # 获取文件大小
-        file_size = self.get_file_size(url)
+        """下载文件并记录统计信息，支持进度回调（共享连接池，失败后断点续传）"""
         filename = Path(filepath).name
+        logger.info(f"⬇️ 正在下载: {filename}")
 
-        for attempt in range(retries):
-            try:
-                logger.info(f"⬇️ 正在下载: {filename}")
-                response = requests.get(url, timeout=30, stream=True)
-                response.raise_for_status()
-
-                # 确保目录存在
-                os.makedirs(os.path.dirname(filepath), exist_ok=True)
-
-                # 获取实际文件大小
-                total_size = int(response.headers.get('content-length', file_size or 0))
-                downloaded_size = 0
-
-                # 发送开始下载的进度信息
-                if progress_callback:
-                    progress_callback({
-                        'status': 'downloading',
-                        'filename': filename,
-                        'total_bytes': total_size,
-                        'downloaded_bytes': 0,
-                        'speed': 0,
-                        'eta': 0
-                    })
+        # 文件大小直接取自 GET 响应的 Content-Length/Content-Range，不再单独发送 HEAD
+        if not self.transfer_engine.download(url, filepath, retries=retries, progress_callback=progress_callback):
+            return False
 
+        # 获取实际文件大小
+        actual_size = os.path.getsize(filepath)
 
-                start_time = time.time()
-                last_update_time = start_time
-
-                with open(filepath, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-                            downloaded_size += len(chunk)
-
-                            current_time = time.time()
-
-                            # 每0.5秒更新一次进度
-                            if current_time - last_update_time >= 0.5 or downloaded_size == total_size:
-                                # 计算下载速度
-                                elapsed_time = current_time - start_time
-                                speed = downloaded_size / elapsed_time if elapsed_time > 0 else 0
-
-                                # 计算预计剩余时间
-                                eta = 0
-                                if speed > 0 and total_size > downloaded_size:
-                                    eta = (total_size - downloaded_size) / speed
-
-                                # 发送进度更新
-                                if progress_callback:
-                                    progress_callback({
-                                        'status': 'downloading',
-                                        'filename': filename,
-                                        'total_bytes': total_size,
-                                        'downloaded_bytes': downloaded_size,
-                                        'speed': speed,
-                                        'eta': eta
-                                    })
-
-                                last_update_time = current_time
-
-                # 获取实际文件大小
-                actual_size = os.path.getsize(filepath)
-
-                # 发送完成信息（仅在单曲下载时发送，专辑下载时由上层统一处理）
-                if progress_callback:
-                    # 检查是否是单曲下载（通过检查是否有专辑上下文来判断）
-                    is_single_song = not hasattr(self, '_in_album_download') or not self._in_album_download
-                    if is_single_song:
-                        progress_callback({
-                            'status': 'finished',
-                            'filename': filename,
-                            'total_bytes': actual_size,
-                            'downloaded_bytes': actual_size,
-                            'speed': 0,
-                            'eta': 0
-                        })
-
-                # 统计信息的更新由上层调用方（专辑/单曲下载函数）统一处理，避免重复统计
-
-                logger.info(f"✅ 下载成功: {filename} ({self.format_file_size(actual_size)})")
-                return True
+        # 发送完成信息（仅在单曲下载时发送，专辑下载时由上层统一处理）
+        if progress_callback:
+            # 检查是否是单曲下载（通过检查是否有专辑上下文来判断）
+            is_single_song = not hasattr(self, '_in_album_download') or not self._in_album_download
+            if is_single_song:
+                progress_callback({
+                    'status': 'finished',
+                    'filename': filename,
+                    'total_bytes': actual_size,
+                    'downloaded_bytes': actual_size,
+                    'speed': 0,
+                    'eta': 0
+                })
 
-            except Exception as e:
-                logger.warning(f"⚠️ 下载失败 (尝试 {attempt + 1}/{retries}): {e}")
-                if attempt < retries - 1:
-                    time.sleep(2)
+        # 统计信息的更新由上层调用方（专辑/单曲下载函数）统一处理，避免重复统计
 
-        return False
+        logger.info(f"✅ 下载成功: {filename} ({self.format_file_size(actual_size)})")
+        return True
     
     def get_song_lyrics(self, song_id: str) -> Optional[Dict[str, str]]:
         """
@@ -1147,6 +1274,11 @@ class NeteaseDownloader:
             Dict包含歌词信息: {'lrc': '同步歌词', 'tlyric': '翻译歌词', 'romalrc': '罗马音歌词'}
             如果获取失败返回None
         """
+        found, cached_lyrics = self.metadata_cache.lookup('lyrics', song_id)
+        if found:
+            logger.info(f"📦 歌词缓存命中: {song_id}")
+            return cached_lyrics
+
         try:
             logger.info(f"🎤 获取歌词: {song_id}")
             
@@ -1184,9 +1316,11 @@ class NeteaseDownloader:
                 
                 if lyrics_data:
                     logger.info(f"✅ 成功获取歌词: {song_id}")
+                    self.metadata_cache.put('lyrics', song_id, lyrics_data)
                     return lyrics_data
                 else:
                     logger.warning(f"⚠️ 歌曲无歌词或歌词为空: {song_id}")
+                    self.metadata_cache.put('lyrics', song_id, None)
                     return None
             else:
                 logger.warning(f"⚠️ 获取歌词失败: {data.get('msg', '未知错误')}")
@@ -1487,47 +1621,14 @@ class NeteaseDownloader:
             str: 合并后的歌词内容
         """
         try:
-            import re
-            
-            # 解析三种歌词的时间轴和内容
-            lyrics1_lines = self._parse_lyrics_with_timestamps(lyrics1)
-            lyrics2_lines = self._parse_lyrics_with_timestamps(lyrics2)
-            lyrics3_lines = self._parse_lyrics_with_timestamps(lyrics3)
+            # 每份歌词只解析一次，按时间有序归并（允许 lyrics_merge_tolerance_ms 的时间偏差）
+            merged_lyrics = merge_lrc(lyrics1, lyrics2, lyrics3, tolerance_ms=self.lyrics_merge_tolerance_ms)
             
-            if not lyrics1_lines:
+            if not merged_lyrics:
                 logger.warning(f"⚠️ 原文歌词解析失败，无法合并")
                 return lyrics1
             
-            # 创建合并后的歌词
-            merged_lines = []
-            
-            # 遍历原文歌词的每一行
-            for timestamp, content1 in lyrics1_lines:
-                # 查找相同时间轴的中文翻译
-                content2 = ""
-                for ts2, content2_temp in lyrics2_lines:
-                    if ts2 == timestamp:
-                        content2 = content2_temp
-                        break
-                
-                # 查找相同时间轴的罗马音
-                content3 = ""
-                for ts3, content3_temp in lyrics3_lines:
-                    if ts3 == timestamp:
-                        content3 = content3_temp
-                        break
-                
-                # 按顺序添加：原文、中文、罗马音
-                merged_lines.append(f"[{timestamp}]{content1}")
-                if content2:
-                    merged_lines.append(f"[{timestamp}]{content2}")
-                if content3:
-                    merged_lines.append(f"[{timestamp}]{content3}")
-            
-            # 组合最终结果
-            merged_lyrics = "\n".join(merged_lines)
-            
-            logger.info(f"✅ 成功合并三种歌词: 原文+中文+罗马音, 共 {len(merged_lines)} 行")
+            logger.info(f"✅ 成功合并三种歌词: 原文+中文+罗马音, 共 {merged_lyrics.count(chr(10)) + 1} 行")
             return merged_lyrics
             
         except Exception as e:
@@ -1548,43 +1649,14 @@ class NeteaseDownloader:
             str: 合并后的歌词内容
         """
         try:
-            import re
-            
-            # 解析第一种歌词的时间轴和内容
-            lyrics1_lines = self._parse_lyrics_with_timestamps(lyrics1)
-            
-            # 解析第二种歌词的时间轴和内容
-            lyrics2_lines = self._parse_lyrics_with_timestamps(lyrics2)
+            # 每份歌词只解析一次，按时间有序归并（允许 lyrics_merge_tolerance_ms 的时间偏差）
+            merged_lyrics = merge_lrc(lyrics1, lyrics2, tolerance_ms=self.lyrics_merge_tolerance_ms)
             
-            if not lyrics1_lines:
+            if not merged_lyrics:
                 logger.warning(f"⚠️ 第一种歌词解析失败，无法合并")
                 return lyrics1
             
-            # 创建合并后的歌词
-            merged_lines = []
-            
-            # 遍历第一种歌词的每一行
-            for timestamp, content1 in lyrics1_lines:
-                # 查找相同时间轴的第二种歌词
-                content2 = ""
-                for ts2, content2_temp in lyrics2_lines:
-                    if ts2 == timestamp:
-                        content2 = content2_temp
-                        break
-                
-                # 垂直合并内容：先显示第一种，再显示第二种
-                if content2:
-                    # 两种语言都有内容，垂直显示
-                    merged_lines.append(f"[{timestamp}]{content1}")
-                    merged_lines.append(f"[{timestamp}]{content2}")
-                else:
-                    # 只有第一种语言有内容
-                    merged_lines.append(f"[{timestamp}]{content1}")
-            
-            # 组合最终结果
-            merged_lyrics = "\n".join(merged_lines)
-            
-            logger.info(f"✅ 成功合并歌词: {merge_type}, 共 {len(merged_lines)} 行")
+            logger.info(f"✅ 成功合并歌词: {merge_type}, 共 {merged_lyrics.count(chr(10)) + 1} 行")
             return merged_lyrics
             
         except Exception as e:
@@ -1600,29 +1672,10 @@ class NeteaseDownloader:
             lyrics: 原始歌词内容
             
         Returns:
-            list: [(timestamp, content), ...] 格式的列表
+            list: [(timestamp, content), ...] 格式的列表，按时间排序
         """
         try:
-            import re
-            
-            # 匹配时间轴格式 [mm:ss.fff] 或 [mm:ss.ff] 或 [mm:ss] 或 [mm:ss.f]
-            timestamp_pattern = r'\[(\d{2}:\d{2}(?:\.\d{1,3})?)\](.*)'
-            
-            lines = []
-            for line in lyrics.split('\n'):
-                line = line.strip()
-                if not line:
-                    continue
-                    
-                match = re.match(timestamp_pattern, line)
-                if match:
-                    timestamp = match.group(1)
-                    content = match.group(2).strip()
-                    if content:  # 只添加有内容的行
-                        lines.append((timestamp, content))
-            
-            return lines
-            
+            return [(stamp, content) for _, stamp, content in parse_lrc(lyrics)]
         except Exception as e:
             logger.error(f"❌ 解析歌词时间轴时出错: {e}")
             return []
@@ -1832,16 +1885,11 @@ class NeteaseDownloader:
             cover_data: Optional[bytes] = None
             cover_mime = 'image/jpeg'
             if cover_url:
-                try:
-                    import requests as _req
-                    resp = _req.get(cover_url, timeout=15)
-                    resp.raise_for_status()
-                    cover_data = resp.content
-                    ctype = resp.headers.get('content-type', '').lower()
-                    if 'png' in ctype:
-                        cover_mime = 'image/png'
-                except Exception as ce:
-                    logger.warning(f"⚠️ 下载专辑封面失败，跳过封面: {ce}")
+                cover = self.cover_cache.get_embeddable(cover_url)
+                if cover:
+                    cover_data, cover_mime = cover
+                else:
+                    logger.warning(f"⚠️ 获取专辑封面失败，跳过封面: {cover_url}")
 
             if suffix == '.mp3':
                 try:
@@ -2123,6 +2171,62 @@ class NeteaseDownloader:
                 'download_path': download_dir
             }
 
+    def _iter_ordered_concurrently(self, items: Iterable[Any], fetch: Callable[[Any], Any],
+                                   max_in_flight: int = None) -> Iterator[Any]:
+        """
+        并发执行 fetch 并按 items 的原始顺序产出结果
+
+        同时在途的请求数不超过 max_in_flight；调用方提前停止迭代时，尚未开始的请求会被取消
+        """
+        max_in_flight = max_in_flight or self.listing_workers
+        items = iter(items)
+        exhausted = object()
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='ncm-list') as executor:
+            try:
+                for item in items:
+                    pending.append(executor.submit(fetch, item))
+                    if len(pending) >= max_in_flight:
+                        break
+                while pending:
+                    result = pending.popleft().result()
+                    next_item = next(items, exhausted)
+                    if next_item is not exhausted:
+                        pending.append(executor.submit(fetch, next_item))
+                    yield result
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def _run_track_jobs(self, items: Iterable[Any], worker, progress: Optional[TrackProgressAggregator] = None) -> List[Any]:
+        """
+        使用线程池并发处理专辑/歌单中的曲目
+
+        Args:
+            items: 待处理的曲目列表，也可以是边获取边产出曲目的生成器
+            worker: 处理单首曲目的函数，参数为 (序号(从1开始), 曲目)
+            progress: 进度汇总器，每首曲目结束时记录完成数
+
+        Returns:
+            与 items 顺序一致的处理结果列表，抛出异常的曲目结果为 None
+        """
+        def run(index, item):
+            try:
+                return worker(index, item)
+            except Exception as e:
+                logger.error(f"❌ 处理第 {index} 首歌曲时发生异常: {e}")
+                return None
+            finally:
+                if progress:
+                    progress.track_finished()
+
+        workers = min(self.track_workers, len(items)) if isinstance(items, (list, tuple)) else self.track_workers
+        if workers == 0:
+            return []
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ncm-track') as executor:
+            futures = [executor.submit(run, i, item) for i, item in enumerate(items, 1)]
+            return [future.result() for future in futures]
+
     def download_album(self, album_name: str, download_dir: str = "./downloads/netease", quality: str = '128k', progress_callback=None) -> Dict:
         """下载专辑"""
         # 重置统计信息
@@ -2287,8 +2391,12 @@ class NeteaseDownloader:
         print(f"📊 歌曲数量: {len(songs)}")
         print()
 
-        # 下载每首歌曲
-        for i, song in enumerate(songs, 1):
+        # 预先批量解析全部歌曲的下载链接，逐曲查询时直接命中缓存
+        self.resolve_music_urls([song['id'] for song in songs], quality)
+        track_progress = TrackProgressAggregator(progress_callback, len(songs))
+
+        def download_track(i, song):
+            """处理单首歌曲，返回 downloaded_songs 记录，无法获取链接时返回 None"""
             song_name = song['name']
             artist = song['artist']
             track_number = song.get('track_number', i)
@@ -2299,107 +2407,97 @@ class NeteaseDownloader:
             song_id = str(song['id'])
             download_url, actual_quality, file_format = self.get_music_url_with_fallback(song_id, quality)
 
-            if download_url:
-                # 使用配置的歌曲文件名格式
-                safe_title = self.clean_filename(song_name)
-                safe_artist = self.clean_filename(artist)
+            if not download_url:
+                print(f"  ❌ 无法获取下载链接: {song_name}")
+                return None
 
-                # 使用从URL推断的实际文件格式
-                ext = file_format
+            # 使用配置的歌曲文件名格式
+            safe_title = self.clean_filename(song_name)
+            safe_artist = self.clean_filename(artist)
 
-                # 构建自定义文件名（使用NCM_SONG_FILE_FORMAT）
-                if '{SongNumber}' in self.song_file_format or '{SongName}' in self.song_file_format or '{ArtistName}' in self.song_file_format:
-                    # 替换占位符
-                    custom_filename = self.song_file_format
-                    
-                    # 替换歌曲编号
-                    if '{SongNumber}' in custom_filename:
-                        custom_filename = custom_filename.replace('{SongNumber}', f"{track_number:02d}")
-                    
-                    # 替换歌曲名称
-                    if '{SongName}' in custom_filename:
-                        custom_filename = custom_filename.replace('{SongName}', safe_title)
-                    
-                    # 替换艺术家名称
-                    if '{ArtistName}' in custom_filename:
-                        custom_filename = custom_filename.replace('{ArtistName}', safe_artist)
-                    
-                    # 添加文件扩展名
-                    filename = f"{custom_filename}.{ext}"
-                else:
-                    # 如果没有占位符，使用默认格式
-                    filename = f"{track_number:02d}. {safe_artist} - {safe_title}.{ext}"
-                
-                filepath = album_dir / filename
+            # 使用从URL推断的实际文件格式
+            ext = file_format
 
-                # 检查文件是否已存在
-                if filepath.exists():
-                    print(f"  📁 文件已存在，跳过")
-                    # 仍然需要更新统计信息
-                    file_size = filepath.stat().st_size
-                    self.download_stats['downloaded_files'] += 1
-                    self.download_stats['total_size'] += file_size
-                    self.download_stats['downloaded_songs'].append({
-                        'name': f"{song_name} - {artist}",
-                        'song_name': song_name,  # 添加原始歌曲名称
-                        'size': file_size,
-                        'filepath': str(filepath),
-                        'file_format': ext  # 添加文件格式信息
-                    })
-                else:
-                    # 下载文件
-                    download_success = self.download_file(download_url, str(filepath), f"{song_name} - {artist}", progress_callback=progress_callback)
-                    if download_success:
-                        # 下载成功，更新统计信息
-                        file_size = filepath.stat().st_size if filepath.exists() else 0
-                        self.download_stats['downloaded_files'] += 1
-                        self.download_stats['total_size'] += file_size
-                        self.download_stats['downloaded_songs'].append({
-                            'name': f"{song_name} - {artist}",
-                            'song_name': song_name,  # 添加原始歌曲名称
-                            'size': file_size,
-                            'filepath': str(filepath),
-                            'file_format': ext  # 添加文件格式信息
-                        })
-                        
-                        # 为下载的音乐文件添加元数据
-                        song_info = {
-                            'name': song_name,
-                            'artist': artist,
-                            'album': album_title,
-                            'album_artist': album_artist,
-                            'pic_url': song.get('pic_url', ''),
-                            'publish_time': song.get('publish_time', ''),
-                            'track_number': track_number
-                        }
-                        album_info = {
-                            'name': album_title,
-                            'artist': album_artist,
-                            'pic_url': songs[0].get('pic_url', '') if songs else '',
-                            'publish_time': songs[0].get('publish_time', '') if songs else ''
-                        }
-                        self.add_metadata_to_music_file(str(filepath), song_info, album_info)
-                        
-                        # 下载歌词文件
-                        self.download_song_lyrics(str(song['id']), str(filepath), song_info)
-                        
-                        print(f"  ✅ 下载成功: {song_name} - {artist} ({self.format_file_size(file_size)})")
-                    else:
-                        print(f"  ❌ 下载失败: {song_name} - {artist}")
-                        # 记录失败的歌曲
-                        self.download_stats['downloaded_songs'].append({
-                            'name': f"{song_name} - {artist}",
-                            'song_name': song_name,  # 添加原始歌曲名称
-                            'size': 0,
-                            'filepath': str(filepath),
-                            'file_format': ext,  # 添加文件格式信息
-                            'status': 'failed'
-                        })
+            # 构建自定义文件名（使用NCM_SONG_FILE_FORMAT）
+            if '{SongNumber}' in self.song_file_format or '{SongName}' in self.song_file_format or '{ArtistName}' in self.song_file_format:
+                # 替换占位符
+                custom_filename = self.song_file_format
+                
+                # 替换歌曲编号
+                if '{SongNumber}' in custom_filename:
+                    custom_filename = custom_filename.replace('{SongNumber}', f"{track_number:02d}")
+                
+                # 替换歌曲名称
+                if '{SongName}' in custom_filename:
+                    custom_filename = custom_filename.replace('{SongName}', safe_title)
+                
+                # 替换艺术家名称
+                if '{ArtistName}' in custom_filename:
+                    custom_filename = custom_filename.replace('{ArtistName}', safe_artist)
+                
+                # 添加文件扩展名
+                filename = f"{custom_filename}.{ext}"
             else:
-                print(f"  ❌ 无法获取下载链接")
+                # 如果没有占位符，使用默认格式
+                filename = f"{track_number:02d}. {safe_artist} - {safe_title}.{ext}"
+            
+            filepath = album_dir / filename
+            record = {
+                'name': f"{song_name} - {artist}",
+                'song_name': song_name,  # 添加原始歌曲名称
+                'size': 0,
+                'filepath': str(filepath),
+                'file_format': ext  # 添加文件格式信息
+            }
+
+            # 检查文件是否已存在
+            if filepath.exists():
+                print(f"  📁 文件已存在，跳过: {filename}")
+                record['size'] = filepath.stat().st_size
+                return record
+
+            # 下载文件
+            download_success = self.download_file(download_url, str(filepath), f"{song_name} - {artist}", progress_callback=track_progress)
+            if not download_success:
+                print(f"  ❌ 下载失败: {song_name} - {artist}")
+                # 记录失败的歌曲
+                record['status'] = 'failed'
+                return record
+
+            record['size'] = filepath.stat().st_size if filepath.exists() else 0
+
+            # 为下载的音乐文件添加元数据
+            song_info = {
+                'name': song_name,
+                'artist': artist,
+                'album': album_title,
+                'album_artist': album_artist,
+                'pic_url': song.get('pic_url', ''),
+                'publish_time': song.get('publish_time', ''),
+                'track_number': track_number
+            }
+            album_info = {
+                'name': album_title,
+                'artist': album_artist,
+                'pic_url': songs[0].get('pic_url', '') if songs else '',
+                'publish_time': songs[0].get('publish_time', '') if songs else ''
+            }
+            self.add_metadata_to_music_file(str(filepath), song_info, album_info)
+            
+            # 下载歌词文件
+            self.download_song_lyrics(str(song['id']), str(filepath), song_info)
+            
+            print(f"  ✅ 下载成功: {song_name} - {artist} ({self.format_file_size(record['size'])})")
+            return record
 
-            # 避免请求过快
-            time.sleep(1)
+        # 并发下载每首歌曲，结果按曲目顺序合并到统计信息
+        for record in self._run_track_jobs(songs, download_track, track_progress):
+            if record is None:
+                continue
+            if record.get('status') != 'failed':
+                self.download_stats['downloaded_files'] += 1
+                self.download_stats['total_size'] += record['size']
+            self.download_stats['downloaded_songs'].append(record)
 
         # 显示下载完成统计
         self.show_download_summary(album_title, str(album_dir), quality)
@@ -2669,8 +2767,12 @@ class NeteaseDownloader:
             print(f"📊 歌曲数量: {len(album_songs)}")
             print()
 
-            # 下载每首歌曲
-            for i, song in enumerate(album_songs, 1):
+            # 预先批量解析全部歌曲的下载链接，逐曲查询时直接命中缓存
+            self.resolve_music_urls([song.get('id') for song in album_songs], quality)
+            track_progress = TrackProgressAggregator(progress_callback, len(album_songs))
+
+            def download_track(i, song):
+                """处理单首歌曲，成功时返回 downloaded_songs 记录，否则返回 None"""
                 song_id = song.get('id')
                 song_name = song.get('name', 'Unknown')
                 artist = song.get('artist', 'Unknown')
@@ -2681,8 +2783,8 @@ class NeteaseDownloader:
                 download_url, actual_quality, file_format = self.get_music_url_with_fallback(str(song_id), quality)
 
                 if not download_url:
-                    print(f"  ❌ 无法获取下载链接")
-                    continue
+                    print(f"  ❌ 无法获取下载链接: {song_name}")
+                    return None
 
                 # 使用配置的歌曲文件名格式
                 safe_song_name = self.clean_filename(song_name)
@@ -2721,51 +2823,53 @@ class NeteaseDownloader:
                     download_url,
                     str(filepath),
                     f"{song_name} - {artist}",
-                    progress_callback=progress_callback
+                    progress_callback=track_progress
                 )
 
-                if success:
-                    # 获取文件大小
-                    file_size = filepath.stat().st_size if filepath.exists() else 0
-
-                    # 更新统计信息
-                    self.download_stats['downloaded_files'] += 1
-                    self.download_stats['total_size'] += file_size
-                    self.download_stats['downloaded_songs'].append({
-                        'name': f"{song_name} - {artist}",
-                        'song_name': song_name,  # 添加原始歌曲名称
-                        'size': file_size,
-                        'filepath': str(filepath)
-                    })
+                if not success:
+                    logger.warning(f"❌ 下载失败: {song_name}")
+                    return None
 
-                    # 为下载的音乐文件添加元数据（优先使用 get_album_songs 中注入的专辑级信息）
-                    song_info = {
-                        'name': song_name,
-                        'artist': artist,
-                        'album': album_title,
-                        'album_artist': song.get('album_artist', artist),
-                        'pic_url': song.get('pic_url', ''),
-                        'publish_time': song.get('publish_time', ''),
-                        'track_number': i
-                    }
-                    album_info = {
-                        'name': album_title,
-                        'artist': song.get('album_artist', artist),
-                        'pic_url': song.get('pic_url', album_songs[0].get('pic_url', '') if album_songs else ''),
-                        'publish_time': song.get('publish_time', album_songs[0].get('publish_time', '') if album_songs else '')
-                    }
-                    self.add_metadata_to_music_file(str(filepath), song_info, album_info)
+                # 获取文件大小
+                file_size = filepath.stat().st_size if filepath.exists() else 0
 
-                    # 下载歌词文件
-                    self.download_song_lyrics(str(song_id), str(filepath), song_info)
+                # 为下载的音乐文件添加元数据（优先使用 get_album_songs 中注入的专辑级信息）
+                song_info = {
+                    'name': song_name,
+                    'artist': artist,
+                    'album': album_title,
+                    'album_artist': song.get('album_artist', artist),
+                    'pic_url': song.get('pic_url', ''),
+                    'publish_time': song.get('publish_time', ''),
+                    'track_number': i
+                }
+                album_info = {
+                    'name': album_title,
+                    'artist': song.get('album_artist', artist),
+                    'pic_url': song.get('pic_url', album_songs[0].get('pic_url', '') if album_songs else ''),
+                    'publish_time': song.get('publish_time', album_songs[0].get('publish_time', '') if album_songs else '')
+                }
+                self.add_metadata_to_music_file(str(filepath), song_info, album_info)
 
-                    size_mb = file_size / (1024 * 1024)
-                    logger.info(f"✅ 下载成功: {filename} ({size_mb:.1f}MB)")
-                else:
-                    logger.warning(f"❌ 下载失败: {song_name}")
+                # 下载歌词文件
+                self.download_song_lyrics(str(song_id), str(filepath), song_info)
+
+                size_mb = file_size / (1024 * 1024)
+                logger.info(f"✅ 下载成功: {filename} ({size_mb:.1f}MB)")
+                return {
+                    'name': f"{song_name} - {artist}",
+                    'song_name': song_name,  # 添加原始歌曲名称
+                    'size': file_size,
+                    'filepath': str(filepath)
+                }
 
-                # 避免请求过快
-                time.sleep(1)
+            # 并发下载每首歌曲，结果按曲目顺序合并到统计信息
+            for record in self._run_track_jobs(album_songs, download_track, track_progress):
+                if record is None:
+                    continue
+                self.download_stats['downloaded_files'] += 1
+                self.download_stats['total_size'] += record['size']
+                self.download_stats['downloaded_songs'].append(record)
 
             # 显示下载统计
             self.show_download_summary(album_title, str(album_dir), quality)
@@ -3089,6 +3193,16 @@ class NeteaseDownloader:
         """通过歌曲ID直接下载单曲"""
         logger.info(f"🎵 开始通过歌曲ID下载: {song_id}")
 
+        # 同一首歌同一音质已经下载过且文件仍在时，直接返回索引中的结果
+        indexed = get_download_index().lookup('netease', str(song_id), quality)
+        if indexed:
+            logger.info(f"🗂️ 下载索引命中，跳过下载: {indexed.path}")
+            return dict(indexed.result,
+                        size_mb=indexed.size / (1024 * 1024),
+                        download_path=str(Path(indexed.path).parent),
+                        filename=Path(indexed.path).name,
+                        from_index=True)
+
         try:
             # 获取下载链接（支持音质降级）
             download_url, actual_quality, file_format = self.get_music_url_with_fallback(str(song_id), quality)
@@ -3180,7 +3294,7 @@ class NeteaseDownloader:
                     # 下载歌词文件
                     self.download_song_lyrics(str(song_id), str(filepath), metadata_song_info)
 
-                return {
+                result = {
                     'success': True,
                     'message': f'单曲下载完成: {song_name} - {artist}',
                     'song_title': song_name,
@@ -3194,6 +3308,10 @@ class NeteaseDownloader:
                     'duration': duration_text,
                     'file_format': ext.upper()
                 }
+                # 元数据和歌词写入完成后再记录索引，指纹对应最终文件内容
+                get_download_index().record('netease', str(song_id), str(filepath), quality,
+                                            title=f"{song_name} - {artist}", result=result)
+                return result
             else:
                 logger.error(f"❌ 单曲下载失败: {song_name}")
                 return {
@@ -3242,14 +3360,11 @@ class NeteaseDownloader:
                 logger.info(f"📁 封面文件已存在: {file_path}")
                 return True
             
-            # 下载封面图片
-            logger.info(f"🖼️ 开始下载封面: {cover_url}")
-            response = self.session.get(cover_url, timeout=30)
-            response.raise_for_status()
-            
-            # 保存图片文件
-            with open(file_path, 'wb') as f:
-                f.write(response.content)
+            # 从封面缓存获取原图（写入标签时通常已经下载过）
+            logger.info(f"🖼️ 开始保存封面: {cover_url}")
+            if not self.cover_cache.save_to(cover_url, str(file_path)):
+                logger.error(f"❌ 获取封面失败: {cover_url}")
+                return False
             
             # 验证文件大小
             file_size = file_path.stat().st_size
@@ -3325,6 +3440,11 @@ class NeteaseDownloader:
 
     def _get_artist_avatar_url(self, artist_name: str) -> Optional[str]:
         """通过用户提供的方法获取艺术家头像URL"""
+        found, cached_url = self.metadata_cache.lookup('artist_avatar', artist_name)
+        if found:
+            logger.info(f"📦 艺术家头像缓存命中: {artist_name}")
+            return cached_url
+
         try:
             # 已知艺术家头像URL映射（基于用户提供的高质量头像）
             known_artist_avatars = {
@@ -3344,6 +3464,7 @@ class NeteaseDownloader:
                 try:
                     response = self.session.head(avatar_url, timeout=10)
                     if response.status_code == 200:
+                        self.metadata_cache.put('artist_avatar', artist_name, avatar_url)
                         return avatar_url
                     else:
                         logger.warning(f"⚠️ 已知头像URL已失效: {avatar_url}")
@@ -3371,8 +3492,11 @@ class NeteaseDownloader:
             avatar_url = self._try_get_avatar_from_search_api(artist_name)
             if avatar_url:
                 logger.info(f"🎨 通过搜索API获取到头像URL: {avatar_url}")
+                self.metadata_cache.put('artist_avatar', artist_name, avatar_url)
                 return avatar_url
             
+            # 所有搜索方式都未找到，记录负缓存，避免每次下载都重复搜索
+            self.metadata_cache.put('artist_avatar', artist_name, None)
             logger.warning(f"⚠️ 艺术家 {artist_name} 的头像获取失败，请手动获取并添加到known_artist_avatars")
             logger.info(f"💡 获取方法：访问 {search_url}，复制头像地址，去除?param=...部分")
             return None
@@ -3693,6 +3817,25 @@ class NeteaseDownloader:
 
     def get_playlist_all_songs_details(self, playlist_id: str) -> Optional[Dict]:
         """获取歌单所有歌曲详情 - 完全基于musicapi.txt的实现"""
+        playlist_info = self.open_playlist_song_stream(playlist_id)
+        if not playlist_info:
+            return None
+
+        all_songs = []
+        for batch in playlist_info.pop('song_batches'):
+            all_songs.extend(batch)
+        logger.info(f"📊 获取完成: 共 {len(all_songs)} 首歌曲")
+
+        playlist_info['songs'] = all_songs
+        return playlist_info
+
+    def open_playlist_song_stream(self, playlist_id: str) -> Optional[Dict]:
+        """
+        获取歌单基本信息，歌曲详情以生成器的形式逐批产出
+
+        返回的字典中 'song_batches' 是按歌单顺序产出歌曲列表的生成器，详情批次在后台并发请求，
+        调用方可以在完整列表获取完成之前就开始下载；'song_total' 为 trackIds 数量
+        """
         logger.info(f"🎵 获取歌单 {playlist_id} 的所有歌曲详情")
         
         try:
@@ -3725,73 +3868,74 @@ class NeteaseDownloader:
             logger.info(f"✅ 歌单: {playlist_name} - {creator}")
             logger.info(f"📊 歌曲总数: {track_count}")
             
-            # 2. 获取所有trackIds并分批获取详细信息 - 完全按照musicapi.txt的实现
+            # 2. 获取所有trackIds，详情分批并发获取
             track_ids = [str(t['id']) for t in playlist.get('trackIds', [])]
-            all_songs = []
-            
-            for i in range(0, len(track_ids), 100):
-                batch_ids = track_ids[i:i+100]
-                batch_num = i // 100 + 1
-                total_batches = (len(track_ids) + 99) // 100
-                
-                logger.info(f"📦 处理第 {batch_num}/{total_batches} 批: {len(batch_ids)} 首歌曲")
-                
-                # 使用musicapi.txt的精确方法
-                song_data = {'c': json.dumps([{'id': int(sid), 'v': 0} for sid in batch_ids])}
-                
-                try:
-                    song_resp = self.session.post(APIConstants.SONG_DETAIL_V3, data=song_data, 
-                                                headers=headers, timeout=30)
-                    song_resp.raise_for_status()
-                    
-                    song_result = song_resp.json()
-                    if song_result.get('code') == 200 and song_result.get('songs'):
-                        songs = song_result['songs']
-                        logger.info(f"✅ 成功获取 {len(songs)} 首歌曲详情")
-                        
-                        # 处理歌曲数据 - 按照musicapi.txt的格式
-                        for song in songs:
-                            artists = song.get('ar', [])
-                            artist_name = '/'.join(artist['name'] for artist in artists) if artists else '未知艺术家'
-                            
-                            album_info = song.get('al', {})
-                            album_name = album_info.get('name', '未知专辑') if album_info else '未知专辑'
-                            
-                            song_info = {
-                                'id': song.get('id'),
-                                'name': song.get('name', '未知歌曲'),
-                                'artist': artist_name,
-                                'album': album_name,
-                                'duration': song.get('dt', 0),
-                                'track_number': len(all_songs) + 1
-                            }
-                            all_songs.append(song_info)
-                            logger.info(f"   ✅ {song_info['name']} - {song_info['artist']}")
-                    else:
-                        logger.error(f"❌ 第 {batch_num} 批获取失败: {song_result.get('message', '未知错误')}")
-                
-                except Exception as e:
-                    logger.error(f"❌ 第 {batch_num} 批请求异常: {e}")
-                
-                # 批次间延迟
-                if i + 100 < len(track_ids):
-                    time.sleep(1)
-            
-            logger.info(f"📊 获取完成: 共 {len(all_songs)} 首歌曲")
-            
+
             return {
                 'id': playlist_id,
                 'name': playlist_name,
                 'creator': creator,
                 'track_count': track_count,
                 'play_count': play_count,
-                'songs': all_songs
+                'song_total': len(track_ids),
+                'song_batches': self._iter_song_detail_batches(track_ids, headers)
             }
             
         except Exception as e:
             logger.error(f"❌ 获取歌单所有歌曲详情失败: {e}")
             return None
 
+    def _iter_song_detail_batches(self, track_ids: List[str], headers: Dict[str, str]) -> Iterator[List[Dict]]:
+        """按每批100首并发请求 SONG_DETAIL_V3，按原始顺序产出每批的歌曲信息"""
+        batches = [track_ids[i:i + 100] for i in range(0, len(track_ids), 100)]
+        total_batches = len(batches)
+
+        def fetch_batch(item):
+            batch_num, batch_ids = item
+            logger.info(f"📦 处理第 {batch_num}/{total_batches} 批: {len(batch_ids)} 首歌曲")
+
+            # 使用musicapi.txt的精确方法
+            song_data = {'c': json.dumps([{'id': int(sid), 'v': 0} for sid in batch_ids])}
+
+            try:
+                song_resp = self.session.post(APIConstants.SONG_DETAIL_V3, data=song_data, 
+                                            headers=headers, timeout=30)
+                song_resp.raise_for_status()
+
+                song_result = song_resp.json()
+                if song_result.get('code') == 200 and song_result.get('songs'):
+                    logger.info(f"✅ 第 {batch_num} 批成功获取 {len(song_result['songs'])} 首歌曲详情")
+                    return song_result['songs']
+                logger.error(f"❌ 第 {batch_num} 批获取失败: {song_result.get('message', '未知错误')}")
+            except Exception as e:
+                logger.error(f"❌ 第 {batch_num} 批请求异常: {e}")
+            return []
+
+        track_number = 0
+        for songs in self._iter_ordered_concurrently(enumerate(batches, 1), fetch_batch):
+            batch = []
+            # 处理歌曲数据 - 按照musicapi.txt的格式
+            for song in songs:
+                artists = song.get('ar', [])
+                artist_name = '/'.join(artist['name'] for artist in artists) if artists else '未知艺术家'
+                
+                album_info = song.get('al', {})
+                album_name = album_info.get('name', '未知专辑') if album_info else '未知专辑'
+                
+                track_number += 1
+                song_info = {
+                    'id': song.get('id'),
+                    'name': song.get('name', '未知歌曲'),
+                    'artist': artist_name,
+                    'album': album_name,
+                    'duration': song.get('dt', 0),
+                    'track_number': track_number
+                }
+                batch.append(song_info)
+                logger.info(f"   ✅ {song_info['name']} - {song_info['artist']}")
+            if batch:
+                yield batch
+
     def download_playlist_with_track_ids(self, playlist_id: str, download_dir: str = "./downloads/netease", quality: str = '128k', progress_callback=None) -> Dict:
         """通过trackIds下载完整歌单 - 基于测试验证的方法"""
         logger.info(f"📋 开始下载完整歌单 (trackIds方法): {playlist_id}")
@@ -3826,45 +3970,42 @@ class NeteaseDownloader:
             playlist_dir.mkdir(parents=True, exist_ok=True)
             logger.info(f"📁 歌单目录: {playlist_dir}")
             
-            # 下载歌单中的每首歌曲
+            # 下载歌单中的每首歌曲（并发处理，结果按歌单顺序汇总）
             downloaded_songs = []
             total_size = 0
             failed_songs = []
-            
-            for i, song in enumerate(songs, 1):
+            # 预先批量解析全部歌曲的下载链接，逐曲查询时直接命中缓存
+            self.resolve_music_urls([song['id'] for song in songs], quality)
+            track_progress = TrackProgressAggregator(progress_callback, len(songs))
+
+            def download_track(i, song):
+                logger.info(f"🎵 下载歌曲 {i}/{len(songs)}: {song['name']} - {song['artist']}")
                 try:
-                    logger.info(f"🎵 下载歌曲 {i}/{len(songs)}: {song['name']} - {song['artist']}")
-                    
                     # 调用单曲下载方法，传入歌曲信息
-                    song_result = self.download_song_by_id(
+                    return self.download_song_by_id(
                         str(song['id']), 
                         str(playlist_dir), 
                         quality, 
-                        progress_callback,
+                        track_progress,
                         song_info=song  # 传入歌曲信息
                     )
-                    
-                    if song_result.get('success'):
-                        downloaded_songs.append(song_result)
-                        total_size += song_result.get('size_mb', 0)
-                        logger.info(f"✅ 歌曲下载成功: {song['name']}")
-                    else:
-                        failed_songs.append({
-                            'song': song,
-                            'error': song_result.get('error', '未知错误')
-                        })
-                        logger.error(f"❌ 歌曲下载失败: {song['name']} - {song_result.get('error')}")
-                        
                 except Exception as e:
+                    logger.error(f"❌ 下载歌曲时发生异常: {song['name']} - {e}")
+                    return {'success': False, 'error': str(e)}
+
+            song_results = self._run_track_jobs(songs, download_track, track_progress)
+            for song, song_result in zip(songs, song_results):
+                song_result = song_result or {'success': False, 'error': '未知错误'}
+                if song_result.get('success'):
+                    downloaded_songs.append(song_result)
+                    total_size += song_result.get('size_mb', 0)
+                    logger.info(f"✅ 歌曲下载成功: {song['name']}")
+                else:
                     failed_songs.append({
                         'song': song,
-                        'error': str(e)
+                        'error': song_result.get('error', '未知错误')
                     })
-                    logger.error(f"❌ 下载歌曲时发生异常: {song['name']} - {e}")
-                
-                # 添加延迟，避免请求过于频繁
-                if i < len(songs):
-                    time.sleep(0.5)
+                    logger.error(f"❌ 歌曲下载失败: {song['name']} - {song_result.get('error')}")
             
             # 计算下载统计
             downloaded_count = len(downloaded_songs)
@@ -3911,89 +4052,8 @@ class NeteaseDownloader:
             logger.info(f"🔄 开始获取完整歌单歌曲: {playlist_id} (总数: {total_count})")
             
             all_songs = []
-            page_size = 1000  # 每页最多1000首
-            total_pages = (total_count + page_size - 1) // page_size
-            
-            for page in range(total_pages):
-                offset = page * page_size
-                limit = min(page_size, total_count - offset)
-                
-                logger.info(f"📄 获取第 {page + 1}/{total_pages} 页歌曲 (offset: {offset}, limit: {limit})")
-                
-                # 使用移动端API获取歌单详情
-                api_url = f"https://music.163.com/api/playlist/detail"
-                params = {
-                    'id': playlist_id,
-                    'limit': limit,
-                    'offset': offset,
-                    'total': 'true',
-                    'n': 1000
-                }
-                
-                # 使用移动端请求头
-                headers = {
-                    'Referer': 'https://music.163.com/',
-                    'User-Agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 14_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.0 Mobile/15E148 Safari/604.1',
-                    'Accept': 'application/json,text/plain,*/*',
-                    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8'
-                }
-                
-                response = self.session.get(api_url, params=params, headers=headers, timeout=15)
-                
-                if response.status_code != 200:
-                    logger.warning(f"⚠️ 获取第 {page + 1} 页失败，状态码: {response.status_code}")
-                    continue
-                
-                try:
-                    data = response.json()
-                    if data.get('code') != 200:
-                        logger.warning(f"⚠️ 第 {page + 1} 页API返回错误: {data.get('msg', '未知错误')}")
-                        continue
-                    
-                    # 从result中获取歌曲列表
-                    result = data.get('result', {})
-                    songs = result.get('tracks', [])
-                    
-                    if not songs:
-                        logger.info(f"�� 第 {page + 1} 页无更多歌曲，停止获取")
-                        break
-                    
-                    # 处理歌曲信息
-                    for i, track in enumerate(songs):
-                        if track:
-                            # 提取艺术家信息
-                            artists = track.get('ar', [])  # 注意：这里使用'ar'字段
-                            artist_name = '未知艺术家'
-                            if artists and len(artists) > 0:
-                                artist_name = artists[0].get('name', '未知艺术家')
-                            
-                            # 提取专辑信息
-                            album_info = track.get('al', {})  # 注意：这里使用'al'字段
-                            album_name = album_info.get('name', '未知专辑') if album_info else '未知专辑'
-                            
-                            song_info = {
-                                'id': track.get('id'),
-                                'name': track.get('name', f'歌曲_{len(all_songs)+1}'),
-                                'artist': artist_name,
-                                'album': album_name,
-                                'duration': track.get('dt', 0),
-                                'track_number': len(all_songs) + 1
-                            }
-                            all_songs.append(song_info)
-                    
-                    logger.info(f"✅ 第 {page + 1} 页获取成功: {len(songs)} 首歌曲")
-                    
-                    # 如果这一页的歌曲数量少于limit，说明已经是最后一页
-                    if len(songs) < limit:
-                        logger.info(f"📄 第 {page + 1} 页是最后一页，停止获取")
-                        break
-                        
-                except json.JSONDecodeError as e:
-                    logger.warning(f"⚠️ 解析第 {page + 1} 页JSON失败: {e}")
-                    continue
-                
-                # 添加延迟，避免请求过于频繁
-                time.sleep(0.5)
+            for songs in self._iter_full_playlist_song_pages(playlist_id, total_count):
+                all_songs.extend(songs)
             
             logger.info(f"📊 完整歌单获取完成: {len(all_songs)} 首歌曲")
             return all_songs
@@ -4001,6 +4061,102 @@ class NeteaseDownloader:
         except Exception as e:
             logger.error(f"❌ 获取完整歌单歌曲异常: {e}")
             return None
+
+    def _iter_full_playlist_song_pages(self, playlist_id: str, total_count: int) -> Iterator[List[Dict]]:
+        """并发请求移动端API的各个分页，按页码顺序产出每页的歌曲信息"""
+        page_size = 1000  # 每页最多1000首
+        total_pages = (total_count + page_size - 1) // page_size
+
+        # 使用移动端请求头
+        headers = {
+            'Referer': 'https://music.163.com/',
+            'User-Agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 14_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.0 Mobile/15E148 Safari/604.1',
+            'Accept': 'application/json,text/plain,*/*',
+            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8'
+        }
+
+        def fetch_page(page):
+            """返回该页的歌曲列表，请求失败时返回 None"""
+            offset = page * page_size
+            limit = min(page_size, total_count - offset)
+            
+            logger.info(f"📄 获取第 {page + 1}/{total_pages} 页歌曲 (offset: {offset}, limit: {limit})")
+            
+            # 使用移动端API获取歌单详情
+            api_url = f"https://music.163.com/api/playlist/detail"
+            params = {
+                'id': playlist_id,
+                'limit': limit,
+                'offset': offset,
+                'total': 'true',
+                'n': 1000
+            }
+            
+            try:
+                response = self.session.get(api_url, params=params, headers=headers, timeout=15)
+            except Exception as e:
+                logger.warning(f"⚠️ 获取第 {page + 1} 页失败: {e}")
+                return None
+            
+            if response.status_code != 200:
+                logger.warning(f"⚠️ 获取第 {page + 1} 页失败，状态码: {response.status_code}")
+                return None
+            
+            try:
+                data = response.json()
+            except json.JSONDecodeError as e:
+                logger.warning(f"⚠️ 解析第 {page + 1} 页JSON失败: {e}")
+                return None
+
+            if data.get('code') != 200:
+                logger.warning(f"⚠️ 第 {page + 1} 页API返回错误: {data.get('msg', '未知错误')}")
+                return None
+            
+            # 从result中获取歌曲列表
+            return data.get('result', {}).get('tracks', [])
+
+        track_number = 0
+        for page, songs in enumerate(self._iter_ordered_concurrently(range(total_pages), fetch_page)):
+            if songs is None:
+                continue
+
+            if not songs:
+                logger.info(f"📄 第 {page + 1} 页无更多歌曲，停止获取")
+                break
+            
+            # 处理歌曲信息
+            page_songs = []
+            for track in songs:
+                if track:
+                    # 提取艺术家信息
+                    artists = track.get('ar', [])  # 注意：这里使用'ar'字段
+                    artist_name = '未知艺术家'
+                    if artists and len(artists) > 0:
+                        artist_name = artists[0].get('name', '未知艺术家')
+                    
+                    # 提取专辑信息
+                    album_info = track.get('al', {})  # 注意：这里使用'al'字段
+                    album_name = album_info.get('name', '未知专辑') if album_info else '未知专辑'
+                    
+                    track_number += 1
+                    song_info = {
+                        'id': track.get('id'),
+                        'name': track.get('name', f'歌曲_{track_number}'),
+                        'artist': artist_name,
+                        'album': album_name,
+                        'duration': track.get('dt', 0),
+                        'track_number': track_number
+                    }
+                    page_songs.append(song_info)
+            
+            logger.info(f"✅ 第 {page + 1} 页获取成功: {len(songs)} 首歌曲")
+            yield page_songs
+            
+            # 如果这一页的歌曲数量少于limit，说明已经是最后一页
+            if len(songs) < min(page_size, total_count - page * page_size):
+                logger.info(f"📄 第 {page + 1} 页是最后一页，停止获取")
+                break
+
     def _get_full_playlist_songs_web(self, playlist_id: str, total_count: int) -> Optional[List[Dict]]:
         """通过网页爬虫获取完整歌单的所有歌曲"""
         try:
@@ -4192,8 +4348,8 @@ class NeteaseDownloader:
         logger.info(f"📋 开始下载歌单: {playlist_id}")
         
         try:
-            # 优先使用获取所有歌曲详情的方法
-            playlist_info = self.get_playlist_all_songs_details(playlist_id)
+            # 优先使用获取所有歌曲详情的方法（详情分批流式获取，边获取边下载）
+            playlist_info = self.open_playlist_song_stream(playlist_id)
             if not playlist_info:
                 # 如果获取所有详情失败，回退到v1 API
                 logger.warning("⚠️ 获取所有歌曲详情失败，回退到v1 API")
@@ -4217,8 +4373,12 @@ class NeteaseDownloader:
             
             playlist_name = playlist_info['name']
             creator = playlist_info['creator']
-            songs = playlist_info['songs']
-            track_count = len(songs)
+            if 'song_batches' in playlist_info:
+                song_batches = playlist_info['song_batches']
+                track_count = playlist_info['song_total']
+            else:
+                song_batches = iter([playlist_info['songs']])
+                track_count = len(playlist_info['songs'])
             
             logger.info(f"📋 歌单: {playlist_name} - {creator}")
             logger.info(f"🎵 歌曲数量: {track_count} 首")
@@ -4233,45 +4393,50 @@ class NeteaseDownloader:
             # 歌单不下载封面，因为包含多个不同歌手的歌曲
             logger.info("📋 歌单下载模式：跳过封面下载（避免多歌手冲突）")
             
-            # 下载歌单中的每首歌曲
+            # 下载歌单中的每首歌曲（并发处理，结果按歌单顺序汇总）
             downloaded_songs = []
             total_size = 0
             failed_songs = []
-            
-            for i, song in enumerate(songs, 1):
+            track_progress = TrackProgressAggregator(progress_callback, track_count)
+            songs = []
+
+            def song_stream():
+                # 每到一批歌曲详情就批量解析下载链接并交给下载线程池，无需等待完整列表
+                for batch in song_batches:
+                    self.resolve_music_urls([song['id'] for song in batch], quality)
+                    songs.extend(batch)
+                    yield from batch
+
+            def download_track(i, song):
+                logger.info(f"🎵 下载歌曲 {i}/{track_count}: {song['name']} - {song['artist']}")
                 try:
-                    logger.info(f"🎵 下载歌曲 {i}/{track_count}: {song['name']} - {song['artist']}")
-                    
                     # 调用单曲下载方法，传入歌曲信息
-                    song_result = self.download_song_by_id(
+                    return self.download_song_by_id(
                         str(song['id']), 
                         str(playlist_dir), 
                         quality, 
-                        progress_callback,
+                        track_progress,
                         song_info=song  # 传入歌曲信息
                     )
-                    
-                    if song_result.get('success'):
-                        downloaded_songs.append(song_result)
-                        total_size += song_result.get('size_mb', 0)
-                        logger.info(f"✅ 歌曲下载成功: {song['name']}")
-                    else:
-                        failed_songs.append({
-                            'song': song,
-                            'error': song_result.get('error', '未知错误')
-                        })
-                        logger.error(f"❌ 歌曲下载失败: {song['name']} - {song_result.get('error')}")
-                        
                 except Exception as e:
+                    logger.error(f"❌ 下载歌曲时发生异常: {song['name']} - {e}")
+                    return {'success': False, 'error': str(e)}
+
+            song_results = self._run_track_jobs(song_stream(), download_track, track_progress)
+            # 部分详情批次可能获取失败，以实际获取到的歌曲数为准
+            track_count = len(songs)
+            for song, song_result in zip(songs, song_results):
+                song_result = song_result or {'success': False, 'error': '未知错误'}
+                if song_result.get('success'):
+                    downloaded_songs.append(song_result)
+                    total_size += song_result.get('size_mb', 0)
+                    logger.info(f"✅ 歌曲下载成功: {song['name']}")
+                else:
                     failed_songs.append({
                         'song': song,
-                        'error': str(e)
+                        'error': song_result.get('error', '未知错误')
                     })
-                    logger.error(f"❌ 下载歌曲时发生异常: {song['name']} - {e}")
-                
-                # 添加延迟，避免请求过于频繁
-                if i < track_count:
-                    time.sleep(0.5)
+                    logger.error(f"❌ 歌曲下载失败: {song['name']} - {song_result.get('error')}")
             
             # 计算下载统计
             downloaded_count = len(downloaded_songs)
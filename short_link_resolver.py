@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+短链接解析缓存
+所有平台的短链接（t.cn、xhslink、163cn.tv、b23.tv、v.douyin.com 等）都通过这里展开：
+优先用 HEAD 请求逐跳跟随重定向，不支持 HEAD 的站点回退为不读取正文的 GET；
+结果先写入内存 LRU（带过期时间），再写入 SQLite 元数据缓存，重启后同一个短链接仍可直接命中。
+同一个短链接的并发请求只发起一次网络请求
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+import requests
+
+from url_router import SHORT_LINK_HOSTS
+
+try:
+    from metadata_cache import get_metadata_cache
+except ImportError:
+    get_metadata_cache = None
+
+logger = logging.getLogger(__name__)
+
+# 元数据缓存中的实体类型
+CACHE_KIND = "short_link"
+
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+DESKTOP_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+}
+
+# 微博短链接使用移动端 User-Agent，避免重定向到登录页面
+MOBILE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 14_7_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.1.2 Mobile/15E148 Safari/604.1',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+}
+
+HOST_HEADERS = {
+    "t.cn": MOBILE_HEADERS,
+    "weibo.cn": MOBILE_HEADERS,
+    "sinaurl.cn": MOBILE_HEADERS,
+}
+
+
+def is_short_link(url: str) -> bool:
+    """是否为需要跳转才能确定内容的短链接"""
+    try:
+        return (urlparse(url).hostname or "") in SHORT_LINK_HOSTS
+    except ValueError:
+        return False
+
+
+class ShortLinkResolver:
+    """带内存/磁盘缓存和并发去重的短链接解析器"""
+
+    def __init__(self, memory_items: int = 2048, ttl: int = 7 * 86400, negative_ttl: int = 300,
+                 max_redirects: int = 8, timeout: float = 10):
+        """
+        初始化短链接解析器
+
+        Args:
+            memory_items: 内存中保留的解析结果数量
+            ttl: 解析结果的有效期（秒）
+            negative_ttl: 短链接返回 HTTP 4xx 时失败结果的有效期（秒），期间不再重试
+            max_redirects: 最多跟随的重定向次数
+            timeout: 每次请求的超时时间（秒）
+        """
+        self.memory_items = max(1, int(memory_items))
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_redirects = max_redirects
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.session.headers.update(DESKTOP_HEADERS)
+
+        # url -> (展开结果或 None, 过期时间)
+        self._memory: "OrderedDict[str, Tuple[Optional[str], float]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.shared = 0
+        self.fetches = 0
+        self.failures = 0
+
+        if get_metadata_cache is not None:
+            policies = get_metadata_cache().policies
+            policies.setdefault(CACHE_KIND, {"ttl": ttl, "negative_ttl": negative_ttl, "max_entries": 20000})
+
+    # ------------------------------------------------------------------
+    # 对外接口
+    # ------------------------------------------------------------------
+
+    async def resolve(self, url: str) -> Optional[str]:
+        """
+        展开短链接（异步），缓存命中时不会切换线程
+
+        Returns:
+            最终地址；请求失败时返回 None
+        """
+        hit, value = self._memory_lookup(url)
+        if hit:
+            return value
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.resolve_sync, url)
+
+    def resolve_sync(self, url: str) -> Optional[str]:
+        """展开短链接（同步，供下载线程中的代码使用）"""
+        if not url:
+            return None
+        hit, value = self._memory_lookup(url)
+        if hit:
+            return value
+
+        with self._lock:
+            future = self._inflight.get(url)
+            owner = future is None
+            if owner:
+                future = self._inflight[url] = Future()
+            else:
+                self.shared += 1
+        if not owner:
+            # 其他线程正在解析同一个短链接，等待它的结果
+            return future.result()
+
+        try:
+            value = self._resolve_uncached(url)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(url, None)
+
+    def stats(self) -> Dict[str, int]:
+        """获取解析统计"""
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'shared': self.shared,
+            'fetches': self.fetches,
+            'failures': self.failures,
+            'memory_items': len(self._memory),
+        }
+
+    # ------------------------------------------------------------------
+    # 内部实现
+    # ------------------------------------------------------------------
+
+    def _memory_lookup(self, url: str) -> Tuple[bool, Optional[str]]:
+        with self._lock:
+            cached = self._memory.get(url)
+            if cached is None:
+                return False, None
+            if cached[1] <= time.time():
+                del self._memory[url]
+                return False, None
+            self._memory.move_to_end(url)
+            self.memory_hits += 1
+            return True, cached[0]
+
+    def _remember(self, url: str, value: Optional[str], ttl: float):
+        with self._lock:
+            self._memory[url] = (value, time.time() + ttl)
+            self._memory.move_to_end(url)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def _resolve_uncached(self, url: str) -> Optional[str]:
+        if get_metadata_cache is not None:
+            hit, value = get_metadata_cache().lookup(CACHE_KIND, url)
+            if hit:
+                self.disk_hits += 1
+                self._remember(url, value, self.ttl if value else self.negative_ttl)
+                return value
+
+        value, cacheable = self._follow_redirects(url)
+        if not cacheable:
+            # 网络错误、超时或服务端 5xx 属于暂时性失败，不写入缓存，下次重新解析
+            return value
+        self._remember(url, value, self.ttl if value else self.negative_ttl)
+        if get_metadata_cache is not None:
+            get_metadata_cache().put(CACHE_KIND, url, value)
+        return value
+
+    def _follow_redirects(self, url: str) -> Tuple[Optional[str], bool]:
+        """
+        逐跳跟随重定向：先发 HEAD，站点不支持 HEAD 或未跳转时用 GET（不读取正文）重试该跳
+
+        Returns:
+            (展开后的链接, 结果是否可以缓存)；只有短链接本身返回 HTTP 4xx 时才作为失败结果缓存
+        """
+        self.fetches += 1
+        start = time.monotonic()
+        current = url
+        try:
+            for _ in range(self.max_redirects):
+                headers = HOST_HEADERS.get(urlparse(current).hostname or "")
+                response = self.session.head(current, headers=headers, allow_redirects=False,
+                                             timeout=self.timeout)
+                response.close()
+                if response.status_code not in REDIRECT_STATUSES and (
+                        response.status_code >= 400 or is_short_link(current)):
+                    response = self.session.get(current, headers=headers, allow_redirects=False,
+                                                timeout=self.timeout, stream=True)
+                    response.close()
+
+                location = response.headers.get('Location')
+                if response.status_code not in REDIRECT_STATUSES or not location:
+                    # 已经跳转过时，目标页面拒绝访问（例如需要登录）不影响展开结果
+                    if response.status_code >= 400 and current == url:
+                        self.failures += 1
+                        logger.warning(f"⚠️ 短链接展开失败: {url} (HTTP {response.status_code})")
+                        return None, response.status_code < 500
+                    break
+                current = urljoin(current, location)
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"⚠️ 短链接展开失败: {url} ({e})")
+            return None, False
+
+        logger.info(f"🔗 短链接展开: {url} -> {current} ({time.monotonic() - start:.2f}s)")
+        return current, True
+
+
+_shared_resolver: Optional[ShortLinkResolver] = None
+_shared_resolver_lock = threading.Lock()
+
+
+def get_short_link_resolver() -> ShortLinkResolver:
+    """获取进程内共享的短链接解析器"""
+    global _shared_resolver
+    with _shared_resolver_lock:
+        if _shared_resolver is None:
+            _shared_resolver = ShortLinkResolver()
+        return _shared_resolver
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Telegram 状态消息渲染器
+所有下载任务的进度文本都先提交到这里，每个聊天一个发送协程：
+同一条消息只保留最新的文本，内容未变化时不编辑，遇到 RetryAfter 时退避，
+并根据限流情况自动调整该聊天的编辑间隔。提交方法可以在任意线程中调用，不会阻塞
+"""
+
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from telegram.error import BadRequest, RetryAfter
+
+logger = logging.getLogger(__name__)
+
+# 私聊约每秒 1 次编辑，群组约每分钟 20 次
+PRIVATE_CHAT_INTERVAL = 1.0
+GROUP_CHAT_INTERVAL = 3.0
+MAX_INTERVAL = 30.0
+# 连续成功多少次后缩短一次编辑间隔
+RECOVERY_STREAK = 10
+# 每个聊天记住最近多少条消息的已发送文本
+LAST_TEXT_LIMIT = 256
+
+
+class _ChatState:
+    """单个聊天的待发送队列与编辑节奏"""
+
+    def __init__(self, chat_id: int, base_interval: float):
+        self.chat_id = chat_id
+        self.base_interval = base_interval
+        self.interval = base_interval
+        self.next_edit_at = 0.0
+        self.success_streak = 0
+        # message_id -> (message, text, parse_mode)，同一条消息只保留最新文本
+        self.pending: "OrderedDict[int, Tuple[Any, str, Optional[str]]]" = OrderedDict()
+        self.last_text: "OrderedDict[int, str]" = OrderedDict()
+        self.task: Optional[asyncio.Task] = None
+        self.edit_lock: Optional[asyncio.Lock] = None
+
+
+class StatusMessageRenderer:
+    """按聊天合并状态消息编辑的渲染器"""
+
+    def __init__(self, private_interval: float = PRIVATE_CHAT_INTERVAL,
+                 group_interval: float = GROUP_CHAT_INTERVAL, max_interval: float = MAX_INTERVAL):
+        """
+        初始化渲染器
+
+        Args:
+            private_interval: 私聊中两次编辑的最小间隔（秒）
+            group_interval: 群组中两次编辑的最小间隔（秒）
+            max_interval: 被限流后编辑间隔的上限（秒）
+        """
+        self.private_interval = private_interval
+        self.group_interval = group_interval
+        self.max_interval = max_interval
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._chats: Dict[int, _ChatState] = {}
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.submitted = 0
+        self.edits = 0
+        self.coalesced = 0
+        self.unchanged = 0
+        self.rate_limited = 0
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop):
+        """绑定 Bot 所在的事件循环（在 post_init 中调用）"""
+        self._loop = loop
+
+    # ------------------------------------------------------------------
+    # 对外接口
+    # ------------------------------------------------------------------
+
+    def submit(self, message, text: str, parse_mode: Optional[str] = None):
+        """
+        提交状态消息的最新文本，可在任意线程中调用
+
+        Args:
+            message: 要编辑的 telegram.Message
+            text: 新文本
+            parse_mode: 解析模式，None 为纯文本
+        """
+        if message is None or not text:
+            return
+        loop = self._loop
+        if loop is None:
+            try:
+                loop = self._loop = asyncio.get_running_loop()
+            except RuntimeError:
+                logger.debug("状态消息渲染器尚未绑定事件循环，跳过更新")
+                return
+
+        chat_id = message.chat_id
+        with self._lock:
+            state = self._chats.get(chat_id)
+            if state is None:
+                base = self.private_interval if chat_id > 0 else self.group_interval
+                state = self._chats[chat_id] = _ChatState(chat_id, base)
+            if message.message_id in state.pending:
+                self.coalesced += 1
+            state.pending[message.message_id] = (message, text, parse_mode)
+            self.submitted += 1
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._ensure_sender(state)
+        else:
+            loop.call_soon_threadsafe(self._ensure_sender, state)
+
+    def discard(self, message):
+        """丢弃某条消息尚未发送的进度文本"""
+        if message is None:
+            return
+        with self._lock:
+            state = self._chats.get(message.chat_id)
+            if state is not None:
+                state.pending.pop(message.message_id, None)
+                state.last_text.pop(message.message_id, None)
+
+    async def settle(self, message):
+        """
+        丢弃未发送的进度文本并等待正在进行的编辑完成
+
+        在直接编辑最终结果之前调用，避免旧的进度文本覆盖完成消息
+        """
+        self.discard(message)
+        state = self._chats.get(message.chat_id) if message is not None else None
+        if state is not None and state.edit_lock is not None:
+            async with state.edit_lock:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        """获取渲染器统计信息"""
+        with self._lock:
+            intervals = {chat_id: state.interval for chat_id, state in self._chats.items()
+                         if state.interval > state.base_interval}
+            pending = sum(len(state.pending) for state in self._chats.values())
+        return {
+            "submitted": self.submitted,
+            "edits": self.edits,
+            "coalesced": self.coalesced,
+            "unchanged": self.unchanged,
+            "rate_limited": self.rate_limited,
+            "pending": pending,
+            "throttled_chats": intervals,
+        }
+
+    # ------------------------------------------------------------------
+    # 发送协程
+    # ------------------------------------------------------------------
+
+    def _ensure_sender(self, state: _ChatState):
+        if state.edit_lock is None:
+            state.edit_lock = asyncio.Lock()
+        if state.task is None or state.task.done():
+            state.task = asyncio.ensure_future(self._drain(state))
+
+    async def _drain(self, state: _ChatState):
+        """依次发送该聊天中所有消息的最新文本，队列为空时退出"""
+        loop = asyncio.get_running_loop()
+        while True:
+            delay = state.next_edit_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            with self._lock:
+                if not state.pending:
+                    return
+                message_id, (message, text, parse_mode) = state.pending.popitem(last=False)
+                if state.last_text.get(message_id) == text:
+                    self.unchanged += 1
+                    continue
+
+            async with state.edit_lock:
+                try:
+                    await message.edit_text(text, parse_mode=parse_mode)
+                    self.edits += 1
+                    self._remember(state, message_id, text)
+                    self._on_success(state)
+                except RetryAfter as e:
+                    self._on_retry_after(state, message_id, message, text, parse_mode, e, loop)
+                    continue
+                except BadRequest as e:
+                    if "not modified" in str(e).lower():
+                        self._remember(state, message_id, text)
+                    else:
+                        logger.warning(f"更新状态消息失败: {e}")
+                except Exception as e:
+                    logger.warning(f"更新状态消息失败: {e}")
+            state.next_edit_at = loop.time() + state.interval
+
+    def _remember(self, state: _ChatState, message_id: int, text: str):
+        with self._lock:
+            state.last_text[message_id] = text
+            state.last_text.move_to_end(message_id)
+            while len(state.last_text) > LAST_TEXT_LIMIT:
+                state.last_text.popitem(last=False)
+
+    def _on_success(self, state: _ChatState):
+        state.success_streak += 1
+        if state.success_streak >= RECOVERY_STREAK and state.interval > state.base_interval:
+            state.interval = max(state.base_interval, state.interval * 0.8)
+            state.success_streak = 0
+
+    def _on_retry_after(self, state: _ChatState, message_id: int, message, text: str,
+                        parse_mode: Optional[str], error: RetryAfter, loop: asyncio.AbstractEventLoop):
+        """被限流：等待 Telegram 要求的时间，并加倍该聊天的编辑间隔"""
+        retry_after = error.retry_after
+        wait = retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else float(retry_after)
+        self.rate_limited += 1
+        state.success_streak = 0
+        state.interval = min(self.max_interval, max(state.interval * 2, wait / 2))
+        state.next_edit_at = loop.time() + wait
+        with self._lock:
+            # 没有更新的文本时重新排队，保证最终状态能送达
+            if message_id not in state.pending:
+                state.pending[message_id] = (message, text, parse_mode)
+                state.pending.move_to_end(message_id, last=False)
+        logger.warning(
+            f"⏳ 聊天 {state.chat_id} 触发限流，{wait:.0f}s 后重试，编辑间隔调整为 {state.interval:.1f}s")
+
+
+_shared_renderer: Optional[StatusMessageRenderer] = None
+_shared_renderer_lock = threading.Lock()
+
+
+def get_status_renderer() -> StatusMessageRenderer:
+    """获取进程内共享的状态消息渲染器"""
+    global _shared_renderer
+    with _shared_renderer_lock:
+        if _shared_renderer is None:
+            _shared_renderer = StatusMessageRenderer()
+        return _shared_renderer
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Telethon 多连接并行下载
+大文件按固定大小分块，通过多个连接到文件所在 DC 的 MTProtoSender 并行请求，
+每块按偏移写入预先分配好大小的 .part 文件；已完成的分块记录在旁边的状态文件中，
+重启或断网后重新下载同一文件时只请求缺失的分块
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Set
+
+try:
+    from telethon import utils
+    from telethon.network import MTProtoSender
+    from telethon.tl import functions
+    from telethon.tl.alltlobjects import LAYER
+    from telethon.tl.types import Document
+    from telethon.tl.types.upload import FileCdnRedirect
+    TELETHON_AVAILABLE = True
+except ImportError:
+    TELETHON_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# 单次 upload.getFile 请求的大小（必须整除 1MB 且是 4KB 的倍数）
+PART_SIZE = 512 * 1024
+PARTIAL_DIR = ".partial"
+STATE_SUFFIX = ".state.json"
+# 每个连接上同时进行的请求数
+REQUESTS_PER_SENDER = 2
+PART_RETRIES = 5
+STATE_FLUSH_SECONDS = 2.0
+
+ProgressCallback = Callable[[int, int], Awaitable[Any]]
+
+
+class ParallelDownloadUnavailable(Exception):
+    """无法使用并行下载（由调用方回退到 download_media）"""
+
+
+def unique_filename(directory: str, filename: str) -> str:
+    """在目录中生成不重名的文件名（只列一次目录，不逐个探测）"""
+    try:
+        with os.scandir(directory) as it:
+            existing = {entry.name for entry in it}
+    except FileNotFoundError:
+        return filename
+    if filename not in existing:
+        return filename
+    name, ext = os.path.splitext(filename)
+    counter = 1
+    while f"{name}_{counter}{ext}" in existing:
+        counter += 1
+    return f"{name}_{counter}{ext}"
+
+
+class _PartState:
+    """分块完成状态（保存在 .part 文件旁边，用于断点续传）"""
+
+    def __init__(self, path: str, document_id: int, size: int, part_size: int):
+        self.path = path
+        self.document_id = document_id
+        self.size = size
+        self.part_size = part_size
+        self.done: Set[int] = set()
+        self._dirty = False
+        self._last_flush = time.monotonic()
+
+    def load(self) -> bool:
+        """读取已有状态；与当前文件不匹配时返回 False"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if (data.get("document_id"), data.get("size"), data.get("part_size")) != (
+                self.document_id, self.size, self.part_size):
+            return False
+        self.done = set(data.get("done") or [])
+        return True
+
+    def mark(self, index: int):
+        self.done.add(index)
+        self._dirty = True
+        if time.monotonic() - self._last_flush >= STATE_FLUSH_SECONDS:
+            self.flush()
+
+    def flush(self):
+        if not self._dirty:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"document_id": self.document_id, "size": self.size,
+                       "part_size": self.part_size, "done": sorted(self.done)}, f)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+        self._last_flush = time.monotonic()
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class ParallelMediaDownloader:
+    """基于 Telethon 的多连接分块下载器"""
+
+    def __init__(self, client, connections: int = 4, min_size: int = 20 * 1024 * 1024,
+                 part_size: int = PART_SIZE):
+        """
+        初始化下载器
+
+        Args:
+            client: 已连接的 TelegramClient
+            connections: 到文件所在 DC 的连接数
+            min_size: 小于该大小的文件不使用并行下载
+            part_size: 分块大小
+        """
+        self.client = client
+        self.connections = max(1, int(connections))
+        self.min_size = min_size
+        self.part_size = part_size
+
+    def supports(self, message) -> bool:
+        """消息中的媒体是否适合并行下载（足够大的 Document）"""
+        document = getattr(getattr(message, "media", None), "document", None)
+        return (TELETHON_AVAILABLE and isinstance(document, Document)
+                and (document.size or 0) >= self.min_size)
+
+    async def download(self, message, dest_path: str,
+                       progress_callback: Optional[ProgressCallback] = None) -> str:
+        """
+        并行下载消息中的文件到 dest_path
+
+        Raises:
+            ParallelDownloadUnavailable: 无法使用并行下载（CDN 文件、Telethon 内部接口变化等）
+        """
+        if not self.supports(message):
+            raise ParallelDownloadUnavailable("媒体不是足够大的文档")
+        document = message.media.document
+        dc_id, location = utils.get_input_location(document)
+        size = document.size
+        parts = (size + self.part_size - 1) // self.part_size
+
+        partial_dir = os.path.join(os.path.dirname(dest_path) or ".", PARTIAL_DIR)
+        os.makedirs(partial_dir, exist_ok=True)
+        part_path = os.path.join(partial_dir, f"{document.id}.part")
+        state = _PartState(part_path + STATE_SUFFIX, document.id, size, self.part_size)
+        if not (os.path.exists(part_path) and state.load()):
+            state.done.clear()
+        if state.done:
+            logger.info(f"🔄 续传 Telegram 文件 {document.id}: 已完成 {len(state.done)}/{parts} 块")
+
+        # 预分配文件大小，各分块按偏移直接写入
+        fd = os.open(part_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, size)
+            pending: asyncio.Queue = asyncio.Queue()
+            for index in range(parts):
+                if index not in state.done:
+                    pending.put_nowait(index)
+            downloaded = sum(self._part_length(index, size) for index in state.done)
+
+            senders = await self._create_senders(dc_id, min(self.connections, max(1, pending.qsize())))
+            logger.info(f"🚀 并行下载 Telegram 文件 {document.id}: {size / 1024 / 1024:.1f}MB，"
+                        f"{len(senders)} 个连接，{pending.qsize()} 块待下载")
+            loop = asyncio.get_running_loop()
+            progress_lock = asyncio.Lock()
+            # 正在线程池中执行的写入（取消工作协程不会中止它们，关闭文件前要等待完成）
+            writes: Set[asyncio.Future] = set()
+
+            async def worker(sender_slot: List[Any]):
+                nonlocal downloaded
+                while True:
+                    try:
+                        index = pending.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    data = await self._fetch_part(sender_slot, dc_id, location, index, size)
+                    write = loop.run_in_executor(None, os.pwrite, fd, data, index * self.part_size)
+                    writes.add(write)
+                    write.add_done_callback(writes.discard)
+                    await asyncio.shield(write)
+                    state.mark(index)
+                    async with progress_lock:
+                        downloaded += len(data)
+                        current = downloaded
+                    if progress_callback:
+                        await progress_callback(current, size)
+
+            slots = [[sender] for sender in senders]
+            tasks = [asyncio.create_task(worker(slot)) for slot in slots for _ in range(REQUESTS_PER_SENDER)]
+            try:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+                for task in done:
+                    if not task.cancelled() and task.exception() is not None:
+                        raise task.exception()
+            finally:
+                # 任一工作协程失败（或下载被取消）时先停止其余协程，再保存状态、断开连接、关闭文件
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                if writes:
+                    await asyncio.gather(*list(writes), return_exceptions=True)
+                state.flush()
+                await asyncio.gather(*(slot[0].disconnect() for slot in slots), return_exceptions=True)
+        finally:
+            os.close(fd)
+
+        if len(state.done) != parts:
+            raise IOError(f"分块未全部完成: {len(state.done)}/{parts}")
+        os.replace(part_path, dest_path)
+        state.remove()
+        return dest_path
+
+    def _part_length(self, index: int, size: int) -> int:
+        return min(self.part_size, size - index * self.part_size)
+
+    async def _fetch_part(self, sender_slot: List[Any], dc_id: int, location, index: int, size: int) -> bytes:
+        """请求一个分块；连接断开时为该工作协程重建连接并重试"""
+        expected = self._part_length(index, size)
+        request = functions.upload.GetFileRequest(location, offset=index * self.part_size, limit=self.part_size)
+        for attempt in range(1, PART_RETRIES + 1):
+            try:
+                result = await sender_slot[0].send(request)
+                if isinstance(result, FileCdnRedirect):
+                    raise ParallelDownloadUnavailable("文件位于 CDN")
+                if len(result.bytes) != expected:
+                    raise IOError(f"分块 {index} 长度不符: {len(result.bytes)} != {expected}")
+                return result.bytes
+            except ParallelDownloadUnavailable:
+                raise
+            except (ConnectionError, OSError, asyncio.TimeoutError) as e:
+                if attempt == PART_RETRIES:
+                    raise
+                logger.warning(f"⚠️ 分块 {index} 下载失败（第 {attempt} 次）: {e}，重建连接后重试")
+                await asyncio.sleep(min(2 ** attempt, 30))
+                try:
+                    await sender_slot[0].disconnect()
+                except Exception:
+                    pass
+                sender_slot[0] = (await self._create_senders(dc_id, 1))[0]
+        raise IOError(f"分块 {index} 下载失败")
+
+    async def _create_senders(self, dc_id: int, count: int) -> List[Any]:
+        """
+        创建到 dc_id 的多个 MTProtoSender：与会话同一 DC 时复用会话的授权密钥，
+        其他 DC 只导出/导入一次授权，之后的连接复用导入得到的密钥
+        """
+        client = self.client
+        try:
+            auth_key = client.session.auth_key if dc_id == client.session.dc_id else None
+            dc = await client._get_dc(dc_id)
+        except AttributeError as e:
+            raise ParallelDownloadUnavailable(f"Telethon 内部接口不可用: {e}")
+        except Exception as e:
+            raise ParallelDownloadUnavailable(f"无法获取 DC {dc_id} 的地址: {e}") from e
+
+        senders = []
+        try:
+            for _ in range(count):
+                sender = MTProtoSender(auth_key, loggers=client._log)
+                await sender.connect(client._connection(
+                    dc.ip_address, dc.port, dc.id, loggers=client._log, proxy=client._proxy,
+                    local_addr=getattr(client, "_local_addr", None)))
+                if auth_key is None:
+                    auth = await client(functions.auth.ExportAuthorizationRequest(dc_id))
+                    client._init_request.query = functions.auth.ImportAuthorizationRequest(
+                        id=auth.id, bytes=auth.bytes)
+                    await sender.send(functions.InvokeWithLayerRequest(LAYER, client._init_request))
+                    auth_key = sender.auth_key
+                senders.append(sender)
+        except Exception as e:
+            await asyncio.gather(*(sender.disconnect() for sender in senders), return_exceptions=True)
+            if senders:
+                # 至少有一个连接可用时以较少的连接继续
+                logger.warning(f"⚠️ 只建立了 {len(senders)}/{count} 个到 DC {dc_id} 的连接: {e}")
+                return await self._create_senders(dc_id, len(senders))
+            # 导出授权或连接失败时由调用方回退到单连接下载
+            raise ParallelDownloadUnavailable(f"无法建立到 DC {dc_id} 的连接: {e}") from e
+        return senders
+
+
+def parallel_download_settings() -> dict:
+    """并行下载参数（TELETHON_DOWNLOAD_CONNECTIONS / TELETHON_PARALLEL_MIN_MB 环境变量）"""
+    return {
+        "connections": int(os.getenv("TELETHON_DOWNLOAD_CONNECTIONS", "4")),
+        "min_size": int(float(os.getenv("TELETHON_PARALLEL_MIN_MB", "20")) * 1024 * 1024),
+    }
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+下载吞吐策略
+根据平台、协议和文件大小为 yt-dlp 选择下载方式：分片（DASH/HLS）下载按平台和文件大小
+调整并发分片数；大的渐进式（单文件 HTTP）下载在安装了 aria2c 时改用多连接下载。
+选中的策略记录到当前任务的指标中，可在 savextube.toml 的 [throughput] 段调整
+"""
+
+import os
+import shutil
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FRAGMENTS = 3
+MAX_FRAGMENTS = 16
+DEFAULT_HTTP_CHUNK_SIZE = 10 * 1024 * 1024
+
+# 小于该大小的文件分片并发收益很小
+SMALL_FILE_BYTES = 20 * 1024 * 1024
+
+# yt-dlp 中按单个 HTTP 文件下载的协议
+PROGRESSIVE_PROTOCOLS = ("http", "https")
+
+STRATEGY_DEFAULT = "default"
+STRATEGY_FRAGMENTS = "fragments"
+STRATEGY_MULTI_CONNECTION = "multi_connection"
+
+
+@dataclass
+class DownloadStrategy:
+    """一次 yt-dlp 下载使用的吞吐策略"""
+
+    name: str
+    concurrent_fragments: int = DEFAULT_FRAGMENTS
+    http_chunk_size: Optional[int] = DEFAULT_HTTP_CHUNK_SIZE
+    external_downloader: Optional[str] = None
+    connections: int = 1
+    estimated_bytes: Optional[int] = None
+    reason: str = ""
+    external_args: List[str] = field(default_factory=list)
+
+    def apply(self, ydl_opts: Dict[str, Any]) -> Dict[str, Any]:
+        """把策略写入 yt-dlp 选项（原地修改并返回）"""
+        ydl_opts["concurrent_fragment_downloads"] = self.concurrent_fragments
+        if self.http_chunk_size:
+            ydl_opts["http_chunk_size"] = self.http_chunk_size
+        if self.external_downloader:
+            # 只接管渐进式 HTTP 下载，DASH/HLS 分片仍由 yt-dlp 原生下载器处理
+            ydl_opts["external_downloader"] = {"http": self.external_downloader}
+            ydl_opts["external_downloader_args"] = {self.external_downloader: list(self.external_args)}
+        return ydl_opts
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "concurrent_fragments": self.concurrent_fragments,
+            "external_downloader": self.external_downloader,
+            "connections": self.connections,
+            "estimated_bytes": self.estimated_bytes,
+            "reason": self.reason,
+        }
+
+    def describe(self) -> str:
+        if self.external_downloader:
+            return f"{self.external_downloader} {self.connections} 连接"
+        return f"{self.concurrent_fragments} 分片并发"
+
+
+def estimate_filesize(info: Optional[Dict[str, Any]]) -> Optional[int]:
+    """从 yt-dlp 信息字典估算下载大小（音视频分开时取两者之和）"""
+    if not info:
+        return None
+    formats = info.get("requested_formats") or [info]
+    total = 0
+    for fmt in formats:
+        size = fmt.get("filesize") or fmt.get("filesize_approx")
+        if not size:
+            return None
+        total += int(size)
+    return total or None
+
+
+def download_protocols(info: Optional[Dict[str, Any]]) -> List[str]:
+    """yt-dlp 信息字典中的下载协议（合并格式为 "https+https" 形式）"""
+    if not info:
+        return []
+    formats = info.get("requested_formats") or [info]
+    protocols: List[str] = []
+    for fmt in formats:
+        protocols.extend(p for p in str(fmt.get("protocol") or "").split("+") if p)
+    return protocols
+
+
+class ThroughputPlanner:
+    """按平台和文件大小选择下载策略"""
+
+    def __init__(self, mode: str = "auto", fragment_concurrency: int = DEFAULT_FRAGMENTS,
+                 platform_fragments: Optional[Dict[str, int]] = None, large_file_mb: int = 200,
+                 multi_connection_downloader: str = "aria2c", multi_connection_count: int = 8):
+        """
+        初始化策略选择器
+
+        Args:
+            mode: auto 为按条件选择策略，off 为固定使用默认分片并发
+            fragment_concurrency: 默认并发分片数
+            platform_fragments: 各平台的并发分片数
+            large_file_mb: 大文件阈值（MB），超过时提高分片并发并尝试多连接下载
+            multi_connection_downloader: 多连接下载使用的外部下载器（aria2c）
+            multi_connection_count: 多连接下载的连接数
+        """
+        self.mode = (mode or "auto").lower()
+        self.fragment_concurrency = self._clamp(fragment_concurrency)
+        self.platform_fragments = {platform: self._clamp(value)
+                                   for platform, value in (platform_fragments or {}).items() if value}
+        self.large_file_bytes = max(1, int(large_file_mb)) * 1024 * 1024
+        self.multi_connection_downloader = multi_connection_downloader or None
+        self.multi_connection_count = max(1, int(multi_connection_count))
+        self._downloader_available: Optional[bool] = None
+
+    @staticmethod
+    def _clamp(value: Any) -> int:
+        return max(1, min(MAX_FRAGMENTS, int(value)))
+
+    def _multi_connection_available(self) -> bool:
+        if self._downloader_available is None:
+            self._downloader_available = bool(
+                self.multi_connection_downloader and shutil.which(self.multi_connection_downloader))
+            if self.multi_connection_downloader and not self._downloader_available:
+                logger.info(f"ℹ️ 未找到 {self.multi_connection_downloader}，大文件将使用单连接下载")
+        return self._downloader_available
+
+    def plan(self, platform: Optional[str] = None, info: Optional[Dict[str, Any]] = None) -> DownloadStrategy:
+        """
+        选择下载策略
+
+        Args:
+            platform: 平台名称（url_router 中的名称）
+            info: 预先获取的 yt-dlp 信息字典，没有时只按平台选择
+
+        Returns:
+            下载策略
+        """
+        fragments = self.platform_fragments.get(platform or "", self.fragment_concurrency)
+        if self.mode == "off":
+            return DownloadStrategy(STRATEGY_DEFAULT, DEFAULT_FRAGMENTS, reason="吞吐模式已关闭")
+
+        size = estimate_filesize(info)
+        protocols = download_protocols(info)
+        progressive = bool(protocols) and all(p in PROGRESSIVE_PROTOCOLS for p in protocols)
+
+        if size is not None and size >= self.large_file_bytes:
+            if progressive and self._multi_connection_available():
+                n = str(self.multi_connection_count)
+                return DownloadStrategy(
+                    STRATEGY_MULTI_CONNECTION, fragments,
+                    http_chunk_size=None,
+                    external_downloader=self.multi_connection_downloader,
+                    connections=self.multi_connection_count,
+                    estimated_bytes=size,
+                    reason="大文件渐进式下载",
+                    external_args=["-x", n, "-s", n, "-k", "1M", "--file-allocation=none",
+                                   "--console-log-level=warn"],
+                )
+            return DownloadStrategy(STRATEGY_FRAGMENTS, self._clamp(fragments * 2),
+                                    estimated_bytes=size, reason="大文件提高分片并发")
+        if size is not None and size < SMALL_FILE_BYTES:
+            return DownloadStrategy(STRATEGY_FRAGMENTS, min(fragments, 2),
+                                    estimated_bytes=size, reason="小文件")
+        return DownloadStrategy(STRATEGY_FRAGMENTS, fragments, estimated_bytes=size,
+                                reason="平台默认")
+
+
+_shared_planner: Optional[ThroughputPlanner] = None
+_shared_planner_lock = threading.Lock()
+
+
+def configure_throughput_planner(settings: Dict[str, Any]) -> ThroughputPlanner:
+    """用 savextube.toml 中的 [throughput] 配置（config_reader.get_throughput_config）替换共享的策略选择器"""
+    global _shared_planner
+    settings = dict(settings)
+    settings["mode"] = os.getenv("THROUGHPUT_MODE", settings.get("mode", "auto"))
+    planner = ThroughputPlanner(**settings)
+    with _shared_planner_lock:
+        _shared_planner = planner
+    logger.info(f"🚀 下载吞吐模式: {planner.mode}，默认分片并发 {planner.fragment_concurrency}，"
+                f"大文件阈值 {planner.large_file_bytes // (1024 * 1024)}MB")
+    return planner
+
+
+def get_throughput_planner() -> ThroughputPlanner:
+    """获取进程内共享的策略选择器（未配置时使用默认值）"""
+    global _shared_planner
+    with _shared_planner_lock:
+        if _shared_planner is None:
+            _shared_planner = ThroughputPlanner(mode=os.getenv("THROUGHPUT_MODE", "auto"))
+        return _shared_planner
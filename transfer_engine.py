@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+可断点续传的流式下载引擎
+共享连接池（同一主机复用 TCP/TLS 连接），下载写入 .part 文件，
+失败重试时通过 HTTP Range 从已下载的位置继续。首次响应的 ETag / Last-Modified
+保存在 .part 旁边，续传时作为 If-Range 发送：服务器上的文件已经变化时返回完整内容（200），从头下载
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+PART_SUFFIX = ".part"
+# 保存 .part 对应的校验值（ETag 或 Last-Modified）
+VALIDATOR_SUFFIX = ".validator"
+
+# 自适应分块大小范围
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
+# 目标：每个分块大约 0.25 秒的数据量
+TARGET_CHUNK_SECONDS = 0.25
+
+
+class TransferEngine:
+    """带连接池的断点续传下载器"""
+
+    def __init__(self, pool_connections: int = 16, pool_maxsize: int = 32,
+                 headers: Optional[Dict[str, str]] = None, timeout: float = 30):
+        """
+        初始化下载引擎
+
+        Args:
+            pool_connections: 缓存连接池的主机数量
+            pool_maxsize: 每个主机的最大连接数
+            headers: 默认请求头
+            timeout: 连接/读取超时（秒）
+        """
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+            'Connection': 'keep-alive',
+        })
+        if headers:
+            self.session.headers.update(headers)
+
+        # 统计信息
+        self.total_bytes = 0
+        self.resumed_bytes = 0
+        self.completed_files = 0
+        self.resume_count = 0
+
+    def download(self, url: str, filepath: str, retries: int = 3,
+                 progress_callback: Optional[Callable[[Dict], None]] = None,
+                 headers: Optional[Dict[str, str]] = None) -> bool:
+        """
+        下载文件到 filepath
+
+        数据先写入 filepath + ".part"，完成后原子重命名。重试（包括进程重启后
+        再次下载同一文件）时从 .part 已有的大小继续。
+
+        Args:
+            url: 下载地址
+            filepath: 目标文件路径
+            retries: 最大尝试次数
+            progress_callback: 进度回调，参数与 yt-dlp progress hook 的字典格式一致
+            headers: 额外请求头
+
+        Returns:
+            是否下载成功
+        """
+        part_path = filepath + PART_SUFFIX
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        filename = os.path.basename(filepath)
+
+        for attempt in range(retries):
+            try:
+                if self._download_once(url, part_path, filename, progress_callback, headers):
+                    os.replace(part_path, filepath)
+                    self._remove_validator(part_path)
+                    self.completed_files += 1
+                    return True
+            except Exception as e:
+                logger.warning(f"⚠️ 下载失败 (尝试 {attempt + 1}/{retries}): {filename}: {e}")
+            if attempt < retries - 1:
+                # 指数退避，.part 文件保留用于续传
+                time.sleep(min(2 ** attempt, 10))
+
+        return False
+
+    def _download_once(self, url: str, part_path: str, filename: str,
+                       progress_callback: Optional[Callable[[Dict], None]],
+                       extra_headers: Optional[Dict[str, str]]) -> bool:
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        request_headers = dict(extra_headers or {})
+        if offset > 0:
+            validator = self._read_validator(part_path)
+            if validator:
+                request_headers['Range'] = f'bytes={offset}-'
+                request_headers['If-Range'] = validator
+            else:
+                # 没有校验值时无法确认服务器上的文件没有变化，不能续传
+                logger.info(f"🔄 .part 没有对应的 ETag/Last-Modified，重新下载: {filename}")
+                offset = 0
+
+        with self.session.get(url, stream=True, timeout=self.timeout, headers=request_headers) as response:
+            if response.status_code == 416 and offset > 0:
+                # 服务器认为范围无效：通常是 .part 已经完整
+                total = self._parse_total_size(response)
+                if total and total == offset:
+                    return True
+                logger.info(f"🔄 续传范围无效，重新下载: {filename}")
+                os.remove(part_path)
+                self._remove_validator(part_path)
+                return self._download_once(url, part_path, filename, progress_callback, extra_headers)
+            response.raise_for_status()
+
+            if offset > 0 and response.status_code == 206 and self._range_start(response) == offset:
+                logger.info(f"⏯️ 断点续传: {filename} 从 {offset} 字节继续")
+                self.resume_count += 1
+                self.resumed_bytes += offset
+                mode = 'ab'
+            else:
+                # 服务器不支持 Range 或文件已变化（If-Range 不匹配时返回 200），从头开始
+                if offset > 0:
+                    logger.info(f"🔄 服务器返回完整内容，从头下载: {filename}")
+                offset = 0
+                mode = 'wb'
+                self._write_validator(part_path, response)
+
+            total_size = self._parse_total_size(response) or 0
+            downloaded = offset
+
+            if progress_callback:
+                progress_callback({
+                    'status': 'downloading',
+                    'filename': filename,
+                    'total_bytes': total_size,
+                    'downloaded_bytes': downloaded,
+                    'speed': 0,
+                    'eta': 0
+                })
+
+            start_time = time.time()
+            last_update_time = start_time
+            chunk_size = MIN_CHUNK_SIZE
+            received_this_attempt = 0
+
+            with open(part_path, mode) as f:
+                chunk_start = time.time()
+                while True:
+                    # 直接读取底层流，使分块大小可以随吞吐量动态调整
+                    chunk = response.raw.read(chunk_size, decode_content=True)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    downloaded += len(chunk)
+                    received_this_attempt += len(chunk)
+                    self.total_bytes += len(chunk)
+
+                    now = time.time()
+                    chunk_size = self._adapt_chunk_size(chunk_size, len(chunk), now - chunk_start)
+                    chunk_start = now
+
+                    if progress_callback and (now - last_update_time >= 0.5 or downloaded == total_size):
+                        elapsed = now - start_time
+                        speed = received_this_attempt / elapsed if elapsed > 0 else 0
+                        eta = (total_size - downloaded) / speed if speed > 0 and total_size > downloaded else 0
+                        progress_callback({
+                            'status': 'downloading',
+                            'filename': filename,
+                            'total_bytes': total_size,
+                            'downloaded_bytes': downloaded,
+                            'speed': speed,
+                            'eta': eta
+                        })
+                        last_update_time = now
+
+            if total_size and downloaded < total_size:
+                raise IOError(f"连接中断，已下载 {downloaded}/{total_size} 字节")
+            return True
+
+    @staticmethod
+    def _range_start(response: requests.Response) -> Optional[int]:
+        """206 响应中 Content-Range 的起始位置"""
+        content_range = response.headers.get('content-range', '')
+        if content_range.startswith('bytes ') and '-' in content_range:
+            start = content_range[len('bytes '):].split('-', 1)[0].strip()
+            if start.isdigit():
+                return int(start)
+        return None
+
+    @staticmethod
+    def _read_validator(part_path: str) -> Optional[str]:
+        try:
+            with open(part_path + VALIDATOR_SUFFIX, 'r', encoding='utf-8') as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    @staticmethod
+    def _write_validator(part_path: str, response: requests.Response):
+        """保存首次响应的校验值（If-Range 只能使用强 ETag，弱 ETag 时改用 Last-Modified）"""
+        etag = response.headers.get('etag')
+        validator = etag if etag and not etag.startswith('W/') else response.headers.get('last-modified')
+        if not validator:
+            TransferEngine._remove_validator(part_path)
+            return
+        try:
+            with open(part_path + VALIDATOR_SUFFIX, 'w', encoding='utf-8') as f:
+                f.write(validator)
+        except OSError as e:
+            logger.debug(f"保存续传校验值失败: {e}")
+
+    @staticmethod
+    def _remove_validator(part_path: str):
+        try:
+            os.remove(part_path + VALIDATOR_SUFFIX)
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _parse_total_size(response: requests.Response) -> Optional[int]:
+        """从 Content-Range 或 Content-Length 中解析文件总大小"""
+        content_range = response.headers.get('content-range', '')
+        if '/' in content_range:
+            total = content_range.rsplit('/', 1)[1].strip()
+            if total.isdigit():
+                return int(total)
+        content_length = response.headers.get('content-length')
+        if content_length and content_length.isdigit():
+            return int(content_length)
+        return None
+
+    @staticmethod
+    def _adapt_chunk_size(chunk_size: int, received: int, elapsed: float) -> int:
+        """按实际吞吐量调整分块大小，快速链路用大块减少 Python 层开销"""
+        if elapsed <= 0 or received < chunk_size:
+            return chunk_size
+        ideal = int(received / elapsed * TARGET_CHUNK_SECONDS)
+        if ideal > chunk_size * 2:
+            chunk_size *= 2
+        elif ideal < chunk_size // 2:
+            chunk_size //= 2
+        return max(MIN_CHUNK_SIZE, min(MAX_CHUNK_SIZE, chunk_size))
+
+    def stats(self) -> Dict[str, int]:
+        """获取下载统计"""
+        return {
+            'total_bytes': self.total_bytes,
+            'resumed_bytes': self.resumed_bytes,
+            'completed_files': self.completed_files,
+            'resume_count': self.resume_count,
+        }
+
+
+_shared_engine: Optional[TransferEngine] = None
+_shared_engine_lock = threading.Lock()
+
+
+def get_transfer_engine() -> TransferEngine:
+    """获取进程内共享的下载引擎"""
+    global _shared_engine
+    with _shared_engine_lock:
+        if _shared_engine is None:
+            _shared_engine = TransferEngine()
+        return _shared_engine
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+链接路由表
+每个链接只做一次 urlparse：主机名通过字典直接查到平台，再用该平台预编译的路径规则
+识别内容类型和 ID，得到的 Route 按链接缓存，后续的平台判断和分支都复用同一个结果
+
+直接运行本文件可以对一批真实链接做分类基准测试：
+    python url_router.py --rounds 2000
+"""
+
+import re
+import time
+import argparse
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+# 主机名 -> 平台（与 get_platform_name 的返回值一致）
+HOST_PLATFORMS: Dict[str, str] = {}
+for _platform, _hosts in {
+    "x": ("twitter.com", "x.com", "www.twitter.com", "www.x.com"),
+    "youtube": ("youtube.com", "www.youtube.com", "youtu.be", "m.youtube.com"),
+    "bilibili": ("bilibili.com", "www.bilibili.com", "space.bilibili.com", "m.bilibili.com",
+                 "b23.tv", "b23.wtf"),
+    "telegraph": ("telegra.ph", "telegraph.co"),
+    "douyin": ("douyin.com", "www.douyin.com", "v.douyin.com", "www.iesdouyin.com", "iesdouyin.com"),
+    "kuaishou": ("kuaishou.com", "www.kuaishou.com", "v.kuaishou.com", "m.kuaishou.com", "f.kuaishou.com"),
+    "toutiao": ("toutiao.com", "www.toutiao.com", "m.toutiao.com"),
+    "facebook": ("facebook.com", "www.facebook.com", "m.facebook.com", "fb.watch", "fb.com"),
+    "xiaohongshu": ("xiaohongshu.com", "www.xiaohongshu.com", "xhslink.com"),
+    "weibo": ("weibo.com", "www.weibo.com", "m.weibo.com", "video.weibo.com", "t.cn", "weibo.cn", "sinaurl.cn"),
+    "instagram": ("instagram.com", "www.instagram.com", "m.instagram.com"),
+    "tiktok": ("tiktok.com", "www.tiktok.com", "m.tiktok.com", "vm.tiktok.com"),
+    "netease": ("music.163.com", "y.music.163.com", "m.music.163.com", "163cn.tv", "music.163.cn"),
+    "qqmusic": ("y.qq.com", "music.qq.com", "c.y.qq.com", "c6.y.qq.com", "i.y.qq.com", "qq.cn", "qq.com"),
+    "youtubemusic": ("music.youtube.com",),
+    "applemusic": ("music.apple.com",),
+}.items():
+    for _host in _hosts:
+        HOST_PLATFORMS[_host] = _platform
+
+# 按域名后缀匹配的平台（任意子域名，例如 cn.pornhub.com）
+SUFFIX_PLATFORMS: Tuple[Tuple[str, str], ...] = (
+    ("xvideos.com", "xvideos"),
+    ("pornhub.com", "pornhub"),
+    ("kuaishou.com", "kuaishou"),
+)
+
+# 短链接主机：需要跳转后才能知道具体内容
+SHORT_LINK_HOSTS = frozenset({
+    "b23.tv", "b23.wtf", "youtu.be", "v.douyin.com", "v.kuaishou.com", "f.kuaishou.com",
+    "xhslink.com", "t.cn", "weibo.cn", "sinaurl.cn", "163cn.tv", "music.163.cn", "vm.tiktok.com",
+    "fb.watch", "c6.y.qq.com",
+})
+
+UNKNOWN_PLATFORM = "other"
+
+
+@dataclass(frozen=True)
+class Route:
+    """链接的路由结果：平台、内容类型和从链接中解析出的 ID（只读）"""
+    url: str
+    platform: str
+    kind: str
+    host: str = ""
+    ids: Dict[str, str] = field(default_factory=dict)
+
+    def get(self, name: str) -> Optional[str]:
+        """获取解析出的 ID，不存在时返回 None"""
+        return self.ids.get(name)
+
+    @property
+    def supported(self) -> bool:
+        return self.platform != UNKNOWN_PLATFORM
+
+
+# ----------------------------------------------------------------------
+# 各平台的路径规则（预编译）
+# ----------------------------------------------------------------------
+
+BILIBILI_LIST_PATH = re.compile(r"^/(\d+)/lists/(\d+)")
+BILIBILI_USER_LISTS_PATH = re.compile(r"^/(\d+)/lists/?$")
+BILIBILI_SPACE_PATH = re.compile(r"^/(\d+)")
+BILIBILI_BV = re.compile(r"BV[a-zA-Z0-9]+")
+BILIBILI_EPISODE_PATH = re.compile(r"^/bangumi/play/(ep|ss)(\d+)")
+
+YOUTUBE_CHANNEL_PATH = re.compile(r"^/(@[^/]+|(?:c|channel|user)/[^/]+)(/playlists)?$")
+YOUTUBE_VIDEO_PATH = re.compile(r"^/(?:shorts|live|embed)/([A-Za-z0-9_-]+)")
+
+X_STATUS_PATH = re.compile(r"^/([^/]+)/status/(\d+)")
+NETEASE_RESOURCE_PATH = re.compile(r"^/(?:m/)?(song|album|playlist|artist|program|djradio)\b")
+QQMUSIC_RESOURCE_PATH = re.compile(r"/(songDetail|albumDetail|playlist|singer)/([A-Za-z0-9]+)")
+QQMUSIC_KINDS = {"songDetail": "song", "albumDetail": "album", "playlist": "playlist", "singer": "artist"}
+APPLE_MUSIC_PATH = re.compile(r"^/([a-z]{2})/(album|playlist|song|artist|music-video)/[^/]*/?([A-Za-z0-9.]+)?")
+DOUYIN_VIDEO_PATH = re.compile(r"/(?:video|note)/(\d+)")
+XIAOHONGSHU_NOTE_PATH = re.compile(r"/(?:explore|discovery/item)/([0-9a-f]+)")
+INSTAGRAM_POST_PATH = re.compile(r"^/(p|reel|reels|tv|stories)/([^/]+)")
+TIKTOK_VIDEO_PATH = re.compile(r"/video/(\d+)")
+
+Extractor = Callable[[str, str, Dict[str, List[str]], str], Tuple[str, Dict[str, str]]]
+
+
+def _first(query: Dict[str, List[str]], name: str) -> Optional[str]:
+    values = query.get(name)
+    return values[0] if values else None
+
+
+def _route_bilibili(host, path, query, url):
+    if host == "space.bilibili.com":
+        match = BILIBILI_LIST_PATH.match(path)
+        if match:
+            return "list", {"uid": match.group(1), "list_id": match.group(2)}
+        match = BILIBILI_USER_LISTS_PATH.match(path)
+        if match:
+            return "user_lists", {"uid": match.group(1)}
+        match = BILIBILI_SPACE_PATH.match(path)
+        return "space", {"uid": match.group(1)} if match else {}
+
+    ids = {}
+    match = BILIBILI_BV.search(url)
+    if match:
+        ids["bv_id"] = match.group(0)
+        season_id = _first(query, "season_id")
+        if season_id:
+            ids["season_id"] = season_id
+        page = _first(query, "p")
+        if page:
+            ids["page"] = page
+        return "video", ids
+    match = BILIBILI_EPISODE_PATH.match(path)
+    if match:
+        return "bangumi", {match.group(1) + "_id": match.group(2)}
+    return ("short", ids) if host in SHORT_LINK_HOSTS else ("other", ids)
+
+
+def _route_youtube(host, path, query, url):
+    ids = {}
+    video_id = _first(query, "v")
+    if host == "youtu.be":
+        video_id = path.strip("/").split("/")[0] or None
+    else:
+        match = YOUTUBE_VIDEO_PATH.match(path)
+        if match:
+            video_id = match.group(1)
+    if video_id:
+        ids["video_id"] = video_id
+
+    playlist_id = _first(query, "list")
+    if playlist_id and host != "youtu.be" and path in ("/playlist", "/watch"):
+        ids["playlist_id"] = playlist_id
+        return "playlist", ids
+    if video_id:
+        return "video", ids
+
+    match = YOUTUBE_CHANNEL_PATH.match(path.rstrip("/"))
+    if match:
+        ids["channel"] = match.group(1)
+        return ("channel_playlists" if match.group(2) else "channel"), ids
+    return "other", ids
+
+
+def _route_x(host, path, query, url):
+    match = X_STATUS_PATH.match(path)
+    if match:
+        return "post", {"user": match.group(1), "status_id": match.group(2)}
+    return "other", {}
+
+
+def _route_netease(host, path, query, url):
+    if host in SHORT_LINK_HOSTS:
+        return "short", {}
+    # 网页版链接的资源路径在 # 之后：music.163.com/#/song?id=xxx
+    if "#" in url:
+        fragment = urlparse(url.split("#", 1)[1])
+        if fragment.path:
+            path = fragment.path
+            query = parse_qs(fragment.query)
+    match = NETEASE_RESOURCE_PATH.match(path)
+    if match:
+        resource_id = _first(query, "id")
+        return match.group(1), {"id": resource_id} if resource_id else {}
+    return "other", {}
+
+
+def _route_qqmusic(host, path, query, url):
+    match = QQMUSIC_RESOURCE_PATH.search(path)
+    if match:
+        return QQMUSIC_KINDS[match.group(1)], {"id": match.group(2)}
+    if host in SHORT_LINK_HOSTS or host in ("qq.cn", "qq.com"):
+        return "short", {}
+    return "other", {}
+
+
+def _route_apple_music(host, path, query, url):
+    match = APPLE_MUSIC_PATH.match(path)
+    if not match:
+        return "other", {}
+    ids = {"storefront": match.group(1)}
+    if match.group(3):
+        ids["id"] = match.group(3)
+    song_id = _first(query, "i")
+    if match.group(2) == "album" and song_id:
+        ids["song_id"] = song_id
+        return "song", ids
+    return match.group(2), ids
+
+
+def _route_by_pattern(pattern: "re.Pattern", kind: str, id_group: int = 1) -> Extractor:
+    def extractor(host, path, query, url):
+        match = pattern.search(path)
+        if match:
+            return kind, {"id": match.group(id_group)}
+        return ("short", {}) if host in SHORT_LINK_HOSTS else ("other", {})
+    return extractor
+
+
+def _route_instagram(host, path, query, url):
+    match = INSTAGRAM_POST_PATH.match(path)
+    if match:
+        return ("reel" if match.group(1) in ("reel", "reels") else "post"), {"id": match.group(2)}
+    return "other", {}
+
+
+PLATFORM_EXTRACTORS: Dict[str, Extractor] = {
+    "bilibili": _route_bilibili,
+    "youtube": _route_youtube,
+    "youtubemusic": _route_youtube,
+    "x": _route_x,
+    "netease": _route_netease,
+    "qqmusic": _route_qqmusic,
+    "applemusic": _route_apple_music,
+    "douyin": _route_by_pattern(DOUYIN_VIDEO_PATH, "video"),
+    "xiaohongshu": _route_by_pattern(XIAOHONGSHU_NOTE_PATH, "note"),
+    "tiktok": _route_by_pattern(TIKTOK_VIDEO_PATH, "video"),
+    "instagram": _route_instagram,
+}
+
+
+def _platform_for_host(host: str, url: str) -> str:
+    platform = HOST_PLATFORMS.get(host)
+    if platform:
+        return platform
+    for suffix, platform in SUFFIX_PLATFORMS:
+        if host == suffix or host.endswith("." + suffix):
+            return platform
+    # 快手链接常被包在其他页面的参数中
+    if "kuaishou.com" in url.lower():
+        return "kuaishou"
+    return UNKNOWN_PLATFORM
+
+
+def _route(url: str) -> Route:
+    try:
+        parsed = urlparse(url)
+        host = (parsed.hostname or "").rstrip(".")
+    except ValueError:
+        return Route(url, UNKNOWN_PLATFORM, "other")
+
+    platform = _platform_for_host(host, url)
+    extractor = PLATFORM_EXTRACTORS.get(platform)
+    if extractor is None:
+        kind = "short" if host in SHORT_LINK_HOSTS else ("other" if platform == UNKNOWN_PLATFORM else "video")
+        return Route(url, platform, kind, host)
+    kind, ids = extractor(host, parsed.path, parse_qs(parsed.query), url)
+    return Route(url, platform, kind, host, ids)
+
+
+@lru_cache(maxsize=4096)
+def route_url(url: str) -> Route:
+    """
+    识别链接的平台、内容类型和 ID（按链接缓存）
+
+    Args:
+        url: 链接
+
+    Returns:
+        Route；不支持的网站 platform 为 "other"
+    """
+    return _route(url or "")
+
+
+def pick_route(urls: Iterable[str]) -> Optional[Route]:
+    """从一条消息的多个链接中选出第一个受支持平台的链接，都不支持时返回第一个"""
+    first = None
+    for url in urls:
+        route = route_url(url)
+        if route.supported:
+            return route
+        if first is None:
+            first = route
+    return first
+
+
+# ----------------------------------------------------------------------
+# 基准测试
+# ----------------------------------------------------------------------
+
+BENCHMARK_CORPUS = (
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://youtu.be/dQw4w9WgXcQ?si=abc",
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PLx0sYbCqOb8TBPRdmBHs5Iftvv9TPboYG",
+    "https://m.youtube.com/playlist?list=PLx0sYbCqOb8TBPRdmBHs5Iftvv9TPboYG",
+    "https://www.youtube.com/@LinusTechTips",
+    "https://www.youtube.com/@LinusTechTips/playlists",
+    "https://www.youtube.com/shorts/abcdEFGhijk",
+    "https://music.youtube.com/playlist?list=OLAK5uy_k1",
+    "https://music.youtube.com/watch?v=abc123",
+    "https://x.com/elonmusk/status/1785392834723491840",
+    "https://twitter.com/NASA/status/1234567890",
+    "https://www.bilibili.com/video/BV1GJ411x7h7/?spm_id_from=333.788",
+    "https://www.bilibili.com/video/BV1GJ411x7h7?p=3",
+    "https://www.bilibili.com/video/BV1Xx411c7mD?season_id=1234",
+    "https://space.bilibili.com/477348669/lists/2111173?type=season",
+    "https://space.bilibili.com/3546380987533935/lists",
+    "https://b23.tv/Ab12Cd3",
+    "https://www.bilibili.com/bangumi/play/ep123456",
+    "https://v.douyin.com/iRNBho6u/",
+    "https://www.douyin.com/video/7312345678901234567",
+    "https://v.kuaishou.com/abc123",
+    "https://www.kuaishou.com/short-video/3xabc",
+    "https://www.xiaohongshu.com/explore/64f1a2b3000000001e03c4d5",
+    "http://xhslink.com/a/AbCdEf",
+    "https://weibo.com/tv/show/1034:4912345678901234",
+    "https://t.cn/A6abcdEf",
+    "https://www.instagram.com/reel/C1abcDEF/",
+    "https://www.instagram.com/p/C1abcDEF/",
+    "https://www.tiktok.com/@user/video/7312345678901234567",
+    "https://vm.tiktok.com/ZMabc123/",
+    "https://www.facebook.com/watch/?v=1234567890",
+    "https://fb.watch/abcDEF/",
+    "https://music.163.com/#/song?id=1901371647",
+    "https://music.163.com/album?id=123456",
+    "https://y.music.163.com/m/playlist?id=2829883282",
+    "http://163cn.tv/abcd",
+    "https://y.qq.com/n/ryqq/songDetail/0039MnYb0qxYhV",
+    "https://y.qq.com/n/ryqq/albumDetail/002eFUFm2XYZ7z",
+    "https://c6.y.qq.com/base/fcgi-bin/u?__=abcdef",
+    "https://music.apple.com/cn/album/fearless/1440935467?i=1440935470",
+    "https://music.apple.com/us/playlist/todays-hits/pl.f4d106fed2bd41149aaacabb233eb5eb",
+    "https://telegra.ph/Some-Post-01-01",
+    "https://www.toutiao.com/video/7312345678901234567/",
+    "https://cn.pornhub.com/view_video.php?viewkey=ph5f1",
+    "https://www.xvideos.com/video12345/title",
+    "https://example.com/some/page",
+    "https://github.com/yt-dlp/yt-dlp/releases",
+)
+
+
+def benchmark(rounds: int = 1000):
+    """对真实链接语料做分类基准测试：首次解析（未缓存）与重复查询（缓存命中）"""
+    corpus = list(BENCHMARK_CORPUS)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for url in corpus:
+            _route(url)
+    uncached = (time.perf_counter() - start) / (rounds * len(corpus))
+
+    route_url.cache_clear()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for url in corpus:
+            route_url(url)
+    cached = (time.perf_counter() - start) / (rounds * len(corpus))
+
+    # 混合链接消息：每条消息 5 个链接，选出第一个受支持的
+    messages = [corpus[i:i + 5] for i in range(0, len(corpus), 5)]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for urls in messages:
+            pick_route(urls)
+    mixed = (time.perf_counter() - start) / (rounds * len(messages))
+
+    counts: Dict[str, int] = {}
+    for url in corpus:
+        platform = route_url(url).platform
+        counts[platform] = counts.get(platform, 0) + 1
+
+    print(f"链接数量: {len(corpus)}，平台: {len(counts)}（不支持 {counts.get(UNKNOWN_PLATFORM, 0)} 个）")
+    print(f"首次解析: {uncached * 1e6:.2f} µs/链接")
+    print(f"缓存命中: {cached * 1e6:.2f} µs/链接")
+    print(f"混合链接消息: {mixed * 1e6:.2f} µs/条（每条 5 个链接）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="链接路由基准测试")
+    parser.add_argument("--rounds", type=int, default=1000, help="重复次数")
+    parser.add_argument("--show", action="store_true", help="打印每个链接的路由结果")
+    args = parser.parse_args()
+    if args.show:
+        for corpus_url in BENCHMARK_CORPUS:
+            print(route_url(corpus_url))
+    benchmark(args.rounds)
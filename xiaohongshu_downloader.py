@@ -11,10 +11,11 @@ import requests
 import os
 import asyncio
 from pathlib import Path
-from urllib.parse import urlparse
 import time
 from typing import List, Dict, Optional
 
+from short_link_resolver import get_short_link_resolver
+
 class XiaohongshuDownloader:
     def __init__(self):
         self.session = requests.Session()
@@ -41,60 +42,10 @@ class XiaohongshuDownloader:
             try:
                 print(f"🔄 正在展开短链接: {url}")
                 
-                # 设置更完整的请求头，模拟真实浏览器
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
-                    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-                    'Accept-Encoding': 'gzip, deflate, br',
-                    'Connection': 'keep-alive',
-                    'Upgrade-Insecure-Requests': '1',
-                    'Sec-Fetch-Dest': 'document',
-                    'Sec-Fetch-Mode': 'navigate',
-                    'Sec-Fetch-Site': 'none',
-                    'Cache-Control': 'max-age=0',
-                    'Referer': 'https://www.xiaohongshu.com/',
-                    'sec-ch-ua': '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
-                    'sec-ch-ua-mobile': '?0',
-                    'sec-ch-ua-platform': '"macOS"'
-                }
-                
-                # 尝试多次重定向
-                max_redirects = 5
-                current_url = url
-                
-                for redirect_count in range(max_redirects):
-                    try:
-                        print(f"🔄 第 {redirect_count + 1} 次请求: {current_url}")
-                        response = self.session.get(current_url, headers=headers, allow_redirects=False, timeout=15)
-                        
-                        if response.status_code in [301, 302, 307, 308]:
-                            # 处理重定向
-                            location = response.headers.get('Location')
-                            if location:
-                                if location.startswith('/'):
-                                    # 相对路径，需要构建完整URL
-                                    parsed = urlparse(current_url)
-                                    location = f"{parsed.scheme}://{parsed.netloc}{location}"
-                                current_url = location
-                                print(f"🔄 重定向到: {current_url}")
-                                
-                                # 检查是否重定向到了通用页面
-                                if '/explore' in current_url or current_url == 'https://www.xiaohongshu.com':
-                                    print(f"⚠️ 重定向到通用页面，可能短链接已过期")
-                                    break
-                                continue
-                        elif response.status_code == 200:
-                            # 成功获取页面
-                            break
-                        else:
-                            print(f"⚠️ 请求状态码: {response.status_code}")
-                            break
-                            
-                    except Exception as e:
-                        print(f"⚠️ 第 {redirect_count + 1} 次请求失败: {e}")
-                        break
-                
+                # 通过共享的短链接解析器展开（HEAD 优先、结果缓存，重复转发的短链接不再请求）
+                current_url = get_short_link_resolver().resolve_sync(url) or url
+                print(f"🔄 重定向到: {current_url}")
+
                 # 返回最终展开的链接
                 if current_url != original_url and '/explore' not in current_url and current_url != 'https://www.xiaohongshu.com':
                     print(f"✅ 短链接展开成功: {current_url}")
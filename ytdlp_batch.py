@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+进程内批量 yt-dlp 下载
+同一组选项下的多个链接共用一组 YoutubeDL 实例（每个工作线程一个，提取器只初始化一次），
+每个视频只提取一次：下载后直接从信息字典得到实际文件名，不再启动 yt-dlp 命令行进程
+"""
+
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import yt_dlp
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 3
+
+
+@dataclass
+class BatchItemResult:
+    """单个链接的下载结果"""
+
+    index: int
+    url: str
+    info: Optional[Dict[str, Any]] = None
+    filepath: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def success(self) -> bool:
+        return self.error is None and self.info is not None
+
+
+def is_anthology(info: Optional[Dict[str, Any]]) -> bool:
+    """B站 anthology（多P视频）在允许 playlist 时返回多个条目的 playlist"""
+    if not info or info.get("_type") != "playlist":
+        return False
+    return len([entry for entry in info.get("entries") or [] if entry]) > 1
+
+
+def downloaded_filepath(ydl: "yt_dlp.YoutubeDL", info: Dict[str, Any]) -> str:
+    """下载完成后的实际文件路径（合并、转码后的最终文件）"""
+    for download in info.get("requested_downloads") or []:
+        if download.get("filepath"):
+            return download["filepath"]
+    if info.get("filepath"):
+        return info["filepath"]
+    filename = ydl.prepare_filename(info)
+    merge_format = ydl.params.get("merge_output_format")
+    if info.get("requested_formats") and merge_format:
+        filename = os.path.splitext(filename)[0] + "." + merge_format
+    return filename
+
+
+class YtdlpBatch:
+    """有界工作线程池中的批量 yt-dlp 下载器"""
+
+    def __init__(self, ydl_opts: Dict[str, Any], max_workers: int = DEFAULT_WORKERS):
+        """
+        初始化批量下载器
+
+        Args:
+            ydl_opts: 所有链接共用的 yt-dlp 选项，outtmpl 可以引用 extra_info 中的字段
+            max_workers: 同时下载的数量
+        """
+        self.ydl_opts = dict(ydl_opts)
+        self.max_workers = max(1, int(max_workers))
+        self._local = threading.local()
+        self._instances: List["yt_dlp.YoutubeDL"] = []
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "YtdlpBatch":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _ydl(self) -> "yt_dlp.YoutubeDL":
+        """当前线程的 YoutubeDL 实例（YoutubeDL 不是线程安全的）"""
+        ydl = getattr(self._local, "ydl", None)
+        if ydl is None:
+            ydl = yt_dlp.YoutubeDL(self.ydl_opts)
+            self._local.ydl = ydl
+            with self._lock:
+                self._instances.append(ydl)
+        return ydl
+
+    def download(self, index: int, url: str, extra_info: Optional[Dict[str, Any]] = None) -> BatchItemResult:
+        """下载单个链接（同步），提取和下载共用一次 extract_info"""
+        result = BatchItemResult(index, url)
+        try:
+            ydl = self._ydl()
+            info = ydl.extract_info(url, download=True, extra_info=extra_info or {})
+            if not info:
+                result.error = "无法获取视频信息"
+                return result
+            result.info = ydl.sanitize_info(info)
+            result.filepath = downloaded_filepath(ydl, info)
+        except Exception as e:
+            result.error = str(e)
+        return result
+
+    def download_all(self, items: Iterable[Tuple[str, Optional[Dict[str, Any]]]],
+                     on_result: Optional[Callable[[BatchItemResult], None]] = None) -> List[BatchItemResult]:
+        """
+        在线程池中下载所有链接
+
+        Args:
+            items: (链接, extra_info) 列表
+            on_result: 每个链接完成时的回调（在工作线程中调用）
+
+        Returns:
+            按输入顺序排列的结果
+        """
+        def run(index: int, url: str, extra_info: Optional[Dict[str, Any]]) -> BatchItemResult:
+            result = self.download(index, url, extra_info)
+            if on_result:
+                try:
+                    on_result(result)
+                except Exception as e:
+                    logger.warning(f"⚠️ 批量下载结果回调失败: {e}")
+            return result
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ytdlp-batch") as pool:
+            futures = [pool.submit(run, index, url, extra_info)
+                       for index, (url, extra_info) in enumerate(items, 1)]
+            return [future.result() for future in futures]
+
+    def close(self):
+        """关闭所有 YoutubeDL 实例"""
+        with self._lock:
+            instances, self._instances = self._instances, []
+        for ydl in instances:
+            try:
+                ydl.close()
+            except Exception:
+                pass
+
+
+def list_download_workers() -> int:
+    """列表下载的并发数（BILIBILI_LIST_WORKERS 环境变量）"""
+    return max(1, int(os.getenv("BILIBILI_LIST_WORKERS", DEFAULT_WORKERS)))